@@ -36,17 +36,17 @@ async def get_patient_demographics():
     try:
         # Search for all patients using async HAPIFHIRClient
         hapi_client = HAPIFHIRClient()
-        response = await hapi_client.search("Patient", {"_count": 1000})
-        entries = response.get('entry', []) if isinstance(response, dict) else []
-        patients = [entry.get('resource', entry) for entry in entries]
         
         # Initialize counters
         gender_dist = {}
         age_dist = {"0-18": 0, "19-35": 0, "36-50": 0, "51-65": 0, "65+": 0}
         race_dist = {}
+        total_patients = 0
         
-        # Process each patient
-        for patient in patients:
+        # Process each patient, page by page (search_iter follows every
+        # Bundle.link[next] — a single _count=1000 page silently truncated)
+        async for patient in hapi_client.search_iter("Patient", {"_count": 1000}):
+            total_patients += 1
             # Gender
             gender = patient.get("gender", "unknown")
             gender_dist[gender] = gender_dist.get(gender, 0) + 1
@@ -75,8 +75,6 @@ async def get_patient_demographics():
                     race_dist[race] = race_dist.get(race, 0) + 1
         
         # Convert to percentages
-        total_patients = len(patients)
-        
         gender_distribution = [
             {"gender": gender.title(), "count": count, "percentage": round((count/total_patients)*100, 1)}
             for gender, count in gender_dist.items()
@@ -114,15 +112,13 @@ async def get_disease_prevalence(limit: int = 20):
     try:
         # Search for all active conditions using async HAPIFHIRClient
         hapi_client = HAPIFHIRClient()
-        response = await hapi_client.search("Condition", {"clinical-status": "active", "_count": 5000})
-        entries = response.get('entry', []) if isinstance(response, dict) else []
-        conditions = [entry.get('resource', entry) for entry in entries]
-        total = len(conditions)
+        total = 0
         
         # Count condition frequencies
         condition_counts = {}
         
-        for condition in conditions:
+        async for condition in hapi_client.search_iter("Condition", {"clinical-status": "active", "_count": 1000}):
+            total += 1
             # Get condition name
             coding = condition.get("code", {}).get("coding", [])
             if coding:
@@ -168,16 +164,14 @@ async def get_medication_patterns(limit: int = 20):
     try:
         # Search for all medication requests using async HAPIFHIRClient
         hapi_client = HAPIFHIRClient()
-        response = await hapi_client.search("MedicationRequest", {"status": "active", "_count": 5000})
-        entries = response.get('entry', []) if isinstance(response, dict) else []
-        med_requests = [entry.get('resource', entry) for entry in entries]
-        total = len(med_requests)
+        total = 0
         
         # Count medication frequencies
         med_counts = {}
         class_counts = {}
         
-        for med_req in med_requests:
+        async for med_req in hapi_client.search_iter("MedicationRequest", {"status": "active", "_count": 1000}):
+            total += 1
             # Get medication name
             med_ref = med_req.get("medicationReference", {})
             med_concept = med_req.get("medicationCodeableConcept", {})
@@ -10,6 +10,8 @@
 import logging
 
 from database import get_db_session
+from services.local_terminology_index import LocalTerminologyIndex
+from services.terminology_service import get_terminology_service
 
 logger = logging.getLogger(__name__)
 from .service import UnifiedCatalogService
@@ -183,15 +185,17 @@ async def search_all_catalogs(
 @router.post("/refresh")
 async def refresh_dynamic_catalogs(
     limit: int = Query(100, ge=10, le=1000),
+    full: bool = Query(False, description="Rebuild from scratch instead of syncing changes"),
     service: UnifiedCatalogService = Depends(get_catalog_service)
 ):
     """
     Refresh dynamic catalogs from FHIR data.
     
-    This extracts fresh catalog data from patient resources.
+    Pulls resources updated since the last sync into the persisted
+    catalogs; full=true re-reads everything (picks up deletions).
     """
     try:
-        await service.dynamic_service.refresh_all_catalogs(limit)
+        await service.dynamic_service.refresh_all_catalogs(limit, full=full)
         return {"message": "Dynamic catalogs refreshed successfully"}
     except Exception as e:
         raise HTTPException(
@@ -200,6 +204,24 @@ async def refresh_dynamic_catalogs(
         )
 
 
+@router.post("/terminology/reload")
+async def reload_terminology_index():
+    """
+    Switch terminology search to a rebuilt index file without a restart.
+
+    Searches already in flight finish on the old file. The index also
+    notices a rebuild by itself within TERMINOLOGY_RELOAD_CHECK_SECONDS.
+    """
+    terminology = get_terminology_service()
+    if not isinstance(terminology, LocalTerminologyIndex):
+        raise HTTPException(
+            status_code=409,
+            detail="No local terminology index in use; restart the backend after building it",
+        )
+    terminology.reload()
+    return {"message": "Terminology index reloaded"}
+
+
 @router.get("/stats")
 async def get_catalog_stats(
     service: UnifiedCatalogService = Depends(get_catalog_service)
@@ -8,6 +8,7 @@
 - ConditionEngine: Main engine for evaluating conditions
 - Condition classes: AgeCondition, GenderCondition, DiagnosisCondition, etc.
 - CompositeCondition: Combine conditions with AND/OR/NOT logic
+- PatientFacts: Indexed prefetch view shared by all conditions in a hook call
 """
 
 from .engine import (
@@ -25,6 +26,12 @@
     ConditionOperator,
     LogicalOperator,
 )
+from .facts import (
+    PatientFacts,
+    BundleIndex,
+    get_patient_facts,
+    patient_facts_scope,
+)
 
 __all__ = [
     "ConditionEngine",
@@ -40,4 +47,8 @@
     "CustomCondition",
     "ConditionOperator",
     "LogicalOperator",
+    "PatientFacts",
+    "BundleIndex",
+    "get_patient_facts",
+    "patient_facts_scope",
 ]
@@ -15,10 +15,11 @@
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional, Union
-from dateutil import parser as date_parser
 import logging
 import re
 
+from .facts import get_patient_facts
+
 logger = logging.getLogger(__name__)
 
 
@@ -132,7 +133,7 @@ async def evaluate(
             )
 
         try:
-            birth = date_parser.parse(birth_date)
+            birth = get_patient_facts().birth_date(patient)
             today = datetime.now()
             age = today.year - birth.year - (
                 (today.month, today.day) < (birth.month, birth.day)
@@ -240,42 +241,23 @@ async def evaluate(
         prefetch: Dict[str, Any]
     ) -> ConditionResult:
         """Evaluate diagnosis condition."""
-        conditions_bundle = prefetch.get(self.prefetch_key, {})
-        entries = conditions_bundle.get("entry", [])
+        conditions = get_patient_facts().bundle(prefetch.get(self.prefetch_key, {}))
 
-        if not entries:
+        if not len(conditions):
             return ConditionResult(
                 satisfied=False,
                 condition_name=self.name,
                 details={"reason": "No conditions found in prefetch"}
             )
 
-        matched_codes = set()
-        matched_texts = set()
-
-        for entry in entries:
-            resource = entry.get("resource", {})
-            code_obj = resource.get("code", {})
-
-            # Check coding matches
-            for coding in code_obj.get("coding", []):
-                if self.coding_system and coding.get("system") != self.coding_system:
-                    continue
-                if coding.get("code") in self.codes:
-                    matched_codes.add(coding.get("code"))
-
-            # Check text matches
-            text = code_obj.get("text", "").lower()
-            display_texts = [
-                c.get("display", "").lower() for c in code_obj.get("coding", [])
-            ]
-
-            for search_text in self.text_contains:
-                if search_text in text:
-                    matched_texts.add(search_text)
-                for display in display_texts:
-                    if search_text in display:
-                        matched_texts.add(search_text)
+        matched_codes = {
+            code for code in self.codes
+            if conditions.with_code(code, self.coding_system)
+        }
+        matched_texts = {
+            search_text for search_text in self.text_contains
+            if conditions.with_text(search_text)
+        }
 
         # Determine satisfaction
         if self.require_all:
@@ -328,35 +310,15 @@ async def evaluate(
         prefetch: Dict[str, Any]
     ) -> ConditionResult:
         """Evaluate medication condition."""
-        meds_bundle = prefetch.get(self.prefetch_key, {})
-        entries = meds_bundle.get("entry", [])
-
-        matching_meds = []
+        meds = get_patient_facts().bundle(prefetch.get(self.prefetch_key, {}), kind="medication")
 
-        for entry in entries:
-            resource = entry.get("resource", {})
-
-            # Get medication code
-            med_code = resource.get("medicationCodeableConcept", {})
-            if not med_code:
-                med_code = resource.get("medication", {}).get("codeableConcept", {})
-
-            # Check code matches
-            for coding in med_code.get("coding", []):
-                if coding.get("code") in self.codes:
-                    matching_meds.append(resource)
-                    break
-            else:
-                # Check text matches
-                text = med_code.get("text", "").lower()
-                display_texts = [
-                    c.get("display", "").lower() for c in med_code.get("coding", [])
-                ]
-
-                for search_text in self.text_contains:
-                    if search_text in text or any(search_text in d for d in display_texts):
-                        matching_meds.append(resource)
-                        break
+        # A medication counts once whether it matched by code or by text
+        positions = set()
+        for code in self.codes:
+            positions.update(meds.with_code(code))
+        for search_text in self.text_contains:
+            positions.update(meds.with_text(search_text))
+        matching_meds = [meds.resources[p] for p in sorted(positions)]
 
         count = len(matching_meds)
         satisfied = count >= self.min_count
@@ -414,38 +376,14 @@ async def evaluate(
         prefetch: Dict[str, Any]
     ) -> ConditionResult:
         """Evaluate lab value condition."""
-        labs_bundle = prefetch.get(self.prefetch_key, {})
-        entries = labs_bundle.get("entry", [])
-
-        matching_labs = []
+        labs = get_patient_facts().bundle(prefetch.get(self.prefetch_key, {}))
         cutoff_date = datetime.now() - timedelta(days=self.within_days)
 
-        for entry in entries:
-            resource = entry.get("resource", {})
-
-            # Check if this is the lab we're looking for
-            code_obj = resource.get("code", {})
-            has_matching_code = any(
-                c.get("code") == self.loinc_code
-                for c in code_obj.get("coding", [])
-            )
-
-            if not has_matching_code:
-                continue
-
-            # Check date if available
-            effective = resource.get("effectiveDateTime")
-            if effective:
-                try:
-                    lab_date = date_parser.parse(effective)
-                    if lab_date.replace(tzinfo=None) < cutoff_date:
-                        continue
-                except Exception:
-                    pass
-
-            matching_labs.append(resource)
+        # Most recent lab with this code inside the window (undated labs
+        # count, ranked after dated ones)
+        latest = labs.latest(labs.with_code(self.loinc_code), since=cutoff_date)
 
-        if not matching_labs:
+        if latest is None:
             return ConditionResult(
                 satisfied=self.operator == ConditionOperator.NOT_EXISTS,
                 condition_name=self.name,
@@ -453,7 +391,7 @@ async def evaluate(
             )
 
         # Get the most recent lab value
-        latest_lab = matching_labs[0]
+        latest_lab = labs.resources[latest]
         lab_value = latest_lab.get("valueQuantity", {}).get("value")
 
         if lab_value is None:
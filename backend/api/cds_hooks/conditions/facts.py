@@ -0,0 +1,220 @@
+"""
+CDS Hooks Patient Facts
+
+A compiled, indexed view of one hook call's prefetch, built once and shared
+by every condition of every service the orchestrator runs for that call.
+
+Educational Focus:
+- Shows build-once / read-many indexing of FHIR Bundles
+- Codes are indexed by code and by system|code, so a diagnosis or
+  medication check is a dict lookup instead of a walk over every entry
+- Observation dates are parsed once and pre-sorted newest-first, so
+  "latest lab within N days" no longer re-parses every effectiveDateTime
+- The view lives in a ContextVar for the duration of a hook invocation;
+  outside one, each lookup builds a throwaway view (same results, no reuse)
+
+Note: the view is a snapshot. It indexes resources as they were when first
+looked at, so services must treat prefetch as read-only (they always had
+to, since the orchestrator hands one prefetch to every service).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from dateutil import parser as date_parser
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_fhir_datetime(value: Any) -> Optional[datetime]:
+    """Parse a FHIR date/dateTime to a naive datetime (None if unparseable)."""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = date_parser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+    return parsed.replace(tzinfo=None)
+
+
+def code_concept(resource: Dict[str, Any]) -> Dict[str, Any]:
+    """The CodeableConcept a Condition/Observation is about."""
+    return resource.get("code") or {}
+
+
+def medication_concept(resource: Dict[str, Any]) -> Dict[str, Any]:
+    """The medication CodeableConcept of a MedicationRequest/Statement."""
+    concept = resource.get("medicationCodeableConcept", {})
+    if not concept:
+        concept = resource.get("medication", {}).get("codeableConcept", {})
+    return concept or {}
+
+
+class BundleIndex:
+    """
+    Indexed view of one prefetch Bundle.
+
+    Educational Notes:
+        - with_code() is a dict lookup over every coding of every entry
+        - with_text() scans pre-lowercased text once per search string and
+          remembers the answer for the next service asking the same thing
+        - latest() walks entries newest-first using dates parsed once
+    """
+
+    def __init__(
+        self,
+        bundle: Optional[Dict[str, Any]],
+        concept: Callable[[Dict[str, Any]], Dict[str, Any]] = code_concept
+    ):
+        entries = (bundle or {}).get("entry", []) if isinstance(bundle, dict) else []
+        self.resources: List[Dict[str, Any]] = [entry.get("resource", {}) for entry in entries]
+
+        self._by_code: Dict[str, List[int]] = {}
+        self._by_system_code: Dict[str, List[int]] = {}
+        self._texts: List[Tuple[str, List[str]]] = []
+        self._text_matches: Dict[str, List[int]] = {}
+        self._dates: Optional[List[Optional[datetime]]] = None
+        self._rank: Optional[List[int]] = None
+
+        for position, resource in enumerate(self.resources):
+            concept_obj = concept(resource)
+            codings = concept_obj.get("coding", [])
+            for coding in codings:
+                code = coding.get("code")
+                if code is None:
+                    continue
+                self._add(self._by_code, code, position)
+                self._add(self._by_system_code, f"{coding.get('system')}|{code}", position)
+            self._texts.append((
+                (concept_obj.get("text") or "").lower(),
+                [(c.get("display") or "").lower() for c in codings]
+            ))
+
+    @staticmethod
+    def _add(index: Dict[str, List[int]], key: str, position: int):
+        positions = index.setdefault(key, [])
+        if not positions or positions[-1] != position:
+            positions.append(position)
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    def with_code(self, code: str, system: Optional[str] = None) -> List[int]:
+        """Entry positions having a coding with this code (and system, if given)."""
+        if system:
+            return self._by_system_code.get(f"{system}|{code}", [])
+        return self._by_code.get(code, [])
+
+    def with_text(self, search_text: str) -> List[int]:
+        """Entry positions whose concept text or a coding display contains search_text."""
+        matches = self._text_matches.get(search_text)
+        if matches is None:
+            matches = [
+                position for position, (text, displays) in enumerate(self._texts)
+                if search_text in text or any(search_text in d for d in displays)
+            ]
+            self._text_matches[search_text] = matches
+        return matches
+
+    def effective_date(self, position: int) -> Optional[datetime]:
+        """Parsed effectiveDateTime of an entry (parsed once for the whole bundle)."""
+        self._ensure_dates()
+        return self._dates[position]
+
+    def latest(self, positions: List[int], since: Optional[datetime] = None) -> Optional[int]:
+        """
+        Most recent of the given entries, by effectiveDateTime.
+
+        Entries dated before `since` are skipped; undated (or unparseable)
+        entries still count but rank after every dated one.
+        """
+        self._ensure_dates()
+        best = None
+        for position in positions:
+            date = self._dates[position]
+            if since is not None and date is not None and date < since:
+                continue
+            if best is None or self._rank[position] < self._rank[best]:
+                best = position
+        return best
+
+    def _ensure_dates(self):
+        if self._dates is not None:
+            return
+        self._dates = [parse_fhir_datetime(r.get("effectiveDateTime")) for r in self.resources]
+        # Newest first, undated last, bundle order among equals
+        dates = self._dates
+        order = sorted(
+            (p for p in range(len(dates)) if dates[p] is not None),
+            key=lambda p: dates[p],
+            reverse=True
+        ) + [p for p in range(len(dates)) if dates[p] is None]
+        self._rank = [0] * len(order)
+        for rank, position in enumerate(order):
+            self._rank[position] = rank
+
+
+class PatientFacts:
+    """
+    Per-invocation cache of BundleIndex views and parsed patient fields.
+
+    Keyed by object identity: every service and condition handed the same
+    prefetch Bundle shares one index of it.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[int, str], Tuple[Any, BundleIndex]] = {}
+        self._birth_dates: Dict[int, Tuple[Any, Optional[datetime]]] = {}
+
+    def bundle(self, bundle: Optional[Dict[str, Any]], kind: str = "code") -> BundleIndex:
+        """Index of a prefetch Bundle; kind is "code" or "medication"."""
+        key = (id(bundle), kind)
+        cached = self._indexes.get(key)
+        if cached is not None and cached[0] is bundle:
+            return cached[1]
+        concept = medication_concept if kind == "medication" else code_concept
+        index = BundleIndex(bundle, concept)
+        # Hold the bundle so its id() can't be reused while we're alive
+        self._indexes[key] = (bundle, index)
+        return index
+
+    def birth_date(self, patient: Dict[str, Any]) -> Optional[datetime]:
+        """Parsed Patient.birthDate (raises ValueError if it doesn't parse)."""
+        cached = self._birth_dates.get(id(patient))
+        if cached is not None and cached[0] is patient:
+            return cached[1]
+        raw = patient.get("birthDate")
+        birth = date_parser.parse(raw) if raw else None
+        self._birth_dates[id(patient)] = (patient, birth)
+        return birth
+
+
+_current_facts: ContextVar[Optional[PatientFacts]] = ContextVar("cds_patient_facts", default=None)
+
+
+def get_patient_facts() -> PatientFacts:
+    """Facts of the current hook invocation, or a throwaway view outside one."""
+    return _current_facts.get() or PatientFacts()
+
+
+@contextmanager
+def patient_facts_scope() -> Iterator[PatientFacts]:
+    """Share one PatientFacts with everything run inside (tasks included).
+
+    Nested scopes reuse the outer one.
+    """
+    facts = _current_facts.get()
+    if facts is not None:
+        yield facts
+        return
+    facts = PatientFacts()
+    token = _current_facts.set(facts)
+    try:
+        yield facts
+    finally:
+        _current_facts.reset(token)
@@ -7,6 +7,7 @@
 - ServiceOrchestrator: Main orchestrator for parallel service execution
 - PriorityServiceOrchestrator: Extended orchestrator with priority support
 - Convenience functions for global orchestrator access
+- LatencyTracker: per-service p50/p95/p99 (drives hedging)
 """
 
 from .service_orchestrator import (
@@ -18,7 +19,9 @@
     get_orchestrator,
     set_orchestrator,
     execute_hook,
+    hook_time_remaining,
 )
+from .latency import LatencyTracker
 
 __all__ = [
     # Service Orchestrator
@@ -30,4 +33,6 @@
     "get_orchestrator",
     "set_orchestrator",
     "execute_hook",
+    "hook_time_remaining",
+    "LatencyTracker",
 ]
@@ -0,0 +1,75 @@
+"""
+CDS Service Latency Tracking
+
+Per-service execution-time percentiles for the orchestrator.
+
+Educational Focus:
+- Keeps a bounded window of recent samples per service, so percentiles
+  follow the service's current behaviour rather than its whole history
+- p50/p95/p99 are computed on demand (nearest rank over the window);
+  recording a sample is an O(1) append
+- Timeouts are recorded at the time they were cut off: the real latency
+  was at least that, so tail percentiles stay honest about stragglers
+- The orchestrator's hedging policy reads a service's p95 from here
+"""
+
+import math
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+CDS_LATENCY_WINDOW = int(os.getenv('CDS_LATENCY_WINDOW', '512'))
+
+
+def _nearest_rank(ordered: List[float], pct: float) -> float:
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LatencyTracker:
+    """Sliding-window latency percentiles per service_id."""
+
+    def __init__(self, window: int = CDS_LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._timeouts: Dict[str, int] = {}
+
+    def record(self, service_id: str, elapsed_ms: float, timed_out: bool = False) -> None:
+        samples = self._samples.get(service_id)
+        if samples is None:
+            samples = self._samples[service_id] = deque(maxlen=self.window)
+        samples.append(elapsed_ms)
+        self._counts[service_id] = self._counts.get(service_id, 0) + 1
+        if timed_out:
+            self._timeouts[service_id] = self._timeouts.get(service_id, 0) + 1
+
+    def sample_count(self, service_id: str) -> int:
+        """Samples currently in the window for service_id."""
+        return len(self._samples.get(service_id, ()))
+
+    def percentile(self, service_id: str, pct: float) -> Optional[float]:
+        """pct-th percentile (0-100] of the window, or None with no samples."""
+        samples = self._samples.get(service_id)
+        if not samples:
+            return None
+        return _nearest_rank(sorted(samples), pct)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for service_id, samples in self._samples.items():
+            ordered = sorted(samples)
+            stats[service_id] = {
+                "count": self._counts.get(service_id, 0),
+                "timeouts": self._timeouts.get(service_id, 0),
+                "window": len(ordered),
+                "p50_ms": round(_nearest_rank(ordered, 50), 2),
+                "p95_ms": round(_nearest_rank(ordered, 95), 2),
+                "p99_ms": round(_nearest_rank(ordered, 99), 2),
+            }
+        return stats
+
+    def reset(self) -> None:
+        self._samples.clear()
+        self._counts.clear()
+        self._timeouts.clear()
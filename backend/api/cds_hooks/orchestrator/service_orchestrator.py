@@ -8,11 +8,16 @@
 - Demonstrates async orchestration patterns
 - Shows parallel service execution with asyncio
 - Illustrates timeout handling and error recovery
+- One hook-level deadline shared by every service: fast services' cards
+  are returned when it hits, stragglers are reported as timed out
+- Optional hedged execute() for idempotent services with a slow tail
 """
 
 import asyncio
 import logging
+import os
 import uuid
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Set, Tuple, Type
@@ -20,10 +25,31 @@
 
 from ..services.base_service import CDSService, HookType
 from ..conditions.engine import ConditionEngine, Condition
+from ..conditions.facts import patient_facts_scope
+from ..prefetch import get_prefetch_engine
 from ..models import Card, CDSHookResponse
+from .latency import LatencyTracker
 
 logger = logging.getLogger(__name__)
 
+# Hedging: once an idempotent service has CDS_HEDGE_MIN_SAMPLES latency
+# samples, an execute() still running after its CDS_HEDGE_PERCENTILE-th
+# percentile gets a second, racing execute(); the first to succeed wins.
+CDS_HEDGE_ENABLED = os.getenv('CDS_HEDGE_ENABLED', 'false').lower() == 'true'
+CDS_HEDGE_MIN_SAMPLES = int(os.getenv('CDS_HEDGE_MIN_SAMPLES', '20'))
+CDS_HEDGE_PERCENTILE = float(os.getenv('CDS_HEDGE_PERCENTILE', '95'))
+
+# Event-loop time by which the current hook call must answer
+_hook_deadline: ContextVar[Optional[float]] = ContextVar("cds_hook_deadline", default=None)
+
+
+def hook_time_remaining() -> Optional[float]:
+    """Seconds left before the current hook call's deadline (None outside one)."""
+    deadline = _hook_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - asyncio.get_running_loop().time())
+
 
 class ExecutionStatus(str, Enum):
     """Status of service execution."""
@@ -59,6 +85,7 @@ class OrchestratorResult:
     services_executed: int
     services_skipped: int
     services_failed: int
+    services_timed_out: int = 0
 
     def to_cds_response(self) -> CDSHookResponse:
         """Convert to CDS Hooks response format."""
@@ -74,13 +101,15 @@ class ServiceOrchestrator:
     - Parallel service execution with asyncio.gather
     - Prefetch data resolution
     - Condition evaluation
-    - Timeout handling
+    - Hook-level deadline and per-service latency percentiles
     - Response aggregation
 
     Educational Notes:
         - Services run in parallel for performance
         - Each service has independent condition evaluation
         - Failed services don't affect others
+        - All services of a hook call share one deadline; the time a
+          service spends waiting for a concurrency slot counts against it
         - Results are aggregated into a single response
     """
 
@@ -88,21 +117,32 @@ def __init__(
         self,
         condition_engine: Optional[ConditionEngine] = None,
         default_timeout_ms: int = 5000,
-        max_concurrent_services: int = 10
+        max_concurrent_services: int = 10,
+        hedging: Optional[bool] = None,
+        latency_tracker: Optional[LatencyTracker] = None
     ):
         """
         Initialize the orchestrator.
 
         Args:
             condition_engine: Engine for evaluating service conditions
-            default_timeout_ms: Default timeout for service execution
+            default_timeout_ms: Default hook deadline (whole hook call)
             max_concurrent_services: Maximum services to run concurrently
+            hedging: Hedge idempotent services' execute() (default: CDS_HEDGE_ENABLED)
+            latency_tracker: Where execution times are recorded
         """
         self.condition_engine = condition_engine or ConditionEngine()
         self.default_timeout_ms = default_timeout_ms
         self.max_concurrent_services = max_concurrent_services
         self._semaphore = asyncio.Semaphore(max_concurrent_services)
 
+        self.hedging = CDS_HEDGE_ENABLED if hedging is None else hedging
+        self.hedge_min_samples = CDS_HEDGE_MIN_SAMPLES
+        self.hedge_percentile = CDS_HEDGE_PERCENTILE
+        self.latency = latency_tracker or LatencyTracker()
+        self.hedges_started = 0
+        self.hedges_won = 0
+
         # Service registry - maps service_id to (service_instance, conditions)
         self._services: Dict[str, Tuple[CDSService, List[Condition]]] = {}
 
@@ -175,13 +215,14 @@ async def execute(
             context: CDS Hooks context object
             prefetch: Pre-fetched FHIR resources
             service_ids: Optional list of specific service IDs to execute
-            timeout_ms: Optional timeout override
+            timeout_ms: Optional hook deadline override
 
         Returns:
             OrchestratorResult containing all cards and execution details
         """
         start_time = datetime.now()
         timeout = timeout_ms or self.default_timeout_ms
+        deadline = asyncio.get_running_loop().time() + timeout / 1000
 
         # Determine which services to execute
         if service_ids:
@@ -208,13 +249,34 @@ async def execute(
                 services_failed=0
             )
 
-        # Execute services in parallel
-        tasks = [
-            self._execute_service(service, conditions, context, prefetch, timeout)
-            for service, conditions in services_to_execute
-        ]
+        # Without client-supplied prefetch, resolve the union of the services'
+        # templates once so shared queries (Patient, Conditions, ...) hit
+        # the FHIR server once per hook instead of once per service
+        prefetch_by_service: Dict[str, Dict[str, Any]] = {}
+        token = _hook_deadline.set(deadline)
+        try:
+            if not prefetch:
+                prefetch_by_service = await self._resolve_prefetch(
+                    [service for service, _ in services_to_execute], context
+                )
+
+            # One patient-facts view for the whole hook call: every service's
+            # conditions index the shared prefetch Bundles once between them
+            with patient_facts_scope():
+                tasks = [
+                    self._execute_service(
+                        service, conditions, context,
+                        prefetch_by_service.get(service.service_id, prefetch),
+                        timeout, deadline
+                    )
+                    for service, conditions in services_to_execute
+                ]
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+                # Execute services in parallel; each one is cut off at the
+                # shared deadline, so this returns by then at the latest
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            _hook_deadline.reset(token)
 
         # Process results
         service_results: List[ServiceExecutionResult] = []
@@ -222,6 +284,7 @@ async def execute(
         executed_count = 0
         skipped_count = 0
         failed_count = 0
+        timed_out_count = 0
 
         for result in results:
             if isinstance(result, Exception):
@@ -242,6 +305,8 @@ async def execute(
                     skipped_count += 1
                 else:
                     failed_count += 1
+                    if result.status == ExecutionStatus.TIMEOUT:
+                        timed_out_count += 1
 
         total_time = (datetime.now() - start_time).total_seconds() * 1000
 
@@ -251,34 +316,115 @@ async def execute(
             total_execution_time_ms=total_time,
             services_executed=executed_count,
             services_skipped=skipped_count,
-            services_failed=failed_count
+            services_failed=failed_count,
+            services_timed_out=timed_out_count
         )
 
+    async def _resolve_prefetch(
+        self,
+        services: List[CDSService],
+        context: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve the prefetch templates of several services in one pass.
+
+        Args:
+            services: Services about to execute
+            context: CDS Hooks context
+
+        Returns:
+            Map of service_id to its resolved prefetch (empty on failure)
+        """
+        configs = {
+            service.service_id: service.prefetch_templates
+            for service in services
+            if service.prefetch_templates
+        }
+        if not configs:
+            return {}
+
+        try:
+            return await get_prefetch_engine().execute_prefetch_for_services(
+                configs, {"context": context}, share_results=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to resolve prefetch for hook services: {e}")
+            return {}
+
     async def _execute_service(
         self,
         service: CDSService,
         conditions: List[Condition],
         context: Dict[str, Any],
         prefetch: Dict[str, Any],
-        timeout_ms: int
+        timeout_ms: int,
+        deadline: Optional[float] = None
     ) -> ServiceExecutionResult:
         """
-        Execute a single CDS service with conditions and timeout.
+        Execute a single CDS service with conditions, within the deadline.
+
+        Waiting for a concurrency slot, conditions, should_execute and
+        execute all share one budget: whatever is left of the hook deadline
+        (or timeout_ms from now, without one).
 
         Args:
             service: The service to execute
             conditions: Conditions to evaluate before execution
             context: CDS Hooks context
             prefetch: Prefetch data
-            timeout_ms: Execution timeout
+            timeout_ms: Execution timeout (when no deadline is given)
+            deadline: Event-loop time the hook call must answer by
 
         Returns:
             ServiceExecutionResult with cards or error
         """
-        start_time = datetime.now()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        if deadline is None:
+            deadline = started + timeout_ms / 1000
+
+        try:
+            return await asyncio.wait_for(
+                self._run_service(service, conditions, context, prefetch, started, deadline),
+                timeout=max(0.0, deadline - started)
+            )
+
+        except asyncio.TimeoutError:
+            elapsed_ms = (loop.time() - started) * 1000
+            self.latency.record(service.service_id, elapsed_ms, timed_out=True)
+            logger.warning(
+                f"Service {service.service_id} timed out at the hook deadline after {elapsed_ms:.0f}ms"
+            )
+            return ServiceExecutionResult(
+                service_id=service.service_id,
+                status=ExecutionStatus.TIMEOUT,
+                execution_time_ms=elapsed_ms,
+                error=f"Execution timeout ({elapsed_ms:.0f}ms, hook deadline)"
+            )
+
+        except Exception as e:
+            logger.exception(f"Error executing service {service.service_id}")
+            return ServiceExecutionResult(
+                service_id=service.service_id,
+                status=ExecutionStatus.FAILED,
+                error=str(e)
+            )
+
+    async def _run_service(
+        self,
+        service: CDSService,
+        conditions: List[Condition],
+        context: Dict[str, Any],
+        prefetch: Dict[str, Any],
+        started: float,
+        deadline: float
+    ) -> ServiceExecutionResult:
+        """Conditions, should_execute and execute (the caller enforces the deadline)."""
+        loop = asyncio.get_running_loop()
 
         async with self._semaphore:
-            try:
+            # Reuses the hook call's patient facts; execute_single gets its own
+            with patient_facts_scope():
                 # Evaluate conditions first
                 if conditions:
                     condition_result = await self.condition_engine.evaluate(
@@ -293,10 +439,7 @@ async def _execute_service(
                         )
 
                 # Check service's own should_execute
-                should_run = await asyncio.wait_for(
-                    service.should_execute(context, prefetch),
-                    timeout=timeout_ms / 1000
-                )
+                should_run = await service.should_execute(context, prefetch)
 
                 if not should_run:
                     return ServiceExecutionResult(
@@ -306,37 +449,66 @@ async def _execute_service(
                     )
 
                 # Execute the service
-                cards = await asyncio.wait_for(
-                    service.execute(context, prefetch),
-                    timeout=timeout_ms / 1000
-                )
-
-                execution_time = (datetime.now() - start_time).total_seconds() * 1000
+                execute_started = loop.time()
+                cards = await self._call_execute(service, context, prefetch, deadline)
+                self.latency.record(service.service_id, (loop.time() - execute_started) * 1000)
 
                 return ServiceExecutionResult(
                     service_id=service.service_id,
                     status=ExecutionStatus.COMPLETED,
                     cards=cards,
-                    execution_time_ms=execution_time
+                    execution_time_ms=(loop.time() - started) * 1000
                 )
 
-            except asyncio.TimeoutError:
-                logger.warning(
-                    f"Service {service.service_id} timed out after {timeout_ms}ms"
-                )
-                return ServiceExecutionResult(
-                    service_id=service.service_id,
-                    status=ExecutionStatus.TIMEOUT,
-                    error=f"Execution timeout ({timeout_ms}ms)"
-                )
+    def _hedge_delay(self, service: CDSService) -> Optional[float]:
+        """Seconds to wait before hedging service.execute(), or None to not hedge."""
+        if not self.hedging or not getattr(service, "idempotent", False):
+            return None
+        if self.latency.sample_count(service.service_id) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(service.service_id, self.hedge_percentile) / 1000
 
-            except Exception as e:
-                logger.exception(f"Error executing service {service.service_id}")
-                return ServiceExecutionResult(
-                    service_id=service.service_id,
-                    status=ExecutionStatus.FAILED,
-                    error=str(e)
-                )
+    async def _call_execute(
+        self,
+        service: CDSService,
+        context: Dict[str, Any],
+        prefetch: Dict[str, Any],
+        deadline: float
+    ) -> List[Card]:
+        """
+        service.execute(), hedged when the service allows it.
+
+        A hedge is only started if it could still finish before the
+        deadline. Whichever call succeeds first wins and the other is
+        cancelled; if both fail, the primary's error is raised.
+        """
+        delay = self._hedge_delay(service)
+        if delay is None or asyncio.get_running_loop().time() + delay >= deadline:
+            return await service.execute(context, prefetch)
+
+        primary = asyncio.ensure_future(service.execute(context, prefetch))
+        calls = [primary]
+        try:
+            done, _ = await asyncio.wait(calls, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedges_started += 1
+            hedge = asyncio.ensure_future(service.execute(context, prefetch))
+            calls.append(hedge)
+            pending = set(calls)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for call in done:
+                    if call.exception() is None:
+                        if call is hedge:
+                            self.hedges_won += 1
+                        return call.result()
+            return primary.result()
+        finally:
+            for call in calls:
+                if not call.done():
+                    call.cancel()
 
     async def execute_single(
         self,
@@ -352,7 +524,7 @@ async def execute_single(
             service_id: ID of the service to execute
             context: CDS Hooks context
             prefetch: Prefetch data
-            timeout_ms: Optional timeout override
+            timeout_ms: Optional deadline override
 
         Returns:
             ServiceExecutionResult for the single service
@@ -365,11 +537,42 @@ async def execute_single(
             )
 
         service, conditions = self._services[service_id]
-        timeout = timeout_ms or self.default_timeout_ms
+        return await self.execute_unregistered(service, context, prefetch, timeout_ms, conditions)
 
-        return await self._execute_service(
-            service, conditions, context, prefetch, timeout
-        )
+    async def execute_unregistered(
+        self,
+        service: CDSService,
+        context: Dict[str, Any],
+        prefetch: Dict[str, Any],
+        timeout_ms: Optional[int] = None,
+        conditions: Optional[List[Condition]] = None
+    ) -> ServiceExecutionResult:
+        """
+        Execute one service that needn't be registered (e.g. an external one).
+
+        It runs like a hook call of its own: one deadline for the whole
+        call, visible to the service through hook_time_remaining(), with
+        latency tracking and hedging as for registered services.
+
+        Args:
+            service: The service to execute
+            context: CDS Hooks context
+            prefetch: Prefetch data
+            timeout_ms: Optional deadline override
+            conditions: Conditions to evaluate before execution
+
+        Returns:
+            ServiceExecutionResult for the service
+        """
+        timeout = timeout_ms or self.default_timeout_ms
+        deadline = asyncio.get_running_loop().time() + timeout / 1000
+        token = _hook_deadline.set(deadline)
+        try:
+            return await self._execute_service(
+                service, conditions or [], context, prefetch, timeout, deadline
+            )
+        finally:
+            _hook_deadline.reset(token)
 
     def get_service_definitions(
         self,
@@ -394,6 +597,19 @@ def get_service_definitions(
 
         return definitions
 
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """Per-service p50/p95/p99 and hedging counters."""
+        return {
+            "services": self.latency.get_stats(),
+            "hedging": {
+                "enabled": self.hedging,
+                "percentile": self.hedge_percentile,
+                "min_samples": self.hedge_min_samples,
+                "hedges_started": self.hedges_started,
+                "hedges_won": self.hedges_won,
+            },
+        }
+
     @property
     def service_count(self) -> int:
         """Get count of registered services."""
@@ -467,17 +683,24 @@ async def execute(
         all_cards: List[Card] = []
         all_results: List[ServiceExecutionResult] = []
         timeout = timeout_ms or self.default_timeout_ms
+        # One deadline across all priority groups: a slow group eats into
+        # the budget of the ones after it instead of extending the hook
+        deadline = asyncio.get_running_loop().time() + timeout / 1000
 
         for priority in sorted(priority_groups.keys()):
             services = priority_groups[priority]
 
             # Execute this priority group in parallel
             tasks = [
-                self._execute_service(service, conditions, context, prefetch, timeout)
+                self._execute_service(service, conditions, context, prefetch, timeout, deadline)
                 for service, conditions in services
             ]
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            token = _hook_deadline.set(deadline)
+            try:
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                _hook_deadline.reset(token)
 
             for result in results:
                 if isinstance(result, ServiceExecutionResult):
@@ -498,7 +721,8 @@ async def execute(
             total_execution_time_ms=total_time,
             services_executed=sum(1 for r in all_results if r.success),
             services_skipped=sum(1 for r in all_results if r.status == ExecutionStatus.SKIPPED),
-            services_failed=sum(1 for r in all_results if r.status == ExecutionStatus.FAILED)
+            services_failed=sum(1 for r in all_results if r.status == ExecutionStatus.FAILED),
+            services_timed_out=sum(1 for r in all_results if r.status == ExecutionStatus.TIMEOUT)
         )
 
 
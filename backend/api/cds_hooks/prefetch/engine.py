@@ -17,10 +17,28 @@
 import json
 import logging
 import asyncio
-from urllib.parse import quote
+from urllib.parse import parse_qsl, quote
+
+from services.fhir_resource_cache import (
+    FHIRResourceCache,
+    get_resource_cache,
+    patient_id_from_params,
+    patient_id_of,
+    patient_tag,
+    resource_tag,
+    type_tag,
+)
 
 logger = logging.getLogger(__name__)
 
+# Seconds a resolved prefetch query is reused across hook firings (0 disables).
+# Off by default: write invalidation only sees writes made by this process,
+# so enable it only when a single worker fronts HAPI.
+CDS_PREFETCH_CACHE_TTL = float(os.getenv('CDS_PREFETCH_CACHE_TTL', '0'))
+
+# Pack each hook call's prefetch queries into one FHIR batch Bundle POST
+CDS_PREFETCH_BATCH = os.getenv('CDS_PREFETCH_BATCH', 'false').lower() == 'true'
+
 
 class PrefetchTemplates:
     """
@@ -162,22 +180,55 @@ class PrefetchEngine:
     - Parallel query execution
     - FHIR resource fetching and searching
     - Error handling and logging
+    - Query sharing across services and hook firings
 
     Educational Notes:
         - Prefetch improves CDS service performance by loading data upfront
         - Queries execute in parallel using asyncio.gather
-        - Results are cached per-request, not globally
+        - Templates are resolved first and each distinct resolved query runs
+          once, however many prefetch keys or services ask for it
+        - Concurrent hook calls (one request per service) join the query
+          already in flight instead of repeating it
+        - Results are kept for a short TTL in the shared FHIR resource cache,
+          tagged by patient and resource type, so a write to the chart drops
+          them immediately
+        - With batch enabled, a call's uncached queries go to the server as
+          one batch Bundle: one round trip instead of one per query
     """
 
-    def __init__(self, fhir_client=None):
+    def __init__(
+        self,
+        fhir_client=None,
+        cache: Optional[FHIRResourceCache] = None,
+        cache_ttl: Optional[float] = None,
+        batch: Optional[bool] = None
+    ):
         """
         Initialize the prefetch engine.
 
         Args:
             fhir_client: Optional FHIR client for making requests.
                         If not provided, will attempt to use the global client.
+            cache: Cache for resolved queries. Defaults to the shared FHIR
+                   resource cache when talking to HAPI; an injected client
+                   is not cached unless a cache is passed explicitly, since
+                   HAPI write invalidation knows nothing about its data.
+            cache_ttl: Seconds a resolved query is reused (0 disables)
+            batch: Send a call's queries as one FHIR batch Bundle POST
+                   (the client must implement batch_get)
         """
         self._fhir_client = fhir_client
+        self._cache = cache
+        self.cache_ttl = CDS_PREFETCH_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.batch = CDS_PREFETCH_BATCH if batch is None else batch
+
+        # Resolved query -> future of its serialized result
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+        self.queries_executed = 0
+        self.queries_shared = 0
+        self.cache_hits = 0
+        self.batches_executed = 0
 
     @property
     def fhir_client(self):
@@ -187,6 +238,15 @@ def fhir_client(self):
             self._fhir_client = HAPIFHIRPrefetchClient()
         return self._fhir_client
 
+    @property
+    def cache(self) -> Optional[FHIRResourceCache]:
+        """Cache for resolved queries, or None when caching is off."""
+        if self.cache_ttl <= 0:
+            return None
+        if self._cache is None and self._fhir_client is None:
+            return get_resource_cache()
+        return self._cache
+
     async def execute_prefetch(
         self,
         prefetch_config: Dict[str, str],
@@ -205,40 +265,223 @@ async def execute_prefetch(
         if not prefetch_config:
             return {}
 
-        # Execute queries in parallel for performance
-        tasks = []
-        keys = list(prefetch_config.keys())
+        results = await self.execute_prefetch_for_services({"": prefetch_config}, context)
+        return results[""]
 
-        for key in keys:
-            template = prefetch_config[key]
-            task = self._execute_single_prefetch(key, template, context)
-            tasks.append(task)
+    async def execute_prefetch_for_services(
+        self,
+        prefetch_configs: Dict[str, Dict[str, str]],
+        context: Dict[str, Any],
+        share_results: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Execute the prefetch of several services for one hook invocation.
 
-        completed_results = await asyncio.gather(*tasks, return_exceptions=True)
+        The union of all templates is resolved once; each distinct resolved
+        query is fetched once and its result handed to every service (and
+        every key) that asked for it.
 
-        # Combine results
-        results = {}
-        for idx, key in enumerate(keys):
-            result = completed_results[idx]
-            if isinstance(result, Exception):
-                logger.error(f"Prefetch error for '{key}': {result}")
-                results[key] = None
+        Args:
+            prefetch_configs: Map of service id to its prefetch configuration
+            context: CDS Hooks context with values for template resolution
+            share_results: Hand every consumer of a query the same parsed
+                object (read-only use, as the orchestrator's services do)
+                instead of a private copy each
+
+        Returns:
+            Map of service id to (prefetch key -> FHIR resource/bundle result)
+        """
+        # Resolve every template first so identical queries collapse
+        resolved: Dict[Tuple[str, str], str] = {}
+        for service_id, config in prefetch_configs.items():
+            for key, template in (config or {}).items():
+                resolved[(service_id, key)] = PrefetchResolver.resolve_template(template, context)
+
+        queries = list(dict.fromkeys(resolved.values()))
+        if self.batch and len(queries) > 1:
+            bodies = await self._fetch_batch(queries)
+        else:
+            completed = await asyncio.gather(
+                *(self._fetch_shared(query) for query in queries),
+                return_exceptions=True
+            )
+            bodies = dict(zip(queries, completed))
+
+        # Unless sharing, every consumer parses its own copy, so one service
+        # mutating its prefetch can't leak into another's
+        results: Dict[str, Dict[str, Any]] = {
+            service_id: {} for service_id in prefetch_configs
+        }
+        shared: Dict[str, Any] = {}
+        for (service_id, key), query in resolved.items():
+            body = bodies[query]
+            if isinstance(body, Exception):
+                logger.error(f"Prefetch error for '{key}': {body}")
+                results[service_id][key] = None
+            elif body is None:
+                results[service_id][key] = None
+            elif share_results:
+                if query not in shared:
+                    shared[query] = json.loads(body)
+                results[service_id][key] = shared[query]
             else:
-                results[key] = result
+                results[service_id][key] = json.loads(body)
 
         return results
 
-    async def _execute_single_prefetch(
-        self,
-        key: str,
-        template: str,
-        context: Dict[str, Any]
-    ) -> Any:
-        """Execute a single prefetch query."""
+    async def _fetch_shared(self, query: str) -> Optional[str]:
+        """Serialized result of a resolved query, via cache or in-flight fetch."""
+        cached = self._cached(query)
+        if cached is not None:
+            return cached
+
+        pending = self._in_flight.get(query)
+        if pending is not None:
+            self.queries_shared += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[query] = future
         try:
-            # Replace tokens in template
-            query = PrefetchResolver.resolve_template(template, context)
+            generation = self._generation()
+            body = self._store(query, await self._execute_query(query), generation)
+            future.set_result(body)
+            return body
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a query nobody joined doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(query, None)
+
+    async def _fetch_batch(self, queries: List[str]) -> Dict[str, Any]:
+        """Like _fetch_shared for many queries, sending the misses as one batch."""
+        bodies: Dict[str, Any] = {}
+        joined: Dict[str, asyncio.Future] = {}
+        owned: Dict[str, asyncio.Future] = {}
+        loop = asyncio.get_running_loop()
+
+        for query in queries:
+            cached = self._cached(query)
+            if cached is not None:
+                bodies[query] = cached
+            elif query in self._in_flight:
+                self.queries_shared += 1
+                joined[query] = self._in_flight[query]
+            else:
+                owned[query] = self._in_flight[query] = loop.create_future()
+
+        if owned:
+            try:
+                generation = self._generation()
+                results = await self._execute_batch(list(owned))
+                for (query, future), result in zip(owned.items(), results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                        future.exception()
+                        bodies[query] = result
+                    else:
+                        bodies[query] = self._store(query, result, generation)
+                        future.set_result(bodies[query])
+            except BaseException as e:
+                for future in owned.values():
+                    if not future.done():
+                        future.set_exception(e)
+                        future.exception()
+                raise
+            finally:
+                for query in owned:
+                    self._in_flight.pop(query, None)
+
+        for query, future in joined.items():
+            try:
+                bodies[query] = await asyncio.shield(future)
+            except Exception as e:
+                bodies[query] = e
+
+        return bodies
+
+    async def _execute_batch(self, queries: List[str]) -> List[Any]:
+        """
+        Execute resolved queries as one FHIR batch Bundle.
+
+        Entries that fail inside the batch are retried individually, and a
+        batch the server rejects outright falls back to individual queries.
+        """
+        try:
+            entries = await self.fhir_client.batch_get(queries)
+        except Exception as e:
+            logger.warning(f"Prefetch batch failed, running {len(queries)} queries individually: {e}")
+            return await asyncio.gather(
+                *(self._execute_query(query) for query in queries),
+                return_exceptions=True
+            )
+
+        self.batches_executed += 1
+        self.queries_executed += len(queries)
+
+        results: List[Any] = []
+        retry: List[int] = []
+        for index, (query, (status, resource)) in enumerate(zip(queries, entries)):
+            resource_path, params = PrefetchResolver.parse_query(query)
+            direct = "/" in resource_path and not params
+            if 200 <= status < 300 and direct:
+                results.append(resource)
+            elif 200 <= status < 300:
+                results.append(self._searchset_bundle(
+                    resource_path,
+                    [entry.get("resource", {}) for entry in (resource or {}).get("entry", [])]
+                ))
+            else:
+                results.append(None)
+                if not (direct and status == 404):
+                    retry.append(index)
+
+        if retry:
+            logger.warning(f"Prefetch batch: {len(retry)} entries failed, retrying individually")
+            retried = await asyncio.gather(
+                *(self._execute_query(queries[index]) for index in retry),
+                return_exceptions=True
+            )
+            for index, result in zip(retry, retried):
+                results[index] = result
+
+        return results
+
+    def _generation(self) -> Optional[int]:
+        cache = self.cache
+        return cache.write_generation if cache is not None else None
 
+    def _cached(self, query: str) -> Optional[str]:
+        """Serialized cached result of a resolved query, or None."""
+        cache = self.cache
+        if cache is None:
+            return None
+        cached = cache.get(("prefetch", query))
+        if cached is not None:
+            self.cache_hits += 1
+        return cached
+
+    def _store(self, query: str, result: Any, generation: Optional[int]) -> Optional[str]:
+        """Serialize a query result and cache it unless the lookup failed."""
+        body = json.dumps(result) if result is not None else None
+        cache = self.cache
+        if cache is not None and body is not None:
+            cache.set(
+                ("prefetch", query),
+                body,
+                tags=self._cache_tags(query, result),
+                ttl=self.cache_ttl,
+                size=len(body),
+                generation=generation
+            )
+        return body
+
+    async def _execute_query(self, query: str) -> Any:
+        """Execute a single resolved prefetch query."""
+        self.queries_executed += 1
+        try:
             # Parse query to determine resource type and parameters
             resource_path, params = PrefetchResolver.parse_query(query)
 
@@ -251,9 +494,49 @@ async def _execute_single_prefetch(
                 return await self._search_resources(resource_path, params)
 
         except Exception as e:
-            logger.error(f"Error executing prefetch for '{key}': {e}")
+            logger.error(f"Error executing prefetch query '{query}': {e}")
             raise
 
+    @staticmethod
+    def _cache_tags(query: str, result: Any) -> List[str]:
+        """Invalidation tags: every type the query returns, the resource, its patient."""
+        resource_path, params = PrefetchResolver.parse_query(query)
+        types = {resource_path.split("/", 1)[0]}
+        if "?" in query:
+            # _include may name its target type; _revinclude names its source
+            for key, value in parse_qsl(query.split("?", 1)[1]):
+                parts = value.split(":")
+                if key.startswith("_include") and len(parts) > 2:
+                    types.add(parts[2])
+                elif key.startswith("_revinclude") and parts[0] not in ("", "*"):
+                    types.add(parts[0])
+        if isinstance(result, dict):
+            types.update(
+                entry["resource"]["resourceType"]
+                for entry in result.get("entry", [])
+                if isinstance(entry.get("resource"), dict) and entry["resource"].get("resourceType")
+            )
+        tags = [type_tag(t) for t in sorted(types)]
+        if "/" in resource_path and not params:
+            tags.append(resource_tag(*resource_path.split("/", 1)))
+            patient_id = patient_id_of(result)
+        else:
+            patient_id = patient_id_from_params(params)
+        if patient_id:
+            tags.append(patient_tag(patient_id))
+        return tags
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Query sharing counters for monitoring."""
+        return {
+            "queries_executed": self.queries_executed,
+            "queries_shared": self.queries_shared,
+            "cache_hits": self.cache_hits,
+            "batches_executed": self.batches_executed,
+            "in_flight": len(self._in_flight),
+            "cache_ttl_s": self.cache_ttl,
+        }
+
     async def _fetch_resource_by_id(self, resource_path: str) -> Optional[Dict[str, Any]]:
         """Fetch a specific resource by ID using FHIR client."""
         try:
@@ -274,34 +557,31 @@ async def _search_resources(
         resource_type: str,
         params: Dict[str, str]
     ) -> Dict[str, Any]:
-        """Search for resources based on parameters."""
-        try:
-            resources = await self.fhir_client.search_resources(resource_type, params)
-
-            # Create bundle response
-            bundle = {
-                "resourceType": "Bundle",
-                "type": "searchset",
-                "total": len(resources) if resources else 0,
-                "entry": [
-                    {
-                        "resource": resource,
-                        "fullUrl": f"{resource_type}/{resource.get('id', 'unknown')}"
-                    }
-                    for resource in (resources or [])
-                ]
-            }
-
-            return bundle
+        """
+        Search for resources based on parameters.
 
-        except Exception as e:
-            logger.error(f"Error searching resources: {e}")
-            return {
-                "resourceType": "Bundle",
-                "type": "searchset",
-                "total": 0,
-                "entry": []
-            }
+        A failed search raises rather than answering an empty Bundle: an
+        empty result would be cached and served as "nothing on file" to
+        every hook for this patient until the TTL runs out.
+        """
+        resources = await self.fhir_client.search_resources(resource_type, params)
+        return self._searchset_bundle(resource_type, resources)
+
+    @staticmethod
+    def _searchset_bundle(resource_type: str, resources: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Searchset Bundle handed to services for a search prefetch."""
+        return {
+            "resourceType": "Bundle",
+            "type": "searchset",
+            "total": len(resources) if resources else 0,
+            "entry": [
+                {
+                    "resource": resource,
+                    "fullUrl": f"{resource_type}/{resource.get('id', 'unknown')}"
+                }
+                for resource in (resources or [])
+            ]
+        }
 
     def get_recommended_prefetch(self, hook_type: str) -> Dict[str, str]:
         """Get recommended prefetch configuration for a hook type."""
@@ -353,28 +633,23 @@ async def search_resources(
         resource_type: str,
         params: Dict[str, str]
     ) -> List[Dict[str, Any]]:
-        """Search for resources."""
-        try:
-            loop = asyncio.get_event_loop()
-            resources = await loop.run_in_executor(
-                None,
-                lambda: self._search_resources(resource_type, params)
-            )
-
-            if resources:
-                # Convert to list of dicts
-                result = []
-                for resource in resources:
-                    if hasattr(resource, "as_json"):
-                        result.append(resource.as_json())
-                    elif isinstance(resource, dict):
-                        result.append(resource)
-                return result
-            return []
-
-        except Exception as e:
-            logger.error(f"Error searching {resource_type}: {e}")
-            return []
+        """Search for resources. Errors propagate so they aren't mistaken for no matches."""
+        loop = asyncio.get_event_loop()
+        resources = await loop.run_in_executor(
+            None,
+            lambda: self._search_resources(resource_type, params)
+        )
+
+        if resources:
+            # Convert to list of dicts
+            result = []
+            for resource in resources:
+                if hasattr(resource, "as_json"):
+                    result.append(resource.as_json())
+                elif isinstance(resource, dict):
+                    result.append(resource)
+            return result
+        return []
 
 
 class NoOpFHIRClient:
@@ -398,6 +673,7 @@ class HAPIFHIRPrefetchClient:
     Educational Notes:
         - Direct HTTP calls to HAPI FHIR JPA Server
         - Supports all FHIR R4 search parameters
+        - batch_get packs many queries into one batch Bundle POST
         - Production-ready implementation
     """
 
@@ -410,22 +686,21 @@ async def get_resource(
         resource_id: str
     ) -> Optional[Dict[str, Any]]:
         """Get a specific resource from HAPI FHIR."""
-        try:
-            import httpx
+        from services.hapi_fhir_client import get_shared_http_client
 
-            async with httpx.AsyncClient() as client:
-                url = f"{self.base_url}/{resource_type}/{resource_id}"
-                response = await client.get(url, timeout=10.0)
+        try:
+            url = f"{self.base_url}/{resource_type}/{resource_id}"
+            response = await get_shared_http_client().get(url, timeout=10.0)
 
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    return None
-                else:
-                    logger.error(
-                        f"HAPI FHIR error: {response.status_code} for {url}"
-                    )
-                    return None
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                return None
+            else:
+                logger.error(
+                    f"HAPI FHIR error: {response.status_code} for {url}"
+                )
+                return None
 
         except Exception as e:
             logger.error(f"Error fetching from HAPI FHIR: {e}")
@@ -436,29 +711,78 @@ async def search_resources(
         resource_type: str,
         params: Dict[str, str]
     ) -> List[Dict[str, Any]]:
-        """Search resources in HAPI FHIR."""
-        try:
-            import httpx
-
-            async with httpx.AsyncClient() as client:
-                url = f"{self.base_url}/{resource_type}"
-                response = await client.get(url, params=params, timeout=10.0)
-
-                if response.status_code == 200:
-                    bundle = response.json()
-                    return [
-                        entry.get("resource", {})
-                        for entry in bundle.get("entry", [])
-                    ]
-                else:
-                    logger.error(
-                        f"HAPI FHIR search error: {response.status_code}"
-                    )
-                    return []
+        """
+        Search resources in HAPI FHIR.
 
-        except Exception as e:
-            logger.error(f"Error searching HAPI FHIR: {e}")
-            return []
+        Raises:
+            httpx.HTTPError if the search fails, so a failure is never
+            taken (and cached) as an empty result
+        """
+        from services.hapi_fhir_client import get_shared_http_client
+
+        url = f"{self.base_url}/{resource_type}"
+        response = await get_shared_http_client().get(url, params=params, timeout=10.0)
+        if response.status_code != 200:
+            logger.error(f"HAPI FHIR search error: {response.status_code}")
+        response.raise_for_status()
+
+        bundle = response.json()
+        return [
+            entry.get("resource", {})
+            for entry in bundle.get("entry", [])
+        ]
+
+    async def batch_get(
+        self,
+        queries: List[str]
+    ) -> List[Tuple[int, Optional[Dict[str, Any]]]]:
+        """
+        Run several GET queries as one FHIR batch Bundle.
+
+        Args:
+            queries: Relative FHIR queries ("Patient/123", "Condition?patient=123")
+
+        Returns:
+            (HTTP status, resource) per query, in order. Searches return the
+            searchset Bundle as the resource.
+
+        Raises:
+            httpx.HTTPError / ValueError if the batch itself fails, so the
+            caller can fall back to individual queries
+        """
+        from services.hapi_fhir_client import get_shared_http_client
+
+        bundle = {
+            "resourceType": "Bundle",
+            "type": "batch",
+            "entry": [
+                {"request": {"method": "GET", "url": query}}
+                for query in queries
+            ]
+        }
+        response = await get_shared_http_client().post(
+            self.base_url,
+            json=bundle,
+            headers={"Content-Type": "application/fhir+json"},
+            timeout=10.0
+        )
+        response.raise_for_status()
+
+        entries = response.json().get("entry", [])
+        if len(entries) != len(queries):
+            raise ValueError(
+                f"batch-response has {len(entries)} entries for {len(queries)} requests"
+            )
+
+        results = []
+        for entry in entries:
+            status = str((entry.get("response") or {}).get("status", "500"))
+            try:
+                code = int(status.split()[0])
+            except ValueError:
+                code = 500
+            results.append((code, entry.get("resource")))
+        return results
 
 
 # Global engine instance
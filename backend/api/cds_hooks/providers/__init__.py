@@ -12,13 +12,18 @@
 """
 
 from .base_provider import BaseServiceProvider
+from .circuit_breaker import CircuitBreaker, CircuitState, get_circuit_breaker
 from .cql_backed_provider import CQLBackedServiceProvider
 from .local_provider import LocalServiceProvider
-from .remote_provider import RemoteServiceProvider
+from .remote_provider import RemoteCDSService, RemoteServiceProvider
 
 __all__ = [
     "BaseServiceProvider",
+    "CircuitBreaker",
+    "CircuitState",
+    "get_circuit_breaker",
     "CQLBackedServiceProvider",
     "LocalServiceProvider",
+    "RemoteCDSService",
     "RemoteServiceProvider",
 ]
@@ -0,0 +1,289 @@
+"""
+External CDS Service Circuit Breaker
+
+Process-local circuit breaker per external hook service (keyed by
+hook_service_id), so a hook call to a healthy external service touches
+neither Postgres nor anything but the network, and a call to a dead one
+touches nothing at all.
+
+States:
+- CLOSED     calls go through; consecutive failures are counted
+- OPEN       the failure threshold was reached; calls short-circuit to an
+             empty card list with zero network I/O until the reset timeout
+- HALF_OPEN  one probe call is let through; success closes the circuit,
+             failure re-opens it for another reset timeout
+
+Persistence:
+- Circuit state is written to external_services.services in one batched
+  UPDATE and one commit, immediately on a state transition and otherwise
+  at most every CDS_CIRCUIT_FLUSH_INTERVAL seconds. A success on a healthy
+  circuit writes nothing.
+- An open circuit is persisted as auto_disabled / status 'suspended' (what
+  the registry UI already shows); closing it again clears both.
+- A service this process has no state for is seeded from its DB row, so a
+  fresh worker starts where the last flush left off.
+
+Note: state is per process. With several uvicorn workers each worker
+counts its own failures and the last flush wins in the DB row.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CDS_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CDS_CIRCUIT_FAILURE_THRESHOLD', '5'))
+CDS_CIRCUIT_RESET_TIMEOUT = float(os.getenv('CDS_CIRCUIT_RESET_TIMEOUT', '60'))
+CDS_CIRCUIT_FLUSH_INTERVAL = float(os.getenv('CDS_CIRCUIT_FLUSH_INTERVAL', '30'))
+
+# Absolute state, not increments: a flush can carry many calls' worth of
+# changes. One row per dirty circuit, sent as a single executemany.
+_FLUSH_SQL = """
+    UPDATE external_services.services AS s
+    SET consecutive_failures = :failures,
+        last_failure_at = :last_failure_at,
+        last_error_message = :err,
+        auto_disabled = :disabled,
+        auto_disabled_at = CASE
+            WHEN NOT :disabled THEN NULL
+            WHEN COALESCE(s.auto_disabled, FALSE) THEN s.auto_disabled_at
+            ELSE :now END,
+        status = CASE
+            WHEN :disabled THEN 'suspended'
+            WHEN COALESCE(s.auto_disabled, FALSE) THEN 'active'
+            ELSE s.status END,
+        updated_at = NOW()
+    FROM external_services.cds_hooks AS ch
+    WHERE ch.service_id = s.id AND ch.hook_service_id = :sid
+"""
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class ServiceCircuit:
+    """Circuit state of one external hook service."""
+    service_id: str
+    state: CircuitState = CircuitState.CLOSED
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+    last_failure_at: Optional[datetime] = None
+    opened_at: float = 0.0
+    probe_in_flight: bool = False
+    probe_started_at: float = 0.0
+    dirty: bool = False
+    short_circuited: int = 0
+
+
+def _utcnow() -> datetime:
+    # The failure-tracking columns are TIMESTAMP without time zone
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class CircuitBreaker:
+    """
+    Circuit breakers for every external hook service in this process.
+
+    The provider asks allow() before calling out, reports the outcome with
+    record_success()/record_failure(), and calls flush() whenever
+    flush_due() says so.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CDS_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CDS_CIRCUIT_RESET_TIMEOUT,
+        flush_interval: float = CDS_CIRCUIT_FLUSH_INTERVAL
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.flush_interval = flush_interval
+
+        self._circuits: Dict[str, ServiceCircuit] = {}
+        self._last_flush = time.monotonic()
+        self._transition_pending = False
+
+        self.transitions = 0
+        self.flushes = 0
+
+    def circuit(self, service_id: str, metadata: Optional[Dict[str, Any]] = None) -> ServiceCircuit:
+        """Circuit for service_id, seeded from its DB row on first sight."""
+        circuit = self._circuits.get(service_id)
+        if circuit is None:
+            circuit = ServiceCircuit(service_id=service_id)
+            if metadata:
+                circuit.consecutive_failures = int(metadata.get("consecutive_failures") or 0)
+                circuit.last_error = metadata.get("last_error_message")
+                if metadata.get("auto_disabled"):
+                    circuit.state = CircuitState.OPEN
+                    circuit.opened_at = time.monotonic()
+            self._circuits[service_id] = circuit
+        return circuit
+
+    def allow(self, service_id: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether a call may go out now (False = short-circuit it)."""
+        circuit = self.circuit(service_id, metadata)
+        if circuit.state is CircuitState.CLOSED:
+            return True
+
+        if circuit.state is CircuitState.OPEN:
+            if time.monotonic() - circuit.opened_at < self.reset_timeout:
+                circuit.short_circuited += 1
+                return False
+            self._transition(circuit, CircuitState.HALF_OPEN)
+
+        # Half-open: exactly one probe at a time (a probe that never
+        # reported back, e.g. cancelled, stops blocking after a reset timeout)
+        now = time.monotonic()
+        if circuit.probe_in_flight and now - circuit.probe_started_at < self.reset_timeout:
+            circuit.short_circuited += 1
+            return False
+        circuit.probe_in_flight = True
+        circuit.probe_started_at = now
+        return True
+
+    def record_success(self, service_id: str) -> None:
+        circuit = self.circuit(service_id)
+        circuit.probe_in_flight = False
+        if circuit.state is not CircuitState.CLOSED:
+            self._transition(circuit, CircuitState.CLOSED)
+        if circuit.consecutive_failures or circuit.last_error:
+            circuit.consecutive_failures = 0
+            circuit.last_error = None
+            circuit.last_failure_at = None
+            circuit.dirty = True
+
+    def record_failure(self, service_id: str, error_message: str) -> None:
+        circuit = self.circuit(service_id)
+        circuit.probe_in_flight = False
+        circuit.consecutive_failures += 1
+        circuit.last_error = error_message
+        circuit.last_failure_at = _utcnow()
+        circuit.dirty = True
+
+        if circuit.state is CircuitState.HALF_OPEN or (
+            circuit.state is CircuitState.CLOSED
+            and circuit.consecutive_failures >= self.failure_threshold
+        ):
+            self._transition(circuit, CircuitState.OPEN)
+            circuit.opened_at = time.monotonic()
+            logger.error(
+                f"  🚨 Circuit for {service_id} opened after "
+                f"{circuit.consecutive_failures} consecutive failures"
+            )
+        else:
+            logger.warning(
+                f"  Failure count for {service_id}: "
+                f"{circuit.consecutive_failures}/{self.failure_threshold}"
+            )
+
+    def _transition(self, circuit: ServiceCircuit, state: CircuitState) -> None:
+        logger.info(f"  Circuit for {circuit.service_id}: {circuit.state.value} -> {state.value}")
+        circuit.state = state
+        circuit.dirty = True
+        self._transition_pending = True
+        self.transitions += 1
+
+    def flush_due(self) -> bool:
+        """True after a state transition, or when the flush interval has passed with changes pending."""
+        if self._transition_pending:
+            return True
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return False
+        return any(circuit.dirty for circuit in self._circuits.values())
+
+    async def flush(self, db) -> int:
+        """
+        Write every changed circuit to Postgres in one batched UPDATE.
+
+        Returns the number of circuits written. On a DB error the circuits
+        stay dirty and go out with the next flush.
+        """
+        self._last_flush = time.monotonic()
+        self._transition_pending = False
+
+        dirty = [circuit for circuit in self._circuits.values() if circuit.dirty]
+        if not dirty:
+            return 0
+        for circuit in dirty:
+            circuit.dirty = False
+
+        now = _utcnow()
+        rows: List[Dict[str, Any]] = [
+            {
+                "sid": circuit.service_id,
+                "failures": circuit.consecutive_failures,
+                "last_failure_at": circuit.last_failure_at,
+                "err": circuit.last_error,
+                "disabled": circuit.state is not CircuitState.CLOSED,
+                "now": now,
+            }
+            for circuit in dirty
+        ]
+
+        try:
+            from sqlalchemy import text
+
+            await db.execute(text(_FLUSH_SQL), rows)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"  Error persisting circuit state: {e}")
+            for circuit in dirty:
+                circuit.dirty = True
+            return 0
+
+        self.flushes += 1
+        logger.debug(f"  Persisted circuit state for {len(rows)} external service(s)")
+        return len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_s": self.reset_timeout,
+            "flush_interval_s": self.flush_interval,
+            "transitions": self.transitions,
+            "flushes": self.flushes,
+            "circuits": {
+                service_id: {
+                    "state": circuit.state.value,
+                    "consecutive_failures": circuit.consecutive_failures,
+                    "short_circuited": circuit.short_circuited,
+                    "pending_flush": circuit.dirty,
+                }
+                for service_id, circuit in self._circuits.items()
+            },
+        }
+
+
+# Module-level singleton shared by every RemoteServiceProvider
+_circuit_breaker: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Get or create the process-wide CircuitBreaker."""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker()
+    return _circuit_breaker
+
+
+async def flush_circuit_breaker() -> None:
+    """Persist pending circuit state. Called from the application shutdown hook."""
+    if _circuit_breaker is None:
+        return
+    try:
+        from database import get_db_context
+
+        async with get_db_context() as db:
+            await _circuit_breaker.flush(db)
+    except Exception as e:
+        logger.error(f"Error flushing circuit state on shutdown: {e}")
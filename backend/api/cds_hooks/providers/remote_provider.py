@@ -6,22 +6,28 @@
 
 Features:
 - Authentication support (API key, OAuth2, HMAC)
-- Failure tracking and auto-disable after consecutive failures
+- Per-service circuit breaker (see circuit_breaker.py); open circuits
+  short-circuit with no network or DB I/O
+- Pooled, keep-alive HTTP clients per external origin
 - Timeout handling and graceful degradation
 """
 
-import inspect
+import asyncio
 import logging
+import os
 import httpx
 import hmac
 import hashlib
 import json
 import uuid
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 from .base_provider import BaseServiceProvider
-from ..models import CDSHookRequest, CDSHookResponse, Card
+from .circuit_breaker import get_circuit_breaker
+from ..orchestrator.service_orchestrator import hook_time_remaining
+from ..services.base_service import CDSService
+from ..models import CDSHookRequest, CDSHookResponse, Card, HookType
 
 
 logger = logging.getLogger(__name__)
@@ -30,21 +36,68 @@
 # never hold a hook response open indefinitely.
 _HTTP_TIMEOUT_SECONDS = 30.0
 
+CDS_REMOTE_MAX_CONNECTIONS = int(os.getenv('CDS_REMOTE_MAX_CONNECTIONS', '20'))
+CDS_REMOTE_MAX_KEEPALIVE = int(os.getenv('CDS_REMOTE_MAX_KEEPALIVE', '10'))
+
+# External services (hook_service_id, comma-separated; "*" for all) whose
+# endpoint may safely be called twice for one hook call, so the orchestrator
+# may hedge a slow call with CDS_HEDGE_ENABLED
+CDS_REMOTE_IDEMPOTENT_SERVICES = os.getenv('CDS_REMOTE_IDEMPOTENT_SERVICES', '')
+
+# One pooled client per external origin (scheme://host:port), so repeated
+# hook calls to the same service reuse warm TLS connections instead of
+# handshaking per card request. Each client remembers the event loop that
+# opened its connections (same rule as services.hapi_fhir_client).
+_origin_clients: Dict[str, Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+
+
+def _origin_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def get_origin_client(url: str) -> httpx.AsyncClient:
+    """Pooled httpx client for the origin of url, created on first use."""
+    origin = _origin_of(url)
+    loop = asyncio.get_running_loop()
+    entry = _origin_clients.get(origin)
+    if entry is None or entry[0].is_closed or entry[1] is not loop:
+        client = httpx.AsyncClient(
+            timeout=_HTTP_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=CDS_REMOTE_MAX_CONNECTIONS,
+                max_keepalive_connections=CDS_REMOTE_MAX_KEEPALIVE
+            )
+        )
+        _origin_clients[origin] = (client, loop)
+        return client
+    return entry[0]
+
+
+async def close_origin_clients() -> None:
+    """Close every per-origin pool. Called from the application shutdown hook."""
+    clients = [client for client, _ in _origin_clients.values()]
+    _origin_clients.clear()
+    for client in clients:
+        if not client.is_closed:
+            await client.aclose()
+
 
 class RemoteServiceProvider(BaseServiceProvider):
     """
     Provider for external HTTP CDS services
 
     Execution flow:
-    1. Check if service is auto-disabled
+    1. Ask the service's circuit breaker (open = return no cards, no I/O)
     2. Resolve the service endpoint from metadata
     3. Prepare authentication headers
-    4. POST CDS Hooks request to external service
+    4. POST CDS Hooks request via the origin's pooled client
     5. Parse response and return cards
-    6. Track failures and auto-disable if threshold exceeded
+    6. Record the outcome on the circuit; persist it when a flush is due
 
     Failure contract: `execute()` NEVER raises. Any failure is tracked
-    (consecutive-failure counters in external_services.services) and degrades
+    (circuit breaker, flushed to external_services.services) and degrades
     to an empty card list — CDS is advisory, and a dead external service must
     not break the clinician-facing hook response. The router keeps its own
     catch-all as a second net, but the contract lives here.
@@ -60,7 +113,8 @@ def __init__(self, db_session=None):
         super().__init__()
         self.provider_type = "remote"
         self.db = db_session
-        self.failure_threshold = 5  # Auto-disable after 5 consecutive failures
+        self.circuit_breaker = get_circuit_breaker()
+        self.failure_threshold = self.circuit_breaker.failure_threshold
 
     async def should_execute(
         self,
@@ -111,9 +165,10 @@ async def execute(
             if not service_metadata:
                 raise ValueError("Service metadata required for remote service execution")
 
-            # Check if service is auto-disabled
-            if service_metadata.get("auto_disabled", False):
-                logger.warning(f"  Service {service_id} is auto-disabled due to consecutive failures")
+            # An open circuit (seeded from auto_disabled on first sight)
+            # short-circuits before any network or DB work
+            if not self.circuit_breaker.allow(tracking_id, service_metadata):
+                logger.warning(f"  Service {service_id} circuit is open; skipping call")
                 return CDSHookResponse(cards=[])
 
             service_url = self._resolve_service_url(plan_definition, service_metadata)
@@ -142,19 +197,20 @@ async def execute(
 
             logger.debug(f"  Sending CDS Hooks request...")
 
-            # One client per call, closed deterministically. The previous
-            # long-lived client was created per provider instance and the
-            # router constructs a provider per request without ever calling
-            # close() — leaking a connection pool on every external hook fire.
-            async with httpx.AsyncClient(
-                timeout=_HTTP_TIMEOUT_SECONDS,
-                follow_redirects=True
-            ) as client:
-                response = await client.post(
-                    service_url,
-                    json=request_body,
-                    headers=headers
-                )
+            # Module-level per-origin pool: the router constructs a provider
+            # per request, so a client owned by the provider would either
+            # leak or handshake on every hook fire.
+            # Inside an orchestrated hook call, never outlive its deadline
+            remaining = hook_time_remaining()
+            timeout = _HTTP_TIMEOUT_SECONDS if remaining is None else min(_HTTP_TIMEOUT_SECONDS, remaining)
+
+            client = get_origin_client(service_url)
+            response = await client.post(
+                service_url,
+                json=request_body,
+                headers=headers,
+                timeout=timeout
+            )
 
             # Explicit status check (rather than raise_for_status) so the
             # failure path is uniform with every other failure below.
@@ -181,9 +237,9 @@ async def execute(
 
             logger.info(f"  Generated {len(card_objects)} cards")
 
-            # Reset failure count on success
-            if self.db:
-                await self._reset_failure_count(tracking_id)
+            # Reset failure count on success (persisted on the next flush)
+            self.circuit_breaker.record_success(tracking_id)
+            await self._flush_if_due()
 
             return CDSHookResponse(cards=card_objects)
 
@@ -327,84 +383,68 @@ async def _handle_failure(self, service_id: str, error_message: str):
         """
         Handle service execution failure
 
-        Increments failure count and auto-disables service if threshold exceeded.
+        Counts the failure on the service's circuit (opening it at the
+        threshold) and persists circuit state if a flush is due.
 
         Args:
-            service_id: Service identifier
+            service_id: Service identifier (hook_service_id)
             error_message: Error message to log
         """
-        if not self.db:
-            return
+        self.circuit_breaker.record_failure(service_id, error_message)
+        await self._flush_if_due()
 
-        try:
-            from sqlalchemy import text
-
-            # The failure counters live on the parent external_services.services
-            # row; service_id here is the CDS service id stored on the child
-            # external_services.cds_hooks.hook_service_id. Update via that join.
-            row = (await self.db.execute(text("""
-                UPDATE external_services.services AS s
-                SET consecutive_failures = COALESCE(s.consecutive_failures, 0) + 1,
-                    last_failure_at = NOW(),
-                    last_error_message = :err,
-                    auto_disabled = (COALESCE(s.consecutive_failures, 0) + 1 >= :threshold),
-                    auto_disabled_at = CASE
-                        WHEN COALESCE(s.consecutive_failures, 0) + 1 >= :threshold THEN NOW()
-                        ELSE s.auto_disabled_at END,
-                    status = CASE
-                        WHEN COALESCE(s.consecutive_failures, 0) + 1 >= :threshold THEN 'suspended'
-                        ELSE s.status END,
-                    updated_at = NOW()
-                FROM external_services.cds_hooks AS ch
-                WHERE ch.service_id = s.id AND ch.hook_service_id = :sid
-                RETURNING s.consecutive_failures, s.auto_disabled
-            """), {"err": error_message, "threshold": self.failure_threshold, "sid": service_id})).first()
-            await self.db.commit()
-
-            # Mocked sessions in tests hand back awaitables; unwrap so the
-            # logging below never explodes inside an error handler.
-            if inspect.isawaitable(row):
-                row = None
-
-            if row is None:
-                logger.warning(f"  Service {service_id} not found in external_services registry")
-            elif row.auto_disabled:
-                logger.error(
-                    f"  🚨 Service {service_id} auto-disabled after {row.consecutive_failures} consecutive failures"
-                )
-            else:
-                logger.warning(
-                    f"  Failure count for {service_id}: {row.consecutive_failures}/{self.failure_threshold}"
-                )
+    async def _flush_if_due(self):
+        """Persist circuit state on a transition or once per flush interval."""
+        if self.db and self.circuit_breaker.flush_due():
+            await self.circuit_breaker.flush(self.db)
 
-        except Exception as e:
-            logger.error(f"  Error updating failure count: {e}")
 
-    async def _reset_failure_count(self, service_id: str):
-        """
-        Reset failure count on successful execution
+def remote_service_idempotent(hook_service_id: Optional[str]) -> bool:
+    """Whether CDS_REMOTE_IDEMPOTENT_SERVICES marks an external service hedgeable."""
+    listed = {name.strip() for name in CDS_REMOTE_IDEMPOTENT_SERVICES.split(",") if name.strip()}
+    return "*" in listed or (hook_service_id is not None and hook_service_id in listed)
 
-        Args:
-            service_id: Service identifier
-        """
-        if not self.db:
-            return
-
-        try:
-            from sqlalchemy import text
 
-            await self.db.execute(text("""
-                UPDATE external_services.services AS s
-                SET consecutive_failures = 0,
-                    last_failure_at = NULL,
-                    last_error_message = NULL,
-                    updated_at = NOW()
-                FROM external_services.cds_hooks AS ch
-                WHERE ch.service_id = s.id AND ch.hook_service_id = :sid
-            """), {"sid": service_id})
-            await self.db.commit()
+class RemoteCDSService(CDSService):
+    """
+    One external service call as a CDSService, so the orchestrator can run it
 
-            logger.debug(f"  Reset failure count for {service_id}")
+    Running external services through ServiceOrchestrator.execute_unregistered
+    puts them under a hook deadline (the provider's HTTP timeout shrinks to
+    what is left of it), records their latency, and hedges the ones
+    configured as idempotent. execute() never raises (RemoteServiceProvider's
+    failure contract).
+    """
 
-        except Exception as e:
-            logger.error(f"  Error resetting failure count: {e}")
+    def __init__(
+        self,
+        service_id: str,
+        provider: RemoteServiceProvider,
+        plan_definition: Dict[str, Any],
+        hook_request: CDSHookRequest,
+        service_metadata: Dict[str, Any]
+    ):
+        super().__init__(service_id)
+        self.provider = provider
+        self.plan_definition = plan_definition
+        self.hook_request = hook_request
+        self.service_metadata = service_metadata
+        try:
+            self.hook_type = HookType(hook_request.hook)
+        except ValueError:
+            pass
+        self.prefetch_templates = {}
+        self.idempotent = remote_service_idempotent(service_metadata.get("hook_service_id"))
+
+    async def should_execute(self, context: Dict[str, Any], prefetch: Dict[str, Any]) -> bool:
+        # The external service decides for itself
+        return True
+
+    async def execute(self, context: Dict[str, Any], prefetch: Dict[str, Any]) -> List[Card]:
+        # context and prefetch are already in the hook request sent as-is
+        response = await self.provider.execute(
+            self.plan_definition,
+            self.hook_request,
+            service_metadata=self.service_metadata
+        )
+        return response.cards
@@ -39,6 +39,7 @@
 from .orchestrator import ServiceOrchestrator, get_orchestrator, execute_hook, ExecutionStatus
 from .registry import ServiceRegistry, get_registry, register_service, get_discovery_response
 from .prefetch import PrefetchEngine, get_prefetch_engine, execute_prefetch
+from .providers.circuit_breaker import get_circuit_breaker
 
 # Hook persistence imports
 from .hooks import (
@@ -532,7 +533,7 @@ async def discover_services(self, *, service_origin: Optional[str] = None):
         return CDSServicesResponse(services=services)
     async def execute_service(self, *, service_id: str, request: CDSHookRequest):
         """Execute a specific CDS service - v3.0 architecture (moved verbatim from the router)."""
-        from .providers import RemoteServiceProvider
+        from .providers import RemoteCDSService, RemoteServiceProvider
 
         start_time = datetime.now()
         cards = []
@@ -702,13 +703,26 @@ async def execute_service(self, *, service_id: str, request: CDSHookRequest):
                         prefetch=resolved_prefetch
                     )
 
-                    provider = RemoteServiceProvider(self.db)
-                    response = await provider.execute(
+                    # Through the orchestrator: the hook deadline bounds the
+                    # HTTP call, latency is tracked and idempotent services
+                    # can be hedged
+                    remote_service = RemoteCDSService(
+                        service_id,
+                        RemoteServiceProvider(self.db),
                         plan_definition,
                         updated_request,
-                        service_metadata=dict(service_metadata)
+                        dict(service_metadata)
                     )
-                    cards = response.cards
+                    result = await get_orchestrator().execute_unregistered(
+                        remote_service,
+                        context=updated_request.context,
+                        prefetch=resolved_prefetch
+                    )
+                    if not result.success:
+                        logger.warning(
+                            f"External service {service_id} {result.status.value}: {result.error or 'no error detail'}"
+                        )
+                    cards = result.cards
 
                 elif service_origin == "visual-builder":
                     # Visual-builder services come in two flavors:
@@ -1582,6 +1596,8 @@ async def health_check(self):
                 "status": "active",
                 "services": [s.service_id for s in registry_services]
             },
+            "latency": get_orchestrator().get_latency_stats(),
+            "external_circuits": get_circuit_breaker().get_stats(),
             "timestamp": datetime.now().isoformat()
         }
 
@@ -35,6 +35,8 @@ class CDSService(ABC):
         description: Detailed description of what the service does
         prefetch_templates: FHIR query templates for prefetch data
         usageRequirements: Optional usage guidance for the service
+        idempotent: True if execute() may safely run twice for one hook
+                    call (lets the orchestrator hedge a slow call)
 
     Educational Notes:
         - Services are registered in the ServiceRegistry
@@ -49,6 +51,7 @@ class CDSService(ABC):
     description: str = ""
     prefetch_templates: Dict[str, str] = {}
     usageRequirements: Optional[str] = None
+    idempotent: bool = False
 
     def __init__(self, service_id: Optional[str] = None):
         """
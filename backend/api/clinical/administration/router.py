@@ -7,6 +7,9 @@
   MAR grid payload: scheduled doses (with admin matches), PRN orders,
   unscheduled admins. Pure read.
 
+- `GET /ward-scheduled-tasks?patient_ids=a,b,c` or `?location_id=...`
+  The same MAR payload for every patient on a unit, from batched searches.
+
 - `GET /tasks?patient_id=...`  (Phase 5.2)
   Tasks-pane payload: pending non-medication recording tasks, bucketed into
   immunization / specimen / procedure ServiceRequest orders.
@@ -39,9 +42,12 @@
 from .service import (
     ADMINISTRABLE_STATUSES,
     IMMUNIZATION_ORDER_EXTENSION,
+    MAR_WARD_MAX_PATIENTS,
     SCHEDULED_DOSE_TIME_EXTENSION,
+    ScheduledTaskBundle,
     get_administration_tasks,
     get_scheduled_tasks,
+    get_ward_scheduled_tasks,
 )
 
 logger = logging.getLogger(__name__)
@@ -112,6 +118,60 @@ async def scheduled_tasks_endpoint(
     The default 12h window (6h back + 6h forward) matches the grid's
     default column span. Callers can shrink/widen it.
     """
+    window_start, window_end = _resolve_window(window_start, window_end)
+    bundle = await get_scheduled_tasks(patient_id, window_start, window_end)
+    return _render_bundle(bundle)
+
+
+@router.get("/ward-scheduled-tasks")
+async def ward_scheduled_tasks_endpoint(
+    patient_ids: Optional[str] = Query(
+        None,
+        description="Comma-separated bare patient FHIR ids",
+    ),
+    location_id: Optional[str] = Query(
+        None,
+        description="Location (unit/ward) id; patients are taken from its in-progress Encounters",
+    ),
+    window_start: Optional[datetime] = Query(None, description="As for /scheduled-tasks"),
+    window_end: Optional[datetime] = Query(None, description="As for /scheduled-tasks"),
+) -> dict[str, Any]:
+    """Build the MAR payload for every patient on a unit in one call.
+
+    For nursing dashboards that would otherwise call /scheduled-tasks once
+    per bed. Exactly one of `patient_ids` / `location_id` is required.
+    """
+    if (patient_ids is None) == (location_id is None):
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of patient_ids or location_id",
+        )
+    ids = None
+    if patient_ids is not None:
+        ids = [p.strip() for p in patient_ids.split(",") if p.strip()]
+        if len(ids) > MAR_WARD_MAX_PATIENTS:
+            raise HTTPException(
+                status_code=http_status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {MAR_WARD_MAX_PATIENTS} patients per request",
+            )
+
+    window_start, window_end = _resolve_window(window_start, window_end)
+    ward = await get_ward_scheduled_tasks(
+        window_start, window_end, patient_ids=ids, location_id=location_id,
+    )
+    return {
+        "location_id": ward.location_id,
+        "window_start": ward.window_start.isoformat(),
+        "window_end": ward.window_end.isoformat(),
+        "patients": [_render_bundle(bundle) for bundle in ward.patients],
+    }
+
+
+def _resolve_window(
+    window_start: Optional[datetime],
+    window_end: Optional[datetime],
+) -> tuple[datetime, datetime]:
+    """Default the MAR window to now +/- 6h, pin naive values to UTC, validate."""
     from datetime import timedelta
 
     now = datetime.now(timezone.utc)
@@ -130,9 +190,10 @@ async def scheduled_tasks_endpoint(
             status_code=http_status.HTTP_400_BAD_REQUEST,
             detail="window_end must be strictly after window_start",
         )
+    return window_start, window_end
 
-    bundle = await get_scheduled_tasks(patient_id, window_start, window_end)
 
+def _render_bundle(bundle: ScheduledTaskBundle) -> dict[str, Any]:
     return {
         "patient_id": bundle.patient_id,
         "window_start": bundle.window_start.isoformat(),
@@ -13,12 +13,15 @@
 
 from __future__ import annotations
 
+import asyncio
+import bisect
 import logging
+import os
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
 
-from services.dose_scheduler import ScheduledDose, compute_due_times
+from services.dose_scheduler import ScheduledDose, compute_due_times_batch
 from services.hapi_fhir_client import HAPIFHIRClient
 
 logger = logging.getLogger(__name__)
@@ -64,6 +67,11 @@
 # ISO-format/precision drift across the round-trip, nothing more.
 _STAMP_TOLERANCE = timedelta(minutes=1)
 
+# Ward MAR: patients per batched `patient=a,b,c` search (keeps the URL
+# well under proxy limits), and the most patients one call may ask for.
+MAR_WARD_BATCH_SIZE = int(os.getenv('MAR_WARD_BATCH_SIZE', '20'))
+MAR_WARD_MAX_PATIENTS = int(os.getenv('MAR_WARD_MAX_PATIENTS', '100'))
+
 
 @dataclass(frozen=True)
 class AdminRecord:
@@ -99,6 +107,18 @@ class ScheduledTaskBundle:
     unscheduled_admins: list[dict[str, Any]]
 
 
+@dataclass(frozen=True)
+class WardScheduledTasksBundle:
+    """MAR payloads for every patient on a unit, from one set of searches."""
+
+    location_id: Optional[str]
+    window_start: datetime
+    window_end: datetime
+    # One ScheduledTaskBundle per patient, in the order requested (or the
+    # order the unit's encounters came back in for a location query)
+    patients: list[ScheduledTaskBundle]
+
+
 @dataclass(frozen=True)
 class AdministrationTasksBundle:
     """Non-medication recording tasks for the MAR Tasks pane (#116 Phase 5.2).
@@ -142,44 +162,71 @@ async def get_scheduled_tasks(
         }),
     )
 
-    med_requests = _entries(med_request_bundle)
+    med_requests = [e["resource"] for e in _entries(med_request_bundle)]
     admins = [_parse_admin(e["resource"]) for e in _entries(admin_bundle)]
     admins = [a for a in admins if a is not None]
 
-    scheduled: list[dict[str, Any]] = []
-    prn_orders: list[dict[str, Any]] = []
-    consumed_admin_ids: set[str] = set()
+    return _build_mar(patient_id, med_requests, admins, window_start, window_end)
 
-    for entry in med_requests:
-        med = entry["resource"]
-        status = med.get("status")
-        if status not in ADMINISTRABLE_STATUSES:
-            logger.debug(
-                "MedicationRequest/%s status=%r — skipping for MAR",
-                med.get("id"), status,
-            )
-            continue
 
-        instr = (med.get("dosageInstruction") or [{}])[0]
-        if instr.get("asNeededBoolean") is True:
-            prn_orders.append(_render_prn(med, admins))
-            continue
+async def get_ward_scheduled_tasks(
+    window_start: datetime,
+    window_end: datetime,
+    patient_ids: Optional[list[str]] = None,
+    location_id: Optional[str] = None,
+) -> WardScheduledTasksBundle:
+    """Build the MAR payload for every patient on a unit in one call.
+
+    Patients come from `patient_ids`, or from the in-progress Encounters at
+    `location_id`. MedicationRequests and MedicationAdministrations for
+    all of them are fetched with batched `patient=a,b,c` searches (every
+    batch concurrently) and split by subject, so a 40-bed unit costs a
+    handful of HAPI round trips instead of two per bed. Each patient's
+    grid is then built exactly as get_scheduled_tasks builds it.
+    """
+    hapi = HAPIFHIRClient()
 
-        doses = compute_due_times(med, window_start, window_end)
-        for dose in doses:
-            scheduled.append(_match_dose(dose, admins, consumed_admin_ids, med))
+    if patient_ids is None:
+        patient_ids = await _patients_at_location(hapi, location_id) if location_id else []
+    # De-duplicate, keep the caller's order
+    patient_ids = list(dict.fromkeys(p for p in patient_ids if p))
 
-    unscheduled_admins = [
-        _render_admin(a) for a in admins if a.id not in consumed_admin_ids
+    batches = [
+        patient_ids[i:i + MAR_WARD_BATCH_SIZE]
+        for i in range(0, len(patient_ids), MAR_WARD_BATCH_SIZE)
     ]
-
-    return ScheduledTaskBundle(
-        patient_id=patient_id,
+    admin_since = f"ge{(window_start - timedelta(hours=2)).isoformat()}"
+    searches = []
+    for batch in batches:
+        patients = ",".join(f"Patient/{p}" for p in batch)
+        searches.append(hapi.search_all("MedicationRequest", {"patient": patients, "_count": 200}))
+        searches.append(hapi.search_all("MedicationAdministration", {
+            "patient": patients,
+            "effective-time": admin_since,
+            "_count": 500,
+        }))
+    results = await asyncio.gather(*searches)
+
+    med_requests: dict[str, list[dict[str, Any]]] = {p: [] for p in patient_ids}
+    admin_resources: dict[str, list[dict[str, Any]]] = {p: [] for p in patient_ids}
+    for i, resources in enumerate(results):
+        by_patient = med_requests if i % 2 == 0 else admin_resources
+        for resource in resources:
+            subject = _subject_patient_id(resource)
+            if subject in by_patient:
+                by_patient[subject].append(resource)
+
+    bundles = []
+    for patient_id in patient_ids:
+        admins = [_parse_admin(r) for r in admin_resources[patient_id]]
+        admins = [a for a in admins if a is not None]
+        bundles.append(_build_mar(patient_id, med_requests[patient_id], admins, window_start, window_end))
+
+    return WardScheduledTasksBundle(
+        location_id=location_id,
         window_start=window_start,
         window_end=window_end,
-        scheduled=sorted(scheduled, key=lambda s: (s["scheduled_time"], s["medication_request_id"])),
-        prn_orders=prn_orders,
-        unscheduled_admins=unscheduled_admins,
+        patients=bundles,
     )
 
 
@@ -243,13 +290,127 @@ async def _parallel_search(
     *queries: tuple[str, dict[str, Any]],
 ) -> list[dict[str, Any]]:
     """Run multiple HAPI searches concurrently. Each query is (resourceType, params)."""
-    import asyncio
-
     return await asyncio.gather(
         *(hapi.search(rt, params) for rt, params in queries)
     )
 
 
+def _build_mar(
+    patient_id: str,
+    med_requests: list[dict[str, Any]],
+    admins: list[AdminRecord],
+    window_start: datetime,
+    window_end: datetime,
+) -> ScheduledTaskBundle:
+    """Expand one patient's orders into the grid and match their admins."""
+    index = _AdminIndex(admins)
+    scheduled: list[dict[str, Any]] = []
+    prn_orders: list[dict[str, Any]] = []
+    consumed_admin_ids: set[str] = set()
+
+    scheduled_meds: list[dict[str, Any]] = []
+    for med in med_requests:
+        status = med.get("status")
+        if status not in ADMINISTRABLE_STATUSES:
+            logger.debug(
+                "MedicationRequest/%s status=%r — skipping for MAR",
+                med.get("id"), status,
+            )
+            continue
+
+        instr = (med.get("dosageInstruction") or [{}])[0]
+        if instr.get("asNeededBoolean") is True:
+            prn_orders.append(_render_prn(med, index.for_request(med.get("id"))))
+            continue
+        scheduled_meds.append(med)
+
+    # Expand every order's schedule in one vectorized pass, then match in
+    # order-list order (matching is greedy, so the order matters)
+    all_doses = compute_due_times_batch(scheduled_meds, window_start, window_end)
+    for med, doses in zip(scheduled_meds, all_doses):
+        for dose in doses:
+            scheduled.append(_match_dose(dose, index, consumed_admin_ids, med))
+
+    unscheduled_admins = [
+        _render_admin(a) for a in admins if a.id not in consumed_admin_ids
+    ]
+
+    return ScheduledTaskBundle(
+        patient_id=patient_id,
+        window_start=window_start,
+        window_end=window_end,
+        scheduled=sorted(scheduled, key=lambda s: (s["scheduled_time"], s["medication_request_id"])),
+        prn_orders=prn_orders,
+        unscheduled_admins=unscheduled_admins,
+    )
+
+
+class _AdminIndex:
+    """A patient's admins indexed by MedicationRequest, then by time.
+
+    Per MedicationRequest, stamped admins are kept sorted by their
+    scheduled-time stamp and unstamped ones by effective time, so matching
+    a dose is a bisect into a +/- tolerance slice instead of a scan of
+    every admin on the chart. Each entry carries the admin's position in
+    the original list: where several admins qualify equally, the earlier
+    one wins, exactly as the linear scan chose.
+    """
+
+    def __init__(self, admins: list[AdminRecord]):
+        self._by_request: dict[Optional[str], list[AdminRecord]] = {}
+        stamped: dict[Optional[str], list[tuple[datetime, int, AdminRecord]]] = {}
+        unstamped: dict[Optional[str], list[tuple[datetime, int, AdminRecord]]] = {}
+        for position, admin in enumerate(admins):
+            rx_id = admin.medication_request_id
+            self._by_request.setdefault(rx_id, []).append(admin)
+            if admin.scheduled_time is not None:
+                stamped.setdefault(rx_id, []).append((admin.scheduled_time, position, admin))
+            else:
+                unstamped.setdefault(rx_id, []).append((admin.effective_datetime, position, admin))
+        self._stamped = {k: _TimeIndex(v) for k, v in stamped.items()}
+        self._unstamped = {k: _TimeIndex(v) for k, v in unstamped.items()}
+
+    def for_request(self, rx_id: Optional[str]) -> list[AdminRecord]:
+        return self._by_request.get(rx_id, [])
+
+    def stamped_for(self, rx_id: Optional[str], at: datetime, tolerance: timedelta) -> list[tuple[datetime, int, AdminRecord]]:
+        index = self._stamped.get(rx_id)
+        return index.between(at - tolerance, at + tolerance) if index else []
+
+    def unstamped_near(self, rx_id: Optional[str], at: datetime, window: timedelta) -> list[tuple[datetime, int, AdminRecord]]:
+        index = self._unstamped.get(rx_id)
+        return index.between(at - window, at + window) if index else []
+
+
+class _TimeIndex:
+    """(time, position, admin) entries sorted by time, sliced by bisect."""
+
+    def __init__(self, entries: list[tuple[datetime, int, AdminRecord]]):
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self._entries = entries
+        self._times = [e[0] for e in entries]
+
+    def between(self, low: datetime, high: datetime) -> list[tuple[datetime, int, AdminRecord]]:
+        lo = bisect.bisect_left(self._times, low)
+        hi = bisect.bisect_right(self._times, high)
+        return self._entries[lo:hi]
+
+
+async def _patients_at_location(hapi: HAPIFHIRClient, location_id: str) -> list[str]:
+    """Patient ids of the in-progress Encounters at a Location (a unit/ward)."""
+    encounters = await hapi.search_all("Encounter", {
+        "location": f"Location/{location_id}",
+        "status": "in-progress",
+        "_count": 200,
+    })
+    return [p for p in (_subject_patient_id(e) for e in encounters) if p]
+
+
+def _subject_patient_id(resource: dict[str, Any]) -> Optional[str]:
+    ref = (resource.get("subject") or {}).get("reference") or ""
+    return ref.split("/", 1)[1] if ref.startswith("Patient/") else None
+
+
 def _entries(bundle: dict[str, Any]) -> list[dict[str, Any]]:
     """Pull the entry list from a FHIR Bundle, tolerating shape variations."""
     if not bundle:
@@ -321,11 +482,12 @@ def _parse_admin(resource: dict[str, Any]) -> Optional[AdminRecord]:
 
 def _match_dose(
     dose: ScheduledDose,
-    admins: list[AdminRecord],
+    admins: _AdminIndex,
     consumed_admin_ids: set[str],
     med_request: dict[str, Any],
 ) -> dict[str, Any]:
     """Find the best-matching admin for a scheduled dose, or return an unmatched cell."""
+    rx_id = dose.medication_request_id
     # Pass 1 — the authoritative link: an admin charted FROM this grid cell
     # carries the cell's scheduled time on SCHEDULED_DOSE_TIME_EXTENSION.
     # Matching on the stamp is exact and independent of when the nurse
@@ -333,16 +495,13 @@ def _match_dose(
     # without this, the admin fell into unscheduled_admins, the cell stayed
     # "due", and the nurse's action looked like it did nothing).
     best: Optional[AdminRecord] = None
-    for admin in admins:
+    first_position: Optional[int] = None
+    for _, position, admin in admins.stamped_for(rx_id, dose.scheduled_time, _STAMP_TOLERANCE):
         if admin.id in consumed_admin_ids:
             continue
-        if admin.medication_request_id != dose.medication_request_id:
-            continue
-        if admin.scheduled_time is None:
-            continue
-        if abs(admin.scheduled_time - dose.scheduled_time) <= _STAMP_TOLERANCE:
+        if first_position is None or position < first_position:
             best = admin
-            break
+            first_position = position
 
     # Pass 2 — proximity fallback for admins recorded outside the MAR (no
     # stamp): same MedicationRequest, effective time within
@@ -350,22 +509,16 @@ def _match_dose(
     # Stamped admins are excluded here — a stamp naming a DIFFERENT cell
     # must not let this cell steal the record.
     if best is None:
-        best_delta: Optional[timedelta] = None
-        for admin in admins:
+        best_key: Optional[tuple[timedelta, int]] = None
+        for effective, position, admin in admins.unstamped_near(rx_id, dose.scheduled_time, ADMIN_MATCH_WINDOW):
             if admin.id in consumed_admin_ids:
                 continue
-            if admin.medication_request_id != dose.medication_request_id:
-                continue
-            if admin.scheduled_time is not None:
-                continue
             # Held/not-done admins should also match their scheduled dose so
             # the cell can render the hold/refuse state instead of staying "due".
-            delta = abs(admin.effective_datetime - dose.scheduled_time)
-            if delta > ADMIN_MATCH_WINDOW:
-                continue
-            if best is None or delta < best_delta:
+            key = (abs(effective - dose.scheduled_time), position)
+            if best_key is None or key < best_key:
                 best = admin
-                best_delta = delta
+                best_key = key
 
     if best is not None:
         consumed_admin_ids.add(best.id)
@@ -396,6 +549,7 @@ def _render_admin(admin: AdminRecord) -> dict[str, Any]:
 
 
 def _render_prn(med_request: dict[str, Any], admins: list[AdminRecord]) -> dict[str, Any]:
+    """PRN list row; `admins` are this MedicationRequest's admins."""
     rx_id = med_request.get("id")
     instr = (med_request.get("dosageInstruction") or [{}])[0]
     related = [
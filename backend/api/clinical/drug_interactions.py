@@ -9,9 +9,11 @@
 from pydantic import BaseModel
 from datetime import datetime
 import logging
+import os
 
 from database import get_db_session as get_db
 from services.hapi_fhir_client import HAPIFHIRClient
+from .interaction_index import InteractionIndex, load_interaction_dataset
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -196,6 +198,41 @@ class SafetyCheckResult(BaseModel):
     }
 }
 
+# Optional external interaction table (CSV/JSON, see interaction_index),
+# merged over the built-in rules at import
+DRUG_INTERACTIONS_DATASET = os.getenv('DRUG_INTERACTIONS_DATASET', '')
+
+
+def load_drug_interaction_dataset(path: str, replace: bool = False) -> int:
+    """
+    Load an external interaction table and rebuild the lookup index.
+
+    Args:
+        path: CSV or JSON dataset (see interaction_index.load_interaction_dataset)
+        replace: Drop the current rules instead of merging over them
+
+    Returns:
+        Number of rules in the active table
+    """
+    global _interaction_index
+    rules = load_interaction_dataset(path)
+    if replace:
+        DRUG_INTERACTIONS.clear()
+    DRUG_INTERACTIONS.update(rules)
+    _interaction_index = InteractionIndex(DRUG_INTERACTIONS)
+    return len(DRUG_INTERACTIONS)
+
+
+# Built once; check_drug_interactions only consults the index.
+# Mutate DRUG_INTERACTIONS through load_drug_interaction_dataset so the
+# index is rebuilt with it.
+_interaction_index = InteractionIndex(DRUG_INTERACTIONS)
+if DRUG_INTERACTIONS_DATASET:
+    try:
+        load_drug_interaction_dataset(DRUG_INTERACTIONS_DATASET)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load drug interaction dataset {DRUG_INTERACTIONS_DATASET}: {e}")
+
 # Drug-Allergy Cross-Reactivity Database
 DRUG_ALLERGY_CROSS_REACTIVITY = {
     "penicillin": {
@@ -432,51 +469,19 @@ async def get_patient_conditions(patient_id: str, db: AsyncSession = None) -> Li
 def check_drug_interactions(medication_list: List[Dict[str, str]]) -> List[Dict[str, any]]:
     """
     Check for drug interactions in a list of medications.
-    
+
+    Names match by substring (a rule drug contained in the medication
+    name) and codes by exact RxNorm code, via the precomputed index, so
+    the cost follows the number of medications rather than the size of
+    the interaction table.
+
     Args:
         medication_list: List of medications with 'name' and 'code' fields
-        
+
     Returns:
         List of interaction warnings
     """
-    interactions = []
-    med_names = [med.get('name', '').lower() for med in medication_list]
-    med_codes = [med.get('code', '') for med in medication_list]
-    
-    # Check each interaction rule
-    for interaction_id, interaction_data in DRUG_INTERACTIONS.items():
-        # Check if any drugs from the interaction are in the medication list
-        matching_drugs = []
-        
-        for drug in interaction_data['drugs']:
-            # Check by name (partial match)
-            for med_name in med_names:
-                if drug.lower() in med_name:
-                    matching_drugs.append(drug)
-                    break
-        
-        # Also check by RxNorm code
-        for code in interaction_data['rxnorm_codes']:
-            if code in med_codes and len(matching_drugs) < 2:
-                # Find which drug this code represents
-                for i, drug_code in enumerate(interaction_data['rxnorm_codes']):
-                    if drug_code == code and i < len(interaction_data['drugs']):
-                        drug_name = interaction_data['drugs'][i]
-                        if drug_name not in matching_drugs:
-                            matching_drugs.append(drug_name)
-        
-        # If we found 2 or more interacting drugs, add the interaction
-        if len(matching_drugs) >= 2:
-            interactions.append({
-                'id': interaction_id,
-                'drugs': matching_drugs,
-                'severity': interaction_data['severity'],
-                'description': interaction_data['description'],
-                'clinical_consequence': interaction_data['clinical_consequence'],
-                'management': interaction_data['management']
-            })
-    
-    return interactions
+    return _interaction_index.check(medication_list)
 
 def check_drug_allergies(medications: List[Dict[str, str]], allergies: List[Dict[str, any]]) -> List[AllergyAlert]:
     """Check for potential drug-allergy interactions"""
@@ -864,5 +869,6 @@ async def get_interaction_database():
     """Get the full drug interaction database."""
     return {
         'total_interactions': len(DRUG_INTERACTIONS),
+        'index': _interaction_index.get_stats(),
         'interactions': DRUG_INTERACTIONS
     }
\ No newline at end of file
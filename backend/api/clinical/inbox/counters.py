@@ -0,0 +1,347 @@
+"""
+Incrementally maintained clinical inbox counts.
+
+GET /api/clinical/inbox/stats used to list up to 200 inbox items and count
+them on every call. InboxCounters counts every inbox item once instead -
+a baseline read through the same searches the listing uses - and then
+keeps the counts current from FHIR writes: each write re-classifies that
+one resource with service.inbox_item() and moves its contribution.
+
+Writes are heard twice over, which is harmless because applying a write is
+idempotent: at the HAPIFHIRClient create/update/delete funnel (the tasks,
+pharmacy and orders routers write there without notifying anyone) and from
+the FHIR write notifications (api/websocket/fhir_notifications.py), which
+also cover the /fhir proxy.
+
+Each uvicorn worker keeps its own counts, so every write a worker hears is
+also appended to InboxWriteLog, a SQLite file shared by the workers on the
+host. Before answering, a worker re-reads the resources other workers
+wrote since it last looked and applies them like its own writes.
+
+What each counted resource contributed (status, type, priority, assignee)
+is remembered, so an update or delete takes back exactly what was added.
+Abnormal labs leave the inbox when they age out of the lab window without
+any write, so they also carry an expiry. Writes that bypass this backend
+(bulk loads straight into HAPI, other systems) can't be seen; a full
+rebuild every INBOX_COUNTERS_RESYNC_SECONDS bounds how long the counts can
+drift.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import Counter
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.clinical.inbox.service import INBOX_RESOURCE_TYPES, SOURCES, inbox_item, inbox_searches, lab_expiry
+from api.websocket.fhir_notifications import notification_service
+from services.hapi_fhir_client import HAPIFHIRClient, SingleFlight, add_write_listener
+from services.shared_sqlite import SharedSQLiteFile
+
+logger = logging.getLogger(__name__)
+
+INBOX_COUNTERS_RESYNC_SECONDS = float(os.getenv("INBOX_COUNTERS_RESYNC_SECONDS", "900"))
+INBOX_COUNTERS_PAGE_SIZE = int(os.getenv("INBOX_COUNTERS_PAGE_SIZE", "500"))
+INBOX_COUNTERS_DB_PATH = os.getenv("INBOX_COUNTERS_DB_PATH", "/app/data/inbox_writes.db")
+# Resources per _id search when re-reading other workers' writes
+INBOX_COUNTERS_REREAD_BATCH = 100
+
+ResourceKey = Tuple[str, str]
+# (status, type, priority, assigned_to) of one inbox item
+Contribution = Tuple[str, str, str, Optional[str]]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inbox_writes (
+    seq            INTEGER PRIMARY KEY AUTOINCREMENT,
+    writer         TEXT NOT NULL,
+    resource_type  TEXT NOT NULL,
+    resource_id    TEXT NOT NULL,
+    written_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_inbox_writes_written_at ON inbox_writes (written_at);
+"""
+
+
+class InboxWriteLog:
+    """Which inbox resources each worker wrote, shared by all workers on the host.
+
+    Only keys are logged; readers re-read the resources from HAPI. Entries
+    older than `retention_seconds` are pruned - a worker that hasn't looked
+    for that long is due a full rebuild anyway. All SQLite work runs in
+    `asyncio.to_thread` on a short-lived connection per call (WAL).
+    """
+
+    def __init__(self, db_path: Optional[str] = None, retention_seconds: float = 2 * INBOX_COUNTERS_RESYNC_SECONDS):
+        self._db = SharedSQLiteFile(
+            db_path or INBOX_COUNTERS_DB_PATH, _SCHEMA, "wintehr_inbox_writes.db", "the inbox write log"
+        )
+        self.retention_seconds = retention_seconds
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._db.connect()
+
+    def _append(self, writer: str, resource_type: str, resource_id: str) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO inbox_writes (writer, resource_type, resource_id, written_at) VALUES (?, ?, ?, ?)",
+                (writer, resource_type, resource_id, now)
+            )
+            conn.execute("DELETE FROM inbox_writes WHERE written_at < ?", (now - self.retention_seconds,))
+
+    def _last_seq(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM inbox_writes").fetchone()[0]
+
+    def _since(self, seq: int, writer: str) -> Tuple[int, List[ResourceKey]]:
+        with closing(self._connect()) as conn:
+            last = conn.execute("SELECT COALESCE(MAX(seq), ?) FROM inbox_writes", (seq,)).fetchone()[0]
+            rows = conn.execute(
+                "SELECT resource_type, resource_id FROM inbox_writes"
+                " WHERE seq > ? AND seq <= ? AND writer != ? ORDER BY seq",
+                (seq, last, writer)
+            ).fetchall()
+        return last, list(dict.fromkeys((resource_type, resource_id) for resource_type, resource_id in rows))
+
+    async def append(self, writer: str, resource_type: str, resource_id: str) -> None:
+        await asyncio.to_thread(self._append, writer, resource_type, resource_id)
+
+    async def last_seq(self) -> int:
+        return await asyncio.to_thread(self._last_seq)
+
+    async def since(self, seq: int, writer: str) -> Tuple[int, List[ResourceKey]]:
+        """(newest seq, keys written after `seq` by anyone but `writer`)."""
+        return await asyncio.to_thread(self._since, seq, writer)
+
+
+class InboxCounters:
+    """Inbox item counts, overall and per assignee, kept current from FHIR writes."""
+
+    def __init__(
+        self,
+        hapi_client: Optional[HAPIFHIRClient] = None,
+        resync_seconds: float = INBOX_COUNTERS_RESYNC_SECONDS,
+        write_log: Optional[InboxWriteLog] = None
+    ):
+        self.hapi = hapi_client or HAPIFHIRClient()
+        self.resync_seconds = resync_seconds
+        self.write_log = write_log or InboxWriteLog(retention_seconds=2 * resync_seconds)
+        # Tells this worker's entries in the write log from everyone else's
+        self.writer = uuid.uuid4().hex
+        self._log_seen = 0
+        self._contributions: Dict[ResourceKey, Contribution] = {}
+        self._expiries: Dict[ResourceKey, datetime] = {}
+        self._expiry_heap: List[Tuple[datetime, ResourceKey]] = []
+        # Assignee (None = everyone) -> Counter of (dimension, value)
+        self._counts: Dict[Optional[str], Counter] = {}
+        self._built_at: Optional[float] = None
+        self._stale = False
+        # Writes seen while a rebuild or re-read is reading, replayed over its result
+        self._writes_during_read: Optional[Dict[ResourceKey, Optional[Dict[str, Any]]]] = None
+        self._flights = SingleFlight()
+
+        self.rebuilds = 0
+        self.events = 0
+        self.rereads = 0
+
+    # -- Contributions -------------------------------------------------------
+
+    def _add(self, contribution: Contribution, sign: int) -> None:
+        status, item_type, priority, assigned_to = contribution
+        for assignee in {None, assigned_to}:
+            counts = self._counts.setdefault(assignee, Counter())
+            counts[("total", None)] += sign
+            counts[("by_status", status)] += sign
+            counts[("by_type", item_type)] += sign
+            counts[("by_priority", priority)] += sign
+
+    def _remove(self, key: ResourceKey) -> None:
+        contribution = self._contributions.pop(key, None)
+        self._expiries.pop(key, None)
+        if contribution is not None:
+            self._add(contribution, -1)
+
+    def _put(self, key: ResourceKey, resource: Optional[Dict[str, Any]], now: datetime) -> None:
+        """Replace a resource's contribution with what it is now (None: deleted)."""
+        self._remove(key)
+        item = inbox_item(resource, now) if resource else None
+        if item is None:
+            return
+        contribution = (item.status.value, item.type.value, item.priority, item.assigned_to)
+        self._contributions[key] = contribution
+        self._add(contribution, +1)
+        if key[0] == "Observation":
+            expiry = lab_expiry(resource)
+            self._expiries[key] = expiry
+            heapq.heappush(self._expiry_heap, (expiry, key))
+
+    def _expire(self, now: datetime) -> None:
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expiry, key = heapq.heappop(self._expiry_heap)
+            # Skip entries superseded by a later write to the same resource
+            if self._expiries.get(key) == expiry:
+                self._remove(key)
+
+    def _reset(self) -> None:
+        self._contributions.clear()
+        self._expiries.clear()
+        self._expiry_heap.clear()
+        self._counts.clear()
+
+    # -- Writes --------------------------------------------------------------
+
+    def apply(self, resource_type: str, resource_id: str, resource: Optional[Dict[str, Any]]) -> None:
+        """Account for one write: `resource` is the new version, None if deleted."""
+        if resource_type not in INBOX_RESOURCE_TYPES:
+            return
+        self.events += 1
+        key = (resource_type, resource_id)
+        if self._writes_during_read is not None:
+            self._writes_during_read[key] = resource
+        self._put(key, resource, datetime.now(timezone.utc))
+
+    async def on_fhir_write(
+        self,
+        action: str,
+        resource_type: str,
+        resource_id: str,
+        resource_data: Optional[Dict[str, Any]]
+    ) -> None:
+        """HAPIFHIRClient write and FHIRNotificationService listener."""
+        if resource_type not in INBOX_RESOURCE_TYPES:
+            return
+        if not resource_id:
+            self._stale = True
+            return
+        if action == "deleted":
+            self.apply(resource_type, resource_id, None)
+        elif isinstance(resource_data, dict) and resource_data.get("resourceType") == resource_type:
+            self.apply(resource_type, resource_id, {**resource_data, "id": resource_data.get("id") or resource_id})
+        else:
+            # The writer had no body to share (e.g. Prefer: return=minimal)
+            self._stale = True
+        try:
+            await self.write_log.append(self.writer, resource_type, resource_id)
+        except Exception as e:
+            # Other workers catch up at their next resync
+            logger.warning(f"Inbox write log append failed for {resource_type}/{resource_id}: {e}")
+
+    # -- Baseline ------------------------------------------------------------
+
+    async def _read_source(self, resource_type: str, params: Dict[str, Any]) -> List[Tuple[ResourceKey, Dict[str, Any]]]:
+        found = []
+        async for resource in self.hapi.search_iter(resource_type, {**params, "_count": INBOX_COUNTERS_PAGE_SIZE}):
+            if resource.get("id"):
+                found.append(((resource_type, resource["id"]), resource))
+        return found
+
+    async def _rebuild(self) -> None:
+        self._writes_during_read = {}
+        self._stale = False
+        try:
+            # Logged writes up to here are already in HAPI, so in the baseline
+            log_seen = await self.write_log.last_seq()
+            searches = inbox_searches()
+            sources = await asyncio.gather(*(
+                self._read_source(SOURCES[source][0], params) for source, params in searches.items()
+            ))
+        except BaseException:
+            self._stale = True
+            raise
+        else:
+            now = datetime.now(timezone.utc)
+            self._reset()
+            for resources in sources:
+                for key, resource in resources:
+                    self._put(key, resource, now)
+            # The baseline may predate writes that landed while it was read
+            for key, resource in self._writes_during_read.items():
+                self._put(key, resource, now)
+            self._log_seen = log_seen
+            self._built_at = time.monotonic()
+            self.rebuilds += 1
+        finally:
+            self._writes_during_read = None
+
+    async def _reread(self, keys: List[ResourceKey]) -> Dict[ResourceKey, Dict[str, Any]]:
+        """Current versions of `keys`; deleted resources are simply absent."""
+        ids_by_type: Dict[str, List[str]] = {}
+        for resource_type, resource_id in keys:
+            ids_by_type.setdefault(resource_type, []).append(resource_id)
+        found = {}
+        for resource_type, ids in ids_by_type.items():
+            for start in range(0, len(ids), INBOX_COUNTERS_REREAD_BATCH):
+                batch = ids[start:start + INBOX_COUNTERS_REREAD_BATCH]
+                params = {"_id": ",".join(batch), "_count": len(batch)}
+                async for resource in self.hapi.search_iter(resource_type, params):
+                    found[resource_type, resource.get("id")] = resource
+        return found
+
+    async def _catch_up(self) -> None:
+        """Apply the inbox writes other workers logged since we last looked."""
+        log_seen, keys = await self.write_log.since(self._log_seen, self.writer)
+        if keys:
+            self._writes_during_read = {}
+            try:
+                current = await self._reread(keys)
+                now = datetime.now(timezone.utc)
+                for key in keys:
+                    self._put(key, current.get(key), now)
+                for key, resource in self._writes_during_read.items():
+                    self._put(key, resource, now)
+                self.rereads += len(keys)
+            finally:
+                self._writes_during_read = None
+        self._log_seen = log_seen
+
+    def _needs_rebuild(self) -> bool:
+        return (
+            self._built_at is None
+            or self._stale
+            or time.monotonic() - self._built_at > self.resync_seconds
+        )
+
+    async def _refresh(self) -> None:
+        if self._needs_rebuild():
+            await self._rebuild()
+        await self._catch_up()
+
+    # -- Reads ---------------------------------------------------------------
+
+    async def get_stats(self, assigned_to: Optional[str] = None) -> Dict[str, Any]:
+        """Counts in the shape GET /api/clinical/inbox/stats has always returned."""
+        try:
+            await self._flights.do(("refresh",), self._refresh)
+        except Exception as e:
+            if self._built_at is None:
+                raise
+            # Slightly stale counts beat no counts; retried on the next read
+            logger.warning(f"Inbox counter resync failed, serving previous counts: {e}")
+        self._expire(datetime.now(timezone.utc))
+
+        counts = self._counts.get(assigned_to, Counter())
+        stats: Dict[str, Any] = {"total": counts[("total", None)], "by_status": {}, "by_type": {}, "by_priority": {}}
+        for (dimension, value), count in counts.items():
+            if dimension != "total" and count:
+                stats[dimension][value] = count
+        return stats
+
+
+_inbox_counters: Optional[InboxCounters] = None
+
+
+def get_inbox_counters() -> InboxCounters:
+    """Get or create the process-wide inbox counters (subscribed to FHIR writes)."""
+    global _inbox_counters
+    if _inbox_counters is None:
+        _inbox_counters = InboxCounters()
+        add_write_listener(_inbox_counters.on_fhir_write)
+        notification_service.add_listener(_inbox_counters.on_fhir_write)
+    return _inbox_counters
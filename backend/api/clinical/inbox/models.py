@@ -0,0 +1,64 @@
+"""
+Clinical inbox request/response models.
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class InboxItemType(str, Enum):
+    TASK = "task"
+    NOTIFICATION = "notification"
+    LAB_RESULT = "lab_result"
+    MESSAGE = "message"
+    MEDICATION_REQUEST = "medication_request"
+    ORDER_REVIEW = "order_review"
+
+
+class InboxItemStatus(str, Enum):
+    UNREAD = "unread"
+    READ = "read"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    ARCHIVED = "archived"
+
+
+class InboxItem(BaseModel):
+    id: str
+    type: InboxItemType
+    status: InboxItemStatus
+    priority: str = "medium"
+    patient_id: Optional[str] = None
+    patient_name: Optional[str] = None
+    subject: str
+    description: Optional[str] = None
+    created_at: datetime
+    due_date: Optional[datetime] = None
+    assigned_to: Optional[str] = None
+    source_resource_id: Optional[str] = None
+    source_resource_type: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+class InboxPage(BaseModel):
+    items: List[InboxItem]
+    # Opaque; pass back as ?cursor= for the next page. None on the last page.
+    next_cursor: Optional[str] = None
+
+
+class BulkActionRequest(BaseModel):
+    item_ids: List[str]
+    action: str  # "mark_read", "mark_completed", "archive", "assign"
+    assignee_id: Optional[str] = None
+
+
+class CreateTaskRequest(BaseModel):
+    patient_id: str
+    subject: str
+    description: Optional[str] = None
+    priority: str = "medium"
+    due_date: Optional[datetime] = None
+    assigned_to: Optional[str] = None
@@ -0,0 +1,419 @@
+"""
+Clinical inbox items from FHIR.
+
+The inbox is a view over three searches - open Tasks, recent abnormal
+laboratory Observations and draft MedicationRequest orders - ordered by
+priority (high first), then newest first.
+
+Every filter the listing takes is pushed down into those searches: the
+status and assignee become Task search parameters, and a type, status or
+assignee that a source can't have drops that source altogether. Each
+(source, priority) pair of Tasks and orders is one date-sorted OrderStream
+(see api/clinical/orders/pagination.py) ranked by its priority, and
+merge_streams() merges them lazily, so a page costs about one page of
+upstream reads per stream it touches - lower priorities aren't searched
+until the higher ones run out - and the cursor resumes each stream where
+the previous page left it.
+
+R4 has no Observation search parameter for interpretation, so labs can't
+be split by priority upstream. They are one RankedScanStream instead: the
+lab window is read once per page, INBOX_LAB_PAGE_SIZE results at a time
+and only the elements an item needs, and each result is ranked by its
+interpretation.
+"""
+
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from api.clinical.inbox.models import InboxItem, InboxItemStatus, InboxItemType, InboxPage
+from api.clinical.orders.pagination import (
+    InvalidCursor,
+    OrderStream,
+    RankedScanStream,
+    StreamPosition,
+    decode_cursor,
+    encode_cursor,
+    filters_fingerprint,
+    merge_streams,
+)
+from services.hapi_fhir_client import HAPIFHIRClient
+
+logger = logging.getLogger(__name__)
+
+# Abnormal lab results stay in the inbox this many days after they were taken
+INBOX_LAB_WINDOW_DAYS = int(os.getenv("INBOX_LAB_WINDOW_DAYS", "7"))
+# Results per upstream page when scanning the lab window
+INBOX_LAB_PAGE_SIZE = int(os.getenv("INBOX_LAB_PAGE_SIZE", "500"))
+# What lab_item() and lab_priority() read
+LAB_ELEMENTS = "code,subject,effectiveDateTime,issued,valueQuantity,interpretation"
+
+PRIORITY_RANKS = {"high": 2, "medium": 1, "low": 0}
+
+# FHIR request priority codes (Task, MedicationRequest) per inbox priority.
+# The inbox's own high/medium/low are accepted as written by older clients;
+# no priority at all is medium. Other codes aren't inbox items.
+REQUEST_PRIORITIES = {
+    "high": ("stat", "asap", "urgent", "high"),
+    "medium": ("routine", "medium"),
+    "low": ("low",),
+}
+
+# Observation interpretation codes per inbox priority
+LAB_PRIORITIES = {
+    "high": ("HH", "LL", "AA"),
+    "medium": ("H", "L", "A"),
+}
+
+# Task status codes per inbox status
+TASK_STATUSES = {
+    InboxItemStatus.UNREAD: ("requested",),
+    InboxItemStatus.IN_PROGRESS: ("accepted", "in-progress"),
+}
+OPEN_TASK_STATUSES = tuple(code for codes in TASK_STATUSES.values() for code in codes)
+
+# Resource type, date search parameter and the element it indexes, per source
+SOURCES = {
+    InboxItemType.TASK: ("Task", "authored-on", "authoredOn"),
+    InboxItemType.LAB_RESULT: ("Observation", "date", "effectiveDateTime"),
+    InboxItemType.MEDICATION_REQUEST: ("MedicationRequest", "authoredon", "authoredOn"),
+}
+INBOX_RESOURCE_TYPES = tuple(resource_type for resource_type, _, _ in SOURCES.values())
+
+
+def _reference(value: Any) -> Tuple[Optional[str], Optional[str]]:
+    """(id, display) of a Reference given as a dict or a bare reference string."""
+    if isinstance(value, str):
+        return value.split("/")[-1] or None, None
+    if isinstance(value, dict):
+        reference = value.get("reference") or ""
+        return (reference.split("/")[-1] if reference else None), value.get("display")
+    return None, None
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def request_priority(code: Optional[str]) -> Optional[str]:
+    """Inbox priority of a FHIR request priority code; None if it isn't one."""
+    if not code:
+        return "medium"
+    for priority, codes in REQUEST_PRIORITIES.items():
+        if code in codes:
+            return priority
+    return None
+
+
+def interpretation_code(observation: Dict[str, Any]) -> Optional[str]:
+    """Code of the first coding of the first interpretation, if any."""
+    interpretations = observation.get("interpretation")
+    if not isinstance(interpretations, list) or not interpretations or not isinstance(interpretations[0], dict):
+        return None
+    codings = interpretations[0].get("coding")
+    if not isinstance(codings, list) or not codings or not isinstance(codings[0], dict):
+        return None
+    return codings[0].get("code")
+
+
+def lab_priority(observation: Dict[str, Any]) -> Optional[str]:
+    code = interpretation_code(observation)
+    for priority, codes in LAB_PRIORITIES.items():
+        if code in codes:
+            return priority
+    return None
+
+
+def lab_window_start(now: Optional[datetime] = None) -> date:
+    """First day whose abnormal labs are still in the inbox."""
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(days=INBOX_LAB_WINDOW_DAYS)).date()
+
+
+def lab_expiry(observation: Dict[str, Any]) -> Optional[datetime]:
+    """When an abnormal lab ages out of the inbox (UTC)."""
+    taken = _parse_datetime(observation.get("effectiveDateTime"))
+    if taken is None:
+        return None
+    if taken.tzinfo is None:
+        taken = taken.replace(tzinfo=timezone.utc)
+    last_day = taken.astimezone(timezone.utc).date() + timedelta(days=INBOX_LAB_WINDOW_DAYS + 1)
+    return datetime(last_day.year, last_day.month, last_day.day, tzinfo=timezone.utc)
+
+
+def inbox_searches(now: Optional[datetime] = None) -> Dict[InboxItemType, Dict[str, Any]]:
+    """Base search parameters of each source: every item it can contribute."""
+    return {
+        InboxItemType.TASK: {"status": ",".join(OPEN_TASK_STATUSES)},
+        InboxItemType.LAB_RESULT: {
+            "status": "final",
+            "category": "laboratory",
+            "date": f"ge{lab_window_start(now).isoformat()}",
+        },
+        InboxItemType.MEDICATION_REQUEST: {"status": "draft", "intent": "order"},
+    }
+
+
+# -- Items -------------------------------------------------------------------
+
+def task_item(task: Dict[str, Any]) -> InboxItem:
+    patient_id, patient_name = _reference(task.get("for"))
+    assigned_to, _ = _reference(task.get("owner"))
+    notes = task.get("note")
+    due = (task.get("restriction") or {}).get("period", {}).get("end")
+    return InboxItem(
+        id=task.get("id"),
+        type=InboxItemType.TASK,
+        status=InboxItemStatus.UNREAD if task.get("status") == "requested" else InboxItemStatus.IN_PROGRESS,
+        priority=request_priority(task.get("priority")) or "medium",
+        patient_id=patient_id,
+        patient_name=patient_name or "Unknown Patient",
+        subject=task.get("description", "Clinical Task"),
+        description=notes[0].get("text") if isinstance(notes, list) and notes else None,
+        created_at=_parse_datetime(task.get("authoredOn")) or datetime.now(timezone.utc),
+        due_date=_parse_datetime(due),
+        assigned_to=assigned_to,
+        source_resource_id=task.get("id"),
+        source_resource_type="Task"
+    )
+
+
+def lab_item(observation: Dict[str, Any]) -> InboxItem:
+    patient_id, patient_name = _reference(observation.get("subject"))
+    code = observation.get("code")
+    quantity = observation.get("valueQuantity")
+    quantity = quantity if isinstance(quantity, dict) else {}
+    interpretation = interpretation_code(observation)
+    return InboxItem(
+        id=f"lab-{observation.get('id')}",
+        type=InboxItemType.LAB_RESULT,
+        status=InboxItemStatus.UNREAD,
+        priority=lab_priority(observation) or "medium",
+        patient_id=patient_id,
+        patient_name=patient_name or "Unknown Patient",
+        subject=f"Abnormal Lab Result: {code.get('text', 'Unknown Test') if isinstance(code, dict) else 'Unknown Test'}",
+        description=f"Value: {quantity.get('value', 'N/A')} {quantity.get('unit', '')}",
+        created_at=(
+            _parse_datetime(observation.get("effectiveDateTime"))
+            or _parse_datetime(observation.get("issued"))
+            or datetime.now(timezone.utc)
+        ),
+        source_resource_id=observation.get("id"),
+        source_resource_type="Observation",
+        metadata={"interpretation": interpretation}
+    )
+
+
+def medication_item(med_req: Dict[str, Any]) -> InboxItem:
+    patient_id, patient_name = _reference(med_req.get("subject"))
+    medication = med_req.get("medicationCodeableConcept")
+    med_display = medication.get("text", "Unknown Medication") if isinstance(medication, dict) else "Unknown Medication"
+    return InboxItem(
+        id=f"med-{med_req.get('id')}",
+        type=InboxItemType.MEDICATION_REQUEST,
+        status=InboxItemStatus.UNREAD,
+        priority=request_priority(med_req.get("priority")) or "medium",
+        patient_id=patient_id,
+        patient_name=patient_name or "Unknown Patient",
+        subject=f"Medication Request Review: {med_display}",
+        description="Pending approval",
+        created_at=_parse_datetime(med_req.get("authoredOn")) or datetime.now(timezone.utc),
+        source_resource_id=med_req.get("id"),
+        source_resource_type="MedicationRequest"
+    )
+
+
+ITEM_BUILDERS = {
+    "Task": task_item,
+    "Observation": lab_item,
+    "MedicationRequest": medication_item,
+}
+
+
+def inbox_item(resource: Dict[str, Any], now: Optional[datetime] = None) -> Optional[InboxItem]:
+    """
+    The inbox item a resource is right now, or None if it isn't in the inbox.
+
+    The rules the listing's searches push down to HAPI, applied to one
+    resource; the counters use it to classify a single write.
+    """
+    resource_type = resource.get("resourceType")
+    if resource_type == "Task":
+        if (
+            resource.get("status") not in OPEN_TASK_STATUSES
+            or not resource.get("authoredOn")
+            or request_priority(resource.get("priority")) is None
+        ):
+            return None
+    elif resource_type == "Observation":
+        categories = resource.get("category") or []
+        laboratory = any(
+            coding.get("code") == "laboratory"
+            for category in categories if isinstance(category, dict)
+            for coding in category.get("coding", []) if isinstance(coding, dict)
+        )
+        expiry = lab_expiry(resource)
+        if (
+            resource.get("status") != "final"
+            or not laboratory
+            or lab_priority(resource) is None
+            or expiry is None
+            or expiry <= (now or datetime.now(timezone.utc))
+        ):
+            return None
+    elif resource_type == "MedicationRequest":
+        if (
+            resource.get("status") != "draft"
+            or resource.get("intent") != "order"
+            or not resource.get("authoredOn")
+            or request_priority(resource.get("priority")) is None
+        ):
+            return None
+    else:
+        return None
+    if not resource.get("id"):
+        return None
+    return ITEM_BUILDERS[resource_type](resource)
+
+
+# -- Listing -----------------------------------------------------------------
+
+def _buckets(source: InboxItemType):
+    """(priority, stream name, extra search params) of a request source's streams."""
+    for priority, codes in REQUEST_PRIORITIES.items():
+        yield priority, priority, {"priority": ",".join(codes)}
+    # An OR of "one of these codes" and "no priority" isn't one FHIR query
+    yield "medium", "unprioritized", {"priority:missing": "true"}
+
+
+def _lab_rank(observation: Dict[str, Any]) -> Optional[int]:
+    return PRIORITY_RANKS.get(lab_priority(observation))
+
+
+def _stream_keys(source: InboxItemType) -> List[str]:
+    """Cursor keys of a source's streams: "<resource type>:<bucket>"."""
+    resource_type = SOURCES[source][0]
+    if source == InboxItemType.LAB_RESULT:
+        return [f"{resource_type}:abnormal"]
+    return [f"{resource_type}:{name}" for _, name, _ in _buckets(source)]
+
+
+LAB_STREAM_KEY, = _stream_keys(InboxItemType.LAB_RESULT)
+STREAM_KEYS = tuple(key for source in SOURCES for key in _stream_keys(source))
+
+
+class InboxService:
+    """Clinical inbox listing over HAPI FHIR (one injected client)."""
+
+    def __init__(self, hapi_client: Optional[HAPIFHIRClient] = None):
+        self.hapi = hapi_client or HAPIFHIRClient()
+
+    def _streams(
+        self,
+        *,
+        status: Optional[InboxItemStatus],
+        item_type: Optional[InboxItemType],
+        assigned_to: Optional[str],
+        patient_id: Optional[str],
+        page_size: int,
+        positions: Dict[str, StreamPosition]
+    ) -> List[OrderStream]:
+        """One stream per (source, priority) the filters leave possible; one for labs."""
+        searches = inbox_searches()
+        sources = []
+        if status is None or status in TASK_STATUSES:
+            if status:
+                searches[InboxItemType.TASK]["status"] = ",".join(TASK_STATUSES[status])
+            if assigned_to:
+                searches[InboxItemType.TASK]["owner"] = assigned_to
+            sources.append(InboxItemType.TASK)
+        # Labs and medication reviews are always unread and never assigned
+        if status in (None, InboxItemStatus.UNREAD) and not assigned_to:
+            sources += [InboxItemType.LAB_RESULT, InboxItemType.MEDICATION_REQUEST]
+        if item_type:
+            sources = [source for source in sources if source == item_type]
+
+        streams = []
+        for source in sources:
+            resource_type, date_param, date_field = SOURCES[source]
+            params = searches[source]
+            if patient_id:
+                params["patient"] = patient_id
+            if source == InboxItemType.LAB_RESULT:
+                streams.append(RankedScanStream(
+                    self.hapi, resource_type, {**params, "_elements": LAB_ELEMENTS},
+                    rank_of=_lab_rank,
+                    ranks=[PRIORITY_RANKS[priority] for priority in LAB_PRIORITIES],
+                    position=positions.get(LAB_STREAM_KEY),
+                    key=LAB_STREAM_KEY,
+                    date_param=date_param,
+                    date_field=date_field,
+                    page_size=INBOX_LAB_PAGE_SIZE
+                ))
+                continue
+            for priority, name, extra_params in _buckets(source):
+                key = f"{resource_type}:{name}"
+                streams.append(OrderStream(
+                    self.hapi, resource_type, {**params, **extra_params},
+                    page_size=page_size,
+                    position=positions.get(key),
+                    key=key,
+                    date_param=date_param,
+                    date_field=date_field,
+                    rank=PRIORITY_RANKS[priority]
+                ))
+        return streams
+
+    async def get_inbox_page(
+        self,
+        *,
+        status: Optional[InboxItemStatus] = None,
+        item_type: Optional[InboxItemType] = None,
+        assigned_to: Optional[str] = None,
+        patient_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 50
+    ) -> InboxPage:
+        """
+        One page of inbox items, high priority first and newest first within
+        a priority, plus the cursor for the next page.
+
+        All streams are searched concurrently and merged lazily, so a page
+        costs about one page of upstream reads per stream it reaches,
+        whichever page it is. `skip` is applied after the cursor position.
+        """
+        fingerprint = filters_fingerprint({
+            "status": status, "type": item_type, "assigned_to": assigned_to, "patient_id": patient_id,
+        })
+        positions = {}
+        if cursor:
+            try:
+                positions = decode_cursor(cursor, fingerprint, keys=STREAM_KEYS)
+            except InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+        streams = self._streams(
+            status=status, item_type=item_type, assigned_to=assigned_to, patient_id=patient_id,
+            page_size=skip + limit, positions=positions
+        )
+        merged = await merge_streams(streams, limit, skip=skip)
+        items = [ITEM_BUILDERS[stream.resource_type](resource) for stream, resource in merged]
+
+        next_cursor = None
+        if len(items) == limit and any(stream.has_more for stream in streams):
+            next_cursor = encode_cursor({stream.key: stream.position for stream in streams}, fingerprint)
+        return InboxPage(items=items, next_cursor=next_cursor)
+
+
+def get_inbox_service() -> InboxService:
+    """FastAPI dependency — one service per request."""
+    return InboxService()
@@ -0,0 +1,270 @@
+"""
+Drug Interaction Lookup Index
+
+Precomputed index over a drug-interaction rule table, so checking a
+medication list costs work proportional to the patient's medications
+instead of rules x drugs x medications.
+
+Rule shape (same as drug_interactions.DRUG_INTERACTIONS):
+    {
+        "drugs": ["warfarin", "aspirin"],
+        "rxnorm_codes": ["855332", "243670"],   # parallel to drugs
+        "severity": "major",
+        "description": "...",
+        "clinical_consequence": "...",
+        "management": "..."
+    }
+
+Architecture:
+- DrugNameAutomaton: Aho-Corasick automaton over every lowercased drug
+  name. One pass over a medication name finds every drug name it
+  contains - the same substring semantics as `drug in med_name`, without
+  trying each drug in turn.
+- InteractionIndex: drug name -> (rule, position) and RxNorm code ->
+  (rule, position) postings. Only rules hit at least twice are evaluated.
+- load_interaction_dataset(): reads external CSV/JSON interaction tables
+  (pairwise rows or full rules) into the rule shape above.
+"""
+
+import csv
+import json
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# (rule ordinal, position of the drug within the rule)
+Posting = Tuple[int, int]
+
+
+class DrugNameAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of lowercase patterns.
+
+    Educational Notes:
+        - Build: a trie of all patterns, then breadth-first failure links
+          (longest proper suffix that is also a trie path)
+        - Search: one state transition per character of the text; every
+          pattern ending at that character is reported via the output set
+        - Cost of a search is O(len(text) + matches), independent of the
+          number of patterns
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[str]] = [set()]
+
+        for pattern in patterns:
+            if pattern:
+                self._insert(pattern)
+        self._link()
+
+    def _insert(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            state = nxt
+        self._out[state].add(pattern)
+
+    def _link(self) -> None:
+        # Depth-1 states fail to the root (their default); go breadth-first
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[str]:
+        """Every pattern occurring anywhere in text."""
+        found: Set[str] = set()
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+class InteractionIndex:
+    """
+    Read-only lookup index over an interaction rule table.
+
+    Built once per table (at import, or when a dataset is loaded);
+    check() reproduces the rule-by-rule scan it replaces, result for
+    result, including rule order and the order drugs are reported in.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Any]]):
+        self.rules = rules
+        self._rule_ids: List[str] = list(rules)
+        self._by_name: Dict[str, List[Posting]] = {}
+        self._by_code: Dict[str, List[Posting]] = {}
+
+        for ordinal, rule_id in enumerate(self._rule_ids):
+            rule = rules[rule_id]
+            drugs = rule.get("drugs", [])
+            for position, drug in enumerate(drugs):
+                self._by_name.setdefault(drug.lower(), []).append((ordinal, position))
+            for position, code in enumerate(rule.get("rxnorm_codes", [])):
+                if code and position < len(drugs):
+                    self._by_code.setdefault(code, []).append((ordinal, position))
+
+        self._automaton = DrugNameAutomaton(self._by_name)
+
+    def __len__(self) -> int:
+        return len(self._rule_ids)
+
+    def check(self, medication_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Interactions among medication_list (dicts with 'name' and 'code')."""
+        name_hits: Dict[int, Set[int]] = {}
+        code_hits: Dict[int, Set[int]] = {}
+
+        for med in medication_list:
+            for drug in self._automaton.find((med.get("name") or "").lower()):
+                for ordinal, position in self._by_name[drug]:
+                    name_hits.setdefault(ordinal, set()).add(position)
+            code = med.get("code") or ""
+            for ordinal, position in self._by_code.get(code, ()):
+                code_hits.setdefault(ordinal, set()).add(position)
+
+        interactions = []
+        for ordinal in sorted(name_hits.keys() | code_hits.keys()):
+            names = name_hits.get(ordinal, set())
+            codes = code_hits.get(ordinal, set())
+            if len(names | codes) < 2:
+                continue
+            rule_id = self._rule_ids[ordinal]
+            rule = self.rules[rule_id]
+            matching = self._matching_drugs(rule, names, codes)
+            if len(matching) >= 2:
+                interactions.append({
+                    "id": rule_id,
+                    "drugs": matching,
+                    "severity": rule["severity"],
+                    "description": rule["description"],
+                    "clinical_consequence": rule.get("clinical_consequence", ""),
+                    "management": rule.get("management", ""),
+                })
+        return interactions
+
+    @staticmethod
+    def _matching_drugs(rule: Dict[str, Any], names: Set[int], codes: Set[int]) -> List[str]:
+        # Name matches first, in rule order; then code matches until two
+        # drugs are known (the order the original scan reported them in)
+        drugs = rule["drugs"]
+        matching = [drugs[position] for position in sorted(names)]
+        for position in sorted(codes):
+            if len(matching) >= 2:
+                break
+            if drugs[position] not in matching:
+                matching.append(drugs[position])
+        return matching
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "rules": len(self._rule_ids),
+            "drug_names": len(self._by_name),
+            "rxnorm_codes": len(self._by_code),
+            "automaton_states": len(self._automaton),
+        }
+
+
+def _split(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(v).strip() for v in value]
+    return [part.strip() for part in str(value or "").split("|") if part.strip()]
+
+
+def _rule_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """One CSV row / JSON object -> rule; pairwise (drug_a/drug_b) or full (drugs)."""
+    if row.get("drugs"):
+        drugs = _split(row["drugs"])
+        codes = _split(row.get("rxnorm_codes", ""))
+    else:
+        drugs = [str(row.get("drug_a") or "").strip(), str(row.get("drug_b") or "").strip()]
+        codes = [str(row.get("rxnorm_a") or "").strip(), str(row.get("rxnorm_b") or "").strip()]
+
+    drugs = [d for d in drugs if d]
+    if len(drugs) < 2:
+        raise ValueError("an interaction needs at least two drugs")
+    for name in ("severity", "description"):
+        if not row.get(name):
+            raise ValueError(f"missing '{name}'")
+
+    return {
+        "drugs": drugs,
+        "rxnorm_codes": codes[:len(drugs)],
+        "severity": str(row["severity"]).strip().lower(),
+        "description": row["description"],
+        "clinical_consequence": row.get("clinical_consequence") or "",
+        "management": row.get("management") or "",
+    }
+
+
+def load_interaction_dataset(path: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load an external interaction table.
+
+    Supported formats:
+        .csv   header row; either drug_a,drug_b[,rxnorm_a,rxnorm_b] per pair
+               or drugs[,rxnorm_codes] with '|'-separated values, plus
+               severity, description[, clinical_consequence, management, id]
+        .json  {id: rule} (the DRUG_INTERACTIONS shape) or [rule, ...]
+               where each rule may be pairwise or full, with optional "id"
+
+    Returns:
+        {rule_id: rule}; rows without an id get "<drug_a>-<drug_b>"
+
+    Raises:
+        ValueError: unsupported format or an invalid row (with its number)
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    if suffix == ".csv":
+        with path.open(newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    elif suffix == ".json":
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            rows = [{"id": rule_id, **rule} for rule_id, rule in data.items()]
+        elif isinstance(data, list):
+            rows = data
+        else:
+            raise ValueError(f"{path}: expected an object or a list of interactions")
+    else:
+        raise ValueError(f"{path}: unsupported interaction dataset format '{suffix}'")
+
+    rules: Dict[str, Dict[str, Any]] = {}
+    for number, row in enumerate(rows, start=1):
+        try:
+            rule = _rule_from_row(row)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError(f"{path}: row {number}: {e}") from e
+        rule_id = str(row.get("id") or "-".join(d.lower() for d in rule["drugs"]))
+        rules[rule_id] = rule
+
+    logger.info(f"Loaded {len(rules)} drug interactions from {path}")
+    return rules
+
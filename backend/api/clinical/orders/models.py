@@ -85,6 +85,12 @@ class OrderResponse(BaseModel):
     updated_at: datetime
 
 
+class OrderPage(BaseModel):
+    orders: List[OrderResponse]
+    # Opaque; pass back as ?cursor= for the next page. None on the last page.
+    next_cursor: Optional[str] = None
+
+
 class OrderSetCreate(BaseModel):
     name: str
     description: Optional[str] = None
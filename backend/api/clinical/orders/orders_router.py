@@ -14,6 +14,7 @@
     ImagingOrderCreate,
     LaboratoryOrderCreate,
     MedicationOrderCreate,
+    OrderPage,
     OrderResponse,
     OrderResultSummary,
     OrderSetCreateRequest,
@@ -92,6 +93,27 @@ async def get_orders(
     return await service.get_orders(patient_id=patient_id, encounter_id=encounter_id, order_type=order_type, status=status, priority=priority, skip=skip, limit=limit, current_user=current_user)
 
 
+@router.get("/page", response_model=OrderPage)
+async def get_orders_page(
+    patient_id: Optional[str] = Query(None),
+    encounter_id: Optional[str] = Query(None),
+    order_type: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    priority: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    service: OrdersService = Depends(get_orders_service),
+):
+    """
+    Get one page of orders, newest first, with a cursor for the next.
+
+    Filters must stay the same across pages; a cursor issued for other
+    filters is rejected with 400.
+    """
+    return await service.get_orders_page(patient_id=patient_id, encounter_id=encounter_id, order_type=order_type, status=status, priority=priority, cursor=cursor, limit=limit, current_user=current_user)
+
+
 @router.get("/active", response_model=List[OrderResponse])
 async def get_active_orders(
     patient_id: Optional[str] = Query(None),
@@ -0,0 +1,376 @@
+"""
+Cursor pagination over several date-sorted FHIR searches.
+
+An order listing is the union of MedicationRequest and ServiceRequest
+searches, newest first. Rather than downloading both result sets and
+slicing the concatenation, each search is an OrderStream that reads one
+page at a time, and merge_streams() performs a lazy k-way merge on the
+authored date.
+
+The position of every stream is keyset-based: the authored date of the
+last order consumed from it, plus the ids already consumed at exactly
+that date (ties). The next page resumes each stream with
+`{date_param}=le{date}` and skips those ids, so page N costs about one
+page of upstream reads per stream, and inserts above the cursor don't
+shift it the way an offset would.
+
+Streams may also carry a rank: merge_streams() drains higher-ranked
+streams before lower ones, so a listing ordered by (priority, date) -
+the clinical inbox - is one stream per priority bucket, and a lower
+bucket isn't even searched until the ones above it run out. When the rank
+is something the search can't filter on, a RankedScanStream reads the
+(bounded) search once and ranks each resource itself; its rank is that of
+its next resource.
+
+encode_cursor()/decode_cursor() turn the positions into an opaque,
+URL-safe token that is bound to the query filters it was issued for.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+CURSOR_VERSION = 1
+
+# HAPI's date search parameter for authored date, per resource type
+AUTHORED_PARAMS = {
+    "MedicationRequest": "authoredon",
+    "ServiceRequest": "authored",
+}
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed or was issued for different filters."""
+
+
+@dataclass
+class StreamPosition:
+    """Keyset position within one date-descending stream.
+
+    `rank` is only set by streams that rank resources themselves
+    (RankedScanStream): the position is then (rank, date, ids).
+    """
+    date: Optional[str] = None
+    ids: List[str] = field(default_factory=list)
+    rank: Optional[int] = None
+
+    def advance(self, date: str, resource_id: str, rank: Optional[int] = None) -> None:
+        if date == self.date and rank == self.rank:
+            self.ids.append(resource_id)
+        else:
+            self.date = date
+            self.ids = [resource_id]
+            self.rank = rank
+
+    def copy(self) -> "StreamPosition":
+        return StreamPosition(self.date, list(self.ids), self.rank)
+
+
+def _sort_key(date: str) -> float:
+    """Authored date as a POSIX timestamp (naive values are taken as UTC)."""
+    try:
+        parsed = datetime.fromisoformat(date.replace("Z", "+00:00"))
+    except ValueError:
+        return float("-inf")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class OrderStream:
+    """
+    One resource type's orders, newest first, fetched a page at a time.
+
+    `position` is where the consumer is (what goes into the cursor);
+    the stream reads ahead from its own fetch position. Resources rejected
+    by `accept` are skipped but still move the fetch position.
+    Orders without authoredOn can't be placed in the date order (and
+    can't be represented as an OrderResponse), so they are skipped.
+
+    Other date-sorted searches override `date_param` (the search/sort
+    parameter) and `date_field` (the element it indexes); `key` names the
+    stream in the cursor when one resource type backs several streams.
+    """
+
+    def __init__(
+        self,
+        hapi_client,
+        resource_type: str,
+        params: Dict[str, Any],
+        page_size: int,
+        position: Optional[StreamPosition] = None,
+        accept: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        *,
+        key: Optional[str] = None,
+        date_param: Optional[str] = None,
+        date_field: str = "authoredOn",
+        rank: int = 0
+    ):
+        self.hapi = hapi_client
+        self.resource_type = resource_type
+        self.key = key or resource_type
+        self.date_param = date_param or AUTHORED_PARAMS[resource_type]
+        self.date_field = date_field
+        self.rank = rank
+        self.params = params
+        self.page_size = page_size
+        self.position = position or StreamPosition()
+        self.accept = accept or (lambda resource: True)
+
+        self._fetch_position = self.position.copy()
+        self._buffer: Deque[Tuple[float, str, Dict[str, Any]]] = deque()
+        self._exhausted = False
+        self.upstream_reads = 0
+
+    @property
+    def has_more(self) -> bool:
+        return bool(self._buffer) or not self._exhausted
+
+    async def peek(self) -> Optional[Tuple[float, str, Dict[str, Any]]]:
+        """Next (sort key, date, resource) without consuming it; None at the end."""
+        while not self._buffer and not self._exhausted:
+            await self._fetch_page()
+        return self._buffer[0] if self._buffer else None
+
+    def pop(self) -> Dict[str, Any]:
+        _, date, resource = self._buffer.popleft()
+        self.position.advance(date, resource.get("id"))
+        return resource
+
+    async def _fetch_page(self) -> None:
+        start = self._fetch_position
+        params = dict(self.params)
+        params["_sort"] = f"-{self.date_param}"
+        # Room for the tie ids we'll skip, so a full page is still new data
+        params["_count"] = self.page_size + len(start.ids)
+        if start.date:
+            bound = f"le{start.date}"
+            # Keep a caller's own bound on the same parameter (date=ge...)
+            existing = params.get(self.date_param)
+            if existing:
+                existing = list(existing) if isinstance(existing, (list, tuple)) else [existing]
+                params[self.date_param] = existing + [bound]
+            else:
+                params[self.date_param] = bound
+
+        bundle = await self.hapi.search(self.resource_type, params)
+        self.upstream_reads += 1
+
+        resources = [entry.get("resource", {}) for entry in bundle.get("entry", [])]
+        if len(resources) < params["_count"]:
+            self._exhausted = True
+
+        seen = set(start.ids) if start.date else set()
+        fetch_position = start.copy()
+        for resource in resources:
+            date = resource.get(self.date_field)
+            resource_id = resource.get("id")
+            if not date or not resource_id:
+                continue
+            if date == start.date and resource_id in seen:
+                continue
+            fetch_position.advance(date, resource_id)
+            if self.accept(resource):
+                self._buffer.append((_sort_key(date), date, resource))
+
+        if fetch_position == start and not self._buffer:
+            # Nothing new came back: don't ask the same question again
+            self._exhausted = True
+        self._fetch_position = fetch_position
+
+
+class RankedScanStream:
+    """
+    A bounded search read whole, then served highest rank first, newest first.
+
+    For a listing ranked by something the search can't filter on, one
+    OrderStream per rank would each page through the same search and throw
+    most of it away. This stream reads the search once instead - every
+    page, `page_size` resources at a time, through the client's
+    search_iter() - and `rank_of` ranks each resource (None drops it). It
+    only suits searches whose own filters bound them, like the inbox's lab
+    window: each listing page re-reads the whole search.
+
+    `rank` is the rank of the next resource, and the highest rank it can
+    return before the search is read, so merge_streams() can interleave it
+    with fixed-rank streams.
+    """
+
+    def __init__(
+        self,
+        hapi_client,
+        resource_type: str,
+        params: Dict[str, Any],
+        rank_of: Callable[[Dict[str, Any]], Optional[int]],
+        ranks: Iterable[int],
+        position: Optional[StreamPosition] = None,
+        *,
+        key: Optional[str] = None,
+        date_param: Optional[str] = None,
+        date_field: str = "authoredOn",
+        page_size: int = 500
+    ):
+        self.hapi = hapi_client
+        self.resource_type = resource_type
+        self.key = key or resource_type
+        self.date_param = date_param or AUTHORED_PARAMS[resource_type]
+        self.date_field = date_field
+        self.params = params
+        self.rank_of = rank_of
+        self.page_size = page_size
+        self.position = position or StreamPosition()
+
+        self._top_rank = max(ranks)
+        # (rank, sort key, date, resource) in listing order; None until read
+        self._buffer: Optional[Deque[Tuple[int, float, str, Dict[str, Any]]]] = None
+
+    @property
+    def rank(self) -> int:
+        return self._buffer[0][0] if self._buffer else self._top_rank
+
+    @property
+    def has_more(self) -> bool:
+        return self._buffer is None or bool(self._buffer)
+
+    async def peek(self) -> Optional[Tuple[float, str, Dict[str, Any]]]:
+        """Next (sort key, date, resource) without consuming it; None at the end."""
+        if self._buffer is None:
+            await self._scan()
+        return self._buffer[0][1:] if self._buffer else None
+
+    def pop(self) -> Dict[str, Any]:
+        rank, _, date, resource = self._buffer.popleft()
+        self.position.advance(date, resource.get("id"), rank)
+        return resource
+
+    def _consumed(self, rank: int, sort_key: float, date: str, resource_id: str) -> bool:
+        """Whether the position is already past this resource."""
+        start = self.position
+        if start.date is None or start.rank is None:
+            return False
+        if rank != start.rank:
+            return rank > start.rank
+        start_key = _sort_key(start.date)
+        if sort_key != start_key:
+            return sort_key > start_key
+        return date == start.date and resource_id in start.ids
+
+    async def _scan(self) -> None:
+        params = {**self.params, "_sort": f"-{self.date_param}", "_count": self.page_size}
+        ranked = []
+        async for resource in self.hapi.search_iter(self.resource_type, params):
+            date = resource.get(self.date_field)
+            resource_id = resource.get("id")
+            if not date or not resource_id:
+                continue
+            rank = self.rank_of(resource)
+            if rank is None:
+                continue
+            sort_key = _sort_key(date)
+            if not self._consumed(rank, sort_key, date, resource_id):
+                ranked.append((rank, sort_key, date, resource))
+        # Stable, so resources of one rank and date keep the server's order
+        ranked.sort(key=lambda item: (-item[0], -item[1]))
+        self._buffer = deque(ranked)
+
+
+async def merge_streams(
+    streams: List[OrderStream],
+    limit: int,
+    skip: int = 0
+) -> List[Tuple[OrderStream, Dict[str, Any]]]:
+    """
+    Lazily k-way merge streams: highest rank first, then newest date.
+
+    Only streams whose read-ahead buffer is empty fetch, and they fetch
+    concurrently; streams of a lower rank aren't read while a higher-ranked
+    one has anything left. Ties go to the earlier stream in `streams`.
+    A RankedScanStream's rank can drop once it has been read; it then
+    competes in its new tier.
+
+    Returns:
+        Up to `limit` (stream, resource) pairs, after skipping `skip`
+    """
+    merged: List[Tuple[OrderStream, Dict[str, Any]]] = []
+    while len(merged) < limit:
+        stream = None
+        ceiling = None
+        while stream is None:
+            live = [s for s in streams if s.has_more and (ceiling is None or s.rank < ceiling)]
+            if not live:
+                break
+            rank = max(s.rank for s in live)
+            tier = [s for s in live if s.rank == rank]
+            heads = await asyncio.gather(*(s.peek() for s in tier))
+            best = None
+            for index, head in enumerate(heads):
+                if head is None or tier[index].rank != rank:
+                    continue
+                if best is None or head[0] > heads[best][0]:
+                    best = index
+            if best is not None:
+                stream = tier[best]
+            else:
+                ceiling = rank
+        if stream is None:
+            break
+        resource = stream.pop()
+        if skip:
+            skip -= 1
+            continue
+        merged.append((stream, resource))
+    return merged
+
+
+def filters_fingerprint(filters: Dict[str, Any]) -> str:
+    canonical = json.dumps(filters, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def encode_cursor(positions: Dict[str, StreamPosition], fingerprint: str) -> str:
+    payload = {
+        "v": CURSOR_VERSION,
+        "f": fingerprint,
+        "s": {
+            key: [p.date, p.ids] if p.rank is None else [p.date, p.ids, p.rank]
+            for key, p in positions.items()
+        },
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str,
+    fingerprint: str,
+    keys: Iterable[str] = AUTHORED_PARAMS
+) -> Dict[str, StreamPosition]:
+    """Positions, by stream key, from a cursor issued for the same filters.
+
+    Entries for keys outside `keys` are dropped.
+
+    Raises:
+        InvalidCursor: malformed, wrong version, or issued for other filters
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload.get("v") != CURSOR_VERSION:
+            raise InvalidCursor("unsupported cursor version")
+        if payload.get("f") != fingerprint:
+            raise InvalidCursor("cursor was issued for different filters")
+        keys = set(keys)
+        return {
+            key: StreamPosition(date, [str(i) for i in ids], int(rank[0]) if rank else None)
+            for key, (date, ids, *rank) in payload["s"].items()
+            if key in keys
+        }
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise InvalidCursor("malformed cursor") from e
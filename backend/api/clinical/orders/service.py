@@ -26,6 +26,7 @@
     MedicationDetails,
     MedicationOrderCreate,
     OrderCreate,
+    OrderPage,
     OrderResponse,
     OrderResultSummary,
     OrderSetCreate,
@@ -34,6 +35,14 @@
     OrderSetResponse,
     OrderSetSummary,
 )
+from .pagination import (
+    InvalidCursor,
+    OrderStream,
+    decode_cursor,
+    encode_cursor,
+    filters_fingerprint,
+    merge_streams,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -146,6 +155,65 @@ def _determine_order_type(action: Dict[str, Any]) -> str:
     return "medication"  # default
 
 
+def _resource_order_type(resource: Dict[str, Any], resource_type: str) -> str:
+    """Order type of a MedicationRequest / ServiceRequest (by category)."""
+    if resource_type == "MedicationRequest":
+        return "medication"
+    # ServiceRequest - check category
+    categories = resource.get("category", [])
+    if categories:
+        category_text = categories[0].get("text", "").lower()
+        if "lab" in category_text:
+            return "laboratory"
+        elif "imaging" in category_text:
+            return "imaging"
+    return "unknown"
+
+
+def _order_response(resource: Dict[str, Any], resource_type: str) -> OrderResponse:
+    """OrderResponse for a MedicationRequest / ServiceRequest from search."""
+    # Extract requester ID
+    requester = resource.get("requester", {})
+    requester_ref = requester.get("reference", "")
+    ordering_provider_id = requester_ref.split("/")[-1] if "/" in requester_ref else "unknown"
+
+    # Extract patient ID
+    subject = resource.get("subject", {})
+    subject_ref = subject.get("reference", "")
+    resource_patient_id = subject_ref.split("/")[-1] if "/" in subject_ref else "unknown"
+
+    # Extract encounter ID
+    encounter = resource.get("encounter", {})
+    encounter_ref = encounter.get("reference", "")
+    resource_encounter_id = encounter_ref.split("/")[-1] if "/" in encounter_ref else None
+
+    # Extract indication
+    reason_codes = resource.get("reasonCode", [])
+    resource_indication = reason_codes[0].get("text") if reason_codes else None
+
+    # Extract clinical information from extensions
+    clinical_info = None
+    for ext in resource.get("extension", []):
+        if ext.get("url") == f"{ExtensionURLs.BASE_URL}/clinical-information":
+            clinical_info = ext.get("valueString")
+            break
+
+    return OrderResponse(
+        id=resource.get("id"),
+        patient_id=resource_patient_id,
+        encounter_id=resource_encounter_id,
+        ordering_provider_id=ordering_provider_id,
+        order_type=_resource_order_type(resource, resource_type),
+        order_date=resource.get("authoredOn"),
+        priority=resource.get("priority", "routine"),
+        status=resource.get("status"),
+        indication=resource_indication,
+        clinical_information=clinical_info,
+        created_at=resource.get("meta", {}).get("lastUpdated"),
+        updated_at=resource.get("meta", {}).get("lastUpdated")
+    )
+
+
 class OrdersService:
     """CPOE order operations over HAPI FHIR (one injected client)."""
 
@@ -573,121 +641,79 @@ async def create_imaging_order(self, *, order: ImagingOrderCreate, current_user:
             )
 
     async def get_orders(self, *, patient_id: Optional[str] = None, encounter_id: Optional[str] = None, order_type: Optional[str] = None, status: Optional[str] = None, priority: Optional[str] = None, skip: int = 0, limit: int = 100, current_user: User):
-        """Get orders using FHIR search. (moved verbatim from the router)."""
-        hapi_client = self.hapi
-        all_orders = []
-
-        try:
-            # Determine which resource types to query based on order_type
-            resource_types = []
-
-            if not order_type or order_type == "medication":
-                resource_types.append("MedicationRequest")
-
-            if not order_type or order_type in ["laboratory", "imaging"]:
-                resource_types.append("ServiceRequest")
-
-            # Build search parameters
-            search_params = {}
-
-            if patient_id:
-                search_params["patient"] = f"Patient/{patient_id}"
-
-            if encounter_id:
-                search_params["encounter"] = f"Encounter/{encounter_id}"
-
-            if status:
-                search_params["status"] = status
+        """Get orders using FHIR search, newest first (one page of get_orders_page)."""
+        page = await self.get_orders_page(
+            patient_id=patient_id, encounter_id=encounter_id, order_type=order_type,
+            status=status, priority=priority, skip=skip, limit=limit, current_user=current_user
+        )
+        return page.orders
 
-            if priority:
-                search_params["priority"] = priority
+    async def get_orders_page(self, *, patient_id: Optional[str] = None, encounter_id: Optional[str] = None, order_type: Optional[str] = None, status: Optional[str] = None, priority: Optional[str] = None, cursor: Optional[str] = None, skip: int = 0, limit: int = 100, current_user: User) -> OrderPage:
+        """
+        One page of orders, MedicationRequest and ServiceRequest merged by
+        authored date (newest first), plus the cursor for the next page.
 
-            search_params["_count"] = limit
+        Both searches run concurrently and are merged lazily (see
+        pagination.py), so a page costs about one page of upstream reads
+        per resource type whichever page it is. `skip` is applied after
+        the cursor position.
+        """
+        # Determine which resource types to query based on order_type
+        resource_types = []
 
-            # Query each resource type
-            for resource_type in resource_types:
-                # HAPI's sort parameter is per-type: MedicationRequest uses
-                # 'authoredon', ServiceRequest uses 'authored'. One shared
-                # '-authored' 400'd every MedicationRequest search (and with
-                # it this whole endpoint) since inception — B12's twin, B13.
-                search_params["_sort"] = (
-                    "-authoredon" if resource_type == "MedicationRequest" else "-authored"
-                )
-                bundle = await hapi_client.search(resource_type, search_params)
+        if not order_type or order_type == "medication":
+            resource_types.append("MedicationRequest")
 
-                entries = bundle.get("entry", [])
+        if not order_type or order_type in ["laboratory", "imaging"]:
+            resource_types.append("ServiceRequest")
 
-                for entry in entries:
-                    resource = entry.get("resource", {})
+        # Build search parameters
+        search_params = {}
 
-                    # Determine order type from resource
-                    if resource_type == "MedicationRequest":
-                        resource_order_type = "medication"
-                    else:
-                        # ServiceRequest - check category
-                        categories = resource.get("category", [])
-                        if categories:
-                            category_text = categories[0].get("text", "").lower()
-                            if "lab" in category_text:
-                                resource_order_type = "laboratory"
-                            elif "imaging" in category_text:
-                                resource_order_type = "imaging"
-                            else:
-                                resource_order_type = "unknown"
-                        else:
-                            resource_order_type = "unknown"
-
-                    # Skip if order_type filter doesn't match
-                    if order_type and resource_order_type != order_type:
-                        continue
+        if patient_id:
+            search_params["patient"] = f"Patient/{patient_id}"
 
-                    # Extract requester ID
-                    requester = resource.get("requester", {})
-                    requester_ref = requester.get("reference", "")
-                    ordering_provider_id = requester_ref.split("/")[-1] if "/" in requester_ref else "unknown"
-
-                    # Extract patient ID
-                    subject = resource.get("subject", {})
-                    subject_ref = subject.get("reference", "")
-                    resource_patient_id = subject_ref.split("/")[-1] if "/" in subject_ref else "unknown"
-
-                    # Extract encounter ID
-                    encounter = resource.get("encounter", {})
-                    encounter_ref = encounter.get("reference", "")
-                    resource_encounter_id = encounter_ref.split("/")[-1] if "/" in encounter_ref else None
-
-                    # Extract indication
-                    reason_codes = resource.get("reasonCode", [])
-                    resource_indication = reason_codes[0].get("text") if reason_codes else None
-
-                    # Extract clinical information from extensions
-                    extensions = resource.get("extension", [])
-                    clinical_info = None
-                    for ext in extensions:
-                        if ext.get("url") == f"{ExtensionURLs.BASE_URL}/clinical-information":
-                            clinical_info = ext.get("valueString")
-                            break
+        if encounter_id:
+            search_params["encounter"] = f"Encounter/{encounter_id}"
 
-                    order_response = OrderResponse(
-                        id=resource.get("id"),
-                        patient_id=resource_patient_id,
-                        encounter_id=resource_encounter_id,
-                        ordering_provider_id=ordering_provider_id,
-                        order_type=resource_order_type,
-                        order_date=resource.get("authoredOn"),
-                        priority=resource.get("priority", "routine"),
-                        status=resource.get("status"),
-                        indication=resource_indication,
-                        clinical_information=clinical_info,
-                        created_at=resource.get("meta", {}).get("lastUpdated"),
-                        updated_at=resource.get("meta", {}).get("lastUpdated")
-                    )
+        if status:
+            search_params["status"] = status
 
-                    all_orders.append(order_response)
+        if priority:
+            search_params["priority"] = priority
 
-            # Apply skip/limit to combined results
-            return all_orders[skip:skip+limit]
+        fingerprint = filters_fingerprint({**search_params, "order_type": order_type})
+        positions = {}
+        if cursor:
+            try:
+                positions = decode_cursor(cursor, fingerprint)
+            except InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+        def accepts(resource_type: str):
+            # ServiceRequest serves both laboratory and imaging; the
+            # category decides, so the filter runs on what comes back
+            if not order_type:
+                return None
+            return lambda resource: _resource_order_type(resource, resource_type) == order_type
+
+        # HAPI's sort parameter is per-type: MedicationRequest uses
+        # 'authoredon', ServiceRequest uses 'authored' (OrderStream sets
+        # it). One shared '-authored' 400'd every MedicationRequest search
+        # (and with it this whole endpoint) since inception — B13.
+        streams = [
+            OrderStream(
+                self.hapi, resource_type, search_params,
+                page_size=skip + limit,
+                position=positions.get(resource_type),
+                accept=accepts(resource_type)
+            )
+            for resource_type in resource_types
+        ]
 
+        try:
+            merged = await merge_streams(streams, limit, skip=skip)
+            orders = [_order_response(resource, stream.resource_type) for stream, resource in merged]
         except Exception as e:
             logger.error(f"Error querying orders: {e}", exc_info=True)
             raise HTTPException(
@@ -695,6 +721,14 @@ async def get_orders(self, *, patient_id: Optional[str] = None, encounter_id: Op
                 detail=f"Failed to query orders: {str(e)}"
             )
 
+        next_cursor = None
+        if len(orders) == limit and any(stream.has_more for stream in streams):
+            next_cursor = encode_cursor(
+                {stream.key: stream.position for stream in streams},
+                fingerprint
+            )
+        return OrderPage(orders=orders, next_cursor=next_cursor)
+
     async def get_active_orders(self, *, patient_id: Optional[str] = None, order_type: Optional[str] = None, current_user: User):
         """Get active orders (status=active) (moved verbatim from the router)."""
         return await self.get_orders(
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+DICOM Viewer Caches
+Dragging the window/level slider or scrolling a stack re-requests the same
+instances over and over. Three layers keep those requests off the PACS:
+
+- instance cache: raw instance bytes on local disk, keyed by study/series/
+  SOP Instance UID; LRU bounded by the directory's total size, shared by
+  workers, survives restarts
+- pixel cache: decoded pixel arrays (LUT indexes) in memory, bounded by nbytes
+- rendered cache: finished PNG/WebP/JPEG bytes keyed by (instance, frame or
+  window, format)
+
+The small metadata cache holds each series' instance list (one WADO-RS
+series metadata request) for the viewer and the read-ahead in
+api/dicom/prefetch.py.
+
+A stored DICOM instance never changes (a corrected object gets a new SOP
+Instance UID), so entries are only ever evicted, never invalidated. The two
+in-memory layers are FHIRResourceCache instances (byte-bounded LRU with
+hit/miss counters); the TTL only bounds how long an idle entry holds memory.
+A series can still gain instances while it is being stored, so series
+metadata gets a short TTL.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.fhir_resource_cache import FHIRResourceCache
+
+logger = logging.getLogger(__name__)
+
+DICOM_CACHE_DIR = os.getenv("DICOM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "wintehr_dicom_cache"))
+DICOM_INSTANCE_CACHE_MAX_BYTES = int(os.getenv("DICOM_INSTANCE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+DICOM_PIXEL_CACHE_MAX_BYTES = int(os.getenv("DICOM_PIXEL_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+DICOM_RENDERED_CACHE_MAX_BYTES = int(os.getenv("DICOM_RENDERED_CACHE_MAX_BYTES", str(128 * 1024 ** 2)))
+DICOM_MEMORY_CACHE_TTL = float(os.getenv("DICOM_MEMORY_CACHE_TTL", "3600"))
+DICOM_METADATA_CACHE_TTL = float(os.getenv("DICOM_METADATA_CACHE_TTL", "300"))
+
+InstanceKey = Tuple[str, str, str]  # (study UID, series UID, SOP Instance UID)
+
+
+class InstanceDiskCache:
+    """Size-bounded on-disk LRU of raw DICOM instance bytes.
+
+    One file per instance, named by a hash of its UIDs; recency is the
+    file's mtime (stamped from a nanosecond clock on every write and hit),
+    so the LRU order survives a restart. Blocking file I/O — call through
+    ``asyncio.to_thread``.
+
+    Several workers share the directory, so the byte budget is enforced on
+    the directory itself: every write rescans it and evicts the oldest
+    files, whichever worker wrote them, until the total fits. Two workers
+    evicting at once can only undershoot the budget, and a file evicted by
+    one worker is simply a miss for the others.
+    """
+
+    def __init__(self, directory: str = DICOM_CACHE_DIR, max_bytes: int = DICOM_INSTANCE_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._ready = False
+        self._last_stamp = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _filename(self, key: InstanceKey) -> str:
+        return hashlib.sha256("/".join(key).encode("utf-8")).hexdigest() + ".dcm"
+
+    def _touch(self, path: Path) -> None:
+        # File timestamps come from a coarse clock; stamp them explicitly so
+        # two uses within one tick still order correctly
+        with self._lock:
+            stamp = self._last_stamp = max(time.time_ns(), self._last_stamp + 1)
+        try:
+            os.utime(path, ns=(stamp, stamp))
+        except OSError:
+            pass
+
+    def _scan(self) -> List[Tuple[int, str, int]]:
+        """(mtime ns, filename, size) of every cached file, oldest first."""
+        files = []
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            if not entry.name.endswith(".dcm"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        files.sort()
+        return files
+
+    def _enforce_budget(self) -> None:
+        """Evict the directory's oldest files until it fits in max_bytes."""
+        files = self._scan()
+        total = sum(size for _, _, size in files)
+        for _, name, size in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                continue  # another worker evicted it first
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def _ensure_ready(self) -> None:
+        if not self._ready:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # A restart may come back with a smaller budget
+            self._enforce_budget()
+            self._ready = True
+
+    def get(self, key: InstanceKey) -> Optional[bytes]:
+        self._ensure_ready()
+        path = self.directory / self._filename(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._touch(path)
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def contains(self, key: InstanceKey) -> bool:
+        """Whether the instance is on disk (no hit/miss accounting)."""
+        self._ensure_ready()
+        return (self.directory / self._filename(key)).exists()
+
+    def put(self, key: InstanceKey, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        self._ensure_ready()
+        name = self._filename(key)
+        tmp = self.directory / f"{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, self.directory / name)
+        except OSError as e:
+            # Best effort: a full or read-only disk only costs a refetch
+            logger.warning(f"DICOM instance cache write failed: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+        self._touch(self.directory / name)
+        with self._lock:
+            self.writes += 1
+        self._enforce_budget()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters of this worker; entries and bytes are the shared directory's."""
+        files = self._scan()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": str(self.directory),
+                "entries": len(files),
+                "bytes": sum(size for _, _, size in files),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+_instance_cache: Optional[InstanceDiskCache] = None
+_pixel_cache: Optional[FHIRResourceCache] = None
+_rendered_cache: Optional[FHIRResourceCache] = None
+_metadata_cache: Optional[FHIRResourceCache] = None
+
+
+def get_instance_cache() -> InstanceDiskCache:
+    """Get or create the process-wide on-disk instance cache."""
+    global _instance_cache
+    if _instance_cache is None:
+        _instance_cache = InstanceDiskCache()
+    return _instance_cache
+
+
+def get_pixel_cache() -> FHIRResourceCache:
+    """Get or create the decoded pixel-array cache (keyed by InstanceKey)."""
+    global _pixel_cache
+    if _pixel_cache is None:
+        _pixel_cache = FHIRResourceCache(
+            max_entries=100_000,
+            max_bytes=DICOM_PIXEL_CACHE_MAX_BYTES,
+            default_ttl=DICOM_MEMORY_CACHE_TTL,
+        )
+    return _pixel_cache
+
+
+def get_rendered_cache() -> FHIRResourceCache:
+    """Get or create the rendered PNG/WebP/JPEG cache."""
+    global _rendered_cache
+    if _rendered_cache is None:
+        _rendered_cache = FHIRResourceCache(
+            max_entries=100_000,
+            max_bytes=DICOM_RENDERED_CACHE_MAX_BYTES,
+            default_ttl=DICOM_MEMORY_CACHE_TTL,
+        )
+    return _rendered_cache
+
+
+def get_metadata_cache() -> FHIRResourceCache:
+    """Get or create the series instance-list cache (keyed by (study, series))."""
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = FHIRResourceCache(
+            max_entries=10_000,
+            max_bytes=64 * 1024 ** 2,
+            default_ttl=DICOM_METADATA_CACHE_TTL,
+        )
+    return _metadata_cache
+
+
+def get_dicom_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters of all layers."""
+    return {
+        "instances": get_instance_cache().get_stats(),
+        "pixels": get_pixel_cache().get_stats(),
+        "rendered": get_rendered_cache().get_stats(),
+        "metadata": get_metadata_cache().get_stats(),
+    }
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+DICOM Series Read-Ahead
+Scrolling a series requests one slice at a time; without read-ahead every
+new slice is a cold WADO-RS round trip. A viewer that sends a ``session``
+id with its image requests gets a background task per session that pulls
+the rest of the series into the on-disk instance cache while the user is
+still looking at the current slice.
+
+Two modes (``DICOM_PREFETCH_MODE``):
+
+- ``neighbors``: the ``DICOM_PREFETCH_NEIGHBORS`` instances on either side
+  of the slice being viewed (in InstanceNumber order, nearest first,
+  re-centred as the user scrolls), fetched one instance at a time
+- ``series``: the whole series in one streamed WADO-RS series retrieve
+
+``off`` disables read-ahead. Downloads across all sessions share
+``DICOM_PREFETCH_CONCURRENCY`` slots, so read-ahead never crowds out the
+PACS. A session's task is cancelled when it requests a slice of another
+series (the user left the series), when the viewer calls
+``DELETE /api/dicom/prefetch/{session}``, or after
+``DICOM_PREFETCH_IDLE_SECONDS`` without a request. Cancelling never
+leaves a partial instance behind: single-instance downloads are shared
+with the foreground (see ``DICOMService.fetch_wado_instance``) and run to
+completion, and series parts are only cached once complete.
+
+Sessions live in the worker process that saw the request. Under several
+uvicorn workers a viewer's image requests spread across workers, and each
+worker runs its own read-ahead for the session. Neighbors mode skips
+instances another worker already put in the shared instance cache, so
+the duplication is limited to downloads in flight at the same moment.
+Series mode may pull the same series once per worker. The ``DELETE``
+reaches only one worker, so the others stop at the next series change or
+after ``DICOM_PREFETCH_IDLE_SECONDS``. This is accepted: read-ahead is
+bounded by the shared slots and the idle timeout, and coordinating
+sessions across workers would cost more than the duplicate downloads.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+from urllib.parse import urljoin
+
+import pydicom
+from fastapi import HTTPException
+
+from api.dicom.cache import get_instance_cache
+from api.dicom.service import DICOMService, _get_wado_url, iter_multipart_related, open_wado_stream
+
+logger = logging.getLogger(__name__)
+
+DICOM_PREFETCH_MODE = os.getenv("DICOM_PREFETCH_MODE", "neighbors").lower()
+DICOM_PREFETCH_NEIGHBORS = int(os.getenv("DICOM_PREFETCH_NEIGHBORS", "16"))
+DICOM_PREFETCH_CONCURRENCY = int(os.getenv("DICOM_PREFETCH_CONCURRENCY", "4"))
+DICOM_PREFETCH_IDLE_SECONDS = float(os.getenv("DICOM_PREFETCH_IDLE_SECONDS", "120"))
+DICOM_PREFETCH_MAX_SESSIONS = int(os.getenv("DICOM_PREFETCH_MAX_SESSIONS", "100"))
+
+PREFETCH_MODES = ("neighbors", "series", "off")
+
+
+def _sop_instance_uid(dicom_data: bytes) -> Optional[str]:
+    ds = pydicom.dcmread(
+        io.BytesIO(dicom_data), force=True, stop_before_pixels=True, specific_tags=["SOPInstanceUID"]
+    )
+    return str(ds.SOPInstanceUID) if "SOPInstanceUID" in ds else None
+
+
+class _Session:
+    """One viewer's read-ahead state for the series it is looking at."""
+
+    def __init__(self, study_uid: str, series_uid: str, sop_instance_uid: str):
+        self.study_uid = study_uid
+        self.series_uid = series_uid
+        self.center = sop_instance_uid
+        self.attempted: Set[str] = {sop_instance_uid}  # the viewer fetches this one itself
+        self.moved = asyncio.Event()
+        self.last_seen = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+
+
+class SeriesPrefetcher:
+    """Per-session background read-ahead into the instance cache."""
+
+    def __init__(
+        self,
+        mode: str = DICOM_PREFETCH_MODE,
+        neighbors: int = DICOM_PREFETCH_NEIGHBORS,
+        concurrency: int = DICOM_PREFETCH_CONCURRENCY,
+        idle_seconds: float = DICOM_PREFETCH_IDLE_SECONDS,
+        max_sessions: int = DICOM_PREFETCH_MAX_SESSIONS,
+    ):
+        if mode not in PREFETCH_MODES:
+            logger.warning(f"Unknown DICOM_PREFETCH_MODE {mode!r}; read-ahead disabled")
+            mode = "off"
+        self.mode = mode
+        self.neighbors = max(0, neighbors)
+        self.concurrency = max(1, concurrency)
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.started = 0
+        self.cancelled = 0
+        self.fetched = 0
+        self.already_cached = 0
+        self.failed = 0
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    def touch(self, session_id: str, study_uid: str, series_uid: str, sop_instance_uid: str) -> None:
+        """Record that a session is viewing an instance; start or re-centre its read-ahead."""
+        if self.mode == "off":
+            return
+        session = self._sessions.get(session_id)
+        if session is not None and (session.study_uid, session.series_uid) == (study_uid, series_uid):
+            session.center = sop_instance_uid
+            session.attempted.add(sop_instance_uid)
+            session.last_seen = time.monotonic()
+            session.moved.set()
+            self._sessions.move_to_end(session_id)
+            if session.task is not None and not session.task.done():
+                return
+        else:
+            if session is not None:
+                # The user left the series: stop fetching the old one
+                self._cancel(session)
+            session = _Session(study_uid, series_uid, sop_instance_uid)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                _, oldest = self._sessions.popitem(last=False)
+                self._cancel(oldest)
+
+        # A series-mode task that finished already pulled the whole series
+        if self.mode == "series" and session.task is not None:
+            return
+        session.task = asyncio.create_task(self._run(session))
+        self.started += 1
+
+    def leave(self, session_id: str) -> bool:
+        """Cancel a session's read-ahead (viewer closed); False if there was none."""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._cancel(session)
+        return True
+
+    def _cancel(self, session: _Session) -> None:
+        if session.task is not None and not session.task.done():
+            session.task.cancel()
+            self.cancelled += 1
+
+    async def close(self) -> None:
+        tasks = [s.task for s in self._sessions.values() if s.task is not None and not s.task.done()]
+        for task in tasks:
+            task.cancel()
+        self._sessions.clear()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, session: _Session) -> None:
+        try:
+            if self.mode == "series":
+                await self._prefetch_series(session)
+            else:
+                await self._prefetch_neighbors(session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Read-ahead is an optimization; the viewer still fetches on demand
+            logger.warning(f"Read-ahead for series {session.series_uid} stopped: {e}")
+
+    def _idle_for(self, session: _Session) -> float:
+        return time.monotonic() - session.last_seen
+
+    async def _prefetch_neighbors(self, session: _Session) -> None:
+        instances = await DICOMService.get_series_instances(session.study_uid, session.series_uid)
+        order = [instance["sopInstanceUID"] for instance in instances]
+        position = {sop: index for index, sop in enumerate(order)}
+
+        def next_wanted() -> Optional[str]:
+            center = position.get(session.center)
+            if center is None:
+                return None
+            # Ahead of the current slice first: that is where scrolling goes
+            for distance in range(1, self.neighbors + 1):
+                for index in (center + distance, center - distance):
+                    if 0 <= index < len(order) and order[index] not in session.attempted:
+                        return order[index]
+            return None
+
+        async def worker() -> None:
+            while True:
+                sop_instance_uid = next_wanted()
+                if sop_instance_uid is None:
+                    remaining = self.idle_seconds - self._idle_for(session)
+                    if remaining <= 0:
+                        return
+                    # Window fully fetched: wait for the user to scroll on
+                    session.moved.clear()
+                    try:
+                        await asyncio.wait_for(session.moved.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        return
+                    continue
+                session.attempted.add(sop_instance_uid)
+                await self._prefetch_instance(session, sop_instance_uid)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    async def _prefetch_instance(self, session: _Session, sop_instance_uid: str) -> None:
+        key = (session.study_uid, session.series_uid, sop_instance_uid)
+        if await asyncio.to_thread(get_instance_cache().contains, key):
+            self.already_cached += 1
+            return
+        async with self._get_slots():
+            try:
+                await DICOMService.fetch_wado_instance(*key)
+                self.fetched += 1
+            except HTTPException as e:
+                self.failed += 1
+                logger.info(f"Read-ahead of instance {sop_instance_uid} failed: {e.detail}")
+
+    async def _prefetch_series(self, session: _Session) -> None:
+        cache = get_instance_cache()
+        url = urljoin(_get_wado_url(), f"studies/{session.study_uid}/series/{session.series_uid}")
+        async with self._get_slots():
+            upstream = await open_wado_stream(url, timeout=120)
+            try:
+                chunks = []
+                async for kind, value in iter_multipart_related(upstream):
+                    if kind == "headers":
+                        chunks = []
+                    elif kind == "data":
+                        chunks.append(value)
+                    else:
+                        data = b"".join(chunks)
+                        chunks = []
+                        sop_instance_uid = await asyncio.to_thread(_sop_instance_uid, data)
+                        if sop_instance_uid:
+                            key = (session.study_uid, session.series_uid, sop_instance_uid)
+                            await asyncio.to_thread(cache.put, key, data)
+                            self.fetched += 1
+            finally:
+                await upstream.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "neighbors": self.neighbors,
+            "concurrency": self.concurrency,
+            "sessions": len(self._sessions),
+            "active": sum(1 for s in self._sessions.values() if s.task is not None and not s.task.done()),
+            "started": self.started,
+            "cancelled": self.cancelled,
+            "fetched": self.fetched,
+            "already_cached": self.already_cached,
+            "failed": self.failed,
+        }
+
+
+_series_prefetcher: Optional[SeriesPrefetcher] = None
+
+
+def get_series_prefetcher() -> SeriesPrefetcher:
+    """Get or create the process-wide read-ahead scheduler."""
+    global _series_prefetcher
+    if _series_prefetcher is None:
+        _series_prefetcher = SeriesPrefetcher()
+    return _series_prefetcher
+
+
+async def close_series_prefetcher() -> None:
+    """Cancel all read-ahead tasks (application shutdown)."""
+    global _series_prefetcher
+    if _series_prefetcher is not None:
+        await _series_prefetcher.close()
+        _series_prefetcher = None
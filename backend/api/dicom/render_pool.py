@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+DICOM Render Pool
+Parsing an instance, decompressing its pixel data, windowing and encoding
+the result are CPU-bound; run inline in an async handler, one large CT slice
+stalls the event loop for every other request. The image endpoint hands
+that work to this pool instead.
+
+It is a thread pool rather than a process pool: pixel decoders, numpy's
+LUT lookup and the zlib/libwebp encoders release the GIL for the heavy
+parts, and the decoded arrays stay in the shared pixel cache instead of
+being pickled across a process boundary on every request.
+
+The pool is bounded twice: ``DICOM_RENDER_WORKERS`` threads, and at most
+``DICOM_RENDER_QUEUE_DEPTH`` jobs waiting behind them. Past that, ``run``
+raises ``RenderPoolBusy`` immediately (the endpoint answers 503 with
+Retry-After) instead of letting a fast scroll through a 500-slice stack
+queue up seconds of work nobody will look at.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+DICOM_RENDER_WORKERS = int(os.getenv("DICOM_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+DICOM_RENDER_QUEUE_DEPTH = int(os.getenv("DICOM_RENDER_QUEUE_DEPTH", "32"))
+
+T = TypeVar("T")
+
+
+class RenderPoolBusy(Exception):
+    """All workers are busy and the wait queue is full."""
+
+
+class RenderPool:
+    """Bounded executor for decode/window/encode jobs.
+
+    ``pending`` is only touched on the event loop, so it needs no lock: it
+    counts jobs submitted and not yet finished (running plus queued). A
+    job's slot is released when the job itself finishes, not when its
+    caller stops waiting: a request cancelled mid-render (the viewer
+    scrolled on and dropped the connection) can't stop the worker thread,
+    so the job still occupies it.
+    """
+
+    def __init__(self, workers: int = DICOM_RENDER_WORKERS, queue_depth: int = DICOM_RENDER_QUEUE_DEPTH):
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="dicom-render"
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` on a worker thread, or raise RenderPoolBusy."""
+        if self.pending >= self.workers + self.queue_depth:
+            self.rejected += 1
+            raise RenderPoolBusy(
+                f"{self.pending} render jobs pending (workers={self.workers}, queue_depth={self.queue_depth})"
+            )
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(fn, *args)
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+
+        def release(done) -> None:
+            try:
+                loop.call_soon_threadsafe(self._finished, done)
+            except RuntimeError:
+                pass  # loop already closed (shutdown)
+
+        future.add_done_callback(release)
+        # Cancelling the wait only cancels a job that hasn't started yet
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, future) -> None:
+        self.pending -= 1
+        if not future.cancelled() and future.exception() is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_render_pool: Optional[RenderPool] = None
+
+
+def get_render_pool() -> RenderPool:
+    """Get or create the process-wide render pool."""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = RenderPool()
+    return _render_pool
+
+
+def close_render_pool() -> None:
+    """Stop the worker threads (application shutdown)."""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown()
+        _render_pool = None
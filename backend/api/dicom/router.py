@@ -6,24 +6,30 @@
 api/dicom/service.py.
 """
 
-import io
 import logging
 import zipfile
 from email.message import Message
-from typing import Optional
+from typing import AsyncIterator, List, Optional
 from urllib.parse import urljoin
 
 import httpx
-import pydicom
 from fastapi import APIRouter, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
+from api.dicom.cache import get_dicom_cache_stats, get_rendered_cache
+from api.dicom.prefetch import get_series_prefetcher
+from api.dicom.render_pool import RenderPoolBusy, get_render_pool
 from api.dicom.service import (
+    DICOM_STREAM_CHUNK_BYTES,
+    IMAGE_ENCODINGS,
     DICOMService,
     _get_wado_url,
     _is_dicom_server_configured,
     get_dicom_http_client,
-    parse_multipart_related,
+    iter_multipart_related,
+    open_wado_stream,
+    render_instance,
     validate_uid,
 )
 
@@ -136,27 +142,11 @@ async def get_study_metadata(
         instances = []
 
         for instance in study_data:
-            series_uid_value = DICOMService._get_dicom_json_value(instance, "0020000E", "SeriesInstanceUID", "")
+            metadata = DICOMService.instance_summary(study_uid, instance)
 
             # Skip if filtering by series UID and this isn't it
-            if series_uid and series_uid_value != series_uid:
+            if series_uid and metadata["seriesInstanceUID"] != series_uid:
                 continue
-            try:
-                number_of_frames = int(
-                    DICOMService._get_dicom_json_value(instance, "00280008", "NumberOfFrames", 1) or 1
-                )
-            except (TypeError, ValueError):
-                number_of_frames = 1
-            metadata = {
-                "studyInstanceUID": study_uid,
-                "seriesInstanceUID": series_uid_value,
-                "sopInstanceUID": DICOMService._get_dicom_json_value(instance, "00080018", "SOPInstanceUID", ""),
-                "instanceNumber": DICOMService._get_dicom_json_value(instance, "00200013", "InstanceNumber", "1"),
-                "modality": DICOMService._get_dicom_json_value(instance, "00080060", "Modality", ""),
-                # Number of frames in this instance (e.g. ultrasound/echo cine
-                # loops have many); 1 for single-frame. Drives frame playback.
-                "numberOfFrames": number_of_frames,
-            }
             instances.append(metadata)
 
         logger.info(f"Found {len(instances)} instances for study {study_uid}")
@@ -180,12 +170,25 @@ async def get_instance_image(
     sop_instance_uid: str,
     window_center: int = Query(128, description="Window center for display"),
     window_width: int = Query(256, description="Window width for display"),
-    frame: int = Query(1, ge=1, description="1-based frame number for multi-frame instances")
+    frame: int = Query(1, ge=1, description="1-based frame number for multi-frame instances"),
+    image_format: str = Query(
+        "png",
+        alias="format",
+        pattern="^(" + "|".join(IMAGE_ENCODINGS) + ")$",
+        description="Encoding of locally windowed images: png, png-fast, or webp (lossy, for scrolling)",
+    ),
+    session: Optional[str] = Query(
+        None, max_length=128, description="Viewer session id; enables read-ahead of the rest of the series"
+    ),
 ):
     """
     Get image data for a specific DICOM instance via WADO.
-    Returns PNG image with applied windowing (grayscale single-frame), or a
-    PACS-rendered JPEG of the requested frame (color / multi-frame, e.g. echo).
+    Returns the windowed image in the requested format (grayscale
+    single-frame), or a PACS-rendered JPEG of the requested frame (color /
+    multi-frame, e.g. echo). Decoding and rendering run on the render pool;
+    when its queue is full the request gets 503 with Retry-After. With a
+    ``session`` id, neighbouring instances are fetched in the background
+    (see api/dicom/prefetch.py).
     """
     try:
         study_uid = validate_uid(study_uid, "study")
@@ -198,32 +201,37 @@ async def get_instance_image(
                 detail="DICOM server not configured"
             )
 
-        logger.info(f"Fetching instance {sop_instance_uid} via WADO")
+        if session:
+            get_series_prefetcher().touch(session, study_uid, series_uid, sop_instance_uid)
 
-        # Fetch DICOM instance from WADO
-        dicom_data = await DICOMService.fetch_wado_instance(
-            study_uid, series_uid, sop_instance_uid
-        )
+        # A window/level drag re-requests the same instance with a new
+        # window; each distinct (instance, window, format) image is rendered once.
+        media_type = IMAGE_ENCODINGS[image_format][2]
+        image_key = (image_format, study_uid, series_uid, sop_instance_uid, window_center, window_width)
+        rendered_cache = get_rendered_cache()
+        cached_image = rendered_cache.get(image_key)
+        if cached_image is not None:
+            return Response(content=cached_image, media_type=media_type)
 
-        # Parse DICOM data
-        ds = pydicom.dcmread(io.BytesIO(dicom_data), force=True)
-
-        samples = int(getattr(ds, "SamplesPerPixel", 1) or 1)
-        frames = int(getattr(ds, "NumberOfFrames", 1) or 1)
+        # Instance bytes come from the on-disk cache, pixels from the
+        # decoded-pixel cache; only a cold instance goes to WADO.
+        decoded = await DICOMService.get_decoded_instance(study_uid, series_uid, sop_instance_uid)
 
         # Grayscale single-frame (e.g. CT): window/level locally so the viewer's
         # window_center/width controls stay interactive. Color or multi-frame
         # instances (e.g. ultrasound/echo cine loops) can't be windowed as
         # grayscale — defer to the PACS renderer below, which decodes JPEG/color
         # and returns an animated GIF for cine.
-        if samples == 1 and frames == 1 and hasattr(ds, "pixel_array"):
+        if decoded.pixels is not None:
             try:
-                pixel_array = ds.pixel_array
-                if hasattr(ds, 'RescaleSlope') and hasattr(ds, 'RescaleIntercept'):
-                    pixel_array = pixel_array * float(ds.RescaleSlope) + float(ds.RescaleIntercept)
-                image_data = DICOMService.convert_to_png(pixel_array, window_center, window_width)
+                image_data = await get_render_pool().run(
+                    render_instance, decoded, window_center, window_width, image_format
+                )
+                rendered_cache.set(image_key, image_data, size=len(image_data))
                 logger.info(f"Successfully retrieved image for instance {sop_instance_uid}")
-                return Response(content=image_data, media_type="image/png")
+                return Response(content=image_data, media_type=media_type)
+            except RenderPoolBusy:
+                raise
             except Exception as conv_err:
                 logger.info(
                     f"Local windowing unavailable for {sop_instance_uid} ({conv_err}); "
@@ -236,6 +244,13 @@ async def get_instance_image(
 
     except HTTPException:
         raise
+    except RenderPoolBusy as e:
+        logger.warning(f"Rejected image request for {sop_instance_uid}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Image rendering is busy, retry shortly",
+            headers={"Retry-After": "1"},
+        )
     except httpx.HTTPError as e:
         logger.error(f"Failed to fetch instance from DICOM server: {e}")
         raise HTTPException(status_code=503, detail=f"Failed to fetch instance from DICOM server: {e}")
@@ -269,19 +284,15 @@ async def download_series(study_uid: str, series_uid: str):
             f"studies/{study_uid}/series/{series_uid}"
         )
 
-        client = get_dicom_http_client()
-        response = await client.get(
-            wado_series_url,
-            headers={"Accept": "application/dicom"},
-            timeout=60
-        )
-        response.raise_for_status()
+        # Relayed chunk by chunk: the series is never held in memory
+        upstream = await open_wado_stream(wado_series_url, headers={"Accept": "application/dicom"})
 
-        logger.info(f"Successfully retrieved series {series_uid}")
+        logger.info(f"Streaming series {series_uid}")
         return StreamingResponse(
-            iter([response.content]),
+            _relay_body(upstream),
             media_type="application/dicom",
-            headers={"Content-Disposition": f"attachment; filename=series_{series_uid}.dcm"}
+            headers={"Content-Disposition": f"attachment; filename=series_{series_uid}.dcm"},
+            background=BackgroundTask(upstream.aclose),
         )
 
     except HTTPException:
@@ -294,6 +305,131 @@ async def download_series(study_uid: str, series_uid: str):
         raise HTTPException(status_code=500, detail=f"Failed to download series: {e}")
 
 
+@router.get("/studies/{study_uid}/series/{series_uid}/metadata")
+async def get_series_metadata(study_uid: str, series_uid: str):
+    """
+    Get the instances of one series, in InstanceNumber order, from a single
+    WADO-RS series metadata request (cached briefly).
+    """
+    try:
+        study_uid = validate_uid(study_uid, "study")
+        series_uid = validate_uid(series_uid, "series")
+
+        if not _is_dicom_server_configured():
+            raise HTTPException(
+                status_code=503,
+                detail="DICOM server not configured"
+            )
+
+        instances = await DICOMService.get_series_instances(study_uid, series_uid)
+        return {"instances": instances, "studyInstanceUID": study_uid, "seriesInstanceUID": series_uid}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get series metadata: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get series metadata: {e}")
+
+
+@router.delete("/prefetch/{session_id}")
+async def cancel_prefetch(session_id: str):
+    """Stop a viewer session's read-ahead (the viewer was closed).
+
+    Only reaches the worker that serves this request; other workers' read-ahead
+    for the session stops when it goes idle (see api/dicom/prefetch.py).
+    """
+    return {"cancelled": get_series_prefetcher().leave(session_id)}
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit rates and sizes of the caches, render pool load, and read-ahead counters."""
+    return {
+        **get_dicom_cache_stats(),
+        "render_pool": get_render_pool().get_stats(),
+        "prefetch": get_series_prefetcher().get_stats(),
+    }
+
+
+class _ZipChunkSink:
+    """Write-only file object collecting ZipFile output between drains.
+
+    It has no tell/seek, so ZipFile writes each entry in streaming form
+    (sizes and CRC in a trailing data descriptor) and never goes back.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _part_filename(headers, part_index: int) -> str:
+    filename = None
+    content_disposition = headers.get(b"Content-Disposition", b"").decode("utf-8", errors="ignore")
+    if content_disposition:
+        params = _content_disposition_params(content_disposition)
+        filename = params.get("filename") or params.get("name")
+    return filename or f"{part_index}.dcm"
+
+
+async def _relay_body(upstream: httpx.Response) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in upstream.aiter_bytes(DICOM_STREAM_CHUNK_BYTES):
+            yield chunk
+    finally:
+        await upstream.aclose()
+
+
+async def _stream_study_zip(upstream: httpx.Response, study_uid: str) -> AsyncIterator[bytes]:
+    """ZIP the parts of a WADO-RS study response as they arrive.
+
+    One archive entry per multipart part, compressed and yielded chunk by
+    chunk, so memory stays at a few chunks whatever the study size. A
+    non-multipart body becomes a single study_<uid>.dcm entry.
+    """
+    sink = _ZipChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+    try:
+        content_type = upstream.headers.get("content-type", "")
+        if content_type.lower().startswith("multipart/"):
+            entry = None
+            part_index = 1
+            async for kind, value in iter_multipart_related(upstream):
+                if kind == "headers":
+                    entry = archive.open(_part_filename(value, part_index), mode="w", force_zip64=True)
+                elif kind == "data":
+                    entry.write(value)
+                else:
+                    entry.close()
+                    part_index += 1
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        else:
+            with archive.open(f"study_{study_uid}.dcm", mode="w", force_zip64=True) as entry:
+                async for data in upstream.aiter_bytes(DICOM_STREAM_CHUNK_BYTES):
+                    entry.write(data)
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+        archive.close()
+        yield sink.drain()
+        logger.info(f"Streamed study {study_uid}")
+    finally:
+        await upstream.aclose()
+
+
 @router.get("/studies/{study_uid}/download")
 async def download_study(study_uid: str):
     """
@@ -318,45 +454,17 @@ async def download_study(study_uid: str):
             f"studies/{study_uid}"
         )
 
-        client = get_dicom_http_client()
-        response = await client.get(
-            wado_study_url,
-            timeout=60
-        )
-        response.raise_for_status()
-
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
-            multipart_parts = parse_multipart_related(
-                response.content, response.headers.get("content-type", "")
-            )
-            part_index = 1
-
-            # Need to check for files as well as parts
-            if multipart_parts:
-                for part in multipart_parts:
-                    filename = None
-                    content_disposition = part.headers.get(b"Content-Disposition", b"").decode("utf-8", errors="ignore")
-                    if content_disposition:
-                        params = _content_disposition_params(content_disposition)
-                        filename = params.get("filename") or params.get("name")
-
-                    if not filename:
-                        filename = f"{part_index}.dcm"
-
-                    archive.writestr(filename, part.content)
-                    part_index += 1
-            else:
-                archive.writestr(f"study_{study_uid}.dcm", response.content)
-
-        zip_buffer.seek(0)
-        response_content = zip_buffer.getvalue()
+        # Opened before the response starts so an upstream error still
+        # becomes a 503; the ZIP is then written while the body streams in.
+        upstream = await open_wado_stream(wado_study_url)
 
-        logger.info(f"Successfully retrieved study {study_uid}")
+        logger.info(f"Streaming study {study_uid}")
         return StreamingResponse(
-            iter([response_content]),
+            _stream_study_zip(upstream, study_uid),
             media_type="application/zip",
-            headers={"Content-Disposition": f"attachment; filename=study_{study_uid}.zip"}
+            headers={"Content-Disposition": f"attachment; filename=study_{study_uid}.zip"},
+            # Also closes the upstream when the client disconnects mid-download
+            background=BackgroundTask(upstream.aclose),
         )
 
     except HTTPException:
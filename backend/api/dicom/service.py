@@ -4,13 +4,19 @@
 Business logic for DICOM file access and metadata: QIDO-RS/WADO-RS client
 helpers, the shared async HTTP client, the multipart/related parser, and
 FHIR ImagingStudy mapping. HTTP endpoints live in api/dicom/router.py.
+Instance bytes, decoded pixels and rendered frames are cached by the layers
+in api/dicom/cache.py; decoding and rendering run on the bounded thread pool
+in api/dicom/render_pool.py.
 """
 
+import asyncio
 import io
 import logging
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from urllib.parse import unquote, urljoin
 
 import httpx
@@ -19,11 +25,14 @@
 from fastapi import HTTPException
 from PIL import Image
 
+from api.dicom.cache import get_instance_cache, get_metadata_cache, get_pixel_cache, get_rendered_cache
+from api.dicom.render_pool import get_render_pool
 from api.dicom.uid_utils import dicom_uid_from_fhir_identifier
 from services.dicom_mapping_service import (
     DICOMImagingStudyService,
     DICOMToImagingStudyMapper,
 )
+from services.hapi_fhir_client import SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +69,10 @@ def _as_base_url(url: str) -> str:
 # certificate.
 DICOM_TLS_VERIFY = os.getenv("DICOM_TLS_VERIFY", "false").lower() == "true"
 
+# Read size for streamed series/study bodies; with the multipart parser's
+# held-back tail this bounds per-download memory.
+DICOM_STREAM_CHUNK_BYTES = int(os.getenv("DICOM_STREAM_CHUNK_BYTES", str(256 * 1024)))
+
 # Module-global httpx.AsyncClient created lazily, reused across requests.
 _dicom_http_client: Optional[httpx.AsyncClient] = None
 
@@ -138,6 +151,30 @@ def __init__(self, content: bytes, headers: _PartHeaders):
         self.headers = headers
 
 
+def _multipart_boundary(content_type: str) -> str:
+    """Boundary parameter of a multipart Content-Type; ValueError if absent."""
+    segments = [segment.strip() for segment in content_type.split(";")]
+    if not segments or segments[0].split("/")[0].lower() != "multipart":
+        raise ValueError(f"Unexpected non-multipart content type: {content_type!r}")
+
+    for segment in segments[1:]:
+        attr, sep, value = segment.partition("=")
+        if sep and attr.strip().lower() == "boundary":
+            boundary = value.strip().strip('"')
+            if boundary:
+                return boundary
+    raise ValueError(f"No boundary parameter in content type: {content_type!r}")
+
+
+def _parse_part_headers(header_block: bytes) -> _PartHeaders:
+    header_items = []
+    for line in header_block.lstrip().split(b"\r\n"):
+        name, colon, value = line.partition(b":")
+        if colon:
+            header_items.append((name.strip(), value.strip()))
+    return _PartHeaders(header_items)
+
+
 def parse_multipart_related(body: bytes, content_type: str) -> List[MultipartPart]:
     """Parse an RFC 2387 multipart/related payload into its parts.
 
@@ -147,24 +184,13 @@ def parse_multipart_related(body: bytes, content_type: str) -> List[MultipartPar
     the boundary is read from the Content-Type header, the body is split on
     ``--boundary`` delimiters, and each part's payload bytes are exposed
     unmodified via ``.content`` — DICOM instance bytes must not be altered.
+    Needs the whole body in memory; series/study bodies go through
+    ``MultipartStreamParser`` instead.
 
     Raises ValueError for a non-multipart content type, a missing boundary,
     or a part without the RFC 2046 header/body separator.
     """
-    segments = [segment.strip() for segment in content_type.split(";")]
-    if not segments or segments[0].split("/")[0].lower() != "multipart":
-        raise ValueError(f"Unexpected non-multipart content type: {content_type!r}")
-
-    boundary = None
-    for segment in segments[1:]:
-        attr, sep, value = segment.partition("=")
-        if sep and attr.strip().lower() == "boundary":
-            boundary = value.strip().strip('"')
-            break
-    if not boundary:
-        raise ValueError(f"No boundary parameter in content type: {content_type!r}")
-
-    delimiter = b"--" + boundary.encode("utf-8")
+    delimiter = b"--" + _multipart_boundary(content_type).encode("utf-8")
     parts: List[MultipartPart] = []
     for fragment in body.split(b"\r\n" + delimiter):
         # Skip the preamble/epilogue fragments around the real parts. Tested
@@ -179,15 +205,106 @@ def parse_multipart_related(body: bytes, content_type: str) -> List[MultipartPar
         header_block, sep, content = fragment.partition(b"\r\n\r\n")
         if not sep:
             raise ValueError("Malformed multipart part: missing header/body separator")
-        header_items = []
-        for line in header_block.lstrip().split(b"\r\n"):
-            name, colon, value = line.partition(b":")
-            if colon:
-                header_items.append((name.strip(), value.strip()))
-        parts.append(MultipartPart(content, _PartHeaders(header_items)))
+        parts.append(MultipartPart(content, _parse_part_headers(header_block)))
     return parts
 
 
+class MultipartStreamParser:
+    """Incremental multipart/related parser for streamed WADO-RS bodies.
+
+    ``feed`` takes bytes as they arrive and returns the events they
+    complete, in order:
+
+    - ``("headers", headers)`` when a part's header block is complete
+    - ``("data", bytes)`` for each piece of the part's payload
+    - ``("end", None)`` at the part's closing delimiter
+
+    Memory is bounded by the chunk size plus one header block, however
+    large the parts are. Payload bytes pass through unmodified, split at
+    arbitrary points. The preamble and epilogue are ignored. ``close``
+    raises ValueError if the body stopped inside a part.
+    """
+
+    MAX_HEADER_BYTES = 64 * 1024
+
+    def __init__(self, content_type: str):
+        self._delimiter = b"\r\n--" + _multipart_boundary(content_type).encode("utf-8")
+        # The opening delimiter may start the body without a leading CRLF
+        self._buffer = bytearray(b"\r\n")
+        self._state = "preamble"
+
+    def feed(self, data: bytes) -> List[Tuple[str, Any]]:
+        buffer = self._buffer
+        buffer += data
+        events: List[Tuple[str, Any]] = []
+        while True:
+            if self._state in ("preamble", "body"):
+                index = buffer.find(self._delimiter)
+                if index < 0:
+                    # Hold back a tail that could be the start of a delimiter
+                    flush = len(buffer) - (len(self._delimiter) - 1)
+                    if flush > 0:
+                        if self._state == "body":
+                            events.append(("data", bytes(buffer[:flush])))
+                        del buffer[:flush]
+                    break
+                if self._state == "body":
+                    if index:
+                        events.append(("data", bytes(buffer[:index])))
+                    events.append(("end", None))
+                del buffer[:index + len(self._delimiter)]
+                self._state = "delimiter"
+            elif self._state == "delimiter":
+                if len(buffer) < 2:
+                    break
+                self._state = "epilogue" if buffer.startswith(b"--") else "headers"
+            elif self._state == "headers":
+                # Buffer holds the rest of the delimiter line (CRLF, maybe
+                # transport padding) followed by the header block.
+                index = buffer.find(b"\r\n\r\n")
+                if index < 0:
+                    if len(buffer) > self.MAX_HEADER_BYTES:
+                        raise ValueError("Malformed multipart part: missing header/body separator")
+                    break
+                events.append(("headers", _parse_part_headers(bytes(buffer[:index]))))
+                del buffer[:index + 4]
+                self._state = "body"
+            else:  # epilogue
+                buffer.clear()
+                break
+        return events
+
+    def close(self) -> None:
+        if self._state not in ("preamble", "epilogue"):
+            raise ValueError("Multipart body ended inside a part")
+
+
+async def iter_multipart_related(response: httpx.Response) -> AsyncIterator[Tuple[str, Any]]:
+    """Parse a streaming multipart/related response into parser events."""
+    parser = MultipartStreamParser(response.headers.get("content-type", ""))
+    async for chunk in response.aiter_bytes(DICOM_STREAM_CHUNK_BYTES):
+        for event in parser.feed(chunk):
+            yield event
+    parser.close()
+
+
+async def open_wado_stream(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 60) -> httpx.Response:
+    """Send a WADO-RS GET and return the response with its body unread.
+
+    Raises httpx.HTTPStatusError (after closing the response) on an error
+    status, so callers can still answer with a proper error before they
+    start streaming. The caller must ``aclose()`` the response.
+    """
+    client = get_dicom_http_client()
+    response = await client.send(client.build_request("GET", url, headers=headers, timeout=timeout), stream=True)
+    try:
+        response.raise_for_status()
+    except httpx.HTTPError:
+        await response.aclose()
+        raise
+    return response
+
+
 def validate_uid(uid: str, uid_type: str = "study") -> str:
     """
     Validate DICOM UID format.
@@ -224,6 +341,149 @@ def validate_uid(uid: str, uid_type: str = "study") -> str:
     return uid
 
 
+# Largest stored-value range windowed through a lookup table; wider integer
+# ranges (rare: 32-bit data) are rescaled per request like float data.
+DICOM_LUT_MAX_ENTRIES = int(os.getenv("DICOM_LUT_MAX_ENTRIES", str(1 << 20)))
+
+# format -> (PIL format, save options, media type). "png" is lossless at the
+# default zlib level; "png-fast" trades ~10% size for a 2-3x faster encode;
+# "webp" is a lossy preview, a fraction of the PNG size, for scrolling
+# through a stack over a slow link — not for reading.
+IMAGE_ENCODINGS: Dict[str, Tuple[str, Dict[str, Any], str]] = {
+    "png": ("PNG", {}, "image/png"),
+    "png-fast": ("PNG", {"compress_level": 1}, "image/png"),
+    "webp": ("WEBP", {"quality": 80, "method": 0}, "image/webp"),
+}
+
+
+@dataclass
+class DecodedInstance:
+    """What the image endpoint needs from a parsed instance.
+
+    ``pixels`` is None when the instance can't be windowed locally (color,
+    multi-frame, undecodable); the request then goes to the PACS renderer
+    without parsing the instance again. Otherwise it holds either
+
+    - integer data as LUT indexes: ``pixels + lut_offset`` is the stored
+      value, ``lut_size`` the number of distinct indexes; or
+    - rescaled float values (``lut_offset`` None) for float or very wide
+      integer data.
+    """
+    samples_per_pixel: int
+    number_of_frames: int
+    pixels: Optional[np.ndarray] = None
+    lut_offset: Optional[int] = None
+    lut_size: int = 0
+    slope: float = 1.0
+    intercept: float = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return 256 + (self.pixels.nbytes if self.pixels is not None else 0)
+
+
+def decode_instance(dicom_data: bytes, sop_instance_uid: str = "") -> DecodedInstance:
+    """Parse instance bytes and decode pixels when local windowing applies.
+
+    CPU-bound: the image endpoint runs it on the render pool.
+    """
+    ds = pydicom.dcmread(io.BytesIO(dicom_data), force=True)
+    decoded = DecodedInstance(
+        samples_per_pixel=int(getattr(ds, "SamplesPerPixel", 1) or 1),
+        number_of_frames=int(getattr(ds, "NumberOfFrames", 1) or 1),
+    )
+    # Color or multi-frame instances (e.g. ultrasound/echo cine loops) can't
+    # be windowed as grayscale; the PACS renderer handles those.
+    if decoded.samples_per_pixel == 1 and decoded.number_of_frames == 1:
+        try:
+            pixel_array = ds.pixel_array
+            if hasattr(ds, 'RescaleSlope') and hasattr(ds, 'RescaleIntercept'):
+                decoded.slope = float(ds.RescaleSlope)
+                decoded.intercept = float(ds.RescaleIntercept)
+            low, size = 0, 0
+            if pixel_array.dtype.kind in "iu" and pixel_array.size:
+                low = int(pixel_array.min())
+                size = int(pixel_array.max()) - low + 1
+            if 0 < size <= DICOM_LUT_MAX_ENTRIES:
+                index_dtype = np.uint8 if size <= 1 << 8 else np.uint16 if size <= 1 << 16 else np.uint32
+                # Subtracting in the (unsigned) index dtype wraps modulo its
+                # range, which is exact here because every result fits.
+                decoded.pixels = np.subtract(
+                    pixel_array, np.asarray(low, dtype=np.int64), dtype=index_dtype, casting="unsafe"
+                )
+                decoded.lut_offset = low
+                decoded.lut_size = size
+            else:
+                decoded.pixels = pixel_array * decoded.slope + decoded.intercept
+        except Exception as e:
+            logger.info(f"Pixel data of {sop_instance_uid} not decodable locally ({e})")
+    return decoded
+
+
+@lru_cache(maxsize=64)
+def _window_lut(
+    offset: int, size: int, slope: float, intercept: float, window_center: int, window_width: int
+) -> np.ndarray:
+    """uint8 display value for every stored value in [offset, offset + size).
+
+    Same arithmetic as ``DICOMService.convert_to_png`` applied to each
+    distinct stored value once, so the result is byte-identical. Slices of
+    one series usually share range and rescale, so a window/level drag
+    across a stack reuses the table. Read-only: shared between threads.
+    """
+    lower = window_center - window_width // 2
+    upper = window_center + window_width // 2
+    values = np.arange(offset, offset + size, dtype=np.float64) * slope + intercept
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lut = ((np.clip(values, lower, upper) - lower) / (upper - lower) * 255).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+def window_pixels(decoded: DecodedInstance, window_center: int, window_width: int) -> np.ndarray:
+    """Apply window center/width to decoded pixels, returning uint8 grayscale."""
+    if decoded.lut_offset is not None:
+        lut = _window_lut(
+            decoded.lut_offset, decoded.lut_size, decoded.slope, decoded.intercept,
+            window_center, window_width,
+        )
+        return lut.take(decoded.pixels)
+    lower = window_center - window_width // 2
+    upper = window_center + window_width // 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return ((np.clip(decoded.pixels, lower, upper) - lower) / (upper - lower) * 255).astype(np.uint8)
+
+
+def encode_image(image: np.ndarray, image_format: str = "png") -> bytes:
+    """Encode a uint8 grayscale array as one of IMAGE_ENCODINGS."""
+    pil_format, options, _ = IMAGE_ENCODINGS[image_format]
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_instance(
+    decoded: DecodedInstance, window_center: int, window_width: int, image_format: str = "png"
+) -> bytes:
+    """Window and encode a decoded instance (CPU-bound: run on the render pool)."""
+    return encode_image(window_pixels(decoded, window_center, window_width), image_format)
+
+
+# Concurrent requests for the same instance/frame share one WADO round trip
+# (and one decode)
+_instance_flights = SingleFlight()
+_decode_flights = SingleFlight()
+_rendered_flights = SingleFlight()
+_metadata_flights = SingleFlight()
+
+
+def _instance_order(summary: Dict[str, Any]) -> Tuple[int, int, str]:
+    try:
+        return (0, int(summary["instanceNumber"]), summary["sopInstanceUID"])
+    except (TypeError, ValueError):
+        return (1, 0, summary["sopInstanceUID"])
+
+
 class DICOMService:
     """Service for DICOM file operations with local filesystem and DICOM server (QIDO/WADO) support."""
 
@@ -341,6 +601,9 @@ async def fetch_wado_instance(
         """
         Fetch DICOM instance using WADO (Web Access to DICOM Objects).
 
+        Served from the on-disk instance cache when present; a miss is
+        downloaded once (concurrent callers share the download) and stored.
+
         Args:
             study_instance_uid: StudyInstanceUID
             series_instance_uid: SeriesInstanceUID
@@ -350,6 +613,28 @@ async def fetch_wado_instance(
         Returns:
             DICOM file bytes
         """
+        key = (study_instance_uid, series_instance_uid, sop_instance_uid)
+        cache = get_instance_cache()
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+
+        async def download() -> bytes:
+            content = await DICOMService._download_wado_instance(
+                study_instance_uid, series_instance_uid, sop_instance_uid, wado_url
+            )
+            await asyncio.to_thread(cache.put, key, content)
+            return content
+
+        return await _instance_flights.do(key, download)
+
+    @staticmethod
+    async def _download_wado_instance(
+        study_instance_uid: str,
+        series_instance_uid: str,
+        sop_instance_uid: str,
+        wado_url: Optional[str] = None
+    ) -> bytes:
         if wado_url is None:
             wado_url = _get_wado_url()
 
@@ -388,34 +673,60 @@ async def fetch_wado_instance(
             logger.error(f"Error fetching DICOM instance: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to fetch instance: {e}")
 
+    @staticmethod
+    async def get_decoded_instance(
+        study_instance_uid: str,
+        series_instance_uid: str,
+        sop_instance_uid: str
+    ) -> DecodedInstance:
+        """Parsed instance from the pixel cache, decoding on the render pool on a miss.
+
+        Raises RenderPoolBusy when the pool's queue is full.
+        """
+        key = (study_instance_uid, series_instance_uid, sop_instance_uid)
+        pixel_cache = get_pixel_cache()
+        decoded = pixel_cache.get(key)
+        if decoded is None:
+            async def decode() -> DecodedInstance:
+                dicom_data = await DICOMService.fetch_wado_instance(
+                    study_instance_uid, series_instance_uid, sop_instance_uid
+                )
+                result = await get_render_pool().run(decode_instance, dicom_data, sop_instance_uid)
+                pixel_cache.set(key, result, size=result.nbytes)
+                return result
+
+            decoded = await _decode_flights.do(key, decode)
+        return decoded
+
     @staticmethod
     async def fetch_wado_metadata(
         study_instance_uid: str,
         series_instance_uid: str,
-        sop_instance_uid: str,
+        sop_instance_uid: Optional[str] = None,
         wado_url: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> Any:
         """
         Fetch DICOM metadata using WADO-RS.
 
         Args:
             study_instance_uid: StudyInstanceUID
             series_instance_uid: SeriesInstanceUID
-            sop_instance_uid: SOPInstanceUID
+            sop_instance_uid: SOPInstanceUID; None fetches the metadata of
+                every instance in the series in one request
             wado_url: WADO-RS base URL (defaults to DICOM_WADO_URL)
 
         Returns:
-            DICOM metadata as dictionary
+            DICOM JSON metadata (a list with one object per instance)
         """
         if wado_url is None:
             wado_url = _get_wado_url()
 
         try:
             # Build WADO-RS URL for metadata
-            wado_metadata_url = urljoin(
-                wado_url,
-                f"studies/{study_instance_uid}/series/{series_instance_uid}/instances/{sop_instance_uid}/metadata"
-            )
+            resource = f"studies/{study_instance_uid}/series/{series_instance_uid}"
+            if sop_instance_uid is not None:
+                resource += f"/instances/{sop_instance_uid}"
+            wado_metadata_url = urljoin(wado_url, f"{resource}/metadata")
 
             logger.info(f"Fetching DICOM metadata via WADO-RS: {wado_metadata_url[:80]}...")
 
@@ -438,6 +749,49 @@ async def fetch_wado_metadata(
             logger.error(f"Error fetching metadata: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to fetch metadata: {e}")
 
+    @staticmethod
+    async def get_series_instances(study_instance_uid: str, series_instance_uid: str) -> List[Dict[str, Any]]:
+        """Instance summaries of a series in display (InstanceNumber) order.
+
+        Built from one series-level metadata request and kept in the
+        metadata cache, so the viewer and the read-ahead share it.
+        """
+        key = (study_instance_uid, series_instance_uid)
+        metadata_cache = get_metadata_cache()
+        instances = metadata_cache.get(key)
+        if instances is None:
+            async def fetch() -> List[Dict[str, Any]]:
+                metadata = await DICOMService.fetch_wado_metadata(study_instance_uid, series_instance_uid)
+                result = sorted(
+                    (DICOMService.instance_summary(study_instance_uid, item) for item in metadata or []),
+                    key=_instance_order,
+                )
+                metadata_cache.set(key, result, size=256 * (len(result) + 1))
+                return result
+
+            instances = await _metadata_flights.do(key, fetch)
+        return instances
+
+    @staticmethod
+    def instance_summary(study_instance_uid: str, instance: Dict[str, Any]) -> Dict[str, Any]:
+        """The viewer's per-instance fields from one DICOM JSON object."""
+        try:
+            number_of_frames = int(
+                DICOMService._get_dicom_json_value(instance, "00280008", "NumberOfFrames", 1) or 1
+            )
+        except (TypeError, ValueError):
+            number_of_frames = 1
+        return {
+            "studyInstanceUID": study_instance_uid,
+            "seriesInstanceUID": DICOMService._get_dicom_json_value(instance, "0020000E", "SeriesInstanceUID", ""),
+            "sopInstanceUID": DICOMService._get_dicom_json_value(instance, "00080018", "SOPInstanceUID", ""),
+            "instanceNumber": DICOMService._get_dicom_json_value(instance, "00200013", "InstanceNumber", "1"),
+            "modality": DICOMService._get_dicom_json_value(instance, "00080060", "Modality", ""),
+            # Number of frames in this instance (e.g. ultrasound/echo cine
+            # loops have many); 1 for single-frame. Drives frame playback.
+            "numberOfFrames": number_of_frames,
+        }
+
     @staticmethod
     def _get_dicom_json_value(
         dicom_json_obj: Dict[str, Any],
@@ -567,8 +921,32 @@ async def fetch_wado_rendered(
         (default frame 1) rather than the whole multi-frame object: the
         instance-level `rendered` returns the full cine as one large animated
         GIF (seconds, multi-MB), whereas a single frame is a fast ~50 KB JPEG.
+        Frames are cached in the rendered cache by (instance, frame).
         Returns {"content": bytes, "content_type": str}.
         """
+        key = ("wado-rendered", study_instance_uid, series_instance_uid, sop_instance_uid, frame)
+        rendered_cache = get_rendered_cache()
+        cached = rendered_cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def render() -> dict:
+            rendered = await DICOMService._download_wado_rendered(
+                study_instance_uid, series_instance_uid, sop_instance_uid, frame, qido_url
+            )
+            rendered_cache.set(key, rendered, size=len(rendered["content"]))
+            return rendered
+
+        return await _rendered_flights.do(key, render)
+
+    @staticmethod
+    async def _download_wado_rendered(
+        study_instance_uid: str,
+        series_instance_uid: str,
+        sop_instance_uid: str,
+        frame: int = 1,
+        qido_url: Optional[str] = None,
+    ) -> dict:
         if qido_url is None:
             qido_url = _get_qido_url()
         rendered_url = urljoin(
@@ -11,6 +11,7 @@
 
 from fastapi import APIRouter, Request, Response
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import asyncio
 import httpx
 import logging
@@ -19,6 +20,8 @@
 from typing import Optional, List, Dict, Any
 
 from api.websocket.fhir_notifications import notification_service
+from services.fhir_resource_cache import get_resource_cache
+from services.hapi_fhir_client import get_shared_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +39,21 @@ def _extract_patient_id(resource: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+def _broadcast_segments(path: str) -> Optional[List[str]]:
+    """Path segments for a plain `{Type}` / `{Type}/{id}` path, else None.
+
+    Only these paths broadcast on write — searches, operations ($...),
+    history and Bundle posts don't.
+    """
+    segments = [s for s in path.split("/") if s]
+    if not segments or len(segments) > 2 or "$" in path:
+        return None
+    resource_type = segments[0]
+    if not resource_type[:1].isupper() or resource_type == "Bundle":
+        return None
+    return segments
+
+
 def _notify_fhir_write(method: str, path: str, response: httpx.Response) -> None:
     """Schedule a WebSocket broadcast for a successful write through the proxy.
 
@@ -47,12 +65,10 @@ def _notify_fhir_write(method: str, path: str, response: httpx.Response) -> None
     proxied response.
     """
     try:
-        segments = [s for s in path.split("/") if s]
-        if not segments or len(segments) > 2 or "$" in path:
+        segments = _broadcast_segments(path)
+        if not segments:
             return
         resource_type = segments[0]
-        if not resource_type[:1].isupper() or resource_type == "Bundle":
-            return
 
         action = {"POST": "created", "PUT": "updated", "PATCH": "updated", "DELETE": "deleted"}[method]
         resource_id = segments[1] if len(segments) == 2 else None
@@ -86,6 +102,37 @@ def _notify_fhir_write(method: str, path: str, response: httpx.Response) -> None
         logger.warning(f"FHIR write broadcast skipped: {exc}")
 
 
+def _invalidate_cache_for_write(path: str, response: Optional[httpx.Response] = None) -> None:
+    """Drop shared-cache entries a successful write through the proxy touched.
+
+    `{Type}[/{id}...]` writes invalidate that type, resource and (when the
+    returned resource says so) its patient compartment. Writes with no type
+    in the path — transaction/batch Bundles, system-level operations — can
+    touch anything, so they clear the whole cache.
+    """
+    try:
+        cache = get_resource_cache()
+        segments = [s for s in path.split("/") if s]
+        if not segments or not segments[0][:1].isupper() or segments[0] == "Bundle":
+            cache.clear()
+            return
+
+        resource_type = segments[0]
+        resource_id = segments[1] if len(segments) > 1 and not segments[1].startswith("$") else None
+        resource = None
+        if response is not None:
+            try:
+                parsed = response.json()
+            except Exception:
+                parsed = None
+            if isinstance(parsed, dict) and parsed.get("resourceType") == resource_type:
+                resource = parsed
+                resource_id = resource_id or parsed.get("id")
+        cache.invalidate_write(resource_type, resource_id, resource=resource)
+    except Exception as exc:  # noqa: BLE001 — cache upkeep must never break the proxy
+        logger.warning(f"FHIR cache invalidation skipped: {exc}")
+
+
 def create_operation_outcome(
     severity: str,
     code: str,
@@ -168,6 +215,11 @@ def create_error_response(
 _raw_hapi_url = os.getenv("HAPI_FHIR_URL", "http://hapi-fhir:8080/fhir")
 HAPI_FHIR_BASE_URL = _raw_hapi_url.rstrip("/").removesuffix("/fhir")
 
+# Stream upstream responses (and transaction Bundle request bodies) through
+# the shared pooled client instead of buffering them whole. Set to "false"
+# to fall back to fully buffered proxying.
+FHIR_PROXY_STREAMING = os.getenv("FHIR_PROXY_STREAMING", "true").lower() == "true"
+
 
 # Explicit base routes: `POST [base]` is the FHIR-standard way to submit a
 # transaction Bundle, but FastAPI's redirect_slashes 301'd the bare paths —
@@ -201,46 +253,74 @@ async def proxy_to_hapi_fhir(path: str, request: Request):
     if request.url.query:
         hapi_url = f"{hapi_url}?{request.url.query}"
 
-    # Get request body if present
+    # Request body: transaction/batch Bundles POSTed to the base are piped
+    # through as they arrive instead of being buffered whole first.
     body = None
     if request.method in ["POST", "PUT", "PATCH"]:
-        body = await request.body()
+        if FHIR_PROXY_STREAMING and not path.strip("/"):
+            body = request.stream()
+        else:
+            body = await request.body()
 
     # Forward headers (exclude host header)
     headers = dict(request.headers)
     headers.pop("host", None)
 
+    is_write = request.method in ("POST", "PUT", "PATCH", "DELETE")
+
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Forward request to HAPI FHIR
-            response = await client.request(
-                method=request.method,
-                url=hapi_url,
-                headers=headers,
-                content=body
-            )
+        client = get_shared_http_client()
+        upstream_request = client.build_request(
+            method=request.method,
+            url=hapi_url,
+            headers=headers,
+            content=body,
+            timeout=30.0
+        )
+        response = await client.send(upstream_request, stream=True)
+
+        # Prepare response headers — strip hop-by-hop and encoding headers
+        # that conflict when nginx proxies to us (causes "Content-Length and
+        # Transfer-Encoding sent at the same time" 502 errors)
+        response_headers = dict(response.headers)
+        response_headers.pop("content-encoding", None)
+        response_headers.pop("content-length", None)
+        response_headers.pop("transfer-encoding", None)
+        media_type = response.headers.get("content-type", "application/json")
+
+        # Writes that broadcast need the parsed resource, and they're a single
+        # resource anyway — read those fully. Everything else (searches,
+        # $everything, history) is piped through chunk by chunk.
+        if not FHIR_PROXY_STREAMING or (is_write and _broadcast_segments(path)):
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
 
             # Broadcast successful writes so connected clients see live
             # updates (fire-and-forget; see _notify_fhir_write)
-            if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 300:
+            if is_write and response.status_code < 300:
+                _invalidate_cache_for_write(path, response)
                 _notify_fhir_write(request.method, path, response)
 
-            # Prepare response headers — strip hop-by-hop and encoding headers
-            # that conflict when nginx proxies to us (causes "Content-Length and
-            # Transfer-Encoding sent at the same time" 502 errors)
-            response_headers = dict(response.headers)
-            response_headers.pop("content-encoding", None)
-            response_headers.pop("content-length", None)
-            response_headers.pop("transfer-encoding", None)
-
-            # Return HAPI FHIR response
             return Response(
                 content=response.content,
                 status_code=response.status_code,
                 headers=response_headers,
-                media_type=response.headers.get("content-type", "application/json")
+                media_type=media_type
             )
 
+        if is_write and response.status_code < 300:
+            _invalidate_cache_for_write(path)
+
+        return StreamingResponse(
+            response.aiter_bytes(),
+            status_code=response.status_code,
+            headers=response_headers,
+            media_type=media_type,
+            background=BackgroundTask(response.aclose)
+        )
+
     except httpx.TimeoutException as e:
         logger.error(f"Timeout proxying request to HAPI FHIR: {e}")
         return create_error_response(
@@ -43,10 +43,11 @@ async def calculate_diabetes_care_measure(db: AsyncSession, provider_id: Optiona
 
     # Get diabetic patients from HAPI FHIR
     # Search for diabetes conditions using SNOMED codes
-    conditions_bundle = await hapi_client.search('Condition', {
-        'code': '44054006,73211009,714628002,127013003,90781000119102'  # Diabetes SNOMED codes
+    # (search_all follows every page — the first page alone undercounted)
+    diabetic_conditions = await hapi_client.search_all('Condition', {
+        'code': '44054006,73211009,714628002,127013003,90781000119102',  # Diabetes SNOMED codes
+        '_count': 500
     })
-    diabetic_conditions = [entry.get('resource', entry) for entry in conditions_bundle.get('entry', [])] if isinstance(conditions_bundle, dict) else []
 
     # Extract unique patient references
     diabetic_patients = set()
@@ -77,11 +78,11 @@ async def calculate_diabetes_care_measure(db: AsyncSession, provider_id: Optiona
     six_months_ago = (datetime.now(timezone.utc) - timedelta(days=180)).isoformat()
 
     # Search for HbA1c observations
-    obs_bundle = await hapi_client.search('Observation', {
+    hba1c_observations = await hapi_client.search_all('Observation', {
         'code': '4548-4',  # LOINC code for HbA1c
-        'date': f'ge{six_months_ago}'
+        'date': f'ge{six_months_ago}',
+        '_count': 500
     })
-    hba1c_observations = [entry.get('resource', entry) for entry in obs_bundle.get('entry', [])] if isinstance(obs_bundle, dict) else []
 
     # Count unique patients with HbA1c tests
     tested_patients = set()
@@ -114,10 +115,10 @@ async def calculate_preventive_screening_measure(db: AsyncSession, provider_id:
     hapi_client = HAPIFHIRClient()
 
     # Get female patients aged 50-74 from HAPI FHIR
-    patients_bundle = await hapi_client.search('Patient', {
-        'gender': 'female'
+    patients = await hapi_client.search_all('Patient', {
+        'gender': 'female',
+        '_count': 500
     })
-    patients = [entry.get('resource', entry) for entry in patients_bundle.get('entry', [])] if isinstance(patients_bundle, dict) else []
 
     # Filter by age 50-74
     eligible_patients = set()
@@ -156,11 +157,11 @@ async def calculate_preventive_screening_measure(db: AsyncSession, provider_id:
     two_years_ago = (datetime.now(timezone.utc) - timedelta(days=730)).isoformat()
 
     # Search for mammography observations using LOINC codes
-    mammo_bundle = await hapi_client.search('Observation', {
+    mammography_observations = await hapi_client.search_all('Observation', {
         'code': '24606-6,24605-8,24604-1',  # LOINC codes for mammography
-        'date': f'ge{two_years_ago}'
+        'date': f'ge{two_years_ago}',
+        '_count': 500
     })
-    mammography_observations = [entry.get('resource', entry) for entry in mammo_bundle.get('entry', [])] if isinstance(mammo_bundle, dict) else []
 
     # Count unique patients screened
     screened_patients = set()
@@ -193,10 +194,10 @@ async def calculate_medication_adherence_measure(db: AsyncSession, provider_id:
     hapi_client = HAPIFHIRClient()
 
     # Get active medications from HAPI FHIR
-    meds_bundle = await hapi_client.search('MedicationRequest', {
-        'status': 'active'
+    active_meds = await hapi_client.search_all('MedicationRequest', {
+        'status': 'active',
+        '_count': 500
     })
-    active_meds = [entry.get('resource', entry) for entry in meds_bundle.get('entry', [])] if isinstance(meds_bundle, dict) else []
 
     denominator = len(active_meds)
     
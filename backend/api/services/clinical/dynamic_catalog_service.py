@@ -1,18 +1,109 @@
 """
 Dynamic Catalog Service - HAPI FHIR Migration
 Extracts and builds catalogs from actual patient FHIR data using fhirclient
+
+Aggregates are kept in `DynamicCatalogStore` (a SQLite file shared by all
+workers) and refreshed incrementally from HAPI, so a cold start or a cache
+expiry reads the persisted catalog instead of re-paging every resource.
 """
 
-import json
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-from collections import defaultdict, Counter
+import asyncio
 import logging
 from services.hapi_fhir_client import HAPIFHIRClient
+from api.services.clinical.dynamic_catalog_store import (
+    CatalogSpec,
+    get_dynamic_catalog_store,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _coded(element_name: str, default_display: str, default_system: Optional[str] = None):
+    """Extractor keyed by the first coding of a CodeableConcept element."""
+    def extract(resource: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        element = resource.get(element_name)
+        if not element or not element.get('coding'):
+            return None
+        coding = element['coding'][0]
+        code = coding.get('code')
+        if not code:
+            return None
+        return code, {
+            'display': coding.get('display') or element.get('text') or default_display,
+            'system': coding.get('system') or default_system,
+        }
+    return extract
+
+
+def _imaging_study_type(resource: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    description = resource.get('description', '')
+    modality_list = resource.get('modality', [])
+    modality_code = modality_list[0].get('code', 'Unknown') if modality_list else 'Unknown'
+    key = description or modality_code
+    if not key:
+        return None
+    return key, {'modality': modality_code, 'display': description or f"{modality_code} Study"}
+
+
+def _order_set(resource: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    return resource['id'], {
+        'title': resource.get('title', 'Unnamed Order Set'),
+        'description': resource.get('description', ''),
+        'status': resource.get('status', 'unknown'),
+    }
+
+
+# FHIR-standard _elements keeps payloads minimal (85-90% reduction) on ANY
+# FHIR R4 server; meta carries lastUpdated for the incremental watermark.
+MEDICATION_CATALOG = CatalogSpec(
+    "medications", "MedicationRequest",
+    {"_elements": "medicationCodeableConcept,meta", "_count": "1000"},
+    _coded('medicationCodeableConcept', "Unknown medication", "http://www.nlm.nih.gov/research/umls/rxnorm"),
+)
+CONDITION_CATALOG = CatalogSpec(
+    "conditions", "Condition",
+    {"_elements": "code,meta", "_count": "1000"},
+    _coded('code', "Unknown condition", "http://snomed.info/sct"),
+)
+LAB_TEST_CATALOG = CatalogSpec(
+    "lab_tests", "Observation",
+    {"category": "laboratory", "_elements": "code,meta", "_count": "1000"},
+    _coded('code', "Unknown lab test"),
+)
+PROCEDURE_CATALOG = CatalogSpec(
+    "procedures", "Procedure",
+    {"_elements": "code,meta", "_count": "1000"},
+    _coded('code', "Unknown procedure", "http://snomed.info/sct"),
+)
+VACCINE_CATALOG = CatalogSpec(
+    "vaccines", "Immunization",
+    {"_elements": "vaccineCode,meta", "_count": "1000"},
+    _coded('vaccineCode', "Unknown vaccine"),
+)
+ALLERGY_CATALOG = CatalogSpec(
+    "allergies", "AllergyIntolerance",
+    {"_elements": "code,meta", "_count": "1000"},
+    _coded('code', "Unknown allergen"),
+)
+IMAGING_CATALOG = CatalogSpec(
+    "imaging", "ImagingStudy",
+    {"_elements": "modality,description,meta", "_count": "500"},
+    _imaging_study_type,
+)
+ORDER_SET_CATALOG = CatalogSpec(
+    "order_sets", "PlanDefinition",
+    {"type": "order-set", "_elements": "title,description,status,meta", "_count": "200"},
+    _order_set,
+)
+
+CATALOG_SPECS = [
+    MEDICATION_CATALOG, CONDITION_CATALOG, LAB_TEST_CATALOG, PROCEDURE_CATALOG,
+    VACCINE_CATALOG, ALLERGY_CATALOG, IMAGING_CATALOG, ORDER_SET_CATALOG,
+]
+
+
 class DynamicCatalogService:
     """
     Service to extract and build catalogs from actual patient FHIR data using fhirclient.
@@ -26,638 +117,144 @@ class DynamicCatalogService:
     - Vaccines (from Immunization resources)
     - Allergies (from AllergyIntolerance resources)
     - Order Sets (from CarePlan and PlanDefinition)
+
+    Cheap to construct per request: the aggregates live in the shared store.
     """
 
     def __init__(self):
-        self.cache = {}
-        self.cache_timeout = 3600  # 1 hour cache
+        self.store = get_dynamic_catalog_store()
         self.last_refresh = None
 
     async def extract_medication_catalog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """
-        Extract medication catalog from MedicationRequest resources.
-
-        Uses FHIR-standard _elements parameter for efficient minimal-payload retrieval.
-        Works with ANY FHIR R4 compliant server (HAPI, Azure FHIR, AWS HealthLake, etc.)
-        """
-        cache_key = f"medications_{limit}"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]
-
-        logger.info("Extracting medication catalog using FHIR-standard _elements parameter")
-
-        hapi_client = HAPIFHIRClient()
-
-        try:
-            # FHIR-standard approach: Fetch only medicationCodeableConcept field (85-90% payload reduction)
-            # Works on ANY FHIR R4 server, not HAPI-specific
-            bundle = await hapi_client.search("MedicationRequest", {
-                "_elements": "medicationCodeableConcept",
-                "_count": "1000"
-            })
-
-            total_found = len(bundle.get('entry', []))
-            logger.info(f"Found {total_found} medication requests (minimal payload)")
-
-            # Aggregate codes from minimal payload (fast in-memory processing)
-            code_map = defaultdict(lambda: {
-                'code': None,
-                'display': None,
-                'system': None,
-                'frequency_count': 0
-            })
-
-            for entry in bundle.get('entry', []):
-                resource = entry['resource']
-                if 'medicationCodeableConcept' not in resource:
-                    continue
-
-                med_concept = resource['medicationCodeableConcept']
-                if 'coding' not in med_concept or not med_concept['coding']:
-                    continue
-
-                coding = med_concept['coding'][0]
-                code = coding.get('code')
-
-                if code:
-                    code_data = code_map[code]
-                    code_data['code'] = code
-                    code_data['display'] = coding.get('display') or med_concept.get('text') or "Unknown medication"
-                    code_data['system'] = coding.get('system') or "http://www.nlm.nih.gov/research/umls/rxnorm"
-                    code_data['frequency_count'] += 1
-
-            logger.info(f"Aggregated {len(code_map)} distinct medication codes from {total_found} requests")
-
-        except Exception as e:
-            logger.error(f"Error extracting medication catalog: {e}")
-            code_map = {}
-
-        # Convert to list format
-        medications = []
-        for code, data in code_map.items():
-            medications.append({
-                "id": f"med_{code}" if code else f"med_{len(medications)}",
-                "code": data['code'],
-                "display": data['display'],
-                "system": data['system'],
-                "frequency_count": data['frequency_count'],
-                "source": "patient_data"
-            })
-
-        # Sort by usage frequency
-        medications.sort(key=lambda x: x['frequency_count'], reverse=True)
-
-        # Apply limit if specified
-        if limit:
-            medications = medications[:limit]
-
-        self._cache_result(cache_key, medications)
-        logger.info(f"Extracted {len(medications)} unique medications using FHIR-standard approach")
+        """Medication catalog from MedicationRequest codes, most used first."""
+        entries = await self.store.get_entries(MEDICATION_CATALOG, limit)
+        medications = [{
+            "id": f"med_{e.key}",
+            "code": e.key,
+            "display": e.data['display'],
+            "system": e.data['system'],
+            "frequency_count": e.count,
+            "source": "patient_data"
+        } for e in entries]
+        logger.info(f"Extracted {len(medications)} unique medications")
         return medications
 
     async def extract_condition_catalog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """
-        Extract condition catalog from Condition resources.
-
-        Uses FHIR-standard _elements parameter for efficient minimal-payload retrieval.
-        Works with ANY FHIR R4 compliant server (HAPI, Azure FHIR, AWS HealthLake, etc.)
-        """
-        cache_key = f"conditions_{limit}"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]
-
-        logger.info("Extracting condition catalog using FHIR-standard _elements parameter")
-
-        hapi_client = HAPIFHIRClient()
-
-        try:
-            # FHIR-standard approach: Fetch only code field (85-90% payload reduction)
-            bundle = await hapi_client.search("Condition", {
-                "_elements": "code",
-                "_count": "1000"
-            })
-
-            total_found = len(bundle.get('entry', []))
-            logger.info(f"Found {total_found} conditions (minimal payload)")
-
-            # Aggregate codes from minimal payload
-            code_map = defaultdict(lambda: {
-                'code': None,
-                'display': None,
-                'system': None,
-                'frequency_count': 0
-            })
-
-            for entry in bundle.get('entry', []):
-                resource = entry['resource']
-                if 'code' not in resource:
-                    continue
-
-                code_element = resource['code']
-                if 'coding' not in code_element or not code_element['coding']:
-                    continue
-
-                coding = code_element['coding'][0]
-                code = coding.get('code')
-
-                if code:
-                    code_data = code_map[code]
-                    code_data['code'] = code
-                    code_data['display'] = coding.get('display') or code_element.get('text') or "Unknown condition"
-                    code_data['system'] = coding.get('system') or "http://snomed.info/sct"
-                    code_data['frequency_count'] += 1
-
-            logger.info(f"Aggregated {len(code_map)} distinct condition codes from {total_found} resources")
-
-        except Exception as e:
-            logger.error(f"Error extracting condition catalog: {e}")
-            code_map = {}
-
-        # Convert to list format
-        conditions = []
-        for code, data in code_map.items():
-            conditions.append({
-                "id": f"cond_{code}" if code else f"cond_{len(conditions)}",
-                "code": data['code'],
-                "display": data['display'],
-                "system": data['system'],
-                "frequency_count": data['frequency_count'],
-                "source": "patient_data"
-            })
-
-        # Sort by usage frequency
-        conditions.sort(key=lambda x: x['frequency_count'], reverse=True)
-
-        # Apply limit if specified
-        if limit:
-            conditions = conditions[:limit]
-
-        self._cache_result(cache_key, conditions)
-        logger.info(f"Extracted {len(conditions)} unique conditions using FHIR-standard approach")
+        """Condition catalog from Condition codes, most used first."""
+        entries = await self.store.get_entries(CONDITION_CATALOG, limit)
+        conditions = [{
+            "id": f"cond_{e.key}",
+            "code": e.key,
+            "display": e.data['display'],
+            "system": e.data['system'],
+            "frequency_count": e.count,
+            "source": "patient_data"
+        } for e in entries]
+        logger.info(f"Extracted {len(conditions)} unique conditions")
         return conditions
 
     async def extract_lab_test_catalog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """
-        Extract lab test catalog from Observation resources with category=laboratory.
-
-        Uses FHIR-standard _elements parameter for efficient minimal-payload retrieval.
-        Works with ANY FHIR R4 compliant server (HAPI, Azure FHIR, AWS HealthLake, etc.)
-        """
-        cache_key = f"lab_tests_{limit}"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]
-
-        logger.info("Extracting lab test catalog using FHIR-standard _elements parameter")
-
-        hapi_client = HAPIFHIRClient()
-
-        try:
-            # FHIR-standard approach: Fetch only code field (85-90% payload reduction)
-            # Works on ANY FHIR R4 server, not HAPI-specific
-            bundle = await hapi_client.search("Observation", {
-                "category": "laboratory",
-                "_elements": "code",
-                "_count": "1000"
-            })
-
-            total_found = len(bundle.get('entry', []))
-            logger.info(f"Found {total_found} laboratory observations (minimal payload)")
-
-            # Aggregate codes from minimal payload (fast in-memory processing)
-            code_map = defaultdict(lambda: {
-                'loinc_code': None,
-                'display': None,
-                'system': None,
-                'frequency_count': 0
-            })
-
-            for entry in bundle.get('entry', []):
-                resource = entry['resource']
-                if 'code' not in resource:
-                    logger.warning(f"Resource {resource.get('id')} missing code field")
-                    continue
-
-                # Extract code from minimal resource
-                code_element = resource['code']
-                if 'coding' not in code_element or not code_element['coding']:
-                    logger.warning(f"Resource {resource.get('id')} code missing coding")
-                    continue
-
-                coding = code_element['coding'][0]
-                code = coding.get('code')
-
-                if code:
-                    code_data = code_map[code]
-                    code_data['loinc_code'] = code
-                    code_data['display'] = coding.get('display') or code_element.get('text') or "Unknown lab test"
-                    code_data['system'] = coding.get('system')
-                    code_data['frequency_count'] += 1
-                    logger.debug(f"Aggregated {code}: {code_data['display']} (count: {code_data['frequency_count']})")
-
-            logger.info(f"Aggregated {len(code_map)} distinct lab test codes from {total_found} observations")
-
-        except Exception as e:
-            logger.error(f"Error extracting lab catalog: {e}")
-            code_map = {}
-
-        # Convert to list format
-        lab_tests = []
-        for code, data in code_map.items():
-            lab_tests.append({
-                "id": f"lab_{code}" if code else f"lab_{len(lab_tests)}",
-                "name": code,
-                "display": data['display'],
-                "loinc_code": data['loinc_code'],
-                "category": "laboratory",
-                # No specimen type: this extraction reads Observation codes
-                # only (_elements=code), which never state the specimen. It
-                # used to hardcode "blood" for every test — wrong for urine,
-                # CSF, swab, and stool studies, and a training platform must
-                # not teach a specimen it did not observe.
-                "specimen_type": None,
-                "frequency_count": data['frequency_count'],
-                "source": "patient_data"
-            })
-
-        # Sort by usage frequency
-        lab_tests.sort(key=lambda x: x['frequency_count'], reverse=True)
-
-        # Apply limit if specified
-        if limit:
-            lab_tests = lab_tests[:limit]
-
-        self._cache_result(cache_key, lab_tests)
-        logger.info(f"Extracted {len(lab_tests)} unique lab tests using FHIR-standard approach")
+        """Lab test catalog from Observation codes (category=laboratory), most used first."""
+        entries = await self.store.get_entries(LAB_TEST_CATALOG, limit)
+        lab_tests = [{
+            "id": f"lab_{e.key}",
+            "name": e.key,
+            "display": e.data['display'],
+            "loinc_code": e.key,
+            "category": "laboratory",
+            # No specimen type: this extraction reads Observation codes
+            # only (_elements=code), which never state the specimen. It
+            # used to hardcode "blood" for every test — wrong for urine,
+            # CSF, swab, and stool studies, and a training platform must
+            # not teach a specimen it did not observe.
+            "specimen_type": None,
+            "frequency_count": e.count,
+            "source": "patient_data"
+        } for e in entries]
+        logger.info(f"Extracted {len(lab_tests)} unique lab tests")
         return lab_tests
 
     async def extract_procedure_catalog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """
-        Extract procedure catalog from Procedure resources.
-
-        Uses FHIR-standard _elements parameter for efficient minimal-payload retrieval.
-        Works with ANY FHIR R4 compliant server (HAPI, Azure FHIR, AWS HealthLake, etc.)
-        """
-        cache_key = f"procedures_{limit}"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]
-
-        logger.info("Extracting procedure catalog using FHIR-standard _elements parameter")
-
-        hapi_client = HAPIFHIRClient()
-
-        try:
-            # FHIR-standard approach: Fetch only code field (85-90% payload reduction)
-            bundle = await hapi_client.search("Procedure", {
-                "_elements": "code",
-                "_count": "1000"
-            })
-
-            total_found = len(bundle.get('entry', []))
-            logger.info(f"Found {total_found} procedures (minimal payload)")
-
-            # Aggregate codes from minimal payload
-            code_map = defaultdict(lambda: {
-                'code': None,
-                'display': None,
-                'system': None,
-                'frequency_count': 0
-            })
-
-            for entry in bundle.get('entry', []):
-                resource = entry['resource']
-                if 'code' not in resource:
-                    continue
-
-                code_element = resource['code']
-                if 'coding' not in code_element or not code_element['coding']:
-                    continue
-
-                coding = code_element['coding'][0]
-                code = coding.get('code')
-
-                if code:
-                    code_data = code_map[code]
-                    code_data['code'] = code
-                    code_data['display'] = coding.get('display') or code_element.get('text') or "Unknown procedure"
-                    code_data['system'] = coding.get('system') or "http://snomed.info/sct"
-                    code_data['frequency_count'] += 1
-
-            logger.info(f"Aggregated {len(code_map)} distinct procedure codes from {total_found} resources")
-
-        except Exception as e:
-            logger.error(f"Error extracting procedure catalog: {e}")
-            code_map = {}
-
-        # Convert to list format
-        procedures = []
-        for code, data in code_map.items():
-            procedures.append({
-                "id": f"proc_{code}" if code else f"proc_{len(procedures)}",
-                "code": data['code'],
-                "display": data['display'],
-                "system": data['system'],
-                "frequency_count": data['frequency_count'],
-                "source": "patient_data"
-            })
-
-        # Sort by usage frequency
-        procedures.sort(key=lambda x: x['frequency_count'], reverse=True)
-
-        # Apply limit if specified
-        if limit:
-            procedures = procedures[:limit]
-
-        self._cache_result(cache_key, procedures)
-        logger.info(f"Extracted {len(procedures)} unique procedures using FHIR-standard approach")
+        """Procedure catalog from Procedure codes, most used first."""
+        entries = await self.store.get_entries(PROCEDURE_CATALOG, limit)
+        procedures = [{
+            "id": f"proc_{e.key}",
+            "code": e.key,
+            "display": e.data['display'],
+            "system": e.data['system'],
+            "frequency_count": e.count,
+            "source": "patient_data"
+        } for e in entries]
+        logger.info(f"Extracted {len(procedures)} unique procedures")
         return procedures
 
     async def extract_vaccine_catalog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """
-        Extract vaccine catalog from Immunization resources.
-
-        Uses FHIR-standard _elements parameter for efficient minimal-payload retrieval.
-        Works with ANY FHIR R4 compliant server (HAPI, Azure FHIR, AWS HealthLake, etc.)
-        """
-        cache_key = f"vaccines_{limit}"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]
-
-        logger.info("Extracting vaccine catalog using FHIR-standard _elements parameter")
-
-        hapi_client = HAPIFHIRClient()
-
-        try:
-            # FHIR-standard approach: Fetch only vaccineCode field (85-90% payload reduction)
-            bundle = await hapi_client.search("Immunization", {
-                "_elements": "vaccineCode",
-                "_count": "1000"
-            })
-
-            total_found = len(bundle.get('entry', []))
-            logger.info(f"Found {total_found} immunizations (minimal payload)")
-
-            # Aggregate codes from minimal payload
-            code_map = defaultdict(lambda: {
-                'cvx_code': None,
-                'display': None,
-                'frequency_count': 0
-            })
-
-            for entry in bundle.get('entry', []):
-                resource = entry['resource']
-                if 'vaccineCode' not in resource:
-                    continue
-
-                vaccine_code = resource['vaccineCode']
-                if 'coding' not in vaccine_code or not vaccine_code['coding']:
-                    continue
-
-                coding = vaccine_code['coding'][0]
-                code = coding.get('code')
-
-                if code:
-                    code_data = code_map[code]
-                    code_data['cvx_code'] = code
-                    code_data['display'] = coding.get('display') or vaccine_code.get('text') or "Unknown vaccine"
-                    code_data['frequency_count'] += 1
-
-            logger.info(f"Aggregated {len(code_map)} distinct vaccine codes from {total_found} immunizations")
-
-        except Exception as e:
-            logger.error(f"Error extracting vaccine catalog: {e}")
-            code_map = {}
-
-        # Convert to list format
-        vaccines = []
-        for code, data in code_map.items():
-            vaccines.append({
-                "id": f"vax_{code}" if code else f"vax_{len(vaccines)}",
-                "vaccine_code": data['cvx_code'],
-                "vaccine_name": data['display'],
-                "cvx_code": data['cvx_code'],
-                "usage_count": data['frequency_count'],
-                "source": "patient_data"
-            })
-
-        # Sort by usage frequency
-        vaccines.sort(key=lambda x: x['usage_count'], reverse=True)
-
-        # Apply limit if specified
-        if limit:
-            vaccines = vaccines[:limit]
-
-        self._cache_result(cache_key, vaccines)
-        logger.info(f"Extracted {len(vaccines)} unique vaccines using FHIR-standard approach")
+        """Vaccine catalog from Immunization vaccineCodes, most used first."""
+        entries = await self.store.get_entries(VACCINE_CATALOG, limit)
+        vaccines = [{
+            "id": f"vax_{e.key}",
+            "vaccine_code": e.key,
+            "vaccine_name": e.data['display'],
+            "cvx_code": e.key,
+            "usage_count": e.count,
+            "source": "patient_data"
+        } for e in entries]
+        logger.info(f"Extracted {len(vaccines)} unique vaccines")
         return vaccines
 
     async def extract_allergy_catalog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """
-        Extract allergy catalog from AllergyIntolerance resources.
-
-        Uses FHIR-standard _elements parameter for efficient minimal-payload retrieval.
-        Works with ANY FHIR R4 compliant server (HAPI, Azure FHIR, AWS HealthLake, etc.)
-        """
-        cache_key = f"allergies_{limit}"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]
-
-        logger.info("Extracting allergy catalog using FHIR-standard _elements parameter")
-
-        hapi_client = HAPIFHIRClient()
-
-        try:
-            # FHIR-standard approach: Fetch only code field (85-90% payload reduction)
-            bundle = await hapi_client.search("AllergyIntolerance", {
-                "_elements": "code",
-                "_count": "1000"
-            })
-
-            total_found = len(bundle.get('entry', []))
-            logger.info(f"Found {total_found} allergy intolerances (minimal payload)")
-
-            # Aggregate codes from minimal payload
-            code_map = defaultdict(lambda: {
-                'code': None,
-                'display': None,
-                'system': None,
-                'frequency_count': 0
-            })
-
-            for entry in bundle.get('entry', []):
-                resource = entry['resource']
-                if 'code' not in resource:
-                    continue
-
-                code_element = resource['code']
-                if 'coding' not in code_element or not code_element['coding']:
-                    continue
-
-                coding = code_element['coding'][0]
-                code = coding.get('code')
-
-                if code:
-                    code_data = code_map[code]
-                    code_data['code'] = code
-                    code_data['display'] = coding.get('display') or code_element.get('text') or "Unknown allergen"
-                    code_data['system'] = coding.get('system')
-                    code_data['frequency_count'] += 1
-
-            logger.info(f"Aggregated {len(code_map)} distinct allergy codes from {total_found} resources")
-
-        except Exception as e:
-            logger.error(f"Error extracting allergy catalog: {e}")
-            code_map = {}
-
-        # Convert to list format
+        """Allergy catalog from AllergyIntolerance codes, most used first."""
+        entries = await self.store.get_entries(ALLERGY_CATALOG, limit)
         allergies = []
-        for code, data in code_map.items():
+        for e in entries:
             # Determine allergen type from system
-            allergen_type = "other"
-            system = data['system'] or ""
-            if "rxnorm" in system.lower():
-                allergen_type = "medication"
+            system = e.data['system'] or ""
+            allergen_type = "medication" if "rxnorm" in system.lower() else "other"
 
             allergy_dict = {
-                "id": f"allergy_{code}" if code else f"allergy_{len(allergies)}",
-                "allergen_code": data['code'],
-                "allergen_name": data['display'],
+                "id": f"allergy_{e.key}",
+                "allergen_code": e.key,
+                "allergen_name": e.data['display'],
                 "allergen_type": allergen_type,
-                "system": data['system'],
-                "usage_count": data['frequency_count'],
+                "system": e.data['system'],
+                "usage_count": e.count,
                 "source": "patient_data"
             }
 
             # Add RxNorm code for medication allergies
-            if allergen_type == "medication" and "rxnorm" in system.lower():
-                allergy_dict["rxnorm_code"] = code
+            if allergen_type == "medication":
+                allergy_dict["rxnorm_code"] = e.key
 
             allergies.append(allergy_dict)
 
-        # Sort by usage frequency
-        allergies.sort(key=lambda x: x['usage_count'], reverse=True)
-
-        # Apply limit if specified
-        if limit:
-            allergies = allergies[:limit]
-
-        self._cache_result(cache_key, allergies)
-        logger.info(f"Extracted {len(allergies)} unique allergies from HAPI FHIR")
+        logger.info(f"Extracted {len(allergies)} unique allergies")
         return allergies
 
     async def extract_imaging_catalog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """
-        Extract imaging catalog from ImagingStudy resources.
-
-        Uses FHIR-standard _elements parameter for efficient minimal-payload retrieval.
-        Works with ANY FHIR R4 compliant server (HAPI, Azure FHIR, AWS HealthLake, etc.)
-        """
-        cache_key = f"imaging_{limit}"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]
-
-        logger.info("Extracting imaging catalog using FHIR-standard _elements parameter")
-
-        hapi_client = HAPIFHIRClient()
-
-        try:
-            bundle = await hapi_client.search("ImagingStudy", {
-                "_elements": "modality,description",
-                "_count": "500"
-            })
-
-            total_found = len(bundle.get('entry', []))
-            logger.info(f"Found {total_found} imaging studies (minimal payload)")
-
-            code_map = defaultdict(lambda: {
-                'modality': None,
-                'display': None,
-                'body_site': None,
-                'frequency_count': 0
-            })
-
-            for entry in bundle.get('entry', []):
-                resource = entry['resource']
-                description = resource.get('description', '')
-                modality_list = resource.get('modality', [])
-                modality_code = modality_list[0].get('code', 'Unknown') if modality_list else 'Unknown'
-
-                key = description or modality_code
-                if key:
-                    code_data = code_map[key]
-                    code_data['modality'] = modality_code
-                    code_data['display'] = description or f"{modality_code} Study"
-                    code_data['frequency_count'] += 1
-
-            logger.info(f"Aggregated {len(code_map)} distinct imaging study types from {total_found} resources")
-
-        except Exception as e:
-            logger.error(f"Error extracting imaging catalog: {e}")
-            code_map = {}
-
-        imaging_studies = []
-        for key, data in code_map.items():
-            imaging_studies.append({
-                "id": f"img_{len(imaging_studies)}",
-                "code": key,
-                "display": data['display'],
-                "modality": data['modality'],
-                "body_site": data.get('body_site'),
-                "frequency_count": data['frequency_count'],
-                "source": "patient_data"
-            })
-
-        imaging_studies.sort(key=lambda x: x['frequency_count'], reverse=True)
-
-        if limit:
-            imaging_studies = imaging_studies[:limit]
-
-        self._cache_result(cache_key, imaging_studies)
-        logger.info(f"Extracted {len(imaging_studies)} unique imaging studies using FHIR-standard approach")
+        """Imaging catalog from ImagingStudy description/modality, most used first."""
+        entries = await self.store.get_entries(IMAGING_CATALOG, limit)
+        imaging_studies = [{
+            "id": f"img_{i}",
+            "code": e.key,
+            "display": e.data['display'],
+            "modality": e.data['modality'],
+            "body_site": None,
+            "frequency_count": e.count,
+            "source": "patient_data"
+        } for i, e in enumerate(entries)]
+        logger.info(f"Extracted {len(imaging_studies)} unique imaging studies")
         return imaging_studies
 
     async def extract_order_set_catalog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """
-        Extract order set catalog from PlanDefinition resources.
-
-        Looks for PlanDefinition resources that represent order sets.
-        """
-        cache_key = f"order_sets_{limit}"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]
-
-        logger.info("Extracting order set catalog from PlanDefinition resources")
-
-        hapi_client = HAPIFHIRClient()
-
-        try:
-            bundle = await hapi_client.search("PlanDefinition", {
-                "type": "order-set",
-                "_elements": "title,description,status",
-                "_count": "200"
-            })
-
-            total_found = len(bundle.get('entry', []))
-            logger.info(f"Found {total_found} order set PlanDefinitions")
-
-        except Exception as e:
-            logger.error(f"Error extracting order set catalog: {e}")
-            bundle = {"entry": []}
-
-        order_sets = []
-        for entry in bundle.get('entry', []):
-            resource = entry['resource']
-            order_sets.append({
-                "id": resource.get('id', f"os_{len(order_sets)}"),
-                "title": resource.get('title', 'Unnamed Order Set'),
-                "description": resource.get('description', ''),
-                "status": resource.get('status', 'unknown'),
-                "source": "patient_data"
-            })
-
-        if limit:
-            order_sets = order_sets[:limit]
-
-        self._cache_result(cache_key, order_sets)
+        """Order set catalog from PlanDefinition resources of type order-set."""
+        entries = await self.store.get_entries(ORDER_SET_CATALOG, limit)
+        order_sets = [{
+            "id": e.key,
+            "title": e.data['title'],
+            "description": e.data['description'],
+            "status": e.data['status'],
+            "source": "patient_data"
+        } for e in entries]
         logger.info(f"Extracted {len(order_sets)} order sets")
         return order_sets
 
@@ -692,25 +289,33 @@ async def get_catalog_statistics(self) -> Dict[str, Any]:
         except Exception as e:
             logger.warning(f"Could not get lab observation count: {e}")
 
+        synced = await self.store.synced_catalogs()
         statistics = {
             "resource_counts": resource_counts,
             "laboratory_observations": lab_count,
             "last_refresh": self.last_refresh,
             "cache_status": {
-                "cached_catalogs": list(self.cache.keys()),
-                "cache_timeout": self.cache_timeout
+                "cached_catalogs": sorted(synced),
+                "last_synced": {
+                    name: datetime.fromtimestamp(ts).isoformat() for name, ts in synced.items()
+                },
+                "cache_timeout": self.store.refresh_seconds
             }
         }
 
         return statistics
 
-    async def refresh_all_catalogs(self, limit: Optional[int] = None) -> Dict[str, Any]:
-        """Refresh all catalogs and return summary."""
-        logger.info("Refreshing all dynamic catalogs from HAPI FHIR")
+    async def refresh_all_catalogs(self, limit: Optional[int] = None, full: bool = False) -> Dict[str, Any]:
+        """Sync all catalogs and return summary.
 
-        self.cache.clear()  # Clear existing cache
+        Each catalog pulls only resources updated since its last sync;
+        `full=True` rebuilds them from scratch (picks up deletions).
+        """
+        logger.info(f"Refreshing all dynamic catalogs from HAPI FHIR ({'full' if full else 'incremental'})")
 
-        # Extract all catalogs
+        await asyncio.gather(*[self.store.sync(spec, full=full) for spec in CATALOG_SPECS])
+
+        # Read back the synced catalogs
         medications = await self.extract_medication_catalog(limit)
         conditions = await self.extract_condition_catalog(limit)
         lab_tests = await self.extract_lab_test_catalog(limit)
@@ -741,23 +346,7 @@ async def refresh_all_catalogs(self, limit: Optional[int] = None) -> Dict[str, A
         logger.info(f"Catalog refresh complete: {summary['catalog_counts']}")
         return summary
 
-    def _is_cached(self, key: str) -> bool:
-        """Check if result is cached and not expired."""
-        if key not in self.cache:
-            return False
-
-        cache_time = self.cache.get(f"{key}_time")
-        if not cache_time:
-            return False
-
-        return (datetime.now() - cache_time).seconds < self.cache_timeout
-
-    def _cache_result(self, key: str, result: Any) -> None:
-        """Cache a result with timestamp."""
-        self.cache[key] = result
-        self.cache[f"{key}_time"] = datetime.now()
-
     def clear_cache(self) -> None:
-        """Clear all cached results."""
-        self.cache.clear()
+        """Drop this worker's in-memory copies; the persisted catalogs stay."""
+        self.store.clear_memo()
         logger.info("Dynamic catalog cache cleared")
@@ -0,0 +1,325 @@
+"""
+Dynamic Catalog Store - persisted, incrementally synced catalog aggregates
+
+DynamicCatalogService used to rebuild every catalog by paging through all
+of a resource type in HAPI whenever its in-memory cache expired, and that
+cache lived on a service instance constructed per request. This store keeps
+the aggregates in a local SQLite file instead, shared by every uvicorn
+worker on the host and surviving restarts:
+
+- catalog_resources: which catalog key each counted resource contributed
+  to (one row per resource), so re-reading a resource is idempotent and an
+  edited resource moves its count from the old code to the new one
+- catalog_entries: the display data for each key
+- catalog_sync: per-catalog watermark (newest meta.lastUpdated seen), last
+  sync time and a lease so only one worker syncs a catalog at a time
+
+A sync only asks HAPI for what changed since the watermark
+(`_lastUpdated=ge{watermark}`, sorted ascending so a truncated pass still
+leaves a correct watermark). `ge` rather than `gt` re-reads resources
+stamped in the watermark's own millisecond; that costs nothing because
+rows are keyed by resource id. Deletes are not visible to `_lastUpdated`
+searches — `sync(full=True)` rebuilds a catalog from scratch.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.hapi_fhir_client import HAPIFHIRClient
+from services.shared_sqlite import SharedSQLiteFile
+
+logger = logging.getLogger(__name__)
+
+DYNAMIC_CATALOG_DB_PATH = os.getenv('DYNAMIC_CATALOG_DB_PATH', '/app/data/dynamic_catalogs.db')
+# How old a catalog may get before a read triggers an incremental sync
+DYNAMIC_CATALOG_REFRESH_SECONDS = float(os.getenv('DYNAMIC_CATALOG_REFRESH_SECONDS', '3600'))
+# A worker that dies mid-sync blocks other workers for at most this long
+DYNAMIC_CATALOG_SYNC_LEASE_SECONDS = float(os.getenv('DYNAMIC_CATALOG_SYNC_LEASE_SECONDS', '300'))
+# How long a read of a never-synced catalog waits for another worker's sync
+DYNAMIC_CATALOG_FIRST_SYNC_WAIT_SECONDS = float(os.getenv('DYNAMIC_CATALOG_FIRST_SYNC_WAIT_SECONDS', '30'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_entries (
+    catalog  TEXT NOT NULL,
+    key      TEXT NOT NULL,
+    data     TEXT NOT NULL,
+    PRIMARY KEY (catalog, key)
+);
+CREATE TABLE IF NOT EXISTS catalog_resources (
+    catalog      TEXT NOT NULL,
+    resource_id  TEXT NOT NULL,
+    key          TEXT NOT NULL,
+    PRIMARY KEY (catalog, resource_id)
+);
+CREATE INDEX IF NOT EXISTS idx_catalog_resources_key ON catalog_resources (catalog, key);
+CREATE TABLE IF NOT EXISTS catalog_sync (
+    catalog      TEXT PRIMARY KEY,
+    watermark    TEXT,
+    synced_at    REAL,
+    lease_until  REAL
+);
+"""
+
+# resource -> (catalog key, entry data), or None if it contributes nothing
+Extractor = Callable[[Dict[str, Any]], Optional[Tuple[str, Dict[str, Any]]]]
+
+
+@dataclass(frozen=True)
+class CatalogSpec:
+    """What one catalog aggregates: a resource search and a key extractor."""
+    name: str
+    resource_type: str
+    params: Dict[str, str]
+    extract: Extractor
+
+
+@dataclass
+class CatalogEntry:
+    key: str
+    data: Dict[str, Any]
+    count: int
+
+
+@dataclass
+class _SyncState:
+    watermark: Optional[str]
+    synced_at: Optional[float]
+    lease_until: Optional[float]
+
+
+def _parse_instant(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class DynamicCatalogStore:
+    """SQLite-backed catalog aggregates shared by all workers on the host.
+
+    All SQLite work runs in `asyncio.to_thread` on a short-lived connection
+    per call (WAL, so readers never wait for a syncing worker).
+    """
+
+    def __init__(
+        self,
+        db_path: str = DYNAMIC_CATALOG_DB_PATH,
+        refresh_seconds: float = DYNAMIC_CATALOG_REFRESH_SECONDS,
+        lease_seconds: float = DYNAMIC_CATALOG_SYNC_LEASE_SECONDS,
+    ):
+        self._db = SharedSQLiteFile(db_path, _SCHEMA, "wintehr_dynamic_catalogs.db", "dynamic catalogs")
+        self.refresh_seconds = refresh_seconds
+        self.lease_seconds = lease_seconds
+        # catalog -> (synced_at, entries): skips re-reading unchanged rows
+        self._memo: Dict[str, Tuple[float, List[CatalogEntry]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    # -- SQLite (worker threads) ------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._db.connect()
+
+    def _read_state(self, catalog: str) -> _SyncState:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT watermark, synced_at, lease_until FROM catalog_sync WHERE catalog = ?",
+                (catalog,),
+            ).fetchone()
+        return _SyncState(*row) if row else _SyncState(None, None, None)
+
+    def _take_lease(self, catalog: str, now: float) -> bool:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR IGNORE INTO catalog_sync (catalog) VALUES (?)", (catalog,))
+            cur = conn.execute(
+                "UPDATE catalog_sync SET lease_until = ? "
+                "WHERE catalog = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (now + self.lease_seconds, catalog, now),
+            )
+            return cur.rowcount == 1
+
+    def _release_lease(self, catalog: str) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE catalog_sync SET lease_until = NULL WHERE catalog = ?", (catalog,))
+
+    def _apply(
+        self,
+        catalog: str,
+        changes: Dict[str, Optional[Tuple[str, Dict[str, Any]]]],
+        watermark: Optional[str],
+        full: bool,
+    ) -> None:
+        """Write one sync pass in a single transaction."""
+        with closing(self._connect()) as conn, conn:
+            if full:
+                conn.execute("DELETE FROM catalog_resources WHERE catalog = ?", (catalog,))
+                conn.execute("DELETE FROM catalog_entries WHERE catalog = ?", (catalog,))
+            for resource_id, item in changes.items():
+                if item is None:
+                    # Edited so it no longer carries a code
+                    conn.execute(
+                        "DELETE FROM catalog_resources WHERE catalog = ? AND resource_id = ?",
+                        (catalog, resource_id),
+                    )
+                    continue
+                key, data = item
+                conn.execute(
+                    "INSERT INTO catalog_resources (catalog, resource_id, key) VALUES (?, ?, ?) "
+                    "ON CONFLICT (catalog, resource_id) DO UPDATE SET key = excluded.key",
+                    (catalog, resource_id, key),
+                )
+                conn.execute(
+                    "INSERT INTO catalog_entries (catalog, key, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT (catalog, key) DO UPDATE SET data = excluded.data",
+                    (catalog, key, json.dumps(data)),
+                )
+            conn.execute(
+                "DELETE FROM catalog_entries WHERE catalog = ? AND key NOT IN "
+                "(SELECT key FROM catalog_resources WHERE catalog = ?)",
+                (catalog, catalog),
+            )
+            conn.execute(
+                "UPDATE catalog_sync SET watermark = ?, synced_at = ?, lease_until = NULL "
+                "WHERE catalog = ?",
+                (watermark, time.time(), catalog),
+            )
+
+    def _read_entries(self, catalog: str) -> List[CatalogEntry]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT e.key, e.data, COUNT(*) AS n "
+                "FROM catalog_entries e "
+                "JOIN catalog_resources r ON r.catalog = e.catalog AND r.key = e.key "
+                "WHERE e.catalog = ? "
+                "GROUP BY e.key ORDER BY n DESC, e.key",
+                (catalog,),
+            ).fetchall()
+        return [CatalogEntry(key, json.loads(data), n) for key, data, n in rows]
+
+    # -- async API --------------------------------------------------------
+
+    async def get_entries(self, spec: CatalogSpec, limit: Optional[int] = None) -> List[CatalogEntry]:
+        """Entries by descending count, syncing first if the catalog is stale."""
+        try:
+            state = await asyncio.to_thread(self._read_state, spec.name)
+            if state.synced_at is None or time.time() - state.synced_at >= self.refresh_seconds:
+                await self.sync(spec)
+                state = await asyncio.to_thread(self._read_state, spec.name)
+
+            memo = self._memo.get(spec.name)
+            if memo is not None and state.synced_at is not None and memo[0] == state.synced_at:
+                entries = memo[1]
+            else:
+                entries = await asyncio.to_thread(self._read_entries, spec.name)
+                if state.synced_at is not None:
+                    self._memo[spec.name] = (state.synced_at, entries)
+        except sqlite3.Error as exc:
+            logger.error(f"Dynamic catalog store unavailable for {spec.name}: {exc}")
+            return []
+        return entries[:limit] if limit else list(entries)
+
+    async def sync(self, spec: CatalogSpec, full: bool = False) -> bool:
+        """Pull what changed since the watermark. Returns False if skipped or failed."""
+        lock = self._locks.setdefault(spec.name, asyncio.Lock())
+        async with lock:
+            state = await asyncio.to_thread(self._read_state, spec.name)
+            if not full and state.synced_at is not None and time.time() - state.synced_at < self.refresh_seconds:
+                return True  # another caller in this worker just synced it
+
+            if not await asyncio.to_thread(self._take_lease, spec.name, time.time()):
+                # Another worker is syncing. A catalog that has data keeps
+                # serving it; a never-synced one waits for the first pass.
+                if state.synced_at is None:
+                    await self._wait_for_first_sync(spec.name)
+                return False
+
+            try:
+                watermark = None if full else state.watermark
+                changes, new_watermark = await self._pull(spec, watermark)
+                await asyncio.to_thread(self._apply, spec.name, changes, new_watermark, full)
+            except Exception as e:
+                logger.error(f"Error syncing {spec.name} catalog: {e}")
+                await asyncio.to_thread(self._release_lease, spec.name)
+                return False
+
+        logger.info(
+            f"Synced {spec.name} catalog: {len(changes)} "
+            f"{'resources' if full or watermark is None else 'changed resources'}"
+        )
+        return True
+
+    async def _pull(
+        self,
+        spec: CatalogSpec,
+        watermark: Optional[str],
+    ) -> Tuple[Dict[str, Optional[Tuple[str, Dict[str, Any]]]], Optional[str]]:
+        params = dict(spec.params)
+        params["_sort"] = "_lastUpdated"
+        if watermark:
+            params["_lastUpdated"] = f"ge{watermark}"
+
+        started = datetime.now(timezone.utc)
+        latest = _parse_instant(watermark)
+        changes: Dict[str, Optional[Tuple[str, Dict[str, Any]]]] = {}
+        saw_stamp = False
+        async for resource in HAPIFHIRClient().search_iter(spec.resource_type, params):
+            resource_id = resource.get('id')
+            if not resource_id:
+                continue
+            changes[resource_id] = spec.extract(resource)
+            stamp = _parse_instant((resource.get('meta') or {}).get('lastUpdated'))
+            if stamp is not None:
+                saw_stamp = True
+                if latest is None or stamp > latest:
+                    latest = stamp
+
+        if changes and not saw_stamp:
+            # Server didn't return meta.lastUpdated; fall back to our clock
+            latest = started
+        return changes, latest.isoformat() if latest else None
+
+    async def _wait_for_first_sync(self, catalog: str) -> None:
+        deadline = time.monotonic() + DYNAMIC_CATALOG_FIRST_SYNC_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+            state = await asyncio.to_thread(self._read_state, catalog)
+            if state.synced_at is not None or state.lease_until is None:
+                return
+
+    async def synced_catalogs(self) -> Dict[str, float]:
+        """catalog -> last sync time (epoch seconds) for every synced catalog."""
+        def read() -> Dict[str, float]:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT catalog, synced_at FROM catalog_sync WHERE synced_at IS NOT NULL"
+                ).fetchall()
+            return dict(rows)
+        try:
+            return await asyncio.to_thread(read)
+        except sqlite3.Error as exc:
+            logger.error(f"Dynamic catalog store unavailable: {exc}")
+            return {}
+
+    def clear_memo(self) -> None:
+        self._memo.clear()
+
+
+_dynamic_catalog_store: Optional[DynamicCatalogStore] = None
+
+
+def get_dynamic_catalog_store() -> DynamicCatalogStore:
+    """Return the process-wide store (the SQLite file is shared by workers)."""
+    global _dynamic_catalog_store
+    if _dynamic_catalog_store is None:
+        _dynamic_catalog_store = DynamicCatalogStore()
+    return _dynamic_catalog_store
@@ -6,7 +6,9 @@
 
 Architecture:
 - Uses HAPIFHIRClient for all FHIR operations (no direct DB access)
-- Caches relationship information with TTL for performance
+- Caches relationship information in the shared FHIRResourceCache
+  (services/fhir_resource_cache.py): TTL + LRU bounded, and dropped when
+  any resource type in the graph is written
 - Extracts references from resources and resolves them through FHIR API
 - Uses FHIR reverse chaining (_has) for incoming relationships
 
@@ -18,11 +20,12 @@
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Dict, Any, List, Optional, Set, Tuple
 from collections import defaultdict
 
 from services.hapi_fhir_client import HAPIFHIRClient
+from services.fhir_resource_cache import get_resource_cache, patient_id_of, patient_tag, resource_tag, type_tag
 from shared.exceptions import FHIRConnectionError, FHIRResourceNotFoundError
 
 from api.fhir.reference_fields import REFERENCE_FIELDS as CANONICAL_REFERENCE_FIELDS
@@ -94,19 +97,33 @@ def __init__(self, cache_ttl_seconds: int = 300):
         """
         self.hapi_client = HAPIFHIRClient()
         self.cache_ttl = timedelta(seconds=cache_ttl_seconds)
-        self._cache: Dict[str, Tuple[datetime, Dict[str, Any]]] = {}
+        self._cache = get_resource_cache()
         self._lock = asyncio.Lock()
 
-    def _get_cache_key(self, resource_type: str, resource_id: str, depth: int) -> str:
+    def _get_cache_key(self, resource_type: str, resource_id: str, depth: int) -> Tuple[str, str, str, int]:
         """Generate cache key for relationship discovery."""
-        return f"{resource_type}/{resource_id}:depth={depth}"
+        return ("relationships", resource_type, resource_id, depth)
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check if cached value is still valid."""
-        if cache_key not in self._cache:
-            return False
-        cached_time, _ = self._cache[cache_key]
-        return datetime.utcnow() - cached_time < self.cache_ttl
+    def _cache_tags(
+        self,
+        resource_type: str,
+        resource_id: str,
+        source_resource: Dict[str, Any],
+        result: Dict[str, Any]
+    ) -> Set[str]:
+        """Invalidation tags: the graph changes when any type in it is written."""
+        tags = {
+            "relationships",
+            f"relationships:{resource_type}",
+            f"relationships:{resource_type}/{resource_id}",
+            resource_tag(resource_type, resource_id),
+            type_tag(resource_type),
+        }
+        tags.update(type_tag(node["resourceType"]) for node in result["nodes"] if node.get("resourceType"))
+        patient_id = patient_id_of(source_resource)
+        if patient_id:
+            tags.add(patient_tag(patient_id))
+        return tags
 
     def get_relationship_schema(self) -> Dict[str, Any]:
         """
@@ -145,14 +162,14 @@ async def discover_relationships(
         cache_key = self._get_cache_key(resource_type, resource_id, depth)
 
         # Check cache
-        if self._is_cache_valid(cache_key):
-            _, cached_result = self._cache[cache_key]
+        cached_result = self._cache.get(cache_key)
+        if cached_result is not None:
             return {**cached_result, "cached": True}
 
         async with self._lock:
             # Double-check after acquiring lock
-            if self._is_cache_valid(cache_key):
-                _, cached_result = self._cache[cache_key]
+            cached_result = self._cache.get(cache_key)
+            if cached_result is not None:
                 return {**cached_result, "cached": True}
 
             try:
@@ -188,7 +205,12 @@ async def discover_relationships(
                 )
 
                 # Cache the result
-                self._cache[cache_key] = (datetime.utcnow(), result)
+                self._cache.set(
+                    cache_key,
+                    result,
+                    tags=self._cache_tags(resource_type, resource_id, source_resource, result),
+                    ttl=self.cache_ttl.total_seconds()
+                )
 
                 return {**result, "cached": False}
 
@@ -570,19 +592,11 @@ def invalidate_cache(
             resource_id: Optional - if resource_type also given, invalidate specific resource
         """
         if resource_type is None:
-            self._cache.clear()
+            self._cache.invalidate_tags("relationships")
         elif resource_id:
-            # Clear entries starting with this resource
-            prefix = f"{resource_type}/{resource_id}:"
-            keys_to_remove = [k for k in self._cache.keys() if k.startswith(prefix)]
-            for key in keys_to_remove:
-                self._cache.pop(key, None)
+            self._cache.invalidate_tags(f"relationships:{resource_type}/{resource_id}")
         else:
-            # Clear all entries for resource type
-            prefix = f"{resource_type}/"
-            keys_to_remove = [k for k in self._cache.keys() if k.startswith(prefix)]
-            for key in keys_to_remove:
-                self._cache.pop(key, None)
+            self._cache.invalidate_tags(f"relationships:{resource_type}")
 
 
 # Module-level singleton for shared cache
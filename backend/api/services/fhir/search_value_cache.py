@@ -6,7 +6,8 @@
 
 Architecture:
 - Uses HAPIFHIRClient for all FHIR operations (no direct DB access)
-- Caches results with TTL for performance
+- Caches results in the shared FHIRResourceCache (services/fhir_resource_cache.py):
+  TTL + LRU bounded, and dropped when the resource type is written
 - Extracts values from search results and aggregates them
 - Falls back to standard value sets for well-known parameters
 
@@ -18,11 +19,12 @@
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Dict, Any, List, Optional, Tuple
 from collections import defaultdict
 
 from services.hapi_fhir_client import HAPIFHIRClient
+from services.fhir_resource_cache import get_resource_cache, type_tag
 from shared.exceptions import FHIRConnectionError
 
 logger = logging.getLogger(__name__)
@@ -124,19 +126,12 @@ def __init__(self, cache_ttl_seconds: int = 300):
         """
         self.hapi_client = HAPIFHIRClient()
         self.cache_ttl = timedelta(seconds=cache_ttl_seconds)
-        self._cache: Dict[str, Tuple[datetime, List[Dict[str, Any]]]] = {}
+        self._cache = get_resource_cache()
         self._lock = asyncio.Lock()
 
-    def _get_cache_key(self, resource_type: str, parameter_name: str) -> str:
+    def _get_cache_key(self, resource_type: str, parameter_name: str) -> Tuple[str, str, str]:
         """Generate cache key for resource type and parameter."""
-        return f"{resource_type}:{parameter_name}"
-
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check if cached value is still valid."""
-        if cache_key not in self._cache:
-            return False
-        cached_time, _ = self._cache[cache_key]
-        return datetime.utcnow() - cached_time < self.cache_ttl
+        return ("search_values", resource_type, parameter_name)
 
     async def get_distinct_values(
         self,
@@ -161,8 +156,8 @@ async def get_distinct_values(
         cache_key = self._get_cache_key(resource_type, parameter_name)
 
         # Check cache first
-        if self._is_cache_valid(cache_key):
-            _, cached_values = self._cache[cache_key]
+        cached_values = self._cache.get(cache_key)
+        if cached_values is not None:
             return {
                 "resource_type": resource_type,
                 "parameter": parameter_name,
@@ -173,8 +168,8 @@ async def get_distinct_values(
 
         async with self._lock:
             # Double-check after acquiring lock
-            if self._is_cache_valid(cache_key):
-                _, cached_values = self._cache[cache_key]
+            cached_values = self._cache.get(cache_key)
+            if cached_values is not None:
                 return {
                     "resource_type": resource_type,
                     "parameter": parameter_name,
@@ -195,7 +190,17 @@ async def get_distinct_values(
                 )
 
                 # Cache the results
-                self._cache[cache_key] = (datetime.utcnow(), values)
+                self._cache.set(
+                    cache_key,
+                    values,
+                    tags=(
+                        "search_values",
+                        f"search_values:{resource_type}",
+                        f"search_values:{resource_type}:{parameter_name}",
+                        type_tag(resource_type),
+                    ),
+                    ttl=self.cache_ttl.total_seconds()
+                )
 
                 return {
                     "resource_type": resource_type,
@@ -432,19 +437,13 @@ def invalidate_cache(
         """
         if resource_type is None:
             # Clear all cache
-            self._cache.clear()
+            self._cache.invalidate_tags("search_values")
         elif parameter_name:
             # Clear specific entry
-            cache_key = self._get_cache_key(resource_type, parameter_name)
-            self._cache.pop(cache_key, None)
+            self._cache.invalidate_tags(f"search_values:{resource_type}:{parameter_name}")
         else:
             # Clear all entries for resource type
-            keys_to_remove = [
-                k for k in self._cache.keys()
-                if k.startswith(f"{resource_type}:")
-            ]
-            for key in keys_to_remove:
-                self._cache.pop(key, None)
+            self._cache.invalidate_tags(f"search_values:{resource_type}")
 
 
 # Module-level singleton for shared cache
@@ -17,6 +17,7 @@
 from sqlalchemy import text
 
 from database import get_db_session, engine
+from services.hapi_fhir_client import get_pool_stats as get_fhir_pool_stats
 
 import logging
 
@@ -55,6 +56,15 @@ async def get_pool_status() -> Dict[str, Any]:
         }
 
 
+def get_fhir_client_pool_stats_safe() -> Dict[str, Any]:
+    """Pool stats, never raising — monitoring must not fail on a stats bug."""
+    try:
+        return get_fhir_pool_stats()
+    except Exception as e:
+        logger.warning(f"Failed to read FHIR client pool stats: {e}")
+        return {"initialized": False, "error": str(e)}
+
+
 class PoolManager:
     """Simple pool manager stub."""
 
@@ -146,6 +156,18 @@ async def get_system_health():
 
     # TODO: Add HAPI FHIR metrics endpoint integration: http://hapi-fhir:8080/actuator/metrics
 
+    # Shared HAPI FHIR client pool (services/hapi_fhir_client.py)
+    fhir_pool = get_fhir_client_pool_stats_safe()
+    health_status["components"]["fhir_client_pool"] = {
+        "status": "healthy",
+        "in_use": fhir_pool.get("requests", {}).get("in_use", 0),
+        "waiting": fhir_pool.get("requests", {}).get("waiting", 0),
+        "idle_connections": fhir_pool.get("connections", {}).get("idle", 0),
+        "avg_wait_ms": fhir_pool.get("wait_time_ms", {}).get("avg", 0),
+        "coalesced_calls": fhir_pool.get("coalescing", {}).get("coalesced_calls", 0),
+        "cache_hit_rate": fhir_pool.get("cache", {}).get("hit_rate", 0),
+    }
+
     # Check system resources
     health_status["components"]["system"] = {
         "status": "healthy",
@@ -202,6 +224,22 @@ async def get_connection_pool_status():
         raise HTTPException(status_code=500, detail=f"Failed to get pool status: {str(e)}")
 
 
+@monitoring_router.get("/fhir-client/pool")
+async def get_fhir_client_pool_status():
+    """
+    Get statistics for the shared HAPI FHIR HTTP connection pool.
+
+    Returns pool configuration, open/idle/active connections, in-flight
+    and waiting requests, time spent waiting for a per-host slot, how
+    many identical concurrent reads were coalesced into one upstream call,
+    and shared resource cache hit/miss/eviction counters.
+    """
+    return {
+        "timestamp": datetime.now().isoformat(),
+        **get_fhir_client_pool_stats_safe()
+    }
+
+
 @monitoring_router.get("/queries/slow")
 async def get_slow_queries(
     db: AsyncSession = Depends(get_db_session),
@@ -3,12 +3,13 @@
 import asyncio
 import json
 import logging
-from typing import Dict, List, Set, Optional, Any
+from collections import defaultdict
+from typing import Dict, List, Set, Optional, Any, Tuple
 from datetime import datetime
 from fastapi import WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
 
-from .connection_pool import connection_pool, ConnectionState
+from .connection_pool import connection_pool, ConnectionState, encode_message
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +60,14 @@ class ConnectionManager:
     def __init__(self):
         self.subscriptions: Dict[str, List[Subscription]] = {}
         self.pool = connection_pool  # Use the global connection pool
+
+        # Inverted subscription index, keyed by (client_id, subscription_id).
+        # An empty resource_types/patient_ids list means "any", so those
+        # subscriptions sit in the wildcard sets instead.
+        self._subs_by_type: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._subs_by_patient: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._subs_any_type: Set[Tuple[str, str]] = set()
+        self._subs_any_patient: Set[Tuple[str, str]] = set()
         
         # Legacy compatibility - redirect to pool
         self._active_connections_redirect = True
@@ -109,12 +118,10 @@ async def subscribe(
             self.subscriptions[client_id] = []
             
         # Remove existing subscription with same ID
-        self.subscriptions[client_id] = [
-            s for s in self.subscriptions[client_id]
-            if s.id != subscription_id
-        ]
+        self._remove_subscription(client_id, subscription_id)
         
         self.subscriptions[client_id].append(subscription)
+        self._index_subscription(subscription)
         
         # Join appropriate rooms in the connection pool
         if resource_types:
@@ -153,11 +160,7 @@ async def subscribe(
         
     async def unsubscribe(self, client_id: str, subscription_id: str):
         """Remove a subscription."""
-        if client_id in self.subscriptions:
-            self.subscriptions[client_id] = [
-                s for s in self.subscriptions[client_id]
-                if s.id != subscription_id
-            ]
+        self._remove_subscription(client_id, subscription_id)
             
         # Send confirmation
         await self._send_message(
@@ -173,6 +176,64 @@ async def unsubscribe(self, client_id: str, subscription_id: str):
         
         logger.info(f"Removed subscription {subscription_id} for client {client_id}")
         
+    def _remove_subscription(self, client_id: str, subscription_id: str):
+        """Drop a client's subscription from the list and the index."""
+        remaining = []
+        for subscription in self.subscriptions.get(client_id, []):
+            if subscription.id == subscription_id:
+                self._unindex_subscription(subscription)
+            else:
+                remaining.append(subscription)
+        if client_id in self.subscriptions:
+            self.subscriptions[client_id] = remaining
+
+    def _index_subscription(self, subscription: Subscription):
+        key = (subscription.client_id, subscription.id)
+        if subscription.resource_types:
+            for resource_type in subscription.resource_types:
+                self._subs_by_type[resource_type].add(key)
+        else:
+            self._subs_any_type.add(key)
+        if subscription.patient_ids:
+            for patient_id in subscription.patient_ids:
+                self._subs_by_patient[patient_id].add(key)
+        else:
+            self._subs_any_patient.add(key)
+
+    def _unindex_subscription(self, subscription: Subscription):
+        key = (subscription.client_id, subscription.id)
+        for index, values in (
+            (self._subs_by_type, subscription.resource_types),
+            (self._subs_by_patient, subscription.patient_ids),
+        ):
+            for value in values:
+                keys = index.get(value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[value]
+        self._subs_any_type.discard(key)
+        self._subs_any_patient.discard(key)
+
+    def match_subscribers(self, resource_type: str, patient_id: Optional[str] = None) -> Set[str]:
+        """Client ids with a subscription matching the update.
+
+        Same result as checking Subscription.matches() for every
+        subscription, but costs about the number of matches.
+        """
+        by_type = self._subs_by_type.get(resource_type, set())
+        if patient_id:
+            by_patient = self._subs_by_patient.get(patient_id, set())
+            matched = (
+                (by_type & by_patient)
+                | (by_type & self._subs_any_patient)
+                | (self._subs_any_type & by_patient)
+                | (self._subs_any_type & self._subs_any_patient)
+            )
+        else:
+            matched = by_type | self._subs_any_type
+        return {client_id for client_id, _ in matched}
+
     async def broadcast_resource_update(
         self,
         resource_type: str,
@@ -193,6 +254,8 @@ async def broadcast_resource_update(
             },
             "timestamp": datetime.utcnow().isoformat()
         }
+        # Serialized once for every room and subscriber below
+        encoded = encode_message(message_data, coalesce_key=f"{resource_type}/{resource_id}")
         
         # Create room keys for efficient broadcasting
         rooms_to_broadcast = set()
@@ -205,16 +268,13 @@ async def broadcast_resource_update(
             rooms_to_broadcast.add(f"patient:{patient_id}")
             rooms_to_broadcast.add(f"patient:{patient_id}:resource:{resource_type}")
         
-        # Broadcast to each room
-        for room in rooms_to_broadcast:
-            await self.pool.broadcast_to_room(room, message_data)
-        
-        # Also handle legacy subscriptions
-        for client_id, client_subscriptions in self.subscriptions.items():
-            for subscription in client_subscriptions:
-                if subscription.matches(resource_type, patient_id):
-                    await self.pool.send_to_client(client_id, message_data)
-                    break
+        # One broadcast to the rooms plus legacy subscribers: a client that
+        # is in several rooms and/or also subscribed gets the update once
+        await self.pool.broadcast_to_rooms(
+            sorted(rooms_to_broadcast),
+            encoded,
+            clients=self.match_subscribers(resource_type, patient_id)
+        )
                     
     async def _send_message(self, client_id: str, message: WebSocketMessage):
         """Send a message to a specific client using the connection pool."""
@@ -274,9 +334,10 @@ async def handle_message(self, client_id: str, message: dict):
 
     async def broadcast_event_to_others(self, sender_id: str, message: dict):
         """Rebroadcast a client-published clinical event to all other clients."""
+        encoded = encode_message(message)
         for other_id in list(self.pool.connections.keys()):
             if other_id != sender_id:
-                await self.pool.send_to_client(other_id, message)
+                await self.pool.send_to_client(other_id, encoded)
             
 
 # Global connection manager instance
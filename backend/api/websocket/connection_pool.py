@@ -6,11 +6,12 @@
 """
 
 import asyncio
+import os
 import time
 import logging
-from typing import Dict, Set, List, Optional, Any
+from typing import Dict, Set, List, Optional, Any, Union
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import defaultdict, deque, OrderedDict
 from dataclasses import dataclass, field
 import weakref
 from enum import Enum
@@ -18,8 +19,34 @@
 from fastapi import WebSocket, WebSocketDisconnect
 import json
 
+try:
+    import orjson
+except ImportError:  # optional: ~5x faster broadcast encoding
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Per-connection outbound queue: max queued messages and what to do when full
+WS_SEND_QUEUE_SIZE = int(os.getenv('WS_SEND_QUEUE_SIZE', '256'))
+WS_SEND_QUEUE_POLICY = os.getenv('WS_SEND_QUEUE_POLICY', 'coalesce')
+
+
+@dataclass(frozen=True)
+class EncodedMessage:
+    """A message serialized once and shared by every recipient of a broadcast"""
+    text: str
+    size: int  # UTF-8 bytes, charged to each recipient's rate limit
+    coalesce_key: Optional[str] = None  # e.g. "Observation/123"; newer replaces queued
+
+
+def encode_message(message: Dict[str, Any], coalesce_key: Optional[str] = None) -> EncodedMessage:
+    """Serialize a message for sending (orjson when installed)"""
+    if orjson is not None:
+        data = orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
+        return EncodedMessage(text=data.decode(), size=len(data), coalesce_key=coalesce_key)
+    text = json.dumps(message, separators=(",", ":"))
+    return EncodedMessage(text=text, size=len(text.encode()), coalesce_key=coalesce_key)
+
 
 class ConnectionState(Enum):
     """WebSocket connection states"""
@@ -96,6 +123,98 @@ def _clean_old_entries(self, client_id: str, now: float):
             self.byte_counts[client_id].popleft()
 
 
+class OverflowPolicy(str, Enum):
+    """What a full per-client send queue does with a new message"""
+    DROP_OLDEST = "drop_oldest"  # discard the oldest queued message
+    COALESCE = "coalesce"        # replace a queued update to the same resource, else drop oldest
+    DISCONNECT = "disconnect"    # evict the slow consumer
+
+
+class ClientSendQueue:
+    """
+    Bounded outbound queue for one connection, drained by its writer task.
+
+    Broadcasts only enqueue, so a slow browser tab backs up its own queue
+    instead of holding up every other recipient.
+    """
+
+    def __init__(self, max_size: int = WS_SEND_QUEUE_SIZE, policy: OverflowPolicy = OverflowPolicy.COALESCE):
+        self.max_size = max_size
+        self.policy = OverflowPolicy(policy)
+
+        # Keyed by coalesce_key (COALESCE policy) or a sequence number, so a
+        # newer update can take an older one's place in line
+        self._items: "OrderedDict[Any, EncodedMessage]" = OrderedDict()
+        self._seq = 0
+        self._ready = asyncio.Event()
+        self._unfinished = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def put(self, message: EncodedMessage) -> bool:
+        """Queue a message. Returns False when the client should be evicted."""
+        key = message.coalesce_key if self.policy == OverflowPolicy.COALESCE else None
+        if key is not None and key in self._items:
+            self._items[key] = message
+            self.coalesced += 1
+            return True
+
+        if len(self._items) >= self.max_size:
+            if self.policy == OverflowPolicy.DISCONNECT:
+                self.dropped += 1
+                return False
+            self._items.popitem(last=False)
+            self._unfinished -= 1
+            self.dropped += 1
+
+        if key is None:
+            self._seq += 1
+            key = self._seq
+        self._items[key] = message
+        self._unfinished += 1
+        self._idle.clear()
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._ready.set()
+        return True
+
+    async def get(self) -> EncodedMessage:
+        """Next message to send; call task_done() once it has been sent."""
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        _, message = self._items.popitem(last=False)
+        return message
+
+    def task_done(self):
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._idle.set()
+
+    async def join(self):
+        """Wait until everything queued so far has been sent (or dropped)."""
+        await self._idle.wait()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+
 class ConnectionPool:
     """Manages WebSocket connections with pooling and optimization"""
     
@@ -105,13 +224,17 @@ def __init__(
         idle_timeout: int = 300,
         ping_interval: int = 30,
         max_message_size: int = 1024 * 1024,  # 1MB
-        enable_compression: bool = True
+        enable_compression: bool = True,
+        send_queue_size: int = WS_SEND_QUEUE_SIZE,
+        send_queue_policy: str = WS_SEND_QUEUE_POLICY
     ):
         self.max_connections = max_connections
         self.idle_timeout = idle_timeout
         self.ping_interval = ping_interval
         self.max_message_size = max_message_size
         self.enable_compression = enable_compression
+        self.send_queue_size = send_queue_size
+        self.send_queue_policy = OverflowPolicy(send_queue_policy)
         
         # Connection tracking
         self.connections: Dict[str, WebSocket] = {}
@@ -122,6 +245,11 @@ def __init__(
         self.rooms: Dict[str, Set[str]] = defaultdict(set)
         self.client_rooms: Dict[str, Set[str]] = defaultdict(set)
         
+        # Per-client outbound queues and the tasks draining them
+        self.send_queues: Dict[str, ClientSendQueue] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+        self.slow_consumers_evicted = 0
+        
         # Rate limiting
         self.rate_limiter = RateLimiter()
         
@@ -163,6 +291,10 @@ async def add_connection(
         self.connection_states[client_id] = ConnectionState.CONNECTED
         self.connection_metrics[client_id] = ConnectionMetrics()
         self._weak_connections[client_id] = websocket
+        self.send_queues[client_id] = ClientSendQueue(self.send_queue_size, self.send_queue_policy)
+        self._writers[client_id] = asyncio.create_task(
+            self._write_queued(client_id, self.send_queues[client_id])
+        )
         
         # Store metadata
         if metadata:
@@ -188,22 +320,30 @@ async def remove_connection(self, client_id: str):
         self.connection_metrics.pop(client_id, None)
         self.client_rooms.pop(client_id, None)
         self._weak_connections.pop(client_id, None)
+        self.send_queues.pop(client_id, None)
+        writer = self._writers.pop(client_id, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
         
         logger.info(f"Removed connection {client_id} from pool (remaining: {len(self.connections)})")
     
     async def send_to_client(
         self,
         client_id: str,
-        message: Dict[str, Any],
+        message: Union[Dict[str, Any], EncodedMessage],
         compress: Optional[bool] = None
     ) -> bool:
-        """Send a message to a specific client"""
+        """Send a message to a specific client.
+
+        Broadcasts pass an EncodedMessage so the message is serialized once,
+        not once per recipient.
+        """
         if client_id not in self.connections:
             return False
         
         websocket = self.connections[client_id]
-        message_str = json.dumps(message)
-        message_size = len(message_str.encode())
+        encoded = message if isinstance(message, EncodedMessage) else encode_message(message)
+        message_size = encoded.size
         
         # Check rate limits
         if not self.rate_limiter.check_rate_limit(client_id, message_size):
@@ -215,15 +355,15 @@ async def send_to_client(
             logger.warning(f"Message size {message_size} exceeds limit for client {client_id}")
             return False
         
+        metrics = self.connection_metrics[client_id]
         try:
             # Send with optional compression
             if compress is None:
                 compress = self.enable_compression
             
-            await websocket.send_text(message_str)
+            await websocket.send_text(encoded.text)
             
             # Update metrics
-            metrics = self.connection_metrics[client_id]
             metrics.messages_sent += 1
             metrics.bytes_sent += message_size
             metrics.update_activity()
@@ -236,17 +376,95 @@ async def send_to_client(
             await self.remove_connection(client_id)
             return False
     
+    def enqueue(self, client_id: str, message: Union[Dict[str, Any], EncodedMessage]) -> bool:
+        """Queue a message on a client's send queue without waiting for it.
+
+        Returns False if the client is gone or was evicted for overflowing
+        its queue (DISCONNECT policy).
+        """
+        queue = self.send_queues.get(client_id)
+        if queue is None:
+            return False
+        if not isinstance(message, EncodedMessage):
+            message = encode_message(message)
+        if queue.put(message):
+            return True
+
+        logger.warning(
+            f"Send queue for client {client_id} overflowed ({queue.max_size} messages), disconnecting slow consumer"
+        )
+        self.slow_consumers_evicted += 1
+        self.send_queues.pop(client_id, None)
+        asyncio.create_task(self._evict_slow_consumer(client_id))
+        return False
+
+    async def _evict_slow_consumer(self, client_id: str):
+        websocket = self.connections.get(client_id)
+        if websocket is not None:
+            try:
+                await websocket.close(code=1013, reason="Send queue overflow")
+            except Exception as e:
+                logger.debug(f"Error closing slow consumer {client_id}: {e}")
+        await self.remove_connection(client_id)
+
+    async def _write_queued(self, client_id: str, queue: ClientSendQueue):
+        """Writer task: drain one client's send queue in order"""
+        while client_id in self.connections:
+            message = await queue.get()
+            try:
+                await self.send_to_client(client_id, message)
+            finally:
+                queue.task_done()
+
+    async def drain_send_queues(self):
+        """Wait until every queued message has been sent (or dropped)"""
+        await asyncio.gather(*(queue.join() for queue in list(self.send_queues.values())))
+
+    def get_send_queue_stats(self) -> Dict[str, Any]:
+        """Aggregate send-queue depth and drop counters"""
+        queues = list(self.send_queues.values())
+        return {
+            "policy": self.send_queue_policy.value,
+            "max_size": self.send_queue_size,
+            "queued_messages": sum(q.depth for q in queues),
+            "deepest_queue": max((q.depth for q in queues), default=0),
+            "max_depth_seen": max((q.max_depth for q in queues), default=0),
+            "dropped": sum(q.dropped for q in queues),
+            "coalesced": sum(q.coalesced for q in queues),
+            "slow_consumers_evicted": self.slow_consumers_evicted,
+        }
+
     async def broadcast_to_room(
         self,
         room: str,
-        message: Dict[str, Any],
+        message: Union[Dict[str, Any], EncodedMessage],
         exclude_clients: Optional[Set[str]] = None,
         priority: int = 0
     ):
         """Broadcast a message to all clients in a room"""
+        await self.broadcast_to_rooms([room], message, exclude_clients=exclude_clients, priority=priority)
+
+    async def broadcast_to_rooms(
+        self,
+        rooms: List[str],
+        message: Union[Dict[str, Any], EncodedMessage],
+        clients: Optional[Set[str]] = None,
+        exclude_clients: Optional[Set[str]] = None,
+        priority: int = 0
+    ):
+        """Broadcast a message to the members of several rooms plus extra clients.
+
+        Recipients are the union, so a client in more than one of the rooms
+        (or also listed in clients) gets the message once.
+        """
+        # Serialize once here; grouping and every recipient reuse the text
+        if not isinstance(message, EncodedMessage):
+            message = encode_message(message)
+
         # Queue the broadcast for optimized processing
         await self.broadcast_queue.put({
-            'room': room,
+            'rooms': tuple(rooms),
+            'clients': set(clients or ()),
             'message': message,
             'exclude_clients': exclude_clients or set(),
             'priority': priority,
@@ -279,46 +497,43 @@ async def _process_broadcast_queue(self):
                     await asyncio.sleep(0.1)
                     continue
                 
-                # Group broadcasts by room and message
-                room_messages = defaultdict(list)
-                for broadcast in broadcasts:
-                    key = (broadcast['room'], json.dumps(broadcast['message']))
-                    room_messages[key].append(broadcast)
-                
-                # Send deduplicated messages
-                for (room, message_str), broadcast_list in room_messages.items():
-                    message = json.loads(message_str)
-                    exclude_clients = set()
-                    for b in broadcast_list:
-                        exclude_clients.update(b['exclude_clients'])
-                    
-                    await self._send_to_room_clients(room, message, exclude_clients)
+                await self._send_broadcasts(broadcasts)
                 
             except Exception as e:
                 logger.error(f"Error processing broadcast queue: {e}")
                 await asyncio.sleep(1)
+
+    async def _send_broadcasts(self, broadcasts: List[Dict[str, Any]]):
+        """Send a batch of queued broadcasts, deduplicating identical ones"""
+        # Group broadcasts by rooms and message
+        room_messages = defaultdict(list)
+        for broadcast in broadcasts:
+            key = (broadcast['rooms'], broadcast['message'].text)
+            room_messages[key].append(broadcast)
+        
+        # Send deduplicated messages
+        for (rooms, _), broadcast_list in room_messages.items():
+            message = broadcast_list[0]['message']
+            recipients = set()
+            exclude_clients = set()
+            for b in broadcast_list:
+                recipients.update(b['clients'])
+                exclude_clients.update(b['exclude_clients'])
+            for room in rooms:
+                recipients.update(self.rooms.get(room, ()))
+            
+            await self._send_to_clients(recipients - exclude_clients, message)
     
-    async def _send_to_room_clients(
+    async def _send_to_clients(
         self,
-        room: str,
-        message: Dict[str, Any],
-        exclude_clients: Set[str]
+        clients: Set[str],
+        message: EncodedMessage
     ):
-        """Send a message to all clients in a room"""
-        clients = self.rooms.get(room, set()) - exclude_clients
-        
-        if not clients:
-            return
-        
-        # Send concurrently with limited parallelism
-        semaphore = asyncio.Semaphore(50)  # Limit concurrent sends
-        
-        async def send_with_semaphore(client_id):
-            async with semaphore:
-                await self.send_to_client(client_id, message)
-        
-        tasks = [send_with_semaphore(client_id) for client_id in clients]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        """Queue a message for each of a set of clients"""
+        # Each client's writer task does the actual send, so a slow
+        # connection never holds up the rest of the batch
+        for client_id in clients:
+            self.enqueue(client_id, message)
     
     async def join_room(self, client_id: str, room: str):
         """Add a client to a room"""
@@ -349,15 +564,11 @@ async def _ping_clients(self):
                 await asyncio.sleep(self.ping_interval)
                 
                 # Ping all connected clients
-                ping_message = {"type": "ping", "timestamp": time.time()}
+                ping_message = encode_message({"type": "ping", "timestamp": time.time()})
                 dead_clients = []
                 
                 for client_id in list(self.connections.keys()):
-                    try:
-                        success = await self.send_to_client(client_id, ping_message)
-                        if not success:
-                            dead_clients.append(client_id)
-                    except Exception:
+                    if not self.enqueue(client_id, ping_message):
                         dead_clients.append(client_id)
                 
                 # Remove dead connections
@@ -405,6 +616,7 @@ def get_pool_stats(self) -> Dict[str, Any]:
             "total_messages_sent": total_messages_sent,
             "total_bytes_sent": total_bytes_sent,
             "total_errors": total_errors,
+            "send_queues": self.get_send_queue_stats(),
             "connections_by_state": dict(defaultdict(int, {
                 state.value: sum(1 for s in self.connection_states.values() if s == state)
                 for state in ConnectionState
@@ -1,7 +1,7 @@
 """FHIR notification service for broadcasting resource updates."""
 
 import logging
-from typing import Optional, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from .connection_manager import manager
 
 logger = logging.getLogger(__name__)
@@ -13,8 +13,42 @@ class FHIRNotificationService:
     Every notify method is failure-proof: a broadcast problem is logged and
     swallowed, because notifying must never break the write path that
     triggered it.
+
+    In-process consumers that keep state derived from FHIR (e.g. the
+    clinical inbox counters) subscribe with add_listener(); they hear every
+    created/updated/deleted notification whether or not any WebSocket
+    client is connected.
     """
 
+    def __init__(self):
+        self._listeners: List[Callable[..., Awaitable[None]]] = []
+
+    def add_listener(self, listener: Callable[..., Awaitable[None]]) -> None:
+        """Subscribe `await listener(action, resource_type, resource_id, resource_data)`.
+
+        `action` is "created", "updated" or "deleted"; `resource_data` is
+        None for deletes and may be empty when the writer had no body.
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[..., Awaitable[None]]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    async def _notify_listeners(
+        self,
+        action: str,
+        resource_type: str,
+        resource_id: str,
+        resource_data: Optional[Dict[str, Any]]
+    ):
+        for listener in list(self._listeners):
+            try:
+                await listener(action, resource_type, resource_id, resource_data)
+            except Exception as exc:  # noqa: BLE001 — never break the caller's write
+                logger.warning(f"FHIR notification listener failed (ignored): {exc}")
+
     async def _safe_broadcast(self, **kwargs):
         try:
             await manager.broadcast_resource_update(**kwargs)
@@ -39,7 +73,8 @@ async def notify_resource_created(
             subject_ref = resource_data.get("subject", {}).get("reference", "")
             if subject_ref.startswith("Patient/"):
                 patient_id = subject_ref.replace("Patient/", "")
-                
+
+        await self._notify_listeners("created", resource_type, resource_id, resource_data)
         await self._safe_broadcast(
             resource_type=resource_type,
             resource_id=resource_id,
@@ -65,7 +100,8 @@ async def notify_resource_updated(
             subject_ref = resource_data.get("subject", {}).get("reference", "")
             if subject_ref.startswith("Patient/"):
                 patient_id = subject_ref.replace("Patient/", "")
-                
+
+        await self._notify_listeners("updated", resource_type, resource_id, resource_data)
         await self._safe_broadcast(
             resource_type=resource_type,
             resource_id=resource_id,
@@ -82,6 +118,7 @@ async def notify_resource_deleted(
         patient_id: Optional[str] = None
     ):
         """Notify clients about a deleted FHIR resource."""
+        await self._notify_listeners("deleted", resource_type, resource_id, None)
         await self._safe_broadcast(
             resource_type=resource_type,
             resource_id=resource_id,
@@ -26,6 +26,7 @@ async def get_websocket_stats(
         - Room statistics
         - Message throughput
         - Error counts
+        - Per-client send queue depth, drops and slow-consumer evictions
     """
     pool_stats = manager.pool.get_pool_stats()
     
@@ -43,12 +44,19 @@ async def get_websocket_stats(
         )
     }
     
+    send_queues = pool_stats["send_queues"]
+
     return {
         "pool": pool_stats,
         "subscriptions": subscription_stats,
+        "send_queues": send_queues,
         "health": {
             "status": "healthy" if pool_stats["total_connections"] > 0 else "idle",
-            "pool_utilization_percent": pool_stats["utilization"] * 100
+            "pool_utilization_percent": pool_stats["utilization"] * 100,
+            "send_queue_utilization_percent": (
+                send_queues["deepest_queue"] / send_queues["max_size"] * 100
+                if send_queues["max_size"] else 0
+            )
         }
     }
 
@@ -74,6 +82,10 @@ async def get_active_connections(
             "subscriptions": len(manager.subscriptions.get(client_id, [])),
             "rooms": list(manager.pool.client_rooms.get(client_id, set()))
         }
+
+        send_queue = manager.pool.send_queues.get(client_id)
+        if send_queue:
+            connection_info["send_queue"] = send_queue.get_stats()
         
         if metrics:
             connection_info.update({
@@ -108,6 +108,12 @@ async def api_health_check():
     }
 
 from api.websocket.connection_pool import connection_pool
+from services.hapi_fhir_client import close_shared_http_client
+from api.cds_hooks.providers.circuit_breaker import flush_circuit_breaker
+from api.cds_hooks.providers.remote_provider import close_origin_clients
+from services.terminology_service import close_terminology_service
+from api.dicom.render_pool import close_render_pool
+from api.dicom.prefetch import close_series_prefetcher
 
 # Startup event
 @app.on_event("startup")
@@ -118,6 +124,12 @@ async def startup_event():
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
+    await close_shared_http_client()
+    await close_origin_clients()
+    await flush_circuit_breaker()
+    close_terminology_service()
+    await close_series_prefetcher()
+    close_render_pool()
     await close_db()
 
 if __name__ == "__main__":
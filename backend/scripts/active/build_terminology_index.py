@@ -37,7 +37,11 @@
 
 The build is idempotent: drops the existing tables and rebuilds. SQLite
 file lives at the path passed via --output (deploy.sh writes
-/app/data/terminology.db).
+/app/data/terminology.db). The index is built next to it under a
+temporary name and renamed into place when complete, so a running backend
+never sees a half-built file and can switch to the new one without a
+restart (`LocalTerminologyIndex` opens the file immutable and notices the
+rename).
 
 Usage (typically via deploy.sh; see ops):
 
@@ -52,6 +56,7 @@
 import argparse
 import json
 import logging
+import os
 import sqlite3
 import sys
 import time
@@ -108,6 +113,7 @@ def _create_schema(conn: sqlite3.Connection) -> None:
         """
         DROP TABLE IF EXISTS concepts_fts;
         DROP TABLE IF EXISTS concepts;
+        DROP TABLE IF EXISTS domain_ranges;
 
         CREATE TABLE concepts (
             domain  TEXT NOT NULL,
@@ -117,12 +123,24 @@ def _create_schema(conn: sqlite3.Connection) -> None:
             PRIMARY KEY (domain, system, code)
         );
 
-        -- FTS5 with unicode61 + remove_diacritics so 'metformin' matches
-        -- 'Metformin'. content='concepts' makes FTS a contentless shadow
-        -- of the main table; rowid pairing is via the FTS-managed rowid.
+        -- FTS5 with unicode61 so 'metformin' matches 'Metformin'. Rows
+        -- share rowids with `concepts`. prefix='2 3 4' adds prefix indexes
+        -- for 2-4 character prefixes, so autocomplete on "di"/"dia"/"diab"
+        -- reads one index entry instead of expanding every matching term.
         CREATE VIRTUAL TABLE concepts_fts USING fts5(
             display,
-            tokenize='unicode61'
+            tokenize='unicode61',
+            prefix='2 3 4'
+        );
+
+        -- Domain partitioning: each domain's concepts are inserted in one
+        -- batch, so they occupy one contiguous rowid range in both tables.
+        -- Search constrains the FTS query to that range (FTS5 seeks rowid
+        -- ranges natively) instead of joining every hit to filter on domain.
+        CREATE TABLE domain_ranges (
+            domain     TEXT PRIMARY KEY,
+            min_rowid  INTEGER NOT NULL,
+            max_rowid  INTEGER NOT NULL
         );
         """
     )
@@ -172,6 +190,12 @@ def _ingest_domain(
         "SELECT rowid, display FROM concepts WHERE domain = ?",
         (domain,),
     )
+    cur.execute(
+        "INSERT INTO domain_ranges (domain, min_rowid, max_rowid) "
+        "SELECT domain, MIN(rowid), MAX(rowid) FROM concepts WHERE domain = ? "
+        "GROUP BY domain",
+        (domain,),
+    )
     conn.commit()
     return len(rows)
 
@@ -183,12 +207,14 @@ def build_index(
 ) -> int:
     """Build the SQLite index. Returns total concept count."""
     output_db.parent.mkdir(parents=True, exist_ok=True)
-    if output_db.exists():
-        output_db.unlink()
-
-    conn = sqlite3.connect(str(output_db))
-    # WAL gives concurrent readers + a single writer, the right shape for
-    # a backend that holds a long-lived read connection.
+    building = output_db.with_name(output_db.name + ".building")
+    for leftover in (building, Path(f"{building}-wal"), Path(f"{building}-shm")):
+        if leftover.exists():
+            leftover.unlink()
+
+    conn = sqlite3.connect(str(building))
+    # WAL keeps the bulk inserts cheap; the journal is folded back in
+    # before the rename (readers open the file immutable and ignore WAL).
     conn.execute("PRAGMA journal_mode = WAL")
     conn.execute("PRAGMA synchronous = NORMAL")
 
@@ -222,12 +248,24 @@ def build_index(
         conn.execute("CREATE INDEX idx_concepts_domain ON concepts(domain)")
         conn.commit()
 
+        # Merge the FTS b-trees built up by the per-domain inserts into one
+        # segment; the index is read-only from here on.
+        conn.execute("INSERT INTO concepts_fts (concepts_fts) VALUES ('optimize')")
+        conn.commit()
+
         # ANALYZE so the SQLite query planner picks reasonable plans for
         # the prefix-match queries the backend issues.
         conn.execute("ANALYZE")
-    finally:
+        conn.commit()
+        conn.execute("PRAGMA journal_mode = DELETE")
+    except BaseException:
         conn.close()
+        building.unlink(missing_ok=True)
+        raise
+    conn.close()
 
+    # Atomic on POSIX: open readers keep the old file until they close it
+    os.replace(building, output_db)
     return total
 
 
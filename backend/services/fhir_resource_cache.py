@@ -0,0 +1,266 @@
+"""
+FHIR Resource Cache - shared, bounded, write-invalidated cache
+
+One in-process cache for FHIR reads, searches and values derived from them
+(search-parameter values, relationship graphs, ValueSet expansions), instead
+of each service keeping its own unbounded dict with an ad-hoc TTL.
+
+Architecture:
+- LRU order with a per-entry TTL, bounded by entry count AND a byte budget
+- Every entry carries invalidation tags:
+    type:{ResourceType}          any write to that type
+    res:{ResourceType}/{id}      a write to that resource
+    patient:{id}                 a write in that patient's compartment
+- Writes through HAPIFHIRClient.create/update/delete and the /fhir proxy
+  call invalidate_write(), which drops every entry tagged with the written
+  resource's type, id or patient
+- Hit/miss/eviction/invalidation counters for /api/monitoring
+
+Note: invalidation is per process. With several uvicorn workers a write
+only invalidates the worker that handled it; the TTL bounds how stale the
+other workers can be.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+FHIR_CACHE_MAX_ENTRIES = int(os.getenv('FHIR_CACHE_MAX_ENTRIES', '5000'))
+FHIR_CACHE_MAX_BYTES = int(os.getenv('FHIR_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+FHIR_CACHE_DEFAULT_TTL = float(os.getenv('FHIR_CACHE_DEFAULT_TTL', '60'))
+
+
+def type_tag(resource_type: str) -> str:
+    return f"type:{resource_type}"
+
+
+def resource_tag(resource_type: str, resource_id: str) -> str:
+    return f"res:{resource_type}/{resource_id}"
+
+
+def patient_tag(patient_id: str) -> str:
+    return f"patient:{patient_id}"
+
+
+def patient_id_of(resource: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Patient compartment of a resource (Patient itself, subject or patient)."""
+    if not isinstance(resource, dict):
+        return None
+    if resource.get("resourceType") == "Patient":
+        return resource.get("id")
+    for ref_field in ("subject", "patient"):
+        ref = (resource.get(ref_field) or {}).get("reference", "")
+        if ref.startswith("Patient/"):
+            return ref.split("/", 1)[1]
+    return None
+
+
+def patient_id_from_params(params: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Patient a search is scoped to (patient=/subject= param), if any."""
+    for name in ("patient", "subject"):
+        value = (params or {}).get(name)
+        if isinstance(value, str) and value and "," not in value:
+            return value.split("/", 1)[1] if value.startswith("Patient/") else value
+    return None
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 1024
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    expires_at: float
+    size: int
+    tags: Set[str] = field(default_factory=set)
+
+
+class FHIRResourceCache:
+    """
+    Bounded LRU + TTL cache with tag-based invalidation.
+
+    Keys are any hashable; by convention the first element names the
+    caller ("read", "search", "search_values", ...) so unrelated users can
+    share one instance without colliding.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = FHIR_CACHE_MAX_ENTRIES,
+        max_bytes: int = FHIR_CACHE_MAX_BYTES,
+        default_ttl: float = FHIR_CACHE_DEFAULT_TTL
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._tag_index: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+
+        # Bumped by every write invalidation. A reader snapshots it before
+        # fetching and passes it to set(), so a response that raced a write
+        # is not cached with pre-write data.
+        self.write_generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key, or None on miss/expiry. Refreshes LRU order."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: Iterable[str] = (),
+        ttl: Optional[float] = None,
+        size: Optional[int] = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """Store value under key with invalidation tags.
+
+        Args:
+            key: Cache key
+            value: Value to cache (callers must not mutate it afterwards)
+            tags: Invalidation tags (see type_tag/resource_tag/patient_tag)
+            ttl: Seconds to live (default: the cache's default_ttl)
+            size: Size in bytes if known; estimated from JSON otherwise
+            generation: write_generation read before fetching the value;
+                the value is dropped if a write has happened since
+        """
+        if generation is not None and generation != self.write_generation:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        size = size if size is not None else _estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        entry = _CacheEntry(
+            value=value,
+            expires_at=time.monotonic() + (self.default_ttl if ttl is None else ttl),
+            size=size,
+            tags=set(tags),
+        )
+        self._entries[key] = entry
+        self._bytes += size
+        for tag in entry.tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Drop every entry carrying any of tags. Returns the number dropped."""
+        keys: Set[Hashable] = set()
+        for tag in tags:
+            keys |= self._tag_index.get(tag, set())
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def invalidate_write(
+        self,
+        resource_type: str,
+        resource_id: Optional[str] = None,
+        resource: Optional[Dict[str, Any]] = None,
+        patient_id: Optional[str] = None
+    ) -> int:
+        """Invalidate everything a write to a resource could have changed.
+
+        Drops entries tagged with the resource type (searches, derived
+        values), the resource itself, and the patient compartment it
+        belongs to.
+        """
+        self.write_generation += 1
+        tags = [type_tag(resource_type)]
+        if resource_id:
+            tags.append(resource_tag(resource_type, resource_id))
+        patient_id = patient_id or patient_id_of(resource)
+        if patient_id:
+            tags.append(patient_tag(patient_id))
+        dropped = self.invalidate_tags(*tags)
+        if dropped:
+            logger.debug(f"FHIR cache: {resource_type}/{resource_id or '*'} write dropped {dropped} entries")
+        return dropped
+
+    def clear(self) -> None:
+        """Drop everything (e.g. after a transaction Bundle of unknown scope)."""
+        self.write_generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tag_index.clear()
+        self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "default_ttl_s": self.default_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Module-level singleton shared by the client and the derived caches
+_resource_cache: Optional[FHIRResourceCache] = None
+
+
+def get_resource_cache() -> FHIRResourceCache:
+    """Get or create the process-wide FHIRResourceCache."""
+    global _resource_cache
+    if _resource_cache is None:
+        _resource_cache = FHIRResourceCache()
+    return _resource_cache
@@ -8,6 +8,8 @@
 - Async/await compatible with FastAPI
 - Dict-based interface (matches HAPI FHIR JSON directly)
 - Lightweight proxy to HAPI FHIR server
+- One process-wide pooled httpx client shared by every instance
+  (keep-alive, per-host limits, optional HTTP/2)
 - HAPI FHIR handles validation, indexing, and storage
 
 Migration Note:
@@ -15,16 +17,389 @@
 All backend code now uses HAPIFHIRClient for async FHIR operations.
 """
 
+import asyncio
 import httpx
+import json
 import logging
 import os
-from typing import Dict, Any, Optional, List
+import socket
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Iterable, Optional, List, Tuple
+
+from services.fhir_resource_cache import (
+    get_resource_cache,
+    patient_id_from_params,
+    patient_id_of,
+    patient_tag,
+    resource_tag,
+    type_tag,
+)
 
 logger = logging.getLogger(__name__)
 
 # HAPI FHIR server configuration
 HAPI_FHIR_BASE_URL = os.getenv('HAPI_FHIR_URL', 'http://hapi-fhir:8080/fhir')
 
+# Shared connection pool configuration. Every HAPIFHIRClient — routers build
+# their own with HAPIFHIRClient() — goes through ONE process-wide
+# httpx.AsyncClient, so FHIR calls reuse keep-alive connections instead of
+# paying TCP setup (and an ephemeral port) per call.
+HAPI_FHIR_MAX_CONNECTIONS = int(os.getenv('HAPI_FHIR_MAX_CONNECTIONS', '100'))
+HAPI_FHIR_MAX_KEEPALIVE = int(os.getenv('HAPI_FHIR_MAX_KEEPALIVE', '20'))
+HAPI_FHIR_KEEPALIVE_EXPIRY = float(os.getenv('HAPI_FHIR_KEEPALIVE_EXPIRY', '30'))
+HAPI_FHIR_MAX_PER_HOST = int(os.getenv('HAPI_FHIR_MAX_PER_HOST', '50'))
+HAPI_FHIR_HTTP2 = os.getenv('HAPI_FHIR_HTTP2', 'false').lower() == 'true'
+
+# Identical concurrent reads/searches (chart-open storms: the CDS prefetch,
+# drug-interaction checks and the frontend all ask for the same Patient and
+# MedicationRequest search at once) share one upstream call.
+HAPI_FHIR_COALESCE_READS = os.getenv('HAPI_FHIR_COALESCE_READS', 'true').lower() == 'true'
+
+# Serve read()/search() from the shared FHIRResourceCache. Writes through
+# this client and the /fhir proxy invalidate it, but only in the worker that
+# handled them — so it is opt-in for multi-worker deployments, where other
+# workers can be up to HAPI_FHIR_CACHE_TTL seconds stale.
+HAPI_FHIR_CACHE_READS = os.getenv('HAPI_FHIR_CACHE_READS', 'false').lower() == 'true'
+HAPI_FHIR_CACHE_TTL = float(os.getenv('HAPI_FHIR_CACHE_TTL', '30'))
+
+# Guard rails for search_iter/search_all: how far a multi-page search may
+# follow Bundle.link[next] before stopping (and logging that it truncated).
+HAPI_FHIR_SEARCH_MAX_PAGES = int(os.getenv('HAPI_FHIR_SEARCH_MAX_PAGES', '100'))
+HAPI_FHIR_SEARCH_MAX_BYTES = int(os.getenv('HAPI_FHIR_SEARCH_MAX_BYTES', str(64 * 1024 * 1024)))
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that frees the per-host slot when closed.
+
+    The slot must outlive ``handle_async_request`` — a streamed response
+    still occupies its connection until the caller finishes reading it.
+    """
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """httpx transport that adds per-host concurrency limits and pool stats.
+
+    Wraps a keep-alive ``httpx.AsyncHTTPTransport``. httpx's own Limits are
+    global to the client; the per-host semaphore keeps one upstream from
+    taking every connection, and timing its acquisition is what gives us an
+    honest "waited for a connection" number for the monitoring endpoint.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HAPI_FHIR_MAX_CONNECTIONS,
+        max_keepalive: int = HAPI_FHIR_MAX_KEEPALIVE,
+        keepalive_expiry: float = HAPI_FHIR_KEEPALIVE_EXPIRY,
+        max_per_host: int = HAPI_FHIR_MAX_PER_HOST,
+        http2: bool = HAPI_FHIR_HTTP2,
+        inner: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if http2 and not _http2_available():
+            logger.warning("HAPI_FHIR_HTTP2 requested but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.max_per_host = min(max_per_host, max_connections)
+        self.http2 = http2
+
+        self._inner = inner or httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+        )
+        self._host_slots: Dict[Tuple[str, str, Optional[int]], asyncio.Semaphore] = {}
+
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.wait_time_total_ms = 0.0
+        self.wait_time_max_ms = 0.0
+
+    def _slot_for(self, url: httpx.URL) -> asyncio.Semaphore:
+        key = (url.scheme, url.host, url.port)
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_per_host)
+            self._host_slots[key] = slot
+        return slot
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._slot_for(request.url)
+
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            await slot.acquire()
+        finally:
+            self.waiting -= 1
+        waited_ms = (time.monotonic() - started) * 1000
+        self.wait_time_total_ms += waited_ms
+        self.wait_time_max_ms = max(self.wait_time_max_ms, waited_ms)
+        self.requests_total += 1
+        self.in_flight += 1
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.in_flight -= 1
+                slot.release()
+
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            self.errors_total += 1
+            release()
+            raise
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+    def discard(self) -> None:
+        """Close the pooled sockets without awaiting anything.
+
+        For a pool whose event loop is gone: its connections can no longer
+        be shut down gracefully, but they must not stay open. Each is shut
+        down through a duplicate of its descriptor; the original is freed
+        with the dead loop's transport objects.
+        """
+        connections = getattr(getattr(self._inner, "_pool", None), "connections", None) or []
+        for connection in list(connections):
+            stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+            sock = stream.get_extra_info("socket") if stream is not None else None
+            if sock is None:
+                continue
+            try:
+                with socket.fromfd(sock.fileno(), sock.family, sock.type) as dup:
+                    dup.shutdown(socket.SHUT_RDWR)
+            except (OSError, ValueError):
+                pass  # already closed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of pool configuration, usage and wait times."""
+        # httpcore exposes its live connections on the pool; degrade to
+        # zeros rather than fail the monitoring endpoint if that moves.
+        connections = getattr(getattr(self._inner, "_pool", None), "connections", None) or []
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "config": {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive,
+                "keepalive_expiry_s": self.keepalive_expiry,
+                "max_per_host": self.max_per_host,
+                "http2": self.http2,
+            },
+            "connections": {
+                "open": len(connections),
+                "idle": idle,
+                "active": len(connections) - idle,
+            },
+            "requests": {
+                "total": self.requests_total,
+                "errors": self.errors_total,
+                "in_use": self.in_flight,
+                "waiting": self.waiting,
+            },
+            "wait_time_ms": {
+                "avg": round(self.wait_time_total_ms / self.requests_total, 3) if self.requests_total else 0.0,
+                "max": round(self.wait_time_max_ms, 3),
+            },
+        }
+
+
+_shared_client: Optional[httpx.AsyncClient] = None
+_shared_transport: Optional[PooledTransport] = None
+_shared_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide pooled httpx client used for HAPI FHIR calls.
+
+    Created lazily on first use. A client is bound to the event loop that
+    opened its connections, so a new loop (tests, a reloaded worker) gets a
+    fresh client rather than reusing sockets from a dead loop; the old one
+    is closed, not just dropped.
+    """
+    global _shared_client, _shared_transport, _shared_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _shared_client is None or _shared_client.is_closed or _shared_client_loop is not loop:
+        _retire_shared_client(_shared_client, _shared_transport, _shared_client_loop)
+        _shared_transport = PooledTransport()
+        _shared_client = httpx.AsyncClient(transport=_shared_transport, timeout=30.0)
+        _shared_client_loop = loop
+    return _shared_client
+
+
+def _retire_shared_client(
+    client: Optional[httpx.AsyncClient],
+    transport: Optional[PooledTransport],
+    loop: Optional[asyncio.AbstractEventLoop]
+) -> None:
+    """Close a shared client that belongs to another event loop."""
+    if client is None or client.is_closed:
+        return
+    if loop is not None and loop.is_running():
+        # Still serving another thread: close it there, gracefully
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    elif transport is not None:
+        transport.discard()
+
+
+async def close_shared_http_client() -> None:
+    """Close the shared pool. Called from the application shutdown hook."""
+    global _shared_client, _shared_transport, _shared_client_loop
+
+    client, transport, loop = _shared_client, _shared_transport, _shared_client_loop
+    _shared_client = None
+    _shared_transport = None
+    _shared_client_loop = None
+    if loop is not None and loop is not asyncio.get_running_loop():
+        _retire_shared_client(client, transport, loop)
+    elif client is not None and not client.is_closed:
+        await client.aclose()
+
+
+class SingleFlight:
+    """
+    Collapse identical in-flight GETs into one upstream request.
+
+    The first caller for a key starts the request; callers arriving while
+    it is in flight await the same task. Only in-flight calls are shared —
+    nothing is cached once the response lands. Waiters are shielded, so one
+    caller being cancelled doesn't cancel the request for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    async def do(self, key: Tuple, fetch):
+        future = self._in_flight.get(key)
+        if future is not None and not future.done():
+            self.coalesced_calls += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fetch())
+        self._in_flight[key] = future
+        self.upstream_calls += 1
+
+        def forget(done):
+            if self._in_flight.get(key) is done:
+                del self._in_flight[key]
+
+        future.add_done_callback(forget)
+        return await asyncio.shield(future)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.upstream_calls + self.coalesced_calls
+        return {
+            "enabled": HAPI_FHIR_COALESCE_READS,
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "in_flight": len(self._in_flight),
+            "coalesced_ratio": round(self.coalesced_calls / total, 3) if total else 0.0,
+        }
+
+
+def _request_key(url: str, params: Optional[Dict[str, Any]]) -> Tuple:
+    """Order-insensitive key for a GET: same URL + same params = same key."""
+    normalized = []
+    for name, value in (params or {}).items():
+        if isinstance(value, (list, tuple)):
+            value = tuple(str(v) for v in value)
+        else:
+            value = str(value)
+        normalized.append((str(name), value))
+    return (url.rstrip("/"), tuple(sorted(normalized)))
+
+
+_single_flight = SingleFlight()
+
+# In-process consumers of FHIR writes (e.g. the clinical inbox counters).
+# Many routers write through HAPIFHIRClient without ever calling
+# FHIRNotificationService, so create/update/delete here is the one funnel
+# every such write passes, next to the cache invalidation.
+_write_listeners: List[Callable[..., Awaitable[None]]] = []
+
+
+def add_write_listener(listener: Callable[..., Awaitable[None]]) -> None:
+    """Subscribe `await listener(action, resource_type, resource_id, resource)`.
+
+    Same signature as FHIRNotificationService listeners: `action` is
+    "created", "updated" or "deleted" and `resource` is what HAPI returned
+    (None for deletes). Called after the write succeeded.
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def remove_write_listener(listener: Callable[..., Awaitable[None]]) -> None:
+    if listener in _write_listeners:
+        _write_listeners.remove(listener)
+
+
+async def _announce_write(
+    action: str,
+    resource_type: str,
+    resource_id: Optional[str],
+    resource: Optional[Dict[str, Any]]
+) -> None:
+    for listener in list(_write_listeners):
+        try:
+            await listener(action, resource_type, resource_id, resource)
+        except Exception as exc:  # noqa: BLE001 — never break the caller's write
+            logger.warning(f"FHIR write listener failed (ignored): {exc}")
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool, request-coalescing and cache statistics for api/system/monitoring.py."""
+    coalescing = _single_flight.get_stats()
+    cache = {"read_through": HAPI_FHIR_CACHE_READS, **get_resource_cache().get_stats()}
+    if _shared_transport is None:
+        return {"initialized": False, "coalescing": coalescing, "cache": cache}
+    return {"initialized": True, **_shared_transport.get_stats(), "coalescing": coalescing, "cache": cache}
+
 
 
 class FHIRClientError(Exception):
@@ -100,12 +475,203 @@ async def search(
                 print(resource.get("id"))
         """
         url = f"{self.base_url}/{resource_type}"
+        cache_key = ("search",) + _request_key(url, params)
+        cached = self._cached_json(cache_key)
+        if cached is not None:
+            return cached
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=params or {})
-                response.raise_for_status()
-                return response.json()
+            response, generation = await self._get(url, params or {})
+            response.raise_for_status()
+            bundle = response.json()
+            self._cache_response(cache_key, response, generation, self._search_tags(resource_type, params, bundle))
+            return bundle
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HAPI FHIR search error for {resource_type}: {e.response.status_code} - {e.response.text}")
+            raise FHIRClientError(f"FHIR search failed: {e.response.status_code}", status_code=e.response.status_code)
+        except httpx.RequestError as e:
+            logger.error(f"HAPI FHIR connection error: {e}")
+            raise FHIRClientError(f"Failed to connect to FHIR server: {str(e)}")
+
+    async def search_iter(
+        self,
+        resource_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_pages: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over every resource matching a search, across all pages.
+
+        Follows Bundle.link[next] until the server has no more pages. The
+        next page is requested while the caller is still consuming the
+        current one, and only one page is held in memory at a time.
+
+        Args:
+            resource_type: FHIR resource type
+            params: Search parameters (``_count`` sets the page size)
+            max_pages: Stop after this many pages (default HAPI_FHIR_SEARCH_MAX_PAGES)
+            max_bytes: Stop once this many response bytes have been read
+                (default HAPI_FHIR_SEARCH_MAX_BYTES)
+
+        Yields:
+            Each entry's resource dict, in server order
+
+        Example:
+            async for patient in client.search_iter("Patient", {"_count": 500}):
+                count_by_gender[patient.get("gender")] += 1
+        """
+        max_pages = max_pages or HAPI_FHIR_SEARCH_MAX_PAGES
+        max_bytes = max_bytes or HAPI_FHIR_SEARCH_MAX_BYTES
+
+        pending = asyncio.ensure_future(
+            self._fetch_page(f"{self.base_url}/{resource_type}", params or {}, resource_type)
+        )
+        pages = 0
+        bytes_read = 0
+        try:
+            while pending is not None:
+                bundle, size = await pending
+                pending = None
+                pages += 1
+                bytes_read += size
+
+                next_url = self._next_page_url(bundle)
+                if next_url:
+                    if pages >= max_pages or bytes_read >= max_bytes:
+                        logger.warning(
+                            f"{resource_type} search truncated after {pages} pages / "
+                            f"{bytes_read} bytes (max_pages={max_pages}, max_bytes={max_bytes})"
+                        )
+                    else:
+                        pending = asyncio.ensure_future(self._fetch_page(next_url, None, resource_type))
+
+                for entry in bundle.get("entry", []):
+                    resource = entry.get("resource")
+                    if resource is not None:
+                        yield resource
+        finally:
+            # Caller stopped early (break/exception): drop the prefetch.
+            if pending is not None:
+                if not pending.done():
+                    pending.cancel()
+                elif not pending.cancelled():
+                    pending.exception()  # retrieved, so asyncio doesn't log it
+
+    async def search_all(
+        self,
+        resource_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_pages: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Collect every resource matching a search into a list.
+
+        Convenience wrapper over search_iter for callers that need the whole
+        result set; prefer search_iter when entries can be processed as they
+        arrive.
+        """
+        return [
+            resource async for resource in
+            self.search_iter(resource_type, params, max_pages=max_pages, max_bytes=max_bytes)
+        ]
+
+    async def _get(self, url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[httpx.Response, int]:
+        """GET through the shared pool, coalescing identical in-flight calls.
+
+        Returns the response and the write generation the request that
+        fetched it started under - what the body may be cached against,
+        since a caller that joined an in-flight request didn't fetch it.
+
+        The shared Response body is already read; each caller parses it with
+        response.json(), so nobody shares (and can mutate) another caller's
+        dicts. The key carries the cache's write generation: a read that
+        starts after a write through this process never joins a request
+        that began before it, so it can't see the pre-write body.
+        """
+        client = get_shared_http_client()
+        generation = get_resource_cache().write_generation
+
+        async def fetch() -> Tuple[httpx.Response, int]:
+            return await client.get(url, params=params, timeout=self.timeout), generation
+
+        if not HAPI_FHIR_COALESCE_READS:
+            return await fetch()
+        return await _single_flight.do((generation,) + _request_key(url, params), fetch)
+
+    def _cached_json(self, cache_key: Tuple) -> Optional[Dict[str, Any]]:
+        """Parsed copy of a cached response body, or None on miss/disabled."""
+        if not HAPI_FHIR_CACHE_READS:
+            return None
+        body = get_resource_cache().get(cache_key)
+        return json.loads(body) if body is not None else None
+
+    def _cache_response(
+        self,
+        cache_key: Tuple,
+        response: httpx.Response,
+        generation: int,
+        tags: Iterable[str]
+    ) -> None:
+        """Cache the raw body (each hit re-parses, so callers can't share dicts)."""
+        if not HAPI_FHIR_CACHE_READS:
+            return
+        get_resource_cache().set(
+            cache_key,
+            response.content,
+            tags=tags,
+            ttl=HAPI_FHIR_CACHE_TTL,
+            size=len(response.content),
+            generation=generation
+        )
+
+    def _search_tags(
+        self,
+        resource_type: str,
+        params: Optional[Dict[str, Any]],
+        bundle: Dict[str, Any]
+    ) -> List[str]:
+        """A search is stale once any type it returned (incl. _include) is written."""
+        types = {resource_type}
+        types.update(
+            entry["resource"]["resourceType"]
+            for entry in bundle.get("entry", [])
+            if isinstance(entry.get("resource"), dict) and entry["resource"].get("resourceType")
+        )
+        tags = [type_tag(t) for t in types]
+        patient_id = patient_id_from_params(params)
+        if patient_id:
+            tags.append(patient_tag(patient_id))
+        return tags
+
+    def _next_page_url(self, bundle: Dict[str, Any]) -> Optional[str]:
+        """Bundle.link[next], re-pointed at our base URL.
+
+        HAPI builds paging links from its own configured server address,
+        which may not be the address this backend reaches it on.
+        """
+        for link in bundle.get("link", []):
+            if link.get("relation") == "next" and link.get("url"):
+                next_url = link["url"]
+                if next_url.startswith(self.base_url):
+                    return next_url
+                base = httpx.URL(self.base_url)
+                return str(httpx.URL(next_url).copy_with(scheme=base.scheme, host=base.host, port=base.port))
+        return None
+
+    async def _fetch_page(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        resource_type: str
+    ) -> Tuple[Dict[str, Any], int]:
+        """Fetch one search page; returns the Bundle and its size in bytes."""
+        try:
+            response, _ = await self._get(url, params)
+            response.raise_for_status()
+            return response.json(), len(response.content)
 
         except httpx.HTTPStatusError as e:
             logger.error(f"HAPI FHIR search error for {resource_type}: {e.response.status_code} - {e.response.text}")
@@ -130,12 +696,21 @@ async def read(self, resource_type: str, resource_id: str) -> Dict[str, Any]:
             print(patient.get("name"))
         """
         url = f"{self.base_url}/{resource_type}/{resource_id}"
+        cache_key = ("read", url)
+        cached = self._cached_json(cache_key)
+        if cached is not None:
+            return cached
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.json()
+            response, generation = await self._get(url)
+            response.raise_for_status()
+            resource = response.json()
+            tags = [type_tag(resource_type), resource_tag(resource_type, resource_id)]
+            patient_id = patient_id_of(resource)
+            if patient_id:
+                tags.append(patient_tag(patient_id))
+            self._cache_response(cache_key, response, generation, tags)
+            return resource
 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
@@ -173,14 +748,18 @@ async def create(self, resource_type: str, resource_data: Dict[str, Any]) -> Dic
             resource_data["resourceType"] = resource_type
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    url,
-                    json=resource_data,
-                    headers={"Content-Type": "application/fhir+json"}
-                )
-                response.raise_for_status()
-                return response.json()
+            client = get_shared_http_client()
+            response = await client.post(
+                url,
+                json=resource_data,
+                headers={"Content-Type": "application/fhir+json"},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            created = response.json()
+            get_resource_cache().invalidate_write(resource_type, created.get("id"), resource=created)
+            await _announce_write("created", resource_type, created.get("id"), created)
+            return created
 
         except httpx.HTTPStatusError as e:
             logger.error(f"HAPI FHIR create error for {resource_type}: {e.response.status_code} - {e.response.text}")
@@ -220,14 +799,18 @@ async def update(
             resource_data["id"] = resource_id
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.put(
-                    url,
-                    json=resource_data,
-                    headers={"Content-Type": "application/fhir+json"}
-                )
-                response.raise_for_status()
-                return response.json()
+            client = get_shared_http_client()
+            response = await client.put(
+                url,
+                json=resource_data,
+                headers={"Content-Type": "application/fhir+json"},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            updated = response.json()
+            get_resource_cache().invalidate_write(resource_type, resource_id, resource=updated)
+            await _announce_write("updated", resource_type, resource_id, updated)
+            return updated
 
         except httpx.HTTPStatusError as e:
             logger.error(f"HAPI FHIR update error for {resource_type}/{resource_id}: {e.response.status_code} - {e.response.text}")
@@ -253,10 +836,12 @@ async def delete(self, resource_type: str, resource_id: str) -> bool:
         url = f"{self.base_url}/{resource_type}/{resource_id}"
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.delete(url)
-                response.raise_for_status()
-                return True
+            client = get_shared_http_client()
+            response = await client.delete(url, timeout=self.timeout)
+            response.raise_for_status()
+            get_resource_cache().invalidate_write(resource_type, resource_id)
+            await _announce_write("deleted", resource_type, resource_id, None)
+            return True
 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
@@ -339,10 +924,10 @@ async def search_with_includes(
                 search_params["_revinclude"] = revinclude
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=search_params)
-                response.raise_for_status()
-                return response.json()
+            client = get_shared_http_client()
+            response = await client.get(url, params=search_params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPStatusError as e:
             logger.error(f"HAPI FHIR search_with_includes error for {resource_type}: {e.response.status_code} - {e.response.text}")
@@ -452,10 +1037,10 @@ async def operation(
         url = f"{self.base_url}/{operation_path}"
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=params or {})
-                response.raise_for_status()
-                return response.json()
+            client = get_shared_http_client()
+            response = await client.get(url, params=params or {}, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPStatusError as e:
             logger.error(f"HAPI FHIR operation error: {e.response.status_code} - {e.response.text}")
@@ -9,19 +9,49 @@
 Public interface mirrors `services.terminology_service.TerminologyService`
 (`search_catalog`, `search_multi`) so `UnifiedCatalogService` doesn't have
 to know which backend it's talking to.
+
+Search is ranked (bm25, so "metformin" comes before "Metformin
+hydrochloride 500 MG Tablet") and constrained to the domain's rowid range
+from `domain_ranges`, so a short prefix like "dia" only reads hits inside
+that domain. Indexes built before `domain_ranges` existed fall back to the
+original join-and-filter query. Recent (domain, query) results are kept in
+an LRU so repeated autocomplete keystrokes don't touch SQLite.
+
+Queries run on a small dedicated thread pool, each worker borrowing one of
+a pool of read-only connections, so catalog search neither serializes on
+one connection nor competes with other `asyncio.to_thread` work. The build
+script swaps a rebuilt file into place atomically; the index notices the
+new file (or `reload()` is called) and moves to it without a restart.
 """
 
 from __future__ import annotations
 
 import asyncio
 import logging
+import os
 import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+TERMINOLOGY_SEARCH_CACHE_SIZE = int(os.getenv('TERMINOLOGY_SEARCH_CACHE_SIZE', '2048'))
+# Read connections == executor workers: a worker never waits for a connection
+TERMINOLOGY_READ_POOL_SIZE = int(os.getenv('TERMINOLOGY_READ_POOL_SIZE', '4'))
+TERMINOLOGY_MMAP_SIZE = int(os.getenv('TERMINOLOGY_MMAP_SIZE', str(256 * 1024 * 1024)))
+# Page cache per connection, in KiB (negative PRAGMA cache_size)
+TERMINOLOGY_PAGE_CACHE_KIB = int(os.getenv('TERMINOLOGY_PAGE_CACHE_KIB', '16384'))
+# How often search checks whether the index file was replaced by a rebuild
+TERMINOLOGY_RELOAD_CHECK_SECONDS = float(os.getenv('TERMINOLOGY_RELOAD_CHECK_SECONDS', '30'))
+
+_CacheKey = Tuple[str, str, int]
+
 
 def _build_fts_query(filter_text: str) -> str:
     """Convert user input to a safe FTS5 MATCH expression with prefix matching.
@@ -41,46 +71,179 @@ def _build_fts_query(filter_text: str) -> str:
     return " ".join(f'"{tok}"*' for tok in tokens)
 
 
+_FileIdentity = Tuple[int, int, int]
+
+
+def _file_identity(path: str) -> Optional[_FileIdentity]:
+    """(inode, mtime, size) — changes when a rebuild is renamed into place."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class _Reader:
+    """A pooled read connection and the domain ranges of the file it reads.
+
+    Ranges are loaded per connection so they always describe the same file
+    the connection has open, even across a swap to a rebuilt index.
+    """
+
+    __slots__ = ("conn", "domain_ranges")
+
+    def __init__(self, conn: sqlite3.Connection, domain_ranges: Dict[str, Tuple[int, int]]):
+        self.conn = conn
+        # {} for an index built without domain_ranges (legacy query path)
+        self.domain_ranges = domain_ranges
+
+
 class LocalTerminologyIndex:
     """SQLite-backed terminology lookup for catalog search.
 
     Same interface as `TerminologyService`: `search_catalog` and
     `search_multi` return `[{system, code, display}, ...]`.
 
-    Connection model: a single read-only SQLite connection held for the
-    lifetime of the process. SQLite reads in WAL mode are concurrent-safe;
-    the build script is the only writer and runs at deploy time, not at
-    request time, so there's no contention.
+    Connection model: up to `pool_size` read-only connections, opened on
+    demand and handed to one query at a time, on a dedicated executor with
+    the same number of workers. The file is opened `immutable=1` — the
+    build script never writes it in place, it renames a finished rebuild
+    over it — so SQLite skips locking and change detection entirely, and
+    mmap serves pages straight from the OS page cache.
+
+    Hot swap: `reload()` retires the pool; searches already running finish
+    on the old file (their open handle keeps it readable) and every later
+    search opens the new one. `search_catalog` also calls it by itself when
+    the file's identity changes, checked at most every
+    `reload_check_seconds`.
     """
 
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        cache_size: int = TERMINOLOGY_SEARCH_CACHE_SIZE,
+        pool_size: int = TERMINOLOGY_READ_POOL_SIZE,
+        reload_check_seconds: float = TERMINOLOGY_RELOAD_CHECK_SECONDS,
+    ):
         self._db_path = db_path
-        self._conn: Optional[sqlite3.Connection] = None
+        self._pool_size = max(1, pool_size)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Idle readers of the current generation. Borrowed readers from an
+        # older generation are closed when returned instead of pooled.
+        self._lock = threading.Lock()
+        self._idle: List[_Reader] = []
+        self._generation = 0
+        # Identity of the file the current generation reads; None until the
+        # first reader opens (or while the index is missing)
+        self._file_identity: Optional[_FileIdentity] = None
+        self._reload_check_seconds = reload_check_seconds
+        self._next_reload_check = 0.0
+
+        # LRU of (domain, normalized FTS query, count) -> results. Only
+        # touched from the event loop (search_catalog), so no lock.
+        self._cache: "OrderedDict[_CacheKey, List[Dict[str, str]]]" = OrderedDict()
+        self._cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
 
-    def _connect(self) -> Optional[sqlite3.Connection]:
-        if self._conn is not None:
-            return self._conn
+    def _open_reader(self) -> Optional[_Reader]:
         path = Path(self._db_path)
         if not path.exists():
             # Caller should have checked existence already, but be defensive
-            # — losing the index between startup and first query (e.g. on
-            # rebuild) shouldn't crash search.
+            # — losing the index between startup and first query shouldn't
+            # crash search.
             logger.warning("Terminology index missing at %s; returning empty", self._db_path)
             return None
-        # mode=ro + immutable=1 makes this read-only; the build script's
-        # rebuild reopens fresh anyway.
-        uri = f"file:{self._db_path}?mode=ro"
+        identity = _file_identity(self._db_path)
+        uri = f"file:{path}?mode=ro&immutable=1"
+        conn: Optional[sqlite3.Connection] = None
         try:
-            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            # check_same_thread=False: readers move between executor
+            # workers, but only ever serve one query at a time
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size = {TERMINOLOGY_MMAP_SIZE}")
+            conn.execute(f"PRAGMA cache_size = {-TERMINOLOGY_PAGE_CACHE_KIB}")
+            ranges = self._load_domain_ranges(conn)
         except sqlite3.Error as exc:
             logger.error("Failed to open terminology index at %s: %s", self._db_path, exc)
+            if conn is not None:
+                conn.close()
             return None
-        return self._conn
+        with self._lock:
+            if self._file_identity is None:
+                self._file_identity = identity
+        return _Reader(conn, ranges)
+
+    @contextmanager
+    def _reader(self) -> Iterator[Optional[_Reader]]:
+        with self._lock:
+            generation = self._generation
+            reader = self._idle.pop() if self._idle else None
+        if reader is None:
+            reader = self._open_reader()
+            if reader is None:
+                yield None
+                return
+        try:
+            yield reader
+        finally:
+            with self._lock:
+                keep = generation == self._generation and len(self._idle) < self._pool_size
+                if keep:
+                    self._idle.append(reader)
+            if not keep:
+                reader.conn.close()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._pool_size,
+                thread_name_prefix="terminology-search",
+            )
+        return self._executor
+
+    def reload(self, db_path: Optional[str] = None) -> None:
+        """Switch to a rebuilt index file (or to `db_path`) without a restart."""
+        with self._lock:
+            if db_path is not None:
+                self._db_path = db_path
+            self._generation += 1
+            retired, self._idle = self._idle, []
+            self._file_identity = None
+        for reader in retired:
+            reader.conn.close()
+        self.clear_cache()
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + self._reload_check_seconds
+        current = self._file_identity
+        latest = _file_identity(self._db_path)
+        # A missing file keeps the old readers serving: their handles
+        # still read the unlinked file
+        if current is not None and latest is not None and latest != current:
+            logger.info("Terminology index at %s was rebuilt; switching to the new file", self._db_path)
+            self.reload()
 
     def close(self) -> None:
-        if self._conn is not None:
-            self._conn.close()
-            self._conn = None
+        self.reload()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._cache),
+            "max_size": self._cache_size,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+        }
 
     async def search_catalog(
         self,
@@ -88,10 +251,33 @@ async def search_catalog(
         filter_text: Optional[str] = None,
         count: int = 50,
     ) -> List[Dict[str, str]]:
-        """Search a single domain. Returns up to `count` matches."""
-        return await asyncio.to_thread(
-            self._search_sync, catalog_type, filter_text, count
+        """Search a single domain. Returns up to `count` matches, best first."""
+        self._maybe_reload()
+        # "Diab", "diab " and "diab," are the same FTS query
+        key = (catalog_type, _build_fts_query(filter_text or "").lower(), count)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return [dict(row) for row in cached]
+
+        self.cache_misses += 1
+        generation = self._generation
+        results = await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), self._search_sync, catalog_type, filter_text, count
         )
+        # Don't cache the empty answer for a missing/unopenable index, nor
+        # an answer from a file that was swapped out mid-query
+        if (
+            self._file_identity is not None
+            and generation == self._generation
+            and self._cache_size > 0
+        ):
+            self._cache[key] = [dict(row) for row in results]
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return results
 
     async def search_multi(
         self,
@@ -119,9 +305,19 @@ def _search_sync(
         filter_text: Optional[str],
         count: int,
     ) -> List[Dict[str, str]]:
-        conn = self._connect()
-        if conn is None:
-            return []
+        with self._reader() as reader:
+            if reader is None:
+                return []
+            return self._query(reader, domain, filter_text, count)
+
+    def _query(
+        self,
+        reader: _Reader,
+        domain: str,
+        filter_text: Optional[str],
+        count: int,
+    ) -> List[Dict[str, str]]:
+        conn = reader.conn
         try:
             if filter_text and filter_text.strip():
                 fts_query = _build_fts_query(filter_text)
@@ -129,17 +325,41 @@ def _search_sync(
                     # All tokens were stripped — fall through to unfiltered
                     # so the caller gets some results rather than empty.
                     return self._fetch_unfiltered(conn, domain, count)
-                rows = conn.execute(
-                    """
-                    SELECT c.system, c.code, c.display
-                    FROM concepts_fts f
-                    JOIN concepts c ON c.rowid = f.rowid
-                    WHERE c.domain = ?
-                      AND concepts_fts MATCH ?
-                    LIMIT ?
-                    """,
-                    (domain, fts_query, count),
-                ).fetchall()
+                ranges = reader.domain_ranges
+                if ranges:
+                    if domain not in ranges:
+                        return []
+                    min_rowid, max_rowid = ranges[domain]
+                    rows = conn.execute(
+                        """
+                        WITH hits AS (
+                            SELECT rowid, rank
+                            FROM concepts_fts
+                            WHERE concepts_fts MATCH ?
+                              AND rowid BETWEEN ? AND ?
+                            ORDER BY rank
+                            LIMIT ?
+                        )
+                        SELECT c.system, c.code, c.display
+                        FROM hits
+                        JOIN concepts c ON c.rowid = hits.rowid
+                        ORDER BY hits.rank
+                        """,
+                        (fts_query, min_rowid, max_rowid, count),
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        """
+                        SELECT c.system, c.code, c.display
+                        FROM concepts_fts f
+                        JOIN concepts c ON c.rowid = f.rowid
+                        WHERE c.domain = ?
+                          AND concepts_fts MATCH ?
+                        ORDER BY f.rank
+                        LIMIT ?
+                        """,
+                        (domain, fts_query, count),
+                    ).fetchall()
             else:
                 return self._fetch_unfiltered(conn, domain, count)
         except sqlite3.Error as exc:
@@ -148,6 +368,20 @@ def _search_sync(
 
         return [{"system": s, "code": c, "display": d} for s, c, d in rows]
 
+    def _load_domain_ranges(self, conn: sqlite3.Connection) -> Dict[str, Tuple[int, int]]:
+        try:
+            rows = conn.execute(
+                "SELECT domain, min_rowid, max_rowid FROM domain_ranges"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            logger.info(
+                "Terminology index at %s has no domain_ranges; using the "
+                "unpartitioned query (rebuild the index to enable it)",
+                self._db_path,
+            )
+            return {}
+        return {d: (lo, hi) for d, lo, hi in rows}
+
     @staticmethod
     def _fetch_unfiltered(
         conn: sqlite3.Connection,
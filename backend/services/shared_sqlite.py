@@ -0,0 +1,53 @@
+"""
+Shared SQLite file - a small database every uvicorn worker on the host opens.
+
+The dynamic catalog store and the inbox write log each keep host-wide state
+in a local SQLite file. Both want the same connection setup: create the
+file's directory (falling back to the temp directory when the configured
+path isn't writable, e.g. no /app/data outside the container), switch the
+file to WAL so readers never wait for a writer, and create the schema once
+per process.
+
+Callers open a short-lived connection per call from `asyncio.to_thread`.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class SharedSQLiteFile:
+    """Connection factory for one host-wide SQLite file and its schema."""
+
+    def __init__(self, db_path: str, schema: str, fallback_name: str, description: str):
+        """
+        Args:
+            db_path: Where the file should live
+            schema: Idempotent DDL (CREATE ... IF NOT EXISTS) run on first connect
+            fallback_name: File name in the temp directory if db_path can't be created
+            description: What the file holds, for the fallback warning
+        """
+        self.db_path = db_path
+        self._schema = schema
+        self._fallback_name = fallback_name
+        self._description = description
+        self._schema_ready = False
+
+    def connect(self) -> sqlite3.Connection:
+        if not self._schema_ready:
+            try:
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            except OSError as exc:
+                fallback = os.path.join(tempfile.gettempdir(), self._fallback_name)
+                logger.warning(f"Cannot create {self.db_path} ({exc}); keeping {self._description} in {fallback}")
+                self.db_path = fallback
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(self._schema)
+            self._schema_ready = True
+        return conn
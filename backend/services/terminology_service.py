@@ -23,10 +23,10 @@
 import asyncio
 import logging
 import os
-from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 
+from services.fhir_resource_cache import get_resource_cache, type_tag
 from services.hapi_fhir_client import HAPIFHIRClient
 from services.local_terminology_index import LocalTerminologyIndex
 
@@ -65,17 +65,20 @@ class _HapiTerminologyService:
     def __init__(self):
         self.hapi_client = HAPIFHIRClient()
         self.hapi_client.timeout = 60.0
-        self._cache: Dict[str, Tuple[datetime, List[Dict[str, str]]]] = {}
-        self._cache_ttl = timedelta(seconds=CACHE_TTL_SECONDS)
+        # Expansions live in the shared FHIRResourceCache (bounded, and
+        # dropped when a ValueSet/CodeSystem is written through the backend)
+        self._cache = get_resource_cache()
 
     def _get_cached(self, key: str) -> Optional[List[Dict[str, str]]]:
-        entry = self._cache.get(key)
-        if entry and (datetime.now() - entry[0]) < self._cache_ttl:
-            return entry[1]
-        return None
+        return self._cache.get(("valueset_expand", key))
 
     def _set_cache(self, key: str, value: List[Dict[str, str]]):
-        self._cache[key] = (datetime.now(), value)
+        self._cache.set(
+            ("valueset_expand", key),
+            value,
+            tags=("valueset_expand", type_tag("ValueSet"), type_tag("CodeSystem")),
+            ttl=CACHE_TTL_SECONDS,
+        )
 
     async def expand_valueset(
         self,
@@ -165,7 +168,8 @@ def get_terminology_service():
     override at `$TERMINOLOGY_DB_PATH`) is present. Otherwise falls
     back to the HAPI-based implementation. The choice is sticky for
     the lifetime of the process — restart the backend after building
-    the index to switch over.
+    the index for the first time to switch over. Later rebuilds are
+    picked up by the running index (see `LocalTerminologyIndex.reload`).
     """
     global _terminology_service
     if _terminology_service is not None:
@@ -183,3 +187,11 @@ def get_terminology_service():
         )
         _terminology_service = _HapiTerminologyService()
     return _terminology_service
+
+
+def close_terminology_service() -> None:
+    """Release the local index's connections and search threads (shutdown)."""
+    global _terminology_service
+    if isinstance(_terminology_service, LocalTerminologyIndex):
+        _terminology_service.close()
+    _terminology_service = None
@@ -0,0 +1,178 @@
+"""
+External-service circuit breaker (api/cds_hooks/providers/circuit_breaker.py).
+
+Successful calls to a healthy service do no DB work; circuit state goes to
+Postgres in one batched UPDATE on transitions or once per flush interval;
+an open circuit short-circuits with no network I/O; a half-open probe
+closes or re-opens it. Outbound calls reuse one pooled client per origin.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from api.cds_hooks.models import CDSHookRequest
+from api.cds_hooks.providers import RemoteServiceProvider
+from api.cds_hooks.providers import remote_provider
+from api.cds_hooks.providers.circuit_breaker import CircuitBreaker, CircuitState
+
+
+@pytest.fixture
+def db():
+    session = MagicMock()
+    session.execute = AsyncMock()
+    session.commit = AsyncMock()
+    return session
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, flush_interval=60)
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("api.cds_hooks.providers.circuit_breaker.time.monotonic", lambda: clock["now"])
+    breaker._last_flush = clock["now"]
+    breaker.clock = clock
+    return breaker
+
+
+class TestCircuitStates:
+
+    def test_opens_at_threshold_and_short_circuits(self, breaker):
+        for _ in range(3):
+            assert breaker.allow("svc")
+            breaker.record_failure("svc", "boom")
+
+        assert breaker.circuit("svc").state is CircuitState.OPEN
+        assert not breaker.allow("svc")
+        assert breaker.circuit("svc").short_circuited == 1
+
+    def test_half_open_allows_one_probe(self, breaker):
+        for _ in range(3):
+            breaker.record_failure("svc", "boom")
+        breaker.clock["now"] += 31
+
+        assert breaker.allow("svc")
+        assert breaker.circuit("svc").state is CircuitState.HALF_OPEN
+        assert not breaker.allow("svc")
+
+        breaker.record_success("svc")
+        assert breaker.circuit("svc").state is CircuitState.CLOSED
+        assert breaker.circuit("svc").consecutive_failures == 0
+
+    def test_failed_probe_reopens(self, breaker):
+        for _ in range(3):
+            breaker.record_failure("svc", "boom")
+        breaker.clock["now"] += 31
+        assert breaker.allow("svc")
+
+        breaker.record_failure("svc", "still down")
+
+        assert breaker.circuit("svc").state is CircuitState.OPEN
+        assert not breaker.allow("svc")
+
+    def test_seeded_from_db_row(self, breaker):
+        assert not breaker.allow("dead", {"auto_disabled": True, "consecutive_failures": 5})
+        assert breaker.allow("flaky", {"auto_disabled": False, "consecutive_failures": 2})
+        breaker.record_failure("flaky", "boom")
+        assert breaker.circuit("flaky").state is CircuitState.OPEN
+
+
+class TestBatchedPersistence:
+
+    @pytest.mark.asyncio
+    async def test_healthy_success_writes_nothing(self, breaker, db):
+        for _ in range(100):
+            breaker.record_success("svc")
+        breaker.clock["now"] += 61
+
+        assert not breaker.flush_due()
+        assert await breaker.flush(db) == 0
+        db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_counter_changes_wait_for_interval(self, breaker, db):
+        breaker.record_failure("a", "boom")
+        breaker.record_failure("b", "boom")
+        assert not breaker.flush_due()
+
+        breaker.clock["now"] += 61
+        assert breaker.flush_due()
+        assert await breaker.flush(db) == 2
+
+        # One executemany and one commit for every dirty circuit
+        db.execute.assert_awaited_once()
+        rows = db.execute.call_args[0][1]
+        assert {row["sid"] for row in rows} == {"a", "b"}
+        assert all(row["failures"] == 1 and not row["disabled"] for row in rows)
+        db.commit.assert_awaited_once()
+        assert not breaker.flush_due()
+
+    @pytest.mark.asyncio
+    async def test_transition_flushes_immediately(self, breaker, db):
+        for _ in range(3):
+            breaker.record_failure("svc", "boom")
+
+        assert breaker.flush_due()
+        await breaker.flush(db)
+        row = db.execute.call_args[0][1][0]
+        assert row["disabled"] is True and row["failures"] == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, breaker, db):
+        db.execute.side_effect = [Exception("db down"), None]
+        breaker.record_failure("svc", "boom")
+
+        assert await breaker.flush(db) == 0
+        assert await breaker.flush(db) == 1
+
+
+class TestProvider:
+
+    @pytest.fixture
+    def request_(self, sample_cds_request):
+        return CDSHookRequest(**sample_cds_request)
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_makes_no_network_or_db_calls(
+        self, external_plan_definition, request_, external_service_metadata, db
+    ):
+        provider = RemoteServiceProvider(db)
+        metadata = {**external_service_metadata, "auto_disabled": True}
+
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as get_client:
+            response = await provider.execute(external_plan_definition, request_, metadata)
+
+        assert response.cards == []
+        get_client.assert_not_called()
+        db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_repeated_success_does_not_touch_db(
+        self, external_plan_definition, request_, external_service_metadata, db
+    ):
+        provider = RemoteServiceProvider(db)
+        ok = MagicMock()
+        ok.status_code = 200
+        ok.json.return_value = {"cards": []}
+
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as get_client:
+            get_client.return_value.post = AsyncMock(return_value=ok)
+            for _ in range(20):
+                await provider.execute(external_plan_definition, request_, external_service_metadata)
+
+        assert get_client.return_value.post.await_count == 20
+        db.execute.assert_not_called()
+        db.commit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_origin_clients_are_pooled(self):
+        try:
+            a = remote_provider.get_origin_client("https://cds.example.com/cds-services/a")
+            b = remote_provider.get_origin_client("https://CDS.example.com/cds-services/b")
+            other = remote_provider.get_origin_client("https://other.example.com/cds-services/a")
+
+            assert a is b
+            assert other is not a
+        finally:
+            await remote_provider.close_origin_clients()
+        assert a.is_closed and other.is_closed
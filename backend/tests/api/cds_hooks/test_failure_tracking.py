@@ -47,10 +47,10 @@ async def test_track_first_failure(
         hook_request = sample_cds_request
 
         # Mock HTTP failure
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = Exception("Connection error")
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             # Mock database update
             test_db.execute = AsyncMock()
@@ -64,6 +64,8 @@ async def test_track_first_failure(
             )
 
             # Verify database update incremented failures
+            # Persisted on the next circuit-state flush, not per call
+            await provider.circuit_breaker.flush(test_db)
             assert test_db.execute.called
             # Check that SQL update was called
             call_args = test_db.execute.call_args
@@ -90,10 +92,10 @@ async def test_increment_consecutive_failures(
         }
 
         # Mock failure
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = Exception("Another error")
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
@@ -106,6 +108,8 @@ async def test_increment_consecutive_failures(
             )
 
             # Should increment to 3
+            # Persisted on the next circuit-state flush, not per call
+            await provider.circuit_breaker.flush(test_db)
             assert test_db.execute.called
 
     @pytest.mark.asyncio
@@ -129,10 +133,10 @@ async def test_auto_disable_at_threshold(
         }
 
         # Mock failure
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = Exception("Fifth failure")
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
@@ -172,10 +176,10 @@ async def test_reset_failures_on_success(
         mock_response.status_code = 200
         mock_response.json.return_value = {"cards": []}
 
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.return_value = mock_response
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
@@ -188,6 +192,8 @@ async def test_reset_failures_on_success(
             )
 
             # Should reset consecutive_failures to 0
+            # Persisted on the next circuit-state flush, not per call
+            await provider.circuit_breaker.flush(test_db)
             assert test_db.execute.called
 
     @pytest.mark.asyncio
@@ -212,10 +218,10 @@ async def test_log_error_message(
         error_message = "Connection timeout after 30s"
 
         # Mock failure with specific error
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = Exception(error_message)
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
@@ -228,6 +234,8 @@ async def test_log_error_message(
             )
 
             # Should log error message
+            # Persisted on the next circuit-state flush, not per call
+            await provider.circuit_breaker.flush(test_db)
             assert test_db.execute.called
 
     @pytest.mark.asyncio
@@ -250,9 +258,9 @@ async def test_disabled_service_skips_execution(
         }
 
         # Should not make HTTP call
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             # Execute
             response = await provider.execute(
@@ -321,10 +329,10 @@ async def test_connection_error_tracked(
         """Test connection errors are tracked"""
         import httpx
 
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = httpx.ConnectError("Connection refused")
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
@@ -335,6 +343,8 @@ async def test_connection_error_tracked(
                 external_service_metadata
             )
 
+            # Persisted on the next circuit-state flush, not per call
+            await provider.circuit_breaker.flush(test_db)
             assert test_db.execute.called
 
     @pytest.mark.asyncio
@@ -349,10 +359,10 @@ async def test_timeout_error_tracked(
         """Test timeout errors are tracked"""
         import httpx
 
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = httpx.TimeoutException("Request timeout")
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
@@ -363,6 +373,8 @@ async def test_timeout_error_tracked(
                 external_service_metadata
             )
 
+            # Persisted on the next circuit-state flush, not per call
+            await provider.circuit_breaker.flush(test_db)
             assert test_db.execute.called
 
     @pytest.mark.asyncio
@@ -379,10 +391,10 @@ async def test_http_error_tracked(
         mock_response.status_code = 500
         mock_response.text = "Internal Server Error"
 
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.return_value = mock_response
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
@@ -393,6 +405,8 @@ async def test_http_error_tracked(
                 external_service_metadata
             )
 
+            # Persisted on the next circuit-state flush, not per call
+            await provider.circuit_breaker.flush(test_db)
             assert test_db.execute.called
 
     @pytest.mark.asyncio
@@ -409,10 +423,10 @@ async def test_malformed_response_tracked(
         mock_response.status_code = 200
         mock_response.json.side_effect = ValueError("Invalid JSON")
 
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.return_value = mock_response
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
@@ -423,6 +437,8 @@ async def test_malformed_response_tracked(
                 external_service_metadata
             )
 
+            # Persisted on the next circuit-state flush, not per call
+            await provider.circuit_breaker.flush(test_db)
             assert test_db.execute.called
 
 
@@ -472,10 +488,10 @@ async def test_returns_empty_cards_on_failure(
         external_service_metadata
     ):
         """Test that failures return empty cards, not errors"""
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = Exception("Service down")
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             response = await provider.execute(
                 external_plan_definition,
@@ -500,10 +516,10 @@ async def test_logs_failure_without_raising(
         test_db.execute = AsyncMock()
         test_db.commit = AsyncMock()
 
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = Exception("Error")
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             # Should not raise exception
             try:
@@ -18,6 +18,7 @@
    transaction. Every spec-compliant FHIR client hits this.
 """
 
+import httpx
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 
@@ -36,18 +37,20 @@ async def test_failure_tracked_under_hook_service_id(
         provider = RemoteServiceProvider(test_db)
         hook_request = CDSHookRequest(**sample_cds_request)
 
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.side_effect = Exception("Connection refused")
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
 
             await provider.execute(external_plan_definition, hook_request, external_service_metadata)
 
+        # Persisted on the next circuit-state flush, not per call
+        await provider.circuit_breaker.flush(test_db)
         assert test_db.execute.called
-        params = test_db.execute.call_args[0][1]
+        params = test_db.execute.call_args[0][1][0]
         # The fixture's PD id is "external-diabetes-cds"; its metadata row's
         # hook_service_id is "external-diabetes-management". Only the latter
         # matches external_services.cds_hooks.
@@ -65,18 +68,22 @@ async def test_success_reset_also_uses_hook_service_id(
         mock_response.status_code = 200
         mock_response.json.return_value = {"cards": []}
 
-        with patch('httpx.AsyncClient') as mock_client_class:
+        with patch('api.cds_hooks.providers.remote_provider.get_origin_client') as mock_client_class:
             mock_client = AsyncMock()
             mock_client.post.return_value = mock_response
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+            mock_client_class.return_value = mock_client
 
             test_db.execute = AsyncMock()
             test_db.commit = AsyncMock()
 
-            await provider.execute(external_plan_definition, hook_request, external_service_metadata)
+            # A success only writes when it clears earlier failures
+            metadata = {**external_service_metadata, "consecutive_failures": 2}
+            await provider.execute(external_plan_definition, hook_request, metadata)
+            await provider.circuit_breaker.flush(test_db)
 
-        params = test_db.execute.call_args[0][1]
+        params = test_db.execute.call_args[0][1][0]
         assert params["sid"] == external_service_metadata["hook_service_id"]
+        assert params["failures"] == 0
 
 
 class TestNullPrefetchValues:
@@ -112,20 +119,21 @@ def client(self):
         return TestClient(app, follow_redirects=False)
 
     def _mock_hapi(self):
-        resp = MagicMock()
-        resp.status_code = 200
-        resp.content = b'{"resourceType":"Bundle","type":"transaction-response","entry":[]}'
-        resp.headers = {"content-type": "application/fhir+json"}
-        client = AsyncMock()
-        client.request.return_value = resp
-        mock_cm = MagicMock()
-        mock_cm.__aenter__ = AsyncMock(return_value=client)
-        mock_cm.__aexit__ = AsyncMock(return_value=False)
-        return mock_cm, client
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(
+                200,
+                content=b'{"resourceType":"Bundle","type":"transaction-response","entry":[]}',
+                headers={"content-type": "application/fhir+json"},
+            )
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler)), seen
 
     def test_post_fhir_base_does_not_redirect(self, client):
-        mock_cm, hapi = self._mock_hapi()
-        with patch('api.fhir.proxy.httpx.AsyncClient', return_value=mock_cm):
+        hapi_client, hapi = self._mock_hapi()
+        with patch('api.fhir.proxy.get_shared_http_client', return_value=hapi_client):
             r = client.post(
                 "/fhir",
                 json={"resourceType": "Bundle", "type": "transaction", "entry": []},
@@ -138,8 +146,8 @@ def test_post_fhir_base_does_not_redirect(self, client):
         assert r.status_code == 200
 
     def test_post_fhir_r4_base_does_not_redirect(self, client):
-        mock_cm, hapi = self._mock_hapi()
-        with patch('api.fhir.proxy.httpx.AsyncClient', return_value=mock_cm):
+        hapi_client, hapi = self._mock_hapi()
+        with patch('api.fhir.proxy.get_shared_http_client', return_value=hapi_client):
             r = client.post(
                 "/fhir/R4",
                 json={"resourceType": "Bundle", "type": "transaction", "entry": []},
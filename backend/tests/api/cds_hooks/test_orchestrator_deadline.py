@@ -0,0 +1,293 @@
+"""
+Hook-level deadline, hedging and latency tracking in the orchestrator.
+
+All services of a hook call share one deadline covering the slot wait,
+should_execute and execute. Fast services' cards come back when it hits,
+stragglers are reported as TIMEOUT. Idempotent services can be hedged
+past their p95, and every service's p50/p95/p99 is tracked. External
+services executed by id go through the orchestrator too.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from api.cds_hooks.models import CDSHookRequest, HookType
+from api.cds_hooks.orchestrator import LatencyTracker, hook_time_remaining
+from api.cds_hooks.orchestrator import service_orchestrator
+from api.cds_hooks.orchestrator.service_orchestrator import (
+    ExecutionStatus,
+    ServiceOrchestrator,
+)
+from api.cds_hooks.providers import remote_provider
+from api.cds_hooks.service import CDSHooksService
+
+
+class SlowService:
+    """Service whose should_execute/execute sleep for configurable times."""
+
+    hook_type = HookType.PATIENT_VIEW
+    prefetch_templates = {}
+    idempotent = False
+
+    def __init__(self, service_id, check_delay=0.0, exec_delays=(0.0,), cards=None):
+        self.service_id = service_id
+        self._check_delay = check_delay
+        self._exec_delays = list(exec_delays)
+        self._cards = cards if cards is not None else [service_id]
+        self.calls = 0
+        self.remaining_seen = None
+
+    async def should_execute(self, context, prefetch):
+        await asyncio.sleep(self._check_delay)
+        return True
+
+    async def execute(self, context, prefetch):
+        self.remaining_seen = hook_time_remaining()
+        delay = self._exec_delays[min(self.calls, len(self._exec_delays) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return self._cards
+
+
+def _orchestrator(*services, **kwargs):
+    orchestrator = ServiceOrchestrator(**kwargs)
+    for service in services:
+        orchestrator.register_service(service)
+    return orchestrator
+
+
+class TestHookDeadline:
+
+    @pytest.mark.asyncio
+    async def test_should_execute_and_execute_share_one_budget(self):
+        # Each phase fits the budget on its own; together they don't
+        service = SlowService("slow", check_delay=0.06, exec_delays=(0.06,))
+        orchestrator = _orchestrator(service)
+
+        result = await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=100)
+
+        # 120ms of work only times out if both phases draw on the one 100ms budget
+        assert result.service_results[0].status == ExecutionStatus.TIMEOUT
+
+    @pytest.mark.asyncio
+    async def test_fast_cards_returned_and_straggler_timed_out(self):
+        fast = SlowService("fast", exec_delays=(0.005,))
+        straggler = SlowService("straggler", exec_delays=(5.0,))
+        orchestrator = _orchestrator(fast, straggler)
+
+        started = time.monotonic()
+        result = await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=80)
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 0.2
+        assert result.cards == ["fast"]
+        assert result.services_executed == 1
+        assert result.services_timed_out == 1
+        statuses = {r.service_id: r.status for r in result.service_results}
+        assert statuses == {"fast": ExecutionStatus.COMPLETED, "straggler": ExecutionStatus.TIMEOUT}
+
+    @pytest.mark.asyncio
+    async def test_waiting_for_a_slot_counts_against_the_deadline(self):
+        services = [SlowService(f"s{i}", exec_delays=(0.05,)) for i in range(3)]
+        orchestrator = _orchestrator(*services, max_concurrent_services=1)
+
+        result = await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=120)
+
+        # 3 x 50ms serialised through one slot cannot all fit in 120ms
+        assert result.services_executed == 2
+        assert result.services_timed_out == 1
+
+    @pytest.mark.asyncio
+    async def test_services_see_the_remaining_budget(self):
+        service = SlowService("svc")
+        orchestrator = _orchestrator(service)
+
+        await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=1000)
+
+        assert 0 < service.remaining_seen <= 1.0
+        assert hook_time_remaining() is None
+
+
+class TestHedging:
+
+    def _warm(self, orchestrator, service_id, ms=10.0, n=20):
+        for _ in range(n):
+            orchestrator.latency.record(service_id, ms)
+
+    @pytest.mark.asyncio
+    async def test_idempotent_straggler_is_hedged(self):
+        service = SlowService("remote", exec_delays=(2.0, 0.005))
+        service.idempotent = True
+        orchestrator = _orchestrator(service, hedging=True)
+        self._warm(orchestrator, "remote")
+
+        started = time.monotonic()
+        result = await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=1000)
+
+        assert time.monotonic() - started < 0.5
+        assert result.cards == ["remote"]
+        assert service.calls == 2
+        assert orchestrator.hedges_started == 1
+        assert orchestrator.hedges_won == 1
+
+    @pytest.mark.asyncio
+    async def test_non_idempotent_service_is_never_hedged(self):
+        service = SlowService("writer", exec_delays=(0.05,))
+        orchestrator = _orchestrator(service, hedging=True)
+        self._warm(orchestrator, "writer")
+
+        result = await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=1000)
+
+        assert result.services_executed == 1
+        assert service.calls == 1
+        assert orchestrator.hedges_started == 0
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_enough_samples(self):
+        service = SlowService("remote", exec_delays=(0.05,))
+        service.idempotent = True
+        orchestrator = _orchestrator(service, hedging=True)
+        self._warm(orchestrator, "remote", n=5)
+
+        await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=1000)
+
+        assert service.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        service = SlowService("remote", exec_delays=(0.001,))
+        service.idempotent = True
+        orchestrator = _orchestrator(service, hedging=True)
+        self._warm(orchestrator, "remote", ms=200.0)
+
+        await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=1000)
+
+        assert service.calls == 1
+        assert orchestrator.hedges_started == 0
+
+
+class TestLatencyTracking:
+
+    def test_percentiles(self):
+        tracker = LatencyTracker(window=1000)
+        for ms in range(1, 101):
+            tracker.record("svc", float(ms))
+
+        stats = tracker.get_stats()["svc"]
+        assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == (50.0, 95.0, 99.0)
+        assert tracker.percentile("missing", 50) is None
+
+    def test_window_is_bounded(self):
+        tracker = LatencyTracker(window=10)
+        for ms in range(100):
+            tracker.record("svc", float(ms))
+
+        assert tracker.sample_count("svc") == 10
+        assert tracker.percentile("svc", 50) >= 90
+        assert tracker.get_stats()["svc"]["count"] == 100
+
+    @pytest.mark.asyncio
+    async def test_orchestrator_records_completions_and_timeouts(self):
+        orchestrator = _orchestrator(
+            SlowService("ok", exec_delays=(0.001,)),
+            SlowService("late", exec_delays=(1.0,))
+        )
+
+        await orchestrator.execute(HookType.PATIENT_VIEW, {}, {"x": 1}, timeout_ms=50)
+
+        stats = orchestrator.get_latency_stats()["services"]
+        assert stats["ok"]["count"] == 1 and stats["ok"]["timeouts"] == 0
+        assert stats["late"]["timeouts"] == 1
+        assert stats["late"]["p99_ms"] >= 45
+
+
+class TestExternalServices:
+
+    @pytest.fixture
+    async def external(self, monkeypatch, external_plan_definition, external_service_metadata, sample_cds_request):
+        """execute_service for the external PlanDefinition against a fake endpoint."""
+        delays = []
+        seen = []
+
+        async def handle(request):
+            seen.append(hook_time_remaining())
+            await asyncio.sleep(delays[min(len(seen), len(delays)) - 1] if delays else 0)
+            return httpx.Response(200, json={"cards": [
+                {"summary": "From outside", "indicator": "info", "source": {"label": "External"}}
+            ]})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        monkeypatch.setattr(remote_provider, "get_origin_client", lambda url: client)
+
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(
+            mappings=lambda: MagicMock(first=lambda: external_service_metadata)
+        )
+        hapi = AsyncMock()
+        hapi.read.return_value = external_plan_definition
+        service = CDSHooksService(db, hapi_client=hapi)
+
+        async def execute(orchestrator):
+            monkeypatch.setattr(service_orchestrator, "_orchestrator", orchestrator)
+            return await service.execute_service(
+                service_id=external_plan_definition["id"],
+                request=CDSHookRequest(**sample_cds_request)
+            )
+
+        execute.delays = delays
+        execute.seen = seen
+        yield execute
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_external_call_sees_the_hook_deadline(self, external):
+        orchestrator = ServiceOrchestrator(default_timeout_ms=1000)
+
+        response = await external(orchestrator)
+
+        assert [card.summary for card in response.cards] == ["From outside"]
+        assert 0 < external.seen[0] <= 1.0
+        assert orchestrator.latency.sample_count("external-diabetes-cds") == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_external_service_is_cut_off_at_the_deadline(self, external):
+        external.delays.append(5.0)
+
+        started = time.monotonic()
+        response = await external(ServiceOrchestrator(default_timeout_ms=100))
+
+        assert time.monotonic() - started < 0.5
+        assert response.cards == []
+
+    @pytest.mark.asyncio
+    async def test_configured_external_service_is_hedged(self, external, monkeypatch):
+        monkeypatch.setattr(remote_provider, "CDS_REMOTE_IDEMPOTENT_SERVICES", "external-diabetes-management")
+        external.delays.extend([2.0, 0.0])
+        orchestrator = ServiceOrchestrator(default_timeout_ms=1000, hedging=True)
+        for _ in range(20):
+            orchestrator.latency.record("external-diabetes-cds", 10.0)
+
+        started = time.monotonic()
+        response = await external(orchestrator)
+
+        assert time.monotonic() - started < 0.5
+        assert len(response.cards) == 1
+        assert len(external.seen) == 2
+        assert orchestrator.hedges_won == 1
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_external_service_is_not_hedged(self, external):
+        external.delays.append(0.05)
+        orchestrator = ServiceOrchestrator(default_timeout_ms=1000, hedging=True)
+        for _ in range(20):
+            orchestrator.latency.record("external-diabetes-cds", 10.0)
+
+        await external(orchestrator)
+
+        assert len(external.seen) == 1
+        assert orchestrator.hedges_started == 0
+
@@ -0,0 +1,282 @@
+"""
+Tests for the shared patient-facts view (api/cds_hooks/conditions/facts.py)
+
+Conditions read prefetch through PatientFacts: codes indexed by code and
+system|code, observation dates parsed once and ranked newest-first. Inside
+one orchestrated hook call every service shares the same view, so each
+prefetch Bundle is indexed once however many conditions look at it. The
+opt-in benchmark reports what that saves in hook latency.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from api.cds_hooks.conditions import facts as facts_module
+from api.cds_hooks.conditions.engine import (
+    AgeCondition,
+    ConditionOperator,
+    DiagnosisCondition,
+    LabValueCondition,
+    MedicationCondition,
+)
+from api.cds_hooks.conditions.facts import (
+    BundleIndex,
+    PatientFacts,
+    get_patient_facts,
+    patient_facts_scope,
+)
+from api.cds_hooks.models import HookType
+from api.cds_hooks.orchestrator.service_orchestrator import ServiceOrchestrator
+
+
+def _obs(code, value, when=None, system="http://loinc.org"):
+    resource = {
+        "resourceType": "Observation",
+        "code": {"coding": [{"system": system, "code": code}], "text": f"Lab {code}"},
+        "valueQuantity": {"value": value},
+    }
+    if when is not None:
+        resource["effectiveDateTime"] = when.isoformat() if isinstance(when, datetime) else when
+    return {"resource": resource}
+
+
+def _bundle(*entries):
+    return {"resourceType": "Bundle", "type": "searchset", "entry": list(entries)}
+
+
+# ---- BundleIndex ----
+
+class TestBundleIndex:
+
+    def test_codes_indexed_with_and_without_system(self):
+        index = BundleIndex(_bundle(
+            _obs("2823-3", 4.0),
+            _obs("2823-3", 4.1, system="urn:local"),
+            _obs("4548-4", 7.0),
+        ))
+        assert index.with_code("2823-3") == [0, 1]
+        assert index.with_code("2823-3", "http://loinc.org") == [0]
+        assert index.with_code("missing") == []
+
+    def test_text_search_is_case_insensitive_and_remembered(self):
+        index = BundleIndex(_bundle(_obs("1", 1), _obs("2", 2)))
+        assert index.with_text("lab 2") == [1]
+        assert index.with_text("lab 2") is index.with_text("lab 2")
+
+    def test_latest_ranks_newest_first_and_undated_last(self):
+        now = datetime.now()
+        index = BundleIndex(_bundle(
+            _obs("k", 1, now - timedelta(days=3)),
+            _obs("k", 2),
+            _obs("k", 3, now - timedelta(days=1)),
+            _obs("k", 4, "not a date"),
+        ))
+        positions = index.with_code("k")
+        assert index.latest(positions) == 2
+        assert index.latest(positions, since=now - timedelta(days=2)) == 2
+        assert index.latest([0, 1, 3]) == 0
+        assert index.latest([1, 3]) == 1
+        assert index.latest([0], since=now - timedelta(days=2)) is None
+
+    def test_timezones_are_dropped_like_before(self):
+        index = BundleIndex(_bundle(_obs("k", 1, "2024-05-01T10:00:00+02:00")))
+        assert index.effective_date(0) == datetime(2024, 5, 1, 10, 0)
+
+    def test_malformed_bundle_is_empty(self):
+        assert len(BundleIndex(None)) == 0
+        assert len(BundleIndex({"resourceType": "Bundle"})) == 0
+
+
+# ---- Conditions read through the view ----
+
+class TestConditionsUseFacts:
+
+    async def test_lab_condition_uses_most_recent_not_first_entry(self):
+        now = datetime.now()
+        prefetch = {"recentLabs": _bundle(
+            _obs("2823-3", 4.0, now - timedelta(days=5)),
+            _obs("2823-3", 6.1, now - timedelta(hours=1)),
+        )}
+        result = await LabValueCondition("2823-3", critical_high=5.5).evaluate({}, prefetch)
+        assert result.details["lab_value"] == 6.1
+        assert result.details["critical"] == "high"
+
+    async def test_medication_counts_code_and_text_matches_once(self):
+        prefetch = {"medications": _bundle(
+            {"resource": {"medicationCodeableConcept": {
+                "coding": [{"code": "197361", "display": "Lisinopril 10 MG"}]}}},
+            {"resource": {"medication": {"codeableConcept": {"text": "lisinopril 20mg"}}}},
+            {"resource": {"medicationCodeableConcept": {"text": "Metformin"}}},
+        )}
+        result = await MedicationCondition(
+            codes=["197361"], text_contains=["lisinopril"]
+        ).evaluate({}, prefetch)
+        assert result.details["matching_count"] == 2
+
+    async def test_conditions_in_scope_share_one_index(self):
+        prefetch = {"conditions": _bundle(
+            {"resource": {"code": {"coding": [{"system": "http://snomed.info/sct", "code": "44054006"}],
+                                   "text": "Diabetes"}}}
+        )}
+        built = []
+        original = BundleIndex.__init__
+
+        def counting_init(self, *args, **kwargs):
+            built.append(self)
+            original(self, *args, **kwargs)
+
+        with patch.object(BundleIndex, "__init__", counting_init):
+            with patient_facts_scope():
+                for _ in range(5):
+                    assert await DiagnosisCondition(codes=["44054006"]).evaluate({}, prefetch)
+                    assert await DiagnosisCondition(text_contains=["diab"]).evaluate({}, prefetch)
+        assert len(built) == 1
+
+    def test_outside_scope_views_are_not_reused(self):
+        assert get_patient_facts() is not get_patient_facts()
+        with patient_facts_scope() as outer:
+            with patient_facts_scope() as inner:
+                assert inner is outer is get_patient_facts()
+
+    async def test_age_uses_cached_birth_date(self):
+        prefetch = {"patient": {"resourceType": "Patient", "birthDate": "1970-06-15"}}
+        with patient_facts_scope() as facts:
+            assert await AgeCondition(min_age=50).evaluate({}, prefetch)
+            assert facts.birth_date(prefetch["patient"]).year == 1970
+
+
+# ---- Orchestrator shares the view across services ----
+
+class _ConditionedService:
+    hook_type = HookType.PATIENT_VIEW
+    prefetch_templates = {}
+
+    def __init__(self, service_id):
+        self.service_id = service_id
+
+    async def should_execute(self, context, prefetch):
+        return True
+
+    async def execute(self, context, prefetch):
+        return []
+
+
+def _service_conditions(i):
+    return [
+        AgeCondition(min_age=18),
+        DiagnosisCondition(codes=["44054006"], text_contains=["hypertension"]),
+        MedicationCondition(text_contains=["metformin"], min_count=0),
+        LabValueCondition(f"{1000 + i % 10}-0", critical_high=150.0, within_days=365),
+        LabValueCondition("4548-4", operator=ConditionOperator.EXISTS, within_days=90),
+    ]
+
+
+def _large_prefetch(n_observations=2000, seed=5):
+    rng = random.Random(seed)
+    now = datetime.now()
+    codes = [f"{1000 + i}-0" for i in range(40)] + ["4548-4"]
+    return {
+        "patient": {"resourceType": "Patient", "id": "p1", "birthDate": "1960-01-01"},
+        "conditions": _bundle(*[
+            {"resource": {"code": {"coding": [{"system": "http://snomed.info/sct", "code": str(100 + i)}],
+                                   "text": f"Condition {i}"}}}
+            for i in range(50)
+        ] + [{"resource": {"code": {"coding": [{"code": "44054006"}], "text": "Diabetes"}}}]),
+        "medications": _bundle(*[
+            {"resource": {"medicationCodeableConcept": {"text": f"Drug {i}"}}} for i in range(30)
+        ]),
+        "recentLabs": _bundle(*[
+            _obs(rng.choice(codes), rng.uniform(50, 200),
+                 now - timedelta(days=rng.uniform(0, 400), seconds=rng.randint(0, 86400)))
+            for _ in range(n_observations)
+        ]),
+    }
+
+
+async def test_orchestrator_indexes_each_bundle_once_per_hook_call():
+    orchestrator = ServiceOrchestrator()
+    for i in range(5):
+        orchestrator.register_service(_ConditionedService(f"svc-{i}"), _service_conditions(i))
+    prefetch = _large_prefetch(n_observations=50)
+
+    with patch.object(facts_module, "BundleIndex", wraps=BundleIndex) as index_cls:
+        result = await orchestrator.execute(HookType.PATIENT_VIEW, {"hook": "patient-view"}, prefetch)
+
+    assert len(result.service_results) == 5
+    assert all(r.condition_details for r in result.service_results)
+    # conditions, medications (medication view), recentLabs
+    assert index_cls.call_count == 3
+
+
+@pytest.mark.slow
+async def test_20_services_2000_observations_index_each_bundle_once():
+    """One shared facts view per hook call vs every condition re-walking prefetch."""
+    n_services, rounds = 20, 3
+    prefetch = _large_prefetch()
+    orchestrator = ServiceOrchestrator(max_concurrent_services=n_services)
+    for i in range(n_services):
+        orchestrator.register_service(_ConditionedService(f"svc-{i}"), _service_conditions(i))
+
+    async def run(scoped):
+        with patch.object(facts_module, "BundleIndex", wraps=BundleIndex) as index_cls:
+            if scoped:
+                result = await orchestrator.execute(HookType.PATIENT_VIEW, {"hook": "patient-view"}, prefetch)
+            else:
+                # Each condition gets a fresh view: the per-condition walk
+                # every condition used to do on its own
+                with patch.object(facts_module, "patient_facts_scope", _no_scope), \
+                        patch("api.cds_hooks.orchestrator.service_orchestrator.patient_facts_scope", _no_scope):
+                    result = await orchestrator.execute(HookType.PATIENT_VIEW, {"hook": "patient-view"}, prefetch)
+        return index_cls.call_count, result
+
+    unshared_builds, unshared_result = await run(scoped=False)
+    for _ in range(rounds):
+        shared_builds, shared_result = await run(scoped=True)
+        # conditions, medications, recentLabs: once per hook call, not per service
+        assert shared_builds == 3
+
+    assert unshared_builds >= n_services * 2
+    assert [r.status for r in shared_result.service_results] == \
+        [r.status for r in unshared_result.service_results]
+
+
+@pytest.mark.benchmark
+async def test_benchmark_20_services_2000_observations(record_property):
+    """Hook latency: one shared facts view vs every condition re-walking prefetch."""
+    n_services, rounds = 20, 5
+    prefetch = _large_prefetch()
+    orchestrator = ServiceOrchestrator(max_concurrent_services=n_services)
+    for i in range(n_services):
+        orchestrator.register_service(_ConditionedService(f"svc-{i}"), _service_conditions(i))
+
+    async def shared():
+        return await orchestrator.execute(HookType.PATIENT_VIEW, {"hook": "patient-view"}, prefetch)
+
+    async def unshared():
+        with patch.object(facts_module, "patient_facts_scope", _no_scope), \
+                patch("api.cds_hooks.orchestrator.service_orchestrator.patient_facts_scope", _no_scope):
+            return await orchestrator.execute(HookType.PATIENT_VIEW, {"hook": "patient-view"}, prefetch)
+
+    async def timed(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await fn()
+        return (time.perf_counter() - start) / rounds
+
+    before = await timed(unshared)
+    after = await timed(shared)
+
+    record_property("benchmark", f"{n_services} services x 2000 observations: per-condition "
+                    f"{before * 1000:.1f}ms, shared facts {after * 1000:.1f}ms per hook call")
+
+
+class _no_scope:
+    def __enter__(self):
+        return PatientFacts()
+
+    def __exit__(self, *exc):
+        return False
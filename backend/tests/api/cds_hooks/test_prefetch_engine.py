@@ -9,6 +9,9 @@
 - PrefetchTemplates hook-specific configurations
 """
 
+import asyncio
+import json
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from typing import Dict, Any, List, Optional
@@ -21,6 +24,7 @@
     get_prefetch_engine,
     execute_prefetch,
 )
+from services.fhir_resource_cache import FHIRResourceCache
 
 
 # ---- PrefetchTemplates Tests ----
@@ -240,6 +244,305 @@ async def test_search_resources_returns_empty(self):
         assert result == []
 
 
+# ---- Query Sharing Tests ----
+
+class TestPrefetchSharing:
+
+    @pytest.fixture
+    def mock_fhir_client(self):
+        client = AsyncMock()
+        client.get_resource.return_value = {"resourceType": "Patient", "id": "123"}
+        client.search_resources.return_value = [
+            {"resourceType": "Condition", "id": "c1",
+             "subject": {"reference": "Patient/123"}}
+        ]
+        return client
+
+    @pytest.fixture
+    def context(self):
+        return {"context": {"patientId": "123"}}
+
+    @pytest.mark.asyncio
+    async def test_union_of_services_resolves_each_query_once(self, mock_fhir_client, context):
+        engine = PrefetchEngine(fhir_client=mock_fhir_client)
+        configs = {
+            "svc-a": {"patient": PrefetchTemplates.PATIENT, "conditions": PrefetchTemplates.CONDITIONS},
+            "svc-b": {"pt": PrefetchTemplates.PATIENT, "conditions": PrefetchTemplates.CONDITIONS},
+            "svc-c": {"patient": PrefetchTemplates.PATIENT},
+        }
+
+        results = await engine.execute_prefetch_for_services(configs, context)
+
+        assert mock_fhir_client.get_resource.call_count == 1
+        assert mock_fhir_client.search_resources.call_count == 1
+        assert results["svc-b"]["pt"]["id"] == "123"
+        assert results["svc-c"] == {"patient": {"resourceType": "Patient", "id": "123"}}
+        # Services get independent copies
+        results["svc-a"]["patient"]["id"] = "mutated"
+        assert results["svc-b"]["pt"]["id"] == "123"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_invocations_join_in_flight_query(self, mock_fhir_client, context):
+        async def slow_get(resource_type, resource_id):
+            await asyncio.sleep(0.01)
+            return {"resourceType": resource_type, "id": resource_id}
+
+        mock_fhir_client.get_resource.side_effect = slow_get
+        engine = PrefetchEngine(fhir_client=mock_fhir_client)
+        config = {"patient": PrefetchTemplates.PATIENT}
+
+        results = await asyncio.gather(
+            *(engine.execute_prefetch(config, context) for _ in range(4))
+        )
+
+        assert mock_fhir_client.get_resource.call_count == 1
+        assert all(r["patient"]["id"] == "123" for r in results)
+        assert engine.get_stats()["queries_shared"] == 3
+
+    @pytest.mark.asyncio
+    async def test_injected_client_is_not_cached_by_default(self, mock_fhir_client, context):
+        engine = PrefetchEngine(fhir_client=mock_fhir_client)
+        config = {"patient": PrefetchTemplates.PATIENT}
+
+        await engine.execute_prefetch(config, context)
+        await engine.execute_prefetch(config, context)
+
+        assert mock_fhir_client.get_resource.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_repeated_firing_hits_cache_until_patient_write(self, mock_fhir_client, context):
+        cache = FHIRResourceCache()
+        engine = PrefetchEngine(fhir_client=mock_fhir_client, cache=cache, cache_ttl=30)
+        config = {"patient": PrefetchTemplates.PATIENT, "conditions": PrefetchTemplates.CONDITIONS}
+
+        first = await engine.execute_prefetch(config, context)
+        second = await engine.execute_prefetch(config, context)
+
+        assert second == first
+        assert mock_fhir_client.get_resource.call_count == 1
+        assert mock_fhir_client.search_resources.call_count == 1
+        assert engine.get_stats()["cache_hits"] == 2
+
+        # A new Condition in the chart drops this patient's prefetch
+        cache.invalidate_write("Condition", "c2", patient_id="123")
+        await engine.execute_prefetch(config, context)
+        assert mock_fhir_client.get_resource.call_count == 2
+        assert mock_fhir_client.search_resources.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_lookups_are_not_cached(self, mock_fhir_client, context):
+        mock_fhir_client.get_resource.return_value = None
+        engine = PrefetchEngine(fhir_client=mock_fhir_client, cache=FHIRResourceCache(), cache_ttl=30)
+        config = {"patient": PrefetchTemplates.PATIENT}
+
+        assert (await engine.execute_prefetch(config, context))["patient"] is None
+        await engine.execute_prefetch(config, context)
+
+        assert mock_fhir_client.get_resource.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_search_is_not_cached(self, mock_fhir_client, context):
+        mock_fhir_client.search_resources.side_effect = [
+            RuntimeError("HAPI FHIR search error: 503"),
+            [{"resourceType": "Condition", "id": "c1", "subject": {"reference": "Patient/123"}}],
+        ]
+        engine = PrefetchEngine(fhir_client=mock_fhir_client, cache=FHIRResourceCache(), cache_ttl=30)
+        config = {"conditions": PrefetchTemplates.CONDITIONS}
+
+        assert (await engine.execute_prefetch(config, context))["conditions"] is None
+        result = await engine.execute_prefetch(config, context)
+
+        assert mock_fhir_client.search_resources.call_count == 2
+        assert result["conditions"]["total"] == 1
+
+    def test_cache_is_off_by_default(self):
+        assert PrefetchEngine().cache is None
+
+    @pytest.mark.asyncio
+    async def test_write_to_included_type_drops_cached_search(self, mock_fhir_client, context):
+        cache = FHIRResourceCache()
+        engine = PrefetchEngine(fhir_client=mock_fhir_client, cache=cache, cache_ttl=30)
+        config = {
+            "meds": "MedicationRequest?patient={{context.patientId}}"
+                    "&_include=MedicationRequest:medication:Medication"
+                    "&_revinclude=Provenance:target"
+        }
+
+        await engine.execute_prefetch(config, context)
+        await engine.execute_prefetch(config, context)
+        assert mock_fhir_client.search_resources.call_count == 1
+
+        # Neither write names the patient, only the included types
+        cache.invalidate_write("Medication", "m1")
+        await engine.execute_prefetch(config, context)
+        assert mock_fhir_client.search_resources.call_count == 2
+
+        cache.invalidate_write("Provenance", "p1")
+        await engine.execute_prefetch(config, context)
+        assert mock_fhir_client.search_resources.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_disables_cache(self, mock_fhir_client, context):
+        engine = PrefetchEngine(fhir_client=mock_fhir_client, cache=FHIRResourceCache(), cache_ttl=0)
+        config = {"patient": PrefetchTemplates.PATIENT}
+
+        await engine.execute_prefetch(config, context)
+        await engine.execute_prefetch(config, context)
+
+        assert mock_fhir_client.get_resource.call_count == 2
+
+
+# ---- Batch Bundle Tests ----
+
+class TestPrefetchBatch:
+
+    @pytest.fixture
+    def context(self):
+        return {"context": {"patientId": "123"}}
+
+    @pytest.fixture
+    def config(self):
+        return {
+            "patient": PrefetchTemplates.PATIENT,
+            "conditions": PrefetchTemplates.CONDITIONS,
+            "medications": PrefetchTemplates.MEDICATIONS,
+        }
+
+    @staticmethod
+    def _searchset(*resources):
+        return {"resourceType": "Bundle", "type": "searchset",
+                "entry": [{"resource": r} for r in resources]}
+
+    @pytest.mark.asyncio
+    async def test_queries_sent_as_one_batch(self, context, config):
+        client = AsyncMock()
+        client.batch_get.return_value = [
+            (200, {"resourceType": "Patient", "id": "123"}),
+            (200, self._searchset({"resourceType": "Condition", "id": "c1"})),
+            (200, self._searchset()),
+        ]
+        engine = PrefetchEngine(fhir_client=client, batch=True)
+
+        result = await engine.execute_prefetch(config, context)
+
+        client.batch_get.assert_called_once_with([
+            "Patient/123",
+            "Condition?patient=123&clinical-status=active",
+            "MedicationRequest?patient=123&status=active",
+        ])
+        client.get_resource.assert_not_called()
+        client.search_resources.assert_not_called()
+        assert result["patient"]["id"] == "123"
+        assert result["conditions"]["entry"][0]["fullUrl"] == "Condition/c1"
+        assert result["medications"]["total"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_entries_are_retried_individually(self, context, config):
+        client = AsyncMock()
+        client.batch_get.return_value = [
+            (200, {"resourceType": "Patient", "id": "123"}),
+            (500, None),
+            (200, self._searchset()),
+        ]
+        client.search_resources.return_value = [{"resourceType": "Condition", "id": "c1"}]
+        engine = PrefetchEngine(fhir_client=client, batch=True)
+
+        result = await engine.execute_prefetch(config, context)
+
+        client.search_resources.assert_called_once_with(
+            "Condition", {"patient": "123", "clinical-status": "active"}
+        )
+        assert result["conditions"]["total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_resource_is_none_without_retry(self, context):
+        client = AsyncMock()
+        client.batch_get.return_value = [(404, None), (200, self._searchset())]
+        engine = PrefetchEngine(fhir_client=client, batch=True)
+
+        result = await engine.execute_prefetch(
+            {"patient": PrefetchTemplates.PATIENT, "allergies": PrefetchTemplates.ALLERGIES},
+            context
+        )
+
+        assert result["patient"] is None
+        client.get_resource.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejected_batch_falls_back_to_individual_queries(self, context, config):
+        client = AsyncMock()
+        client.batch_get.side_effect = RuntimeError("batch not supported")
+        client.get_resource.return_value = {"resourceType": "Patient", "id": "123"}
+        client.search_resources.return_value = []
+        engine = PrefetchEngine(fhir_client=client, batch=True)
+
+        result = await engine.execute_prefetch(config, context)
+
+        assert result["patient"]["id"] == "123"
+        assert client.search_resources.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_only_sends_cache_misses(self, context, config):
+        client = AsyncMock()
+        client.get_resource.return_value = {"resourceType": "Patient", "id": "123"}
+        client.batch_get.return_value = [(200, self._searchset()), (200, self._searchset())]
+        engine = PrefetchEngine(fhir_client=client, cache=FHIRResourceCache(), cache_ttl=30, batch=True)
+
+        await engine.execute_prefetch({"patient": PrefetchTemplates.PATIENT}, context)
+        await engine.execute_prefetch(config, context)
+
+        assert client.batch_get.call_args.args[0] == [
+            "Condition?patient=123&clinical-status=active",
+            "MedicationRequest?patient=123&status=active",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_hapi_client_posts_batch_bundle(self):
+        import httpx
+        from api.cds_hooks.prefetch.engine import HAPIFHIRPrefetchClient
+
+        sent = []
+
+        async def dispatch(request):
+            sent.append(json.loads(await request.aread()))
+            return httpx.Response(200, json={
+                "resourceType": "Bundle", "type": "batch-response",
+                "entry": [
+                    {"resource": {"resourceType": "Patient", "id": "123"},
+                     "response": {"status": "200 OK"}},
+                    {"response": {"status": "404 Not Found"}},
+                ]
+            })
+
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(dispatch))
+        with patch("services.hapi_fhir_client.get_shared_http_client", return_value=http_client):
+            results = await HAPIFHIRPrefetchClient("http://hapi/fhir").batch_get(
+                ["Patient/123", "Encounter/e1"]
+            )
+
+        assert sent[0]["type"] == "batch"
+        assert [e["request"] for e in sent[0]["entry"]] == [
+            {"method": "GET", "url": "Patient/123"},
+            {"method": "GET", "url": "Encounter/e1"},
+        ]
+        assert results == [(200, {"resourceType": "Patient", "id": "123"}), (404, None)]
+
+    @pytest.mark.asyncio
+    async def test_hapi_client_search_failure_raises(self):
+        import httpx
+        from api.cds_hooks.prefetch.engine import HAPIFHIRPrefetchClient
+
+        async def dispatch(request):
+            return httpx.Response(503)
+
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(dispatch))
+        with patch("services.hapi_fhir_client.get_shared_http_client", return_value=http_client):
+            with pytest.raises(httpx.HTTPStatusError):
+                await HAPIFHIRPrefetchClient("http://hapi/fhir").search_resources(
+                    "Condition", {"patient": "123"}
+                )
+
+
 # ---- Global Functions Tests ----
 
 class TestGlobalFunctions:
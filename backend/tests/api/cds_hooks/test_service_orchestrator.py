@@ -318,6 +318,38 @@ async def test_execute_single_by_id(self, orchestrator, default_context, default
         assert isinstance(result, ServiceExecutionResult)
         assert result.service_id == "test-1"
 
+    @pytest.mark.asyncio
+    async def test_empty_prefetch_resolved_once_for_all_services(self, orchestrator, default_context):
+        from api.cds_hooks.prefetch.engine import PrefetchEngine
+
+        seen = {}
+
+        class RecordingService(MockCDSService):
+            async def execute(self, context, prefetch):
+                seen[self.service_id] = prefetch
+                return []
+
+        for sid in ("svc-a", "svc-b", "svc-c"):
+            orchestrator.register_service(RecordingService(sid))
+
+        fhir_client = AsyncMock()
+        fhir_client.get_resource.return_value = {"resourceType": "Patient", "id": "123"}
+        engine = PrefetchEngine(fhir_client=fhir_client)
+
+        with patch(
+            "api.cds_hooks.orchestrator.service_orchestrator.get_prefetch_engine",
+            return_value=engine
+        ):
+            result = await orchestrator.execute(
+                hook_type=HookType.PATIENT_VIEW,
+                context={"patientId": "123"},
+                prefetch={}
+            )
+
+        assert result.services_executed == 3
+        fhir_client.get_resource.assert_called_once_with("Patient", "123")
+        assert all(p["patient"]["id"] == "123" for p in seen.values())
+
 
 # ---- Service Definitions Tests ----
 
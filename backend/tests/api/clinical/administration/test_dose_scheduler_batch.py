@@ -0,0 +1,177 @@
+"""
+Equivalence tests for the vectorized dose-schedule expansion.
+
+`compute_due_times_batch` / `expand_due_times_batch` must return exactly
+what `compute_due_times` returns for every order — same instants, same
+timezone on each datetime, same dose numbering — so the MAR can switch to
+the batch path without a single grid cell moving. Orders are generated at
+random (seeded, so failures reproduce) across the timing shapes the
+scheduler handles and the edge cases around them.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from services.dose_scheduler import (
+    compute_due_times,
+    compute_due_times_batch,
+    expand_due_times_batch,
+)
+
+BASE = datetime(2026, 5, 14, tzinfo=timezone.utc)
+OFFSETS = [
+    timezone.utc,
+    timezone(timedelta(hours=-5)),
+    timezone(timedelta(hours=5, minutes=30)),
+    timezone(timedelta(hours=-9, minutes=-30)),
+    None,  # naive
+]
+
+
+def _stamp(rng, around: datetime, spread_hours: int) -> str:
+    dt = around + timedelta(
+        hours=rng.randint(-spread_hours, spread_hours),
+        minutes=rng.choice([0, 0, 0, 7, 30, 59]),
+        seconds=rng.choice([0, 0, 13]),
+    )
+    tz = rng.choice(OFFSETS)
+    if tz is None:
+        return dt.replace(tzinfo=None).isoformat()
+    text = dt.astimezone(tz).isoformat()
+    return text.replace("+00:00", "Z") if rng.random() < 0.3 else text
+
+
+def random_order(rng, i: int) -> dict:
+    repeat: dict = {}
+    roll = rng.random()
+    if roll < 0.5:
+        repeat = {
+            "frequency": rng.choice([1, 1, 2, 3, 4, 6, 7, 0]),
+            "period": rng.choice([1, 1.5, 2, 4, 6, 8, 12, 24, 0.25]),
+            "periodUnit": "h",
+        }
+    elif roll < 0.9:
+        repeat = {
+            "frequency": rng.choice([1, 2, 3, 4, 5, 6, 7, 9, 12]),
+            "period": rng.choice([1, 1, 2, 3, 7]),
+            "periodUnit": "d",
+        }
+    elif roll < 0.95:
+        repeat = {"frequency": 1, "period": 1, "periodUnit": rng.choice(["wk", "min"])}
+
+    if repeat and rng.random() < 0.35:
+        bounds = {}
+        if rng.random() < 0.7:
+            bounds["start"] = _stamp(rng, BASE, 72)
+        if rng.random() < 0.5:
+            # Naive ends are excluded: the walk raises comparing them
+            end = BASE + timedelta(hours=rng.randint(-24, 24 * 20))
+            bounds["end"] = end.astimezone(rng.choice(OFFSETS[:4])).isoformat()
+        repeat["boundsPeriod"] = bounds
+
+    timing: dict = {"repeat": repeat} if repeat else {"code": {"text": rng.choice(["BID", "q8h", "Q4H", "weird"])}}
+    instr = {"text": "1 tab", "route": {"text": "PO"}, "timing": timing}
+    if rng.random() < 0.05:
+        instr["asNeededBoolean"] = True
+
+    order = {
+        "resourceType": "MedicationRequest",
+        "id": f"rx-{i}",
+        "medicationCodeableConcept": {"text": f"Drug {i}"},
+        "dosageInstruction": [instr],
+    }
+    if rng.random() < 0.9:
+        order["authoredOn"] = _stamp(rng, BASE, 24 * 10)
+    return order
+
+
+def random_window(rng):
+    tz = rng.choice(OFFSETS[:4])
+    start = (BASE + timedelta(hours=rng.randint(-48, 48), minutes=rng.choice([0, 15, 45]))).astimezone(tz)
+    length = timedelta(hours=rng.choice([1, 12, 24, 72, 24 * 10]))
+    return start, start + length
+
+
+def _as_tuples(doses):
+    # isoformat pins the timezone as well as the instant
+    return [(d.scheduled_time.isoformat(), d.dose_number, d.medication_request_id) for d in doses]
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_batch_matches_compute_due_times(seed):
+    rng = random.Random(seed)
+    orders = [random_order(rng, i) for i in range(150)]
+    window_start, window_end = random_window(rng)
+
+    expected = [compute_due_times(o, window_start, window_end) for o in orders]
+    actual = compute_due_times_batch(orders, window_start, window_end)
+
+    assert actual == expected
+    assert [_as_tuples(a) for a in actual] == [_as_tuples(e) for e in expected]
+    assert sum(len(e) for e in expected) > 0
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_datetime64_arrays_hold_the_same_utc_instants(seed):
+    rng = random.Random(1000 + seed)
+    orders = [random_order(rng, i) for i in range(100)]
+    window_start, window_end = random_window(rng)
+
+    arrays = expand_due_times_batch(orders, window_start, window_end)
+
+    for order, array in zip(orders, arrays):
+        expected = [
+            np.datetime64(d.scheduled_time.astimezone(timezone.utc).replace(tzinfo=None), "us")
+            for d in compute_due_times(order, window_start, window_end)
+        ]
+        assert array.dtype == np.dtype("datetime64[us]")
+        assert array.tolist() == [e.tolist() for e in expected]
+
+
+def test_naive_window_and_zone_boundaries():
+    order = random_order(random.Random(3), 0)
+    order["authoredOn"] = "2026-05-13T23:30:00-05:00"
+    order["dosageInstruction"][0]["timing"] = {"repeat": {"frequency": 2, "period": 3, "periodUnit": "d"}}
+    start, end = datetime(2026, 5, 14), datetime(2026, 5, 30)
+
+    assert compute_due_times_batch([order], start, end) == [compute_due_times(order, start, end)]
+
+
+def test_unsupported_and_prn_orders_are_empty():
+    rng = random.Random(5)
+    prn = random_order(rng, 0)
+    prn["dosageInstruction"][0]["asNeededBoolean"] = True
+    weekly = random_order(rng, 1)
+    weekly["dosageInstruction"][0]["timing"] = {"repeat": {"frequency": 1, "period": 1, "periodUnit": "wk"}}
+
+    assert compute_due_times_batch([prn, weekly], BASE, BASE + timedelta(days=1)) == [[], []]
+    assert [a.size for a in expand_due_times_batch([prn, weekly], BASE, BASE + timedelta(days=1))] == [0, 0]
+
+
+@pytest.mark.slow
+def test_ward_30_day_history_matches_scalar_walk():
+    rng = random.Random(42)
+    orders = []
+    for i in range(400):
+        order = random_order(rng, i)
+        order["dosageInstruction"][0].pop("asNeededBoolean", None)
+        order["dosageInstruction"][0]["timing"] = {"repeat": rng.choice([
+            {"frequency": 1, "period": 1, "periodUnit": "h"},
+            {"frequency": 1, "period": 4, "periodUnit": "h"},
+            {"frequency": 4, "period": 1, "periodUnit": "d"},
+            {"frequency": 2, "period": 1, "periodUnit": "d"},
+        ])}
+        orders.append(order)
+    start, end = BASE - timedelta(days=30), BASE
+
+    expected = [compute_due_times(o, start, end) for o in orders]
+    arrays = expand_due_times_batch(orders, start, end)
+    actual = compute_due_times_batch(orders, start, end)
+
+    assert actual == expected
+    assert sum(a.size for a in arrays) == sum(len(e) for e in expected)
@@ -0,0 +1,266 @@
+"""
+Ward-level MAR (#116 follow-up): GET /ward-scheduled-tasks and the indexed
+dose/admin matcher behind every MAR grid.
+
+The matcher must pick exactly the admin the original linear scan picked
+(stamp first, then closest unstamped within the window, earlier record on
+ties); the ward call must return, per patient, exactly what the
+single-patient MAR returns, from batched searches.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.clinical.administration import service
+from api.clinical.administration.router import router
+from api.clinical.administration.service import (
+    ADMIN_MATCH_WINDOW,
+    SCHEDULED_DOSE_TIME_EXTENSION,
+    AdminRecord,
+    _build_mar,
+    _parse_admin,
+    get_scheduled_tasks,
+    get_ward_scheduled_tasks,
+)
+from services.dose_scheduler import compute_due_times
+
+WINDOW_START = datetime(2026, 5, 14, tzinfo=timezone.utc)
+WINDOW_END = datetime(2026, 5, 15, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def reference_match(dose, admins, consumed) -> Optional[AdminRecord]:
+    """The O(doses x admins) scan _match_dose used before the index."""
+    best = None
+    for admin in admins:
+        if admin.id in consumed or admin.medication_request_id != dose.medication_request_id:
+            continue
+        if admin.scheduled_time is None:
+            continue
+        if abs(admin.scheduled_time - dose.scheduled_time) <= timedelta(minutes=1):
+            best = admin
+            break
+    if best is None:
+        best_delta = None
+        for admin in admins:
+            if admin.id in consumed or admin.medication_request_id != dose.medication_request_id:
+                continue
+            if admin.scheduled_time is not None:
+                continue
+            delta = abs(admin.effective_datetime - dose.scheduled_time)
+            if delta > ADMIN_MATCH_WINDOW:
+                continue
+            if best is None or delta < best_delta:
+                best, best_delta = admin, delta
+    if best is not None:
+        consumed.add(best.id)
+    return best
+
+
+def med_request(rx_id, patient_id, frequency=4, prn=False, status="active"):
+    instr = {
+        "text": "1 tab PO",
+        "timing": {"repeat": {"frequency": frequency, "period": 1, "periodUnit": "d"}},
+    }
+    if prn:
+        instr["asNeededBoolean"] = True
+    return {
+        "resourceType": "MedicationRequest",
+        "id": rx_id,
+        "status": status,
+        "authoredOn": "2026-05-13T08:00:00+00:00",
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "medicationCodeableConcept": {"text": f"Drug {rx_id}"},
+        "dosageInstruction": [instr],
+    }
+
+
+def med_admin(admin_id, rx_id, patient_id, effective, stamp=None, status="completed"):
+    resource = {
+        "resourceType": "MedicationAdministration",
+        "id": admin_id,
+        "status": status,
+        "effectiveDateTime": effective.isoformat(),
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "request": {"reference": f"MedicationRequest/{rx_id}"},
+    }
+    if stamp is not None:
+        resource["extension"] = [{"url": SCHEDULED_DOSE_TIME_EXTENSION, "valueDateTime": stamp.isoformat()}]
+    return resource
+
+
+def patient_chart(rng, patient_id, n_meds=12, n_admins=40):
+    meds = [
+        med_request(f"{patient_id}-rx{i}", patient_id,
+                    frequency=rng.choice([1, 2, 3, 4, 6]), prn=rng.random() < 0.15)
+        for i in range(n_meds)
+    ]
+    admins = []
+    for i in range(n_admins):
+        rx = rng.choice(meds)["id"]
+        # Cluster around whole hours so stamps/proximity collide often
+        effective = WINDOW_START + timedelta(hours=rng.randrange(24), minutes=rng.choice([-61, -30, 0, 0, 15, 60, 90]))
+        stamp = None
+        if rng.random() < 0.4:
+            stamp = WINDOW_START + timedelta(hours=rng.randrange(24), seconds=rng.choice([0, 30, 90]))
+        admins.append(med_admin(f"{patient_id}-a{i}", rx, patient_id, effective, stamp))
+    return meds, admins
+
+
+class _WardHAPI:
+    """Fake HAPI serving several patients' charts; counts round trips."""
+
+    def __init__(self, charts, encounters=()):
+        self.charts = charts
+        self.encounters = list(encounters)
+        self.calls = []
+
+    def _matching(self, resource_type, params):
+        if resource_type == "Encounter":
+            return self.encounters
+        patients = {ref.split("/", 1)[1] for ref in params["patient"].split(",")}
+        index = 0 if resource_type == "MedicationRequest" else 1
+        return [r for pid in patients if pid in self.charts for r in self.charts[pid][index]]
+
+    async def search(self, resource_type, params):
+        self.calls.append((resource_type, dict(params)))
+        return {"entry": [{"resource": r} for r in self._matching(resource_type, params)]}
+
+    async def search_all(self, resource_type, params):
+        self.calls.append((resource_type, dict(params)))
+        return self._matching(resource_type, params)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_indexed_matching_equals_linear_scan(seed):
+    rng = random.Random(seed)
+    meds, admin_resources = patient_chart(rng, "p", n_meds=6, n_admins=80)
+    admins = [_parse_admin(r) for r in admin_resources]
+
+    bundle = _build_mar("p", meds, admins, WINDOW_START, WINDOW_END)
+
+    consumed: set[str] = set()
+    expected = []
+    for med in meds:
+        if (med["dosageInstruction"][0]).get("asNeededBoolean"):
+            continue
+        for dose in compute_due_times(med, WINDOW_START, WINDOW_END):
+            match = reference_match(dose, admins, consumed)
+            expected.append((dose.scheduled_time.isoformat(), dose.medication_request_id, match.id if match else None))
+    expected.sort(key=lambda e: (e[0], e[1]))
+
+    actual = [
+        (s["scheduled_time"], s["medication_request_id"], (s["administration"] or {}).get("id"))
+        for s in bundle.scheduled
+    ]
+    assert actual == expected
+    assert {a["id"] for a in bundle.unscheduled_admins} == {a.id for a in admins} - consumed
+
+
+@pytest.mark.asyncio
+async def test_ward_equals_per_patient_mar_with_batched_searches():
+    rng = random.Random(7)
+    patient_ids = [f"p{i}" for i in range(25)]
+    charts = {pid: patient_chart(rng, pid) for pid in patient_ids}
+    hapi = _WardHAPI(charts)
+
+    with patch.object(service, "HAPIFHIRClient", return_value=hapi):
+        ward = await get_ward_scheduled_tasks(WINDOW_START, WINDOW_END, patient_ids=patient_ids)
+        ward_calls = len(hapi.calls)
+        singles = [await get_scheduled_tasks(pid, WINDOW_START, WINDOW_END) for pid in patient_ids]
+
+    assert [b.patient_id for b in ward.patients] == patient_ids
+    assert ward.patients == singles
+    # 25 patients in batches of 20 -> 2 batches x 2 resource types
+    assert ward_calls == 4
+    assert all(len(params["patient"].split(",")) <= 20 for _, params in hapi.calls[:ward_calls])
+
+
+@pytest.mark.asyncio
+async def test_ward_by_location_uses_in_progress_encounters():
+    charts = {"a": patient_chart(random.Random(1), "a"), "b": patient_chart(random.Random(2), "b")}
+    encounters = [
+        {"resourceType": "Encounter", "id": "e1", "subject": {"reference": "Patient/b"}},
+        {"resourceType": "Encounter", "id": "e2", "subject": {"reference": "Patient/a"}},
+        {"resourceType": "Encounter", "id": "e3", "subject": {"reference": "Patient/b"}},
+    ]
+    hapi = _WardHAPI(charts, encounters)
+
+    with patch.object(service, "HAPIFHIRClient", return_value=hapi):
+        ward = await get_ward_scheduled_tasks(WINDOW_START, WINDOW_END, location_id="icu-4")
+
+    assert [b.patient_id for b in ward.patients] == ["b", "a"]
+    assert hapi.calls[0] == ("Encounter", {"location": "Location/icu-4", "status": "in-progress", "_count": 200})
+
+
+def test_ward_endpoint_requires_exactly_one_selector(client):
+    url = "/api/clinical/administration/ward-scheduled-tasks"
+    assert client.get(url).status_code == 400
+    assert client.get(url, params={"patient_ids": "a", "location_id": "x"}).status_code == 400
+
+
+def test_ward_endpoint_payload(client):
+    charts = {"a": patient_chart(random.Random(3), "a"), "b": patient_chart(random.Random(4), "b")}
+    with patch.object(service, "HAPIFHIRClient", return_value=_WardHAPI(charts)):
+        resp = client.get(
+            "/api/clinical/administration/ward-scheduled-tasks",
+            params={
+                "patient_ids": "a, b",
+                "window_start": WINDOW_START.isoformat(),
+                "window_end": WINDOW_END.isoformat(),
+            },
+        )
+    assert resp.status_code == 200
+    payload = resp.json()
+    assert [p["patient_id"] for p in payload["patients"]] == ["a", "b"]
+    assert all(p["scheduled"] for p in payload["patients"])
+
+
+def forty_bed_unit():
+    rng = random.Random(42)
+    patient_ids = [f"bed{i}" for i in range(40)]
+    charts = {pid: patient_chart(rng, pid, n_meds=15, n_admins=120) for pid in patient_ids}
+    return patient_ids, _WardHAPI(charts)
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_40_bed_unit():
+    patient_ids, hapi = forty_bed_unit()
+
+    with patch.object(service, "HAPIFHIRClient", return_value=hapi):
+        ward = await get_ward_scheduled_tasks(WINDOW_START, WINDOW_END, patient_ids=patient_ids)
+
+    assert [b.patient_id for b in ward.patients] == patient_ids
+    assert all(b.scheduled for b in ward.patients)
+    # 40 patients in batches of 20 -> 2 batches x 2 resource types
+    assert len(hapi.calls) == 4
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_benchmark_40_bed_unit(record_property):
+    patient_ids, hapi = forty_bed_unit()
+
+    with patch.object(service, "HAPIFHIRClient", return_value=hapi):
+        started = time.perf_counter()
+        ward = await get_ward_scheduled_tasks(WINDOW_START, WINDOW_END, patient_ids=patient_ids)
+        elapsed = time.perf_counter() - started
+
+    doses = sum(len(b.scheduled) for b in ward.patients)
+    record_property("benchmark", f"40 beds, {doses} doses, 4800 admins: {elapsed * 1000:.0f}ms")
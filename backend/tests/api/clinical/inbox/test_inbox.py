@@ -0,0 +1,592 @@
+"""
+Clinical inbox listing and counters (api/clinical/inbox/).
+
+Tasks, abnormal labs and draft medication orders are searched concurrently
+with the filters pushed down, one stream per (source, priority), and
+merged high priority first, then newest first. Walking the cursor must
+visit exactly the items inbox_item() accepts, in that order. The stats
+counters must always equal a recount from scratch, however the inbox
+changes through FHIR write notifications.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from api.auth import get_current_user
+from api.clinical.inbox import counters as counters_module
+from api.clinical.inbox.counters import InboxCounters, InboxWriteLog
+from api.clinical.tasks.router import router as tasks_router
+from api.clinical.inbox.models import InboxItemStatus, InboxItemType
+from api.clinical.inbox.router import router
+from api.clinical.inbox.service import (
+    INBOX_LAB_PAGE_SIZE,
+    LAB_STREAM_KEY,
+    PRIORITY_RANKS,
+    STREAM_KEYS,
+    InboxService,
+    get_inbox_service,
+    inbox_item,
+    lab_expiry,
+)
+from api.websocket import fhir_notifications
+from api.websocket.fhir_notifications import notification_service
+
+NOW = datetime.now(timezone.utc)
+DATE_FIELDS = {
+    ("Task", "authored-on"): "authoredOn",
+    ("Observation", "date"): "effectiveDateTime",
+    ("MedicationRequest", "authoredon"): "authoredOn",
+}
+
+
+def _parse(value):
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _reference_id(value):
+    return (value or {}).get("reference", "").split("/")[-1] or None
+
+
+def _matches(resource, name, value):
+    resource_type = resource["resourceType"]
+    if (resource_type, name) in DATE_FIELDS:
+        field = resource.get(DATE_FIELDS[resource_type, name])
+        if not field:
+            return False
+        for bound in value if isinstance(value, list) else [value]:
+            prefix, limit = bound[:2], bound[2:]
+            if len(limit) == 10:  # date only: compare days
+                ok = _parse(field).date().isoformat() >= limit if prefix == "ge" else _parse(field).date().isoformat() <= limit
+            else:
+                ok = _parse(field) >= _parse(limit) if prefix == "ge" else _parse(field) <= _parse(limit)
+            if not ok:
+                return False
+        return True
+    if name in ("status", "intent", "priority"):
+        return resource.get(name) in value.split(",")
+    if name == "priority:missing":
+        return not resource.get("priority")
+    if name == "owner":
+        return _reference_id(resource.get("owner")) == value
+    if name == "patient":
+        return _reference_id(resource.get("for") or resource.get("subject")) == value
+    if name == "category":
+        return any(c.get("code") == value for cat in resource.get("category", []) for c in cat.get("coding", []))
+    raise AssertionError(f"unexpected search parameter {name}")
+
+
+class _InboxHAPI:
+    """Fake HAPI search over an in-memory store, honouring the inbox's parameters."""
+
+    def __init__(self, resources, delay=0.0):
+        self.store = {(r["resourceType"], r["id"]): r for r in resources}
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _search(self, resource_type, params):
+        ids = params["_id"].split(",") if "_id" in params else None
+        matches = [
+            r for (rt, _), r in self.store.items()
+            if rt == resource_type and (ids is None or r["id"] in ids) and all(
+                _matches(r, name, value) for name, value in params.items() if not name.startswith("_")
+            )
+        ]
+        sort = params.get("_sort")
+        if sort:
+            field = DATE_FIELDS[resource_type, sort.lstrip("-")]
+            # Stable sort: ties come back in a fixed order, as from a database
+            matches.sort(key=lambda r: _parse(r[field]), reverse=True)
+        return matches
+
+    async def _request(self, resource_type, params):
+        """One upstream read, recorded."""
+        self.calls.append((resource_type, dict(params)))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+    async def search(self, resource_type, params):
+        await self._request(resource_type, params)
+        matches = self._search(resource_type, params)
+        return {"entry": [{"resource": r} for r in matches[:params["_count"]]]}
+
+    async def search_iter(self, resource_type, params):
+        """Pages of `_count`, one read each, like following Bundle.link[next]."""
+        matches = self._search(resource_type, params)
+        count = params["_count"]
+        for start in range(0, max(len(matches), 1), count):
+            await self._request(resource_type, params)
+            for resource in matches[start:start + count]:
+                await asyncio.sleep(self.delay)
+                yield resource
+
+
+def _when(rng, days=6):
+    minutes = rng.randrange(days * 24 * 60 // 97) * 97  # coarse, so dates tie
+    return (NOW - timedelta(minutes=minutes)).isoformat().replace("+00:00", "Z")
+
+
+def _resource(rng, i):
+    kind = rng.choice(["Task", "Observation", "MedicationRequest"])
+    patient = {"reference": f"Patient/p{rng.randrange(3)}", "display": "Pat Ient"}
+    if kind == "Task":
+        resource = {
+            "resourceType": "Task",
+            "status": rng.choice(["requested", "accepted", "in-progress", "completed"]),
+            "intent": "order",
+            "description": f"Task {i}",
+            "for": patient,
+            "authoredOn": _when(rng),
+        }
+        owner = rng.choice(["prov-1", "prov-2", None])
+        if owner:
+            resource["owner"] = {"reference": f"Practitioner/{owner}"}
+    elif kind == "Observation":
+        resource = {
+            "resourceType": "Observation",
+            "status": rng.choice(["final", "final", "preliminary"]),
+            "category": [{"coding": [{"code": rng.choice(["laboratory", "laboratory", "vital-signs"])}]}],
+            "code": {"text": f"Test {i}"},
+            "subject": patient,
+            "effectiveDateTime": _when(rng, days=10),
+            "valueQuantity": {"value": i, "unit": "mg/dL"},
+        }
+        interpretation = rng.choice(["HH", "H", "N", "L", "LL", "A", "AA", None])
+        if interpretation:
+            resource["interpretation"] = [{"coding": [{"code": interpretation}]}]
+    else:
+        resource = {
+            "resourceType": "MedicationRequest",
+            "status": rng.choice(["draft", "draft", "active"]),
+            "intent": rng.choice(["order", "order", "plan"]),
+            "medicationCodeableConcept": {"text": f"Drug {i}"},
+            "subject": patient,
+            "authoredOn": _when(rng),
+        }
+    priority = rng.choice(["stat", "urgent", "routine", "low", None, None])
+    if priority and kind != "Observation":
+        resource["priority"] = priority
+    resource["id"] = f"{kind[0].lower()}{i}"
+    return resource
+
+
+def _dataset(rng, n):
+    return [_resource(rng, i) for i in range(n)]
+
+
+def _stream_key(resource, item):
+    if resource["resourceType"] == "Observation":
+        return LAB_STREAM_KEY
+    bucket = item.priority if resource.get("priority") else "unprioritized"
+    return f"{resource['resourceType']}:{bucket}"
+
+
+def _expected(resources, status=None, item_type=None, assigned_to=None, patient_id=None):
+    """Inbox item ids in listing order, computed from scratch."""
+    rows = []
+    for index, resource in enumerate(resources):
+        item = inbox_item(resource)
+        if item is None:
+            continue
+        if (status and item.status != status) or (item_type and item.type != item_type):
+            continue
+        if (assigned_to and item.assigned_to != assigned_to) or (patient_id and item.patient_id != patient_id):
+            continue
+        rows.append((
+            -PRIORITY_RANKS[item.priority],
+            -item.created_at.timestamp(),
+            STREAM_KEYS.index(_stream_key(resource, item)),
+            index,
+            item.id,
+        ))
+    return [row[-1] for row in sorted(rows)]
+
+
+async def _walk(service, limit, **filters):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = await service.get_inbox_page(cursor=cursor, limit=limit, **filters)
+        pages += 1
+        ids.extend(item.id for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return ids, pages
+        assert pages < 1000
+
+
+FILTERS = [
+    {},
+    {"status": InboxItemStatus.UNREAD},
+    {"status": InboxItemStatus.IN_PROGRESS},
+    {"item_type": InboxItemType.LAB_RESULT},
+    {"assigned_to": "prov-1"},
+    {"patient_id": "p2", "item_type": InboxItemType.MEDICATION_REQUEST},
+]
+
+
+# -- Listing -----------------------------------------------------------------
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("filters", FILTERS, ids=lambda f: ",".join(f"{k}={v}" for k, v in f.items()) or "none")
+async def test_cursor_walk_matches_global_sort(seed, filters):
+    rng = random.Random(seed)
+    resources = _dataset(rng, 200)
+    service = InboxService(hapi_client=_InboxHAPI(resources))
+
+    ids, _ = await _walk(service, limit=rng.choice([1, 6, 25]), **filters)
+
+    assert ids == _expected(resources, **filters)
+    assert ids or filters
+
+
+@pytest.mark.asyncio
+async def test_lower_priorities_are_not_searched_while_higher_ones_fill_the_page():
+    rng = random.Random(3)
+    resources = _dataset(rng, 300)
+    hapi = _InboxHAPI(resources, delay=0.01)
+    service = InboxService(hapi_client=hapi)
+
+    page = await service.get_inbox_page(limit=5)
+
+    assert {item.priority for item in page.items} == {"high"}
+    searched = {(rt, params.get("priority"), params.get("priority:missing")) for rt, params in hapi.calls}
+    assert searched == {
+        ("Task", "stat,asap,urgent,high", None),
+        ("Observation", None, None),
+        ("MedicationRequest", "stat,asap,urgent,high", None),
+    }
+    # The three sources were searched at once
+    assert hapi.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_filters_are_pushed_down_into_the_searches():
+    hapi = _InboxHAPI(_dataset(random.Random(5), 100))
+    service = InboxService(hapi_client=hapi)
+
+    await _walk(service, limit=50, status=InboxItemStatus.IN_PROGRESS, assigned_to="prov-2", patient_id="p1")
+
+    assert {rt for rt, _ in hapi.calls} == {"Task"}
+    for _, params in hapi.calls:
+        assert (params["status"], params["owner"], params["patient"]) == ("accepted,in-progress", "prov-2", "p1")
+
+    hapi.calls.clear()
+    await _walk(service, limit=50, item_type=InboxItemType.LAB_RESULT)
+    assert {rt for rt, _ in hapi.calls} == {"Observation"}
+    for _, params in hapi.calls:
+        assert (params["status"], params["category"]) == ("final", "laboratory")
+
+    hapi.calls.clear()
+    page = await service.get_inbox_page(limit=50, status=InboxItemStatus.COMPLETED)
+    assert page.items == [] and hapi.calls == []
+
+
+@pytest.mark.asyncio
+async def test_deep_pages_cost_about_one_read_per_stream():
+    resources = _dataset(random.Random(8), 600)
+    hapi = _InboxHAPI(resources)
+    service = InboxService(hapi_client=hapi)
+
+    _, pages = await _walk(service, limit=20)
+
+    assert pages >= 10
+    assert len(hapi.calls) <= len(STREAM_KEYS) * pages
+    assert max(params["_count"] for rt, params in hapi.calls if rt != "Observation") <= 20 + 10
+
+
+@pytest.mark.asyncio
+async def test_lab_window_is_scanned_once_per_page():
+    taken = (NOW - timedelta(days=1)).isoformat().replace("+00:00", "Z")
+
+    def lab(i, interpretation):
+        return {
+            "resourceType": "Observation", "id": f"o{i}", "status": "final",
+            "category": [{"coding": [{"code": "laboratory"}]}], "code": {"text": f"Test {i}"},
+            "subject": {"reference": "Patient/p1"}, "effectiveDateTime": taken,
+            "interpretation": [{"coding": [{"code": interpretation}]}],
+        }
+
+    labs = [lab(i, "N") for i in range(3000)] + [lab(3000 + i, code) for i, code in enumerate(["H", "HH", "L"])]
+    hapi = _InboxHAPI(labs)
+    service = InboxService(hapi_client=hapi)
+
+    page = await service.get_inbox_page(item_type=InboxItemType.LAB_RESULT, limit=20)
+
+    assert [item.id for item in page.items] == ["lab-o3001", "lab-o3000", "lab-o3002"]
+    assert len(hapi.calls) == -(-len(labs) // INBOX_LAB_PAGE_SIZE)
+    assert all(params["_elements"] and params["_count"] == INBOX_LAB_PAGE_SIZE for _, params in hapi.calls)
+
+
+@pytest.mark.asyncio
+async def test_cursor_bound_to_filters():
+    service = InboxService(hapi_client=_InboxHAPI(_dataset(random.Random(1), 60)))
+    page = await service.get_inbox_page(limit=5, assigned_to="prov-1")
+
+    with pytest.raises(HTTPException) as exc:
+        await service.get_inbox_page(limit=5, cursor=page.next_cursor, assigned_to="prov-2")
+    assert exc.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc:
+        await service.get_inbox_page(limit=5, cursor="not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+def test_list_and_page_endpoints():
+    resources = _dataset(random.Random(2), 120)
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_inbox_service] = lambda: InboxService(hapi_client=_InboxHAPI(resources))
+    expected = _expected(resources)
+
+    with TestClient(app) as client:
+        listed = client.get("/api/clinical/inbox/", params={"limit": 15, "offset": 10}).json()
+        first = client.get("/api/clinical/inbox/page", params={"limit": 10}).json()
+        second = client.get("/api/clinical/inbox/page", params={"limit": 10, "cursor": first["next_cursor"]}).json()
+        bad = client.get("/api/clinical/inbox/page", params={"cursor": "nope"})
+
+    assert [item["id"] for item in listed] == expected[10:25]
+    assert [item["id"] for item in first["items"] + second["items"]] == expected[:20]
+    assert bad.status_code == 400
+
+
+# -- Counters ----------------------------------------------------------------
+
+def _recount(resources, assigned_to=None):
+    stats = {"total": 0, "by_status": Counter(), "by_type": Counter(), "by_priority": Counter()}
+    for resource in resources:
+        item = inbox_item(resource)
+        if item is None or (assigned_to and item.assigned_to != assigned_to):
+            continue
+        stats["total"] += 1
+        stats["by_status"][item.status.value] += 1
+        stats["by_type"][item.type.value] += 1
+        stats["by_priority"][item.priority] += 1
+    return {key: dict(value) if isinstance(value, Counter) else value for key, value in stats.items()}
+
+
+@pytest.fixture
+def listening(monkeypatch):
+    """Route notifications to listeners only (no WebSocket manager)."""
+    async def broadcast(**kwargs):
+        pass
+
+    monkeypatch.setattr(fhir_notifications.manager, "broadcast_resource_update", broadcast)
+    subscribed = []
+
+    def subscribe(counters):
+        notification_service.add_listener(counters.on_fhir_write)
+        subscribed.append(counters)
+        return counters
+
+    yield subscribe
+    for counters in subscribed:
+        notification_service.remove_listener(counters.on_fhir_write)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seed", range(3))
+async def test_counters_follow_write_notifications(seed, listening):
+    rng = random.Random(seed)
+    resources = _dataset(rng, 150)
+    hapi = _InboxHAPI(resources)
+    counters = listening(InboxCounters(hapi_client=hapi))
+
+    assert await counters.get_stats() == _recount(resources)
+    reads = len(hapi.calls)
+
+    for step in range(300):
+        action = rng.random()
+        if action < 0.3:
+            new = _resource(rng, 1000 + step)
+            hapi.store[new["resourceType"], new["id"]] = new
+            await notification_service.notify_resource_created(new["resourceType"], new["id"], new)
+        elif action < 0.8:
+            key = rng.choice(list(hapi.store))
+            changed = dict(hapi.store[key])
+            if key[0] == "Task":
+                changed["status"] = rng.choice(["requested", "in-progress", "completed"])
+                changed["owner"] = {"reference": f"Practitioner/prov-{rng.randrange(1, 4)}"}
+            elif key[0] == "Observation":
+                changed["interpretation"] = [{"coding": [{"code": rng.choice(["HH", "H", "N"])}]}]
+            else:
+                changed["status"] = rng.choice(["draft", "active"])
+                changed["priority"] = rng.choice(["stat", "routine"])
+            hapi.store[key] = changed
+            await notification_service.notify_resource_updated(key[0], key[1], changed)
+        else:
+            key = rng.choice(list(hapi.store))
+            del hapi.store[key]
+            await notification_service.notify_resource_deleted(*key)
+
+        if step % 50 == 0:
+            current = list(hapi.store.values())
+            for assignee in (None, "prov-1", "prov-3"):
+                assert await counters.get_stats(assigned_to=assignee) == _recount(current, assignee)
+
+    assert await counters.get_stats() == _recount(list(hapi.store.values()))
+    # Served from the counters: no further searches after the baseline
+    assert len(hapi.calls) == reads and counters.rebuilds == 1
+
+
+@pytest.mark.asyncio
+async def test_write_without_body_triggers_a_rebuild(listening):
+    resources = _dataset(random.Random(4), 40)
+    hapi = _InboxHAPI(resources)
+    counters = listening(InboxCounters(hapi_client=hapi))
+    await counters.get_stats()
+
+    task = {"resourceType": "Task", "id": "new", "status": "requested", "authoredOn": _when(random.Random(1))}
+    hapi.store["Task", "new"] = task
+    await notification_service.notify_resource_updated("Task", "new", {})
+
+    assert await counters.get_stats() == _recount(list(hapi.store.values()))
+    assert counters.rebuilds == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_during_a_rebuild_are_not_lost():
+    resources = _dataset(random.Random(6), 60)
+    hapi = _InboxHAPI(resources, delay=0.002)
+    counters = InboxCounters(hapi_client=hapi)
+    victim = next(r for r in resources if inbox_item(r) is not None)
+
+    stats = asyncio.ensure_future(counters.get_stats())
+    await asyncio.sleep(0.01)
+    # Deleted after the baseline may already have read it
+    del hapi.store[victim["resourceType"], victim["id"]]
+    counters.apply(victim["resourceType"], victim["id"], None)
+
+    assert await stats == _recount(list(hapi.store.values()))
+
+
+@pytest.mark.asyncio
+async def test_abnormal_labs_age_out_of_the_counts():
+    lab = {
+        "resourceType": "Observation",
+        "id": "o1",
+        "status": "final",
+        "category": [{"coding": [{"code": "laboratory"}]}],
+        "interpretation": [{"coding": [{"code": "HH"}]}],
+        "effectiveDateTime": (NOW - timedelta(days=6)).isoformat(),
+    }
+    counters = InboxCounters(hapi_client=_InboxHAPI([lab]))
+    assert (await counters.get_stats())["by_type"] == {"lab_result": 1}
+
+    counters._expire(lab_expiry(lab) - timedelta(seconds=1))
+    assert counters._contributions
+    counters._expire(lab_expiry(lab))
+    assert (await counters.get_stats())["total"] == 0
+
+
+def test_stats_endpoint_serves_the_counters(monkeypatch):
+    resources = _dataset(random.Random(7), 80)
+    counters = InboxCounters(hapi_client=_InboxHAPI(resources))
+    monkeypatch.setattr(counters_module, "_inbox_counters", counters)
+    app = FastAPI()
+    app.include_router(router)
+
+    with TestClient(app) as client:
+        everyone = client.get("/api/clinical/inbox/stats").json()
+        mine = client.get("/api/clinical/inbox/stats", params={"assigned_to": "prov-2"}).json()
+
+    assert everyone == _recount(resources)
+    assert mine == _recount(resources, "prov-2")
+    assert counters.rebuilds == 1
+
+
+@pytest.mark.asyncio
+async def test_workers_apply_each_others_writes(tmp_path):
+    rng = random.Random(8)
+    resources = _dataset(rng, 60)
+    hapi = _InboxHAPI(resources)
+    log_path = str(tmp_path / "shared.db")
+    writer = InboxCounters(hapi_client=hapi, write_log=InboxWriteLog(log_path))
+    reader = InboxCounters(hapi_client=hapi, write_log=InboxWriteLog(log_path))
+    await writer.get_stats()
+    await reader.get_stats()
+
+    new = {"resourceType": "Task", "id": "new", "status": "requested", "priority": "stat", "authoredOn": _when(rng)}
+    hapi.store["Task", "new"] = new
+    await writer.on_fhir_write("created", "Task", "new", new)
+    gone = next(key for key, r in hapi.store.items() if inbox_item(r) is not None and key != ("Task", "new"))
+    del hapi.store[gone]
+    await writer.on_fhir_write("deleted", *gone, None)
+
+    expected = _recount(list(hapi.store.values()))
+    assert await reader.get_stats() == expected
+    assert await writer.get_stats() == expected
+    assert reader.rebuilds == 1 and reader.rereads == 2
+    # Each worker skips its own entries
+    assert writer.rereads == 0
+
+
+def _hapi_transport(store):
+    """HAPI create/read/update/delete over the fake search's store."""
+    ids = itertools.count(1)
+
+    def handle(request):
+        resource_type, _, resource_id = request.url.path.split("/fhir/", 1)[1].partition("/")
+        if request.method == "POST":
+            resource = {**json.loads(request.content), "id": f"created-{next(ids)}"}
+        elif request.method == "PUT":
+            resource = json.loads(request.content)
+        elif (resource_type, resource_id) not in store:
+            return httpx.Response(404)
+        elif request.method == "DELETE":
+            del store[resource_type, resource_id]
+            return httpx.Response(200, json={})
+        else:
+            return httpx.Response(200, json=store[resource_type, resource_id])
+        store[resource_type, resource["id"]] = resource
+        return httpx.Response(201 if request.method == "POST" else 200, json=resource)
+
+    return httpx.MockTransport(handle)
+
+
+def test_task_router_writes_reach_the_stats(monkeypatch):
+    resources = _dataset(random.Random(9), 40)
+    hapi = _InboxHAPI(resources)
+    monkeypatch.setattr(counters_module, "HAPIFHIRClient", lambda: hapi)
+    http_client = httpx.AsyncClient(transport=_hapi_transport(hapi.store))
+    app = FastAPI()
+    app.include_router(router)
+    app.include_router(tasks_router)
+    app.dependency_overrides[get_current_user] = lambda: {"id": "prov-1"}
+
+    def stats():
+        assert client.get("/api/clinical/inbox/stats").json() == _recount(list(hapi.store.values()))
+        return client.get("/api/clinical/inbox/stats", params={"assigned_to": "prov-2"}).json()
+
+    with TestClient(app) as client, \
+            patch("services.hapi_fhir_client.get_shared_http_client", return_value=http_client):
+        before = stats()
+        created = client.post("/api/clinical/tasks/", json={
+            "patient_id": "p1", "title": "Call back", "status": "requested", "priority": "urgent", "assignee": "prov-2"
+        }).json()
+        assert stats()["by_priority"].get("high", 0) == before["by_priority"].get("high", 0) + 1
+
+        client.put(f"/api/clinical/tasks/{created['id']}", json={"priority": "routine"})
+        stats()
+        client.patch(f"/api/clinical/tasks/{created['id']}/status", json={"status": "completed"})
+        assert stats() == before
+        client.delete(f"/api/clinical/tasks/{created['id']}")
+        stats()
+
+    assert counters_module.get_inbox_counters().rebuilds == 1
@@ -0,0 +1,204 @@
+"""
+Merged, cursor-paginated order listing (api/clinical/orders/pagination.py).
+
+MedicationRequest and ServiceRequest are searched concurrently and merged
+newest-first on authored date. Walking the cursor must visit every order
+exactly once, in the same order as sorting everything up front, and each
+page must cost about one page of upstream reads per type.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from api.auth.models import User
+from api.clinical.orders.pagination import (
+    InvalidCursor,
+    StreamPosition,
+    decode_cursor,
+    encode_cursor,
+)
+from api.clinical.orders.service import OrdersService
+
+USER = User(
+    id="prov-1",
+    username="demo",
+    name="Demo Physician",
+    email="demo@example.com",
+    role="physician",
+    permissions=[],
+)
+
+DATE_PARAMS = {"MedicationRequest": "authoredon", "ServiceRequest": "authored"}
+
+
+def _parse(date):
+    return datetime.fromisoformat(date.replace("Z", "+00:00"))
+
+
+class _PagingHAPI:
+    """Fake HAPI search honouring _sort=-<date>, <date>=le..., and _count."""
+
+    def __init__(self, resources, delay=0.0):
+        self.resources = resources
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def search(self, resource_type, params):
+        self.calls.append((resource_type, dict(params)))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        date_param = DATE_PARAMS[resource_type]
+        assert params["_sort"] == f"-{date_param}"
+        matches = [r for r in self.resources if r["resourceType"] == resource_type]
+        if params.get("status"):
+            matches = [r for r in matches if r["status"] == params["status"]]
+        bound = params.get(date_param)
+        if bound:
+            matches = [r for r in matches if _parse(r["authoredOn"]) <= _parse(bound[2:])]
+        # Stable sort: ties come back in a fixed order, as from a database
+        matches.sort(key=lambda r: _parse(r["authoredOn"]), reverse=True)
+        return {"entry": [{"resource": r} for r in matches[:params["_count"]]]}
+
+
+def _order(resource_type, order_id, authored, category=None, status="active"):
+    resource = {
+        "resourceType": resource_type,
+        "id": order_id,
+        "status": status,
+        "authoredOn": authored,
+        "subject": {"reference": "Patient/p1"},
+        "requester": {"reference": "Practitioner/prov-1"},
+        "meta": {"lastUpdated": "2026-01-01T00:00:00Z"},
+    }
+    if category:
+        resource["category"] = [{"text": category}]
+    return resource
+
+
+def _dataset(rng, n, tie_every=4):
+    """n orders over both types, with plenty of identical authored dates."""
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    resources = []
+    for i in range(n):
+        minutes = rng.randrange(n // tie_every + 1)
+        authored = (base + timedelta(minutes=minutes)).isoformat().replace("+00:00", "Z")
+        if rng.random() < 0.5:
+            resources.append(_order("MedicationRequest", f"m{i}", authored))
+        else:
+            category = rng.choice(["Laboratory", "Imaging"])
+            resources.append(_order("ServiceRequest", f"s{i}", authored, category=category))
+    return resources
+
+
+def _expected(resources, keep=lambda r: True):
+    # Newest first; ties keep stream order (MedicationRequest first)
+    types = list(DATE_PARAMS)
+    ordered = sorted(
+        (r for r in resources if keep(r)),
+        key=lambda r: (-_parse(r["authoredOn"]).timestamp(), types.index(r["resourceType"]))
+    )
+    return [r["id"] for r in ordered]
+
+
+async def _walk(service, limit, **filters):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = await service.get_orders_page(cursor=cursor, limit=limit, current_user=USER, **filters)
+        pages += 1
+        ids.extend(order.id for order in page.orders)
+        cursor = page.next_cursor
+        if cursor is None:
+            return ids, pages
+        assert pages < 1000
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seed", range(4))
+async def test_cursor_walk_matches_global_sort(seed):
+    rng = random.Random(seed)
+    resources = _dataset(rng, 150)
+    service = OrdersService(hapi_client=_PagingHAPI(resources))
+
+    ids, _ = await _walk(service, limit=rng.choice([1, 7, 20]))
+
+    assert ids == _expected(resources)
+
+
+@pytest.mark.asyncio
+async def test_order_type_filter_refills_the_page():
+    rng = random.Random(11)
+    resources = _dataset(rng, 120)
+    service = OrdersService(hapi_client=_PagingHAPI(resources))
+
+    ids, _ = await _walk(service, limit=10, order_type="imaging")
+
+    assert ids == _expected(resources, keep=lambda r: r.get("category", [{}])[0].get("text") == "Imaging")
+    assert ids
+
+
+@pytest.mark.asyncio
+async def test_each_page_costs_one_read_per_type():
+    resources = _dataset(random.Random(3), 400, tie_every=1)
+    hapi = _PagingHAPI(resources)
+    service = OrdersService(hapi_client=hapi)
+
+    _, pages = await _walk(service, limit=25)
+
+    assert pages >= 16
+    assert len(hapi.calls) <= 2 * pages
+    # page size plus the few orders tied at each cursor date
+    assert max(params["_count"] for _, params in hapi.calls) <= 30
+
+
+@pytest.mark.asyncio
+async def test_streams_are_searched_concurrently():
+    resources = _dataset(random.Random(5), 20)
+    hapi = _PagingHAPI(resources, delay=0.02)
+    service = OrdersService(hapi_client=hapi)
+
+    await service.get_orders_page(limit=5, current_user=USER)
+
+    assert hapi.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_skip_is_applied_to_the_merged_order():
+    resources = _dataset(random.Random(9), 60)
+    service = OrdersService(hapi_client=_PagingHAPI(resources))
+
+    orders = await service.get_orders(skip=10, limit=15, current_user=USER)
+
+    assert [o.id for o in orders] == _expected(resources)[10:25]
+
+
+@pytest.mark.asyncio
+async def test_cursor_bound_to_filters():
+    resources = _dataset(random.Random(1), 30)
+    service = OrdersService(hapi_client=_PagingHAPI(resources))
+    page = await service.get_orders_page(limit=5, status="active", current_user=USER)
+
+    with pytest.raises(HTTPException) as exc:
+        await service.get_orders_page(limit=5, cursor=page.next_cursor, status="completed", current_user=USER)
+    assert exc.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc:
+        await service.get_orders_page(limit=5, cursor="not-a-cursor", current_user=USER)
+    assert exc.value.status_code == 400
+
+
+def test_cursor_round_trip():
+    positions = {"MedicationRequest": StreamPosition("2026-01-01T10:00:00Z", ["a", "b"])}
+    assert decode_cursor(encode_cursor(positions, "f1"), "f1") == positions
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(positions, "f1"), "f2")
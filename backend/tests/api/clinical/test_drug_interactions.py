@@ -0,0 +1,210 @@
+"""
+Indexed drug-interaction lookup (api/clinical/interaction_index.py).
+
+check_drug_interactions must return exactly what the old rule-by-rule
+scan returned - same rules, same order, same drugs - while only touching
+rules the patient's medications hit. External CSV/JSON tables load into
+the same rule shape.
+"""
+
+import json
+import random
+
+import pytest
+
+from api.clinical import drug_interactions
+from api.clinical.interaction_index import (
+    DrugNameAutomaton,
+    InteractionIndex,
+    load_interaction_dataset,
+)
+
+
+def reference_check(rules, medication_list):
+    """The scan check_drug_interactions used before the index."""
+    interactions = []
+    med_names = [med.get('name', '').lower() for med in medication_list]
+    med_codes = [med.get('code', '') for med in medication_list]
+    for interaction_id, interaction_data in rules.items():
+        matching_drugs = []
+        for drug in interaction_data['drugs']:
+            for med_name in med_names:
+                if drug.lower() in med_name:
+                    matching_drugs.append(drug)
+                    break
+        for code in interaction_data['rxnorm_codes']:
+            if code in med_codes and len(matching_drugs) < 2:
+                for i, drug_code in enumerate(interaction_data['rxnorm_codes']):
+                    if drug_code == code and i < len(interaction_data['drugs']):
+                        drug_name = interaction_data['drugs'][i]
+                        if drug_name not in matching_drugs:
+                            matching_drugs.append(drug_name)
+        if len(matching_drugs) >= 2:
+            interactions.append({
+                'id': interaction_id,
+                'drugs': matching_drugs,
+                'severity': interaction_data['severity'],
+                'description': interaction_data['description'],
+                'clinical_consequence': interaction_data['clinical_consequence'],
+                'management': interaction_data['management']
+            })
+    return interactions
+
+
+def synthetic_table(rng, n_rules, n_drugs=400):
+    """Pairwise rules over made-up drug names, some sharing prefixes/suffixes."""
+    names = [f"drug{i:04d}" for i in range(n_drugs)] + ["pam", "opam", "diazepam", "lorazepam"]
+    rules = {}
+    for i in range(n_rules):
+        a, b = rng.sample(range(len(names)), 2)
+        rules[f"r{i}"] = {
+            "drugs": [names[a], names[b]],
+            "rxnorm_codes": [str(100000 + a), str(100000 + b)],
+            "severity": rng.choice(["minor", "moderate", "major"]),
+            "description": "d",
+            "clinical_consequence": "c",
+            "management": "m",
+        }
+    return rules, names
+
+
+def random_meds(rng, names, codes, k):
+    meds = []
+    for _ in range(k):
+        roll = rng.random()
+        if roll < 0.4:
+            meds.append({"name": f"{rng.choice(names).upper()} 10 MG Oral Tablet", "code": ""})
+        elif roll < 0.7:
+            meds.append({"name": "unlabelled", "code": rng.choice(codes)})
+        elif roll < 0.85:
+            meds.append({"name": f"{rng.choice(names)}/{rng.choice(names)}", "code": rng.choice(codes)})
+        else:
+            meds.append({"name": "acetaminophen", "code": "999"})
+    return meds
+
+
+class TestAutomaton:
+
+    def test_matches_substring_semantics(self):
+        rng = random.Random(7)
+        patterns = ["pam", "opam", "diazepam", "he", "she", "hers", "his", "a"]
+        automaton = DrugNameAutomaton(patterns)
+        for _ in range(500):
+            text = "".join(rng.choice("adehiopmrsz ") for _ in range(rng.randint(0, 30)))
+            assert automaton.find(text) == {p for p in patterns if p in text}
+
+
+class TestInteractionIndex:
+
+    def test_builtin_table_examples(self):
+        meds = [
+            {"name": "Warfarin Sodium 5 MG Oral Tablet", "code": ""},
+            {"name": "Aspirin 81 MG", "code": ""},
+        ]
+        ids = [i["id"] for i in drug_interactions.check_drug_interactions(meds)]
+        assert ids == ["warfarin-aspirin", "anticoagulant-antiplatelet"]
+        assert drug_interactions.check_drug_interactions([meds[0]]) == []
+
+    def test_code_only_match(self):
+        meds = [{"name": "a", "code": "855332"}, {"name": "b", "code": "243670"}]
+        result = drug_interactions.check_drug_interactions(meds)
+        assert result[0]["drugs"] == ["warfarin", "aspirin"]
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_equivalent_to_rule_scan_on_builtin_table(self, seed):
+        rng = random.Random(seed)
+        rules = drug_interactions.DRUG_INTERACTIONS
+        names = sorted({d for r in rules.values() for d in r["drugs"]})
+        codes = sorted({c for r in rules.values() for c in r["rxnorm_codes"]})
+        index = InteractionIndex(rules)
+        for _ in range(200):
+            meds = random_meds(rng, names, codes, rng.randint(0, 8))
+            assert index.check(meds) == reference_check(rules, meds)
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_equivalent_to_rule_scan_on_synthetic_table(self, seed):
+        rng = random.Random(100 + seed)
+        rules, names = synthetic_table(rng, 2000)
+        codes = sorted({c for r in rules.values() for c in r["rxnorm_codes"]})
+        index = InteractionIndex(rules)
+        for _ in range(50):
+            meds = random_meds(rng, names, codes, rng.randint(2, 12))
+            assert index.check(meds) == reference_check(rules, meds)
+
+
+class TestDatasetLoader:
+
+    def test_pairwise_csv(self, tmp_path):
+        path = tmp_path / "pairs.csv"
+        path.write_text(
+            "drug_a,drug_b,rxnorm_a,rxnorm_b,severity,description,management\n"
+            "Tramadol,Sertraline,10689,36437,Major,Serotonin syndrome,Avoid\n"
+        )
+        rules = load_interaction_dataset(path)
+        assert rules == {"tramadol-sertraline": {
+            "drugs": ["Tramadol", "Sertraline"],
+            "rxnorm_codes": ["10689", "36437"],
+            "severity": "major",
+            "description": "Serotonin syndrome",
+            "clinical_consequence": "",
+            "management": "Avoid",
+        }}
+
+    def test_full_rule_csv_with_ids(self, tmp_path):
+        path = tmp_path / "rules.csv"
+        path.write_text(
+            "id,drugs,rxnorm_codes,severity,description\n"
+            "qt,amiodarone|sotalol|haloperidol,703|9947|5093,major,QT prolongation\n"
+        )
+        rules = load_interaction_dataset(path)
+        assert rules["qt"]["drugs"] == ["amiodarone", "sotalol", "haloperidol"]
+        assert rules["qt"]["rxnorm_codes"] == ["703", "9947", "5093"]
+
+    def test_json_object_and_list(self, tmp_path):
+        as_object = tmp_path / "object.json"
+        as_object.write_text(json.dumps({
+            "x": {"drugs": ["a1", "b1"], "rxnorm_codes": ["1", "2"],
+                  "severity": "minor", "description": "d"}
+        }))
+        as_list = tmp_path / "list.json"
+        as_list.write_text(json.dumps([
+            {"drug_a": "a2", "drug_b": "b2", "severity": "moderate", "description": "d"}
+        ]))
+        assert list(load_interaction_dataset(as_object)) == ["x"]
+        assert list(load_interaction_dataset(as_list)) == ["a2-b2"]
+
+    def test_invalid_row_reports_row_number(self, tmp_path):
+        path = tmp_path / "bad.csv"
+        path.write_text("drug_a,drug_b,severity,description\na,b,major,ok\nc,,major,missing drug\n")
+        with pytest.raises(ValueError, match="row 2"):
+            load_interaction_dataset(path)
+
+    def test_unsupported_format(self, tmp_path):
+        path = tmp_path / "table.xlsx"
+        path.write_text("")
+        with pytest.raises(ValueError, match="unsupported"):
+            load_interaction_dataset(path)
+
+    def test_load_rebuilds_module_index(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(drug_interactions, "DRUG_INTERACTIONS", dict(drug_interactions.DRUG_INTERACTIONS))
+        monkeypatch.setattr(drug_interactions, "_interaction_index", drug_interactions._interaction_index)
+        path = tmp_path / "extra.csv"
+        path.write_text("drug_a,drug_b,severity,description\ntramadol,ondansetron,moderate,Serotonergic\n")
+
+        total = drug_interactions.load_drug_interaction_dataset(str(path))
+
+        assert total == 13
+        meds = [{"name": "tramadol 50 mg", "code": ""}, {"name": "ondansetron 4 mg", "code": ""}]
+        assert [i["id"] for i in drug_interactions.check_drug_interactions(meds)] == ["tramadol-ondansetron"]
+
+
+@pytest.mark.slow
+def test_30k_pair_table_matches_scan():
+    rng = random.Random(42)
+    rules, names = synthetic_table(rng, 30000, n_drugs=3000)
+    codes = sorted({c for r in rules.values() for c in r["rxnorm_codes"]})
+    patients = [random_meds(rng, names, codes, 12) for _ in range(20)]
+
+    index = InteractionIndex(rules)
+
+    assert [index.check(meds) for meds in patients] == [reference_check(rules, meds) for meds in patients]
@@ -0,0 +1,116 @@
+"""
+Shared fixtures for the DICOM tests: a fake WADO-RS PACS serving a few
+generated CT instances, isolated caches and a client for the DICOM router.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import CTImageStorage, ExplicitVRLittleEndian
+
+from api.dicom import cache, service
+from api.dicom.cache import InstanceDiskCache
+from api.dicom.router import router
+
+
+STUDY, SERIES = "1.2.840.1", "1.2.840.1.2"
+BOUNDARY = "wado-boundary"
+
+
+def dicom_instance(sop_uid: str, samples: int = 1, frames: int = 1, pixels=None, rescale=(1, -1024)) -> bytes:
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = CTImageStorage
+    meta.MediaStorageSOPInstanceUID = sop_uid
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = CTImageStorage
+    ds.SOPInstanceUID = sop_uid
+    if pixels is None:
+        pixels = (np.arange(32 * 32 * samples * frames, dtype=np.uint16) % 4096).reshape(-1, 32)
+    ds.Rows, ds.Columns = pixels.shape[0] // (samples * frames), pixels.shape[1]
+    ds.SamplesPerPixel = samples
+    ds.PhotometricInterpretation = "MONOCHROME2" if samples == 1 else "RGB"
+    if samples > 1:
+        ds.PlanarConfiguration = 0
+    if frames > 1:
+        ds.NumberOfFrames = frames
+    bits = pixels.dtype.itemsize * 8
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = bits, bits, bits - 1
+    ds.PixelRepresentation = 1 if pixels.dtype.kind == "i" else 0
+    if rescale is not None:
+        ds.RescaleSlope, ds.RescaleIntercept = rescale
+    ds.PixelData = pixels.tobytes()
+    buffer = io.BytesIO()
+    ds.save_as(buffer, enforce_file_format=True)
+    return buffer.getvalue()
+
+
+def multipart(payload: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Type: application/dicom\r\n\r\n".encode()
+        + payload
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+
+class _Response:
+    def __init__(self, content: bytes, content_type: str):
+        self.content = content
+        self.headers = {"content-type": content_type, "Content-Type": content_type}
+
+    def raise_for_status(self):
+        pass
+
+
+class _FakePACS:
+    """WADO-RS instances + rendered frames; counts round trips."""
+
+    def __init__(self, instances):
+        self.instances = instances
+        self.calls = []
+
+    async def get(self, url, headers=None, timeout=None):
+        self.calls.append(url)
+        await asyncio.sleep(0.01)
+        if url.endswith("/rendered"):
+            return _Response(b"JPEG:" + url.encode(), "image/jpeg")
+        sop = url.rsplit("/", 1)[1]
+        return _Response(multipart(self.instances[sop]), f'multipart/related; type="application/dicom"; boundary={BOUNDARY}')
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "_instance_cache", InstanceDiskCache(str(tmp_path / "instances"), 10 * 1024 * 1024))
+    monkeypatch.setattr(cache, "_pixel_cache", None)
+    monkeypatch.setattr(cache, "_rendered_cache", None)
+    return cache
+
+
+@pytest.fixture
+def pacs(monkeypatch, caches):
+    fake = _FakePACS({
+        "1.1": dicom_instance("1.1"),
+        "1.2": dicom_instance("1.2", samples=3),
+        "1.3": dicom_instance("1.3", frames=4),
+    })
+    monkeypatch.setattr(service, "get_dicom_http_client", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def image_url(sop):
+    return f"/api/dicom/studies/{STUDY}/series/{SERIES}/instances/{sop}/image"
@@ -0,0 +1,134 @@
+"""
+DICOM viewer caches: a window/level drag or a re-visited slice must not
+go back to WADO.
+
+The on-disk instance cache is a size-bounded LRU that survives a restart;
+the image endpoint serves decoded pixels and finished PNGs from memory, and
+PACS-rendered frames are cached per frame.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from api.dicom import cache
+from api.dicom.cache import InstanceDiskCache
+from api.dicom.service import DICOMService
+from tests.api.dicom.conftest import SERIES, STUDY, image_url
+
+
+# -- InstanceDiskCache ------------------------------------------------------
+
+def test_disk_cache_evicts_least_recently_used_by_bytes(tmp_path):
+    disk = InstanceDiskCache(str(tmp_path), max_bytes=250)
+    disk.put(("s", "se", "a"), b"a" * 100)
+    disk.put(("s", "se", "b"), b"b" * 100)
+    assert disk.get(("s", "se", "a")) == b"a" * 100  # a is now most recent
+    disk.put(("s", "se", "c"), b"c" * 100)
+
+    assert disk.get(("s", "se", "b")) is None
+    assert disk.get(("s", "se", "a")) is not None
+    assert disk.get(("s", "se", "c")) is not None
+    stats = disk.get_stats()
+    assert stats["evictions"] == 1 and stats["bytes"] == 200
+    assert len(list(tmp_path.glob("*.dcm"))) == 2
+
+
+def test_disk_cache_survives_restart_in_lru_order(tmp_path):
+    disk = InstanceDiskCache(str(tmp_path), max_bytes=1000)
+    for name in ("a", "b", "c"):
+        disk.put(("s", "se", name), name.encode() * 100)
+    # b is oldest by mtime, then a, then c
+    old = time.time() - 100
+    os.utime(tmp_path / disk._filename(("s", "se", "b")), (old, old))
+    os.utime(tmp_path / disk._filename(("s", "se", "a")), (old + 1, old + 1))
+
+    restarted = InstanceDiskCache(str(tmp_path), max_bytes=150)
+    assert restarted.get(("s", "se", "c")) == b"c" * 100
+    assert restarted.get(("s", "se", "b")) is None
+    assert restarted.get(("s", "se", "a")) is None
+    assert restarted.get_stats()["bytes"] == 100
+
+
+def test_disk_cache_file_removed_by_another_worker_is_a_miss(tmp_path):
+    worker_a = InstanceDiskCache(str(tmp_path), max_bytes=1000)
+    worker_b = InstanceDiskCache(str(tmp_path), max_bytes=1000)
+    worker_a.put(("s", "se", "a"), b"x" * 10)
+
+    assert worker_b.get(("s", "se", "a")) == b"x" * 10  # written by the other worker
+    (tmp_path / worker_a._filename(("s", "se", "a"))).unlink()
+    assert worker_a.get(("s", "se", "a")) is None
+    assert worker_a.get_stats()["bytes"] == 0
+
+
+def test_disk_cache_budget_holds_for_the_shared_directory(tmp_path):
+    worker_a = InstanceDiskCache(str(tmp_path), max_bytes=250)
+    worker_b = InstanceDiskCache(str(tmp_path), max_bytes=250)
+    worker_a.put(("s", "se", "a"), b"a" * 100)
+    worker_a.put(("s", "se", "b"), b"b" * 100)
+    assert worker_b.get(("s", "se", "a")) is not None  # a is now most recent
+    worker_b.put(("s", "se", "c"), b"c" * 100)
+    worker_a.put(("s", "se", "d"), b"d" * 100)
+
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.dcm")) == 200
+    assert worker_a.get(("s", "se", "b")) is None
+    assert worker_a.get(("s", "se", "a")) is None
+    assert worker_a.get(("s", "se", "c")) is not None
+    assert worker_b.get_stats()["bytes"] == worker_a.get_stats()["bytes"] == 200
+
+
+# -- Service + endpoint -----------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_concurrent_fetches_share_one_wado_download(pacs):
+    results = await asyncio.gather(*[DICOMService.fetch_wado_instance(STUDY, SERIES, "1.1") for _ in range(5)])
+    again = await DICOMService.fetch_wado_instance(STUDY, SERIES, "1.1")
+
+    assert len(pacs.calls) == 1
+    assert all(r == pacs.instances["1.1"] for r in results + [again])
+    assert cache.get_instance_cache().get_stats()["hits"] == 1
+
+
+def test_window_level_drag_fetches_and_decodes_once(pacs, client):
+    windows = [(40, 400), (50, 400), (60, 350), (40, 400)]
+    bodies = []
+    for center, width in windows:
+        resp = client.get(image_url("1.1"), params={"window_center": center, "window_width": width})
+        assert resp.status_code == 200 and resp.headers["content-type"] == "image/png"
+        bodies.append(resp.content)
+
+    assert len(pacs.calls) == 1
+    assert bodies[0] == bodies[3] and bodies[0] != bodies[1]
+    stats = client.get("/api/dicom/cache/stats").json()
+    assert stats["pixels"]["misses"] == 1 and stats["pixels"]["hits"] == 2
+    assert stats["rendered"]["hits"] == 1
+
+
+def test_pixel_cache_miss_is_served_from_disk(pacs, client):
+    client.get(image_url("1.1"))
+    cache._pixel_cache = None
+    cache._rendered_cache = None
+
+    resp = client.get(image_url("1.1"))
+
+    assert resp.status_code == 200
+    assert len(pacs.calls) == 1
+    assert cache.get_instance_cache().get_stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("sop", ["1.2", "1.3"])
+def test_color_and_multiframe_use_cached_pacs_rendering(pacs, client, sop):
+    first = client.get(image_url(sop), params={"frame": 2})
+    second = client.get(image_url(sop), params={"frame": 2, "window_center": 10})
+    third = client.get(image_url(sop), params={"frame": 3})
+
+    assert first.headers["content-type"] == "image/jpeg"
+    assert first.content == second.content != third.content
+    rendered = [url for url in pacs.calls if url.endswith("/rendered")]
+    assert [url.split("/frames/")[1] for url in rendered] == ["2/rendered", "3/rendered"]
+    # Instance parsed once: the "not windowable" verdict is cached too
+    assert len(pacs.calls) - len(rendered) == 1
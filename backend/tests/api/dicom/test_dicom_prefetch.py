@@ -0,0 +1,216 @@
+"""
+Tests for series read-ahead and the series metadata endpoint.
+
+A fake PACS serves one 30-slice series (metadata, single instances and a
+streamed series retrieve) and records every request and the peak number
+of concurrent instance downloads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.dicom import cache, prefetch, service
+from api.dicom.cache import InstanceDiskCache
+from api.dicom.prefetch import SeriesPrefetcher
+from api.dicom.router import router
+from tests.api.dicom.conftest import dicom_instance
+
+STUDY, SERIES, OTHER_SERIES = "1.2.840.1", "1.2.840.1.2", "1.2.840.1.3"
+BOUNDARY = "series-boundary"
+SOPS = [f"1.2.3.{n}" for n in range(1, 31)]  # display order: InstanceNumber n
+
+
+class _SeriesPACS:
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.instances = {sop: dicom_instance(sop) for sop in SOPS}
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def metadata(self):
+        shuffled = list(enumerate(SOPS, start=1))
+        random.Random(4).shuffle(shuffled)
+        return [
+            {
+                "0020000E": {"vr": "UI", "Value": [SERIES]},
+                "00080018": {"vr": "UI", "Value": [sop]},
+                "00200013": {"vr": "IS", "Value": [number]},
+                "00080060": {"vr": "CS", "Value": ["CT"]},
+            }
+            for number, sop in shuffled
+        ]
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(path)
+        if path.endswith("/metadata"):
+            return httpx.Response(200, json=self.metadata())
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        content_type = f"multipart/related; type=application/dicom; boundary={BOUNDARY}"
+        if "/instances/" in path:
+            sop = path.rsplit("/", 1)[1]
+            body = self._multipart([self.instances[sop]])
+        else:
+            body = self._multipart(list(self.instances.values()))
+        return httpx.Response(200, headers={"content-type": content_type}, content=body)
+
+    @staticmethod
+    def _multipart(payloads):
+        body = b""
+        for payload in payloads:
+            body += f"--{BOUNDARY}\r\nContent-Type: application/dicom\r\n\r\n".encode() + payload + b"\r\n"
+        return body + f"--{BOUNDARY}--".encode()
+
+    def instance_requests(self):
+        return [path.rsplit("/", 1)[1] for path in self.requests if "/instances/" in path]
+
+
+@pytest.fixture
+def pacs(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "_instance_cache", InstanceDiskCache(str(tmp_path / "instances"), 10 * 1024 * 1024))
+    monkeypatch.setattr(cache, "_pixel_cache", None)
+    monkeypatch.setattr(cache, "_rendered_cache", None)
+    monkeypatch.setattr(cache, "_metadata_cache", None)
+    fake = _SeriesPACS()
+    http = httpx.AsyncClient(transport=httpx.MockTransport(fake))
+    monkeypatch.setattr(service, "get_dicom_http_client", lambda: http)
+    return fake
+
+
+def cached_sops(series=SERIES):
+    disk = cache.get_instance_cache()
+    return {sop for sop in SOPS if disk.contains((STUDY, series, sop))}
+
+
+async def settle(prefetcher, fetched: int, timeout: float = 3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while prefetcher.fetched + prefetcher.already_cached < fetched:
+        assert asyncio.get_running_loop().time() < deadline, prefetcher.get_stats()
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_series_instances_come_from_one_metadata_request_in_display_order(pacs):
+    first = await service.DICOMService.get_series_instances(STUDY, SERIES)
+    second = await service.DICOMService.get_series_instances(STUDY, SERIES)
+
+    assert [i["sopInstanceUID"] for i in first] == SOPS
+    assert second == first
+    assert pacs.requests == [f"/dcm4chee-arc/aets/DCM4CHEE/rs/studies/{STUDY}/series/{SERIES}/metadata"]
+
+
+@pytest.mark.asyncio
+async def test_neighbors_are_fetched_nearest_first_with_bounded_concurrency(pacs):
+    prefetcher = SeriesPrefetcher(mode="neighbors", neighbors=3, concurrency=2, idle_seconds=5)
+    try:
+        prefetcher.touch("viewer-1", STUDY, SERIES, SOPS[10])
+        await settle(prefetcher, 6)
+
+        assert cached_sops() == {SOPS[i] for i in (7, 8, 9, 11, 12, 13)}
+        assert set(pacs.instance_requests()[:2]) == {SOPS[11], SOPS[9]}
+        assert pacs.peak_in_flight <= 2
+
+        # Scrolling on re-centres the window; nothing is fetched twice
+        prefetcher.touch("viewer-1", STUDY, SERIES, SOPS[13])
+        await settle(prefetcher, 9)
+
+        # Slice 10 was viewed, so the viewer fetched it itself
+        assert cached_sops() == {SOPS[i] for i in (7, 8, 9, 11, 12, 13, 14, 15, 16)}
+        assert len(pacs.instance_requests()) == len(set(pacs.instance_requests())) == 9
+        assert prefetcher.started == 1
+    finally:
+        await prefetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_leaving_the_series_cancels_its_read_ahead(pacs):
+    pacs.delay = 0.2
+    prefetcher = SeriesPrefetcher(mode="neighbors", neighbors=10, concurrency=1, idle_seconds=5)
+    try:
+        prefetcher.touch("viewer-1", STUDY, SERIES, SOPS[0])
+        await asyncio.sleep(0.05)
+        first_task = prefetcher._sessions["viewer-1"].task
+
+        prefetcher.touch("viewer-1", STUDY, OTHER_SERIES, SOPS[0])
+        await asyncio.sleep(0.3)
+
+        assert first_task.cancelled()
+        assert prefetcher.cancelled == 1
+        assert prefetcher.get_stats()["sessions"] == 1
+        # Only the download already in flight finished for the old series
+        assert len(cached_sops()) <= 1
+    finally:
+        await prefetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_read_ahead_stops_when_the_viewer_goes_idle(pacs):
+    prefetcher = SeriesPrefetcher(mode="neighbors", neighbors=2, concurrency=2, idle_seconds=0.1)
+    try:
+        prefetcher.touch("viewer-1", STUDY, SERIES, SOPS[5])
+        await settle(prefetcher, 4)
+        task = prefetcher._sessions["viewer-1"].task
+        await asyncio.wait_for(task, timeout=1)
+
+        assert prefetcher.get_stats()["active"] == 0
+
+        # Coming back restarts it
+        prefetcher.touch("viewer-1", STUDY, SERIES, SOPS[20])
+        await settle(prefetcher, 8)
+        assert prefetcher.started == 2
+    finally:
+        await prefetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_series_mode_caches_every_instance_from_one_retrieve(pacs):
+    prefetcher = SeriesPrefetcher(mode="series", concurrency=2, idle_seconds=5)
+    try:
+        prefetcher.touch("viewer-1", STUDY, SERIES, SOPS[0])
+        await asyncio.wait_for(prefetcher._sessions["viewer-1"].task, timeout=3)
+        prefetcher.touch("viewer-1", STUDY, SERIES, SOPS[1])
+
+        assert cached_sops() == set(SOPS)
+        assert pacs.requests == [f"/dcm4chee-arc/aets/DCM4CHEE/rs/studies/{STUDY}/series/{SERIES}"]
+        data = await service.DICOMService.fetch_wado_instance(STUDY, SERIES, SOPS[17])
+        assert data == pacs.instances[SOPS[17]]
+        assert prefetcher.started == 1
+    finally:
+        await prefetcher.close()
+
+
+def test_endpoints_start_and_cancel_read_ahead(pacs, monkeypatch):
+    pacs.delay = 0.05
+    prefetcher = SeriesPrefetcher(mode="neighbors", neighbors=8, concurrency=1, idle_seconds=5)
+    monkeypatch.setattr(prefetch, "_series_prefetcher", prefetcher)
+    app = FastAPI()
+    app.include_router(router)
+    url = f"/api/dicom/studies/{STUDY}/series/{SERIES}/instances/{SOPS[3]}/image"
+
+    with TestClient(app) as client:
+        metadata = client.get(f"/api/dicom/studies/{STUDY}/series/{SERIES}/metadata").json()
+        assert [i["sopInstanceUID"] for i in metadata["instances"]] == SOPS
+        assert metadata["instances"][0]["instanceNumber"] == "1"
+
+        assert client.get(url).status_code == 200
+        assert prefetcher.get_stats()["sessions"] == 0  # no session, no read-ahead
+
+        assert client.get(url, params={"session": "viewer-9"}).status_code == 200
+        assert client.get("/api/dicom/cache/stats").json()["prefetch"]["active"] == 1
+
+        assert client.delete("/api/dicom/prefetch/viewer-9").json() == {"cancelled": True}
+        assert client.delete("/api/dicom/prefetch/viewer-9").json() == {"cancelled": False}
+        assert prefetcher.cancelled == 1
@@ -0,0 +1,276 @@
+"""
+Tests for off-loop DICOM rendering: LUT windowing, the bounded render pool,
+and the faster encodings of the image endpoint.
+
+LUT windowing must produce exactly the bytes the old inline path
+(rescale + ``DICOMService.convert_to_png``) produced, for every pixel
+type the viewer sees — unsigned, signed, with and without rescale, and
+the degenerate window widths.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import random
+import threading
+import time
+
+import numpy as np
+import pydicom
+import pytest
+from PIL import Image
+
+from api.dicom import render_pool
+from api.dicom.render_pool import RenderPool, RenderPoolBusy
+from api.dicom.service import DICOMService, decode_instance, render_instance, window_pixels
+from tests.api.dicom.conftest import dicom_instance, image_url
+
+
+def inline_png(data: bytes, window_center: int, window_width: int) -> bytes:
+    """The image endpoint's pre-pool path, kept as the reference.
+
+    Unrescaled integers are widened first: clipping a uint8/uint16 array to
+    a window bound outside its range raises OverflowError under numpy 2
+    (the endpoint then fell back to the PACS renderer). The LUT path
+    windows those values like any other.
+    """
+    ds = pydicom.dcmread(io.BytesIO(data), force=True)
+    pixel_array = ds.pixel_array.astype(np.float64)
+    if hasattr(ds, "RescaleSlope") and hasattr(ds, "RescaleIntercept"):
+        pixel_array = ds.pixel_array * float(ds.RescaleSlope) + float(ds.RescaleIntercept)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return DICOMService.convert_to_png(pixel_array, window_center, window_width)
+
+
+def random_pixels(rng: random.Random, dtype, shape=(48, 40)) -> np.ndarray:
+    info = np.iinfo(dtype)
+    low = rng.randint(int(info.min), int(info.max))
+    high = rng.randint(low, min(int(info.max), low + rng.choice([10, 300, 5000, 70000])))
+    gen = np.random.default_rng(rng.randrange(1 << 30))
+    return gen.integers(low, high, size=shape, endpoint=True).astype(dtype)
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.int16])
+def test_lut_windowing_matches_inline_png(seed, dtype):
+    rng = random.Random(seed)
+    rescale = rng.choice([None, (1, -1024), (1, 0), (0.5, 10.25), (2, -3000)])
+    data = dicom_instance("1.9", pixels=random_pixels(rng, dtype), rescale=rescale)
+
+    decoded = decode_instance(data)
+
+    assert decoded.lut_offset is not None
+    assert decoded.pixels.dtype.kind == "u"
+    for _ in range(6):
+        center = rng.randint(-2000, 4000)
+        width = rng.choice([0, 1, 2, 3, 80, 400, 1500, 4096, rng.randint(1, 70000)])
+        assert render_instance(decoded, center, width) == inline_png(data, center, width)
+
+
+def test_lut_index_dtype_follows_stored_range():
+    narrow = decode_instance(dicom_instance("1.9", pixels=np.full((4, 4), -1000, dtype=np.int16)))
+    full = np.array([[-32768, 32767], [0, 1]], dtype=np.int16)
+    wide = decode_instance(dicom_instance("1.9", pixels=full))
+
+    assert narrow.pixels.dtype == np.uint8 and narrow.lut_size == 1
+    assert wide.pixels.dtype == np.uint16 and wide.lut_size == 65536
+    assert (wide.pixels.astype(np.int64) + wide.lut_offset == full).all()
+
+
+def test_wide_integer_range_falls_back_to_float_windowing(monkeypatch):
+    from api.dicom import service
+
+    monkeypatch.setattr(service, "DICOM_LUT_MAX_ENTRIES", 100)
+    data = dicom_instance("1.9", pixels=(np.arange(64, dtype=np.uint16) * 40).reshape(8, 8))
+
+    decoded = decode_instance(data)
+
+    assert decoded.lut_offset is None and decoded.pixels.dtype == np.float64
+    assert render_instance(decoded, 100, 1000) == inline_png(data, 100, 1000)
+
+
+@pytest.mark.parametrize("image_format, pil_format", [("png", "PNG"), ("png-fast", "PNG"), ("webp", "WEBP")])
+def test_encodings_round_trip(image_format, pil_format):
+    decoded = decode_instance(dicom_instance("1.9"))
+
+    body = render_instance(decoded, 40, 400, image_format)
+
+    image = Image.open(io.BytesIO(body))
+    assert image.format == pil_format and image.size == (32, 32)
+    if image_format != "webp":  # lossy
+        assert (np.asarray(image) == window_pixels(decoded, 40, 400)).all()
+
+
+# -- RenderPool -------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_render_pool_rejects_past_queue_depth():
+    pool = RenderPool(workers=1, queue_depth=1)
+    release = threading.Event()
+    try:
+        running = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(RenderPoolBusy):
+            await pool.run(int, "1")
+
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+        assert await pool.run(int, "7") == 7
+        stats = pool.get_stats()
+        assert (stats["pending"], stats["peak_pending"], stats["completed"], stats["rejected"]) == (0, 2, 3, 1)
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_keeps_its_slot_until_the_job_finishes():
+    pool = RenderPool(workers=1, queue_depth=0)
+    release = threading.Event()
+    try:
+        waiting = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        await asyncio.sleep(0.05)
+
+        # The worker thread is still busy, so the pool is still full
+        assert pool.pending == 1
+        with pytest.raises(RenderPoolBusy):
+            await pool.run(int, "1")
+
+        release.set()
+        for _ in range(100):
+            if pool.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.pending == 0
+        assert await pool.run(int, "2") == 2
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_failed_and_rejected_jobs_are_not_counted_as_completed():
+    pool = RenderPool(workers=1, queue_depth=0)
+    try:
+        with pytest.raises(ValueError):
+            await pool.run(int, "not a number")
+        pool.pending = 1
+        with pytest.raises(RenderPoolBusy):
+            await pool.run(int, "1")
+        pool.pending = 0
+        assert await pool.run(int, "3") == 3
+
+        stats = pool.get_stats()
+        assert (stats["completed"], stats["failed"], stats["rejected"]) == (1, 1, 1)
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_render_pool_keeps_event_loop_responsive():
+    pool = RenderPool(workers=2, queue_depth=4)
+    lag = []
+
+    async def ticker():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag.append(time.perf_counter() - started - 0.005)
+
+    task = asyncio.ensure_future(ticker())
+    try:
+        await asyncio.gather(*[pool.run(time.sleep, 0.2) for _ in range(2)])
+    finally:
+        task.cancel()
+        pool.shutdown()
+
+    assert len(lag) > 10 and max(lag) < 0.1
+
+
+# -- Endpoint ---------------------------------------------------------------
+
+@pytest.fixture
+def pool(monkeypatch):
+    fresh = RenderPool(workers=2, queue_depth=4)
+    monkeypatch.setattr(render_pool, "_render_pool", fresh)
+    yield fresh
+    fresh.shutdown()
+
+
+def test_image_formats_are_rendered_and_cached_separately(pacs, client, pool):
+    png = client.get(image_url("1.1"), params={"window_center": 40, "window_width": 400})
+    fast = client.get(image_url("1.1"), params={"window_center": 40, "window_width": 400, "format": "png-fast"})
+    webp = client.get(image_url("1.1"), params={"window_center": 40, "window_width": 400, "format": "webp"})
+    again = client.get(image_url("1.1"), params={"window_center": 40, "window_width": 400, "format": "webp"})
+    bad = client.get(image_url("1.1"), params={"format": "gif"})
+
+    assert png.headers["content-type"] == fast.headers["content-type"] == "image/png"
+    assert webp.headers["content-type"] == "image/webp" and again.content == webp.content
+    assert png.content != fast.content
+    assert bad.status_code == 422
+    stats = client.get("/api/dicom/cache/stats").json()
+    assert stats["rendered"]["hits"] == 1
+    assert stats["render_pool"]["completed"] == pool.completed == 4  # one decode, three renders
+    assert len(pacs.calls) == 1
+
+
+def test_full_render_queue_answers_503_with_retry_after(pacs, client, monkeypatch):
+    busy = RenderPool(workers=1, queue_depth=0)
+    busy.pending = 1
+    monkeypatch.setattr(render_pool, "_render_pool", busy)
+
+    resp = client.get(image_url("1.1"))
+
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
+    assert busy.rejected == 1
+
+
+def ct_slice() -> bytes:
+    rng = np.random.default_rng(7)
+    ct = (rng.normal(0, 300, (512, 512)).cumsum(axis=1) % 4096).astype(np.uint16)
+    return dicom_instance("1.9", pixels=ct)
+
+
+CT_WINDOWS = [(40 + i, 400 + 3 * i) for i in range(30)]
+
+
+@pytest.mark.slow
+def test_lut_windowing_matches_inline_on_a_full_ct_slice():
+    data = ct_slice()
+    decoded = decode_instance(data)
+
+    for center, width in CT_WINDOWS[::6]:
+        assert render_instance(decoded, center, width) == inline_png(data, center, width)
+
+
+@pytest.mark.benchmark
+def test_benchmark_lut_windowing_vs_inline(record_property):
+    data = ct_slice()
+    decoded = decode_instance(data)
+    ds = pydicom.dcmread(io.BytesIO(data), force=True)
+    rescaled = ds.pixel_array * float(ds.RescaleSlope) + float(ds.RescaleIntercept)
+
+    started = time.perf_counter()
+    for center, width in CT_WINDOWS:
+        DICOMService.convert_to_png(rescaled, center, width)
+    inline_ms = (time.perf_counter() - started) * 1000 / len(CT_WINDOWS)
+
+    started = time.perf_counter()
+    for center, width in CT_WINDOWS:
+        window_pixels(decoded, center, width)
+    lut_ms = (time.perf_counter() - started) * 1000 / len(CT_WINDOWS)
+
+    timings = {}
+    for image_format in ("png", "png-fast", "webp"):
+        started = time.perf_counter()
+        for center, width in CT_WINDOWS:
+            render_instance(decoded, center, width, image_format)
+        timings[image_format] = (time.perf_counter() - started) * 1000 / len(CT_WINDOWS)
+
+    record_property("benchmark", f"512x512 CT slice: inline window+png {inline_ms:.1f}ms, LUT window {lut_ms:.2f}ms, "
+                    + ", ".join(f"{k} {v:.1f}ms" for k, v in timings.items()))
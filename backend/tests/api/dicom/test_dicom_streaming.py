@@ -0,0 +1,225 @@
+"""
+Tests for streamed series/study downloads.
+
+``MultipartStreamParser`` must yield exactly the parts
+``parse_multipart_related`` finds, however the body is cut into chunks;
+the study ZIP is written while the WADO-RS body streams in, so memory
+stays flat no matter how large the study is.
+"""
+
+from __future__ import annotations
+
+import io
+import random
+import tracemalloc
+import zipfile
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.dicom import service
+from api.dicom.router import _stream_study_zip, router
+from api.dicom.service import MultipartStreamParser, open_wado_stream, parse_multipart_related
+
+STUDY, SERIES = "1.2.840.1", "1.2.840.1.2"
+BOUNDARY = "wado-boundary"
+CONTENT_TYPE = f'multipart/related; type="application/dicom"; boundary="{BOUNDARY}"'
+
+
+def multipart_body(parts, preamble=b"", epilogue=b"", padding=b"") -> bytes:
+    body = preamble + (b"\r\n" if preamble else b"")
+    for headers, payload in parts:
+        body += f"--{BOUNDARY}".encode() + padding + b"\r\n"
+        body += b"".join(f"{name}: {value}\r\n".encode() for name, value in headers)
+        body += b"\r\n" + payload + b"\r\n"
+    return body + f"--{BOUNDARY}--".encode() + epilogue
+
+
+def random_parts(rng: random.Random):
+    tricky = [b"", b"--" + BOUNDARY.encode(), b"\r\n--wado-bound", b"\r\n\r\n", b"-" * 40, b"\r"]
+    parts = []
+    for i in range(rng.randint(1, 6)):
+        payload = bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 3000)))
+        cut = rng.randint(0, len(payload))
+        payload = payload[:cut] + rng.choice(tricky) + payload[cut:]
+        headers = [("Content-Type", "application/dicom")] if rng.random() < 0.8 else []
+        if rng.random() < 0.5:
+            headers.append(("Content-Disposition", f'attachment; filename="img{i}.dcm"'))
+        parts.append((headers, payload))
+    return parts
+
+
+def feed_in_chunks(body: bytes, rng: random.Random):
+    parser = MultipartStreamParser(CONTENT_TYPE)
+    events = []
+    position = 0
+    while position < len(body):
+        size = rng.choice([1, 2, 7, 64, 500, 4096])
+        events.extend(parser.feed(body[position:position + size]))
+        position += size
+    parser.close()
+    return events
+
+
+def collect_parts(events):
+    parts = []
+    for kind, value in events:
+        if kind == "headers":
+            parts.append([value.items(), b""])
+        elif kind == "data":
+            assert value
+            parts[-1][1] += value
+    return [tuple(p) for p in parts]
+
+
+# -- MultipartStreamParser --------------------------------------------------
+
+@pytest.mark.parametrize("seed", range(25))
+def test_stream_parser_matches_buffered_parser(seed):
+    rng = random.Random(seed)
+    body = multipart_body(
+        random_parts(rng),
+        epilogue=rng.choice([b"", b"\r\n", b"\r\nignored epilogue\r\n"]),
+        padding=rng.choice([b"", b"  "]),
+    )
+
+    expected = [(p.headers.items(), p.content) for p in parse_multipart_related(body, CONTENT_TYPE)]
+    events = feed_in_chunks(body, rng)
+
+    assert collect_parts(events) == expected
+    assert [kind for kind, _ in events if kind != "data"] == ["headers", "end"] * len(expected)
+
+
+def test_stream_parser_skips_preamble():
+    body = multipart_body([([("Content-Type", "application/dicom")], b"DICM")], preamble=b"This is a preamble")
+
+    events = feed_in_chunks(body, random.Random(1))
+
+    assert collect_parts(events) == [([(b"Content-Type", b"application/dicom")], b"DICM")]
+
+
+def test_stream_parser_rejects_truncated_body_and_bad_content_type():
+    parser = MultipartStreamParser(CONTENT_TYPE)
+    parser.feed(multipart_body([([], b"x" * 100)])[:60])
+
+    with pytest.raises(ValueError):
+        parser.close()
+    with pytest.raises(ValueError):
+        MultipartStreamParser("application/dicom")
+
+
+# -- Downloads --------------------------------------------------------------
+
+class _StreamingPACS:
+    """MockTransport handler serving bodies as a stream of small chunks."""
+
+    def __init__(self, body: bytes, content_type: str = CONTENT_TYPE, status: int = 200):
+        self.body = body
+        self.content_type = content_type
+        self.status = status
+        self.requests = []
+        self.closed = 0
+
+    async def _chunks(self):
+        try:
+            for start in range(0, len(self.body), 1000):
+                yield self.body[start:start + 1000]
+        finally:
+            self.closed += 1
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return httpx.Response(self.status, headers={"content-type": self.content_type}, content=self._chunks())
+
+
+@pytest.fixture
+def stream_pacs(monkeypatch):
+    def install(pacs: _StreamingPACS):
+        http = httpx.AsyncClient(transport=httpx.MockTransport(pacs))
+        monkeypatch.setattr(service, "get_dicom_http_client", lambda: http)
+        return pacs
+    return install
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_study_download_streams_a_zip_of_the_parts(stream_pacs, client):
+    parts = random_parts(random.Random(7))
+    stream_pacs(_StreamingPACS(multipart_body(parts)))
+
+    resp = client.get(f"/api/dicom/studies/{STUDY}/download")
+
+    assert resp.status_code == 200 and resp.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(resp.content))
+    assert archive.testzip() is None
+    expected_names = [
+        next((v.split('filename="')[1].rstrip('"') for k, v in headers if k == "Content-Disposition"), f"{i}.dcm")
+        for i, (headers, _) in enumerate(parts, start=1)
+    ]
+    assert archive.namelist() == expected_names
+    assert [archive.read(name) for name in expected_names] == [payload for _, payload in parts]
+
+
+def test_study_download_of_non_multipart_body_is_one_entry(stream_pacs, client):
+    stream_pacs(_StreamingPACS(b"DICM" * 5000, content_type="application/dicom"))
+
+    resp = client.get(f"/api/dicom/studies/{STUDY}/download")
+
+    archive = zipfile.ZipFile(io.BytesIO(resp.content))
+    assert archive.namelist() == [f"study_{STUDY}.dcm"]
+    assert archive.read(f"study_{STUDY}.dcm") == b"DICM" * 5000
+
+
+def test_series_download_relays_the_body(stream_pacs, client):
+    body = bytes(random.Random(3).getrandbits(8) for _ in range(25_000))
+    pacs = stream_pacs(_StreamingPACS(body, content_type="application/dicom"))
+
+    resp = client.get(f"/api/dicom/studies/{STUDY}/series/{SERIES}/download")
+
+    assert resp.status_code == 200 and resp.content == body
+    assert pacs.requests[0].headers["accept"] == "application/dicom"
+    assert pacs.closed == 1
+
+
+@pytest.mark.parametrize("url", [f"/api/dicom/studies/{STUDY}/download", f"/api/dicom/studies/{STUDY}/series/{SERIES}/download"])
+def test_upstream_error_is_503_before_streaming(stream_pacs, client, url):
+    stream_pacs(_StreamingPACS(b"not found", content_type="text/plain", status=404))
+
+    resp = client.get(url)
+
+    assert resp.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_study_zip_memory_is_independent_of_study_size(stream_pacs):
+    part = bytes(random.Random(11).getrandbits(8) for _ in range(4096)) * 256  # 1 MiB, compressible
+    parts = [([("Content-Type", "application/dicom")], part) for _ in range(32)]
+    pacs = stream_pacs(_StreamingPACS(b""))
+    body = multipart_body(parts)
+
+    async def chunks():
+        for start in range(0, len(body), 64 * 1024):
+            yield body[start:start + 64 * 1024]
+
+    pacs._chunks = chunks
+    del parts
+
+    upstream = await open_wado_stream("http://pacs/studies/1")
+    tracemalloc.start()
+    try:
+        total = 0
+        async for chunk in _stream_study_zip(upstream, STUDY):
+            total += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert total > 0
+    assert peak < 4 * 1024 * 1024, f"peak {peak / 1e6:.1f} MB while zipping a {len(body) / 1e6:.0f} MB study"
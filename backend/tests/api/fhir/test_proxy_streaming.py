@@ -0,0 +1,135 @@
+"""
+Streaming FHIR proxy (api/fhir/proxy.py).
+
+Searches and $everything stream the upstream body through the shared
+pooled client instead of buffering it; transaction Bundle POSTs stream the
+request body. Single-resource writes are still read whole so the WebSocket
+broadcast sees the created/updated resource, and upstream failures still
+map to OperationOutcome responses.
+"""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.fhir import proxy
+
+
+@pytest.fixture
+def hapi():
+    """Mock HAPI upstream; `hapi.requests` records what the proxy sent."""
+    class Upstream:
+        requests = []
+        handler = None
+
+    async def dispatch(request):
+        Upstream.requests.append((request, await request.aread()))
+        return Upstream.handler(request)
+
+    Upstream.client = httpx.AsyncClient(transport=httpx.MockTransport(dispatch))
+    return Upstream
+
+
+@pytest.fixture
+def client(hapi):
+    app = FastAPI()
+    app.include_router(proxy.router)
+    with patch("api.fhir.proxy.get_shared_http_client", return_value=hapi.client):
+        yield TestClient(app)
+
+
+def test_search_response_is_streamed(client, hapi):
+    chunks = [b'{"resourceType":"Bundle",', b'"type":"searchset",', b'"entry":[]}']
+    hapi.handler = lambda r: httpx.Response(
+        200, stream=httpx.ByteStream(b"".join(chunks)),
+        headers={"content-type": "application/fhir+json"},
+    )
+
+    with patch("api.fhir.proxy.Response", side_effect=AssertionError("buffered")):
+        r = client.get("/fhir/R4/Observation?patient=p1")
+
+    assert r.status_code == 200
+    assert r.json()["type"] == "searchset"
+    sent, _ = hapi.requests[0]
+    assert sent.url.path == "/fhir/Observation"
+    assert sent.url.params["patient"] == "p1"
+
+
+def test_transaction_bundle_request_body_is_forwarded(client, hapi):
+    hapi.handler = lambda r: httpx.Response(
+        200, json={"resourceType": "Bundle", "type": "transaction-response"})
+    payload = b'{"resourceType":"Bundle","type":"transaction","entry":[]}'
+
+    r = client.post("/fhir/R4", content=payload,
+                    headers={"Content-Type": "application/fhir+json"})
+
+    assert r.status_code == 200
+    _, body = hapi.requests[0]
+    assert body == payload
+
+
+def test_single_resource_write_still_broadcasts(client, hapi):
+    hapi.handler = lambda r: httpx.Response(
+        201, json={"resourceType": "Condition", "id": "c1",
+                   "subject": {"reference": "Patient/p1"}})
+
+    with patch("api.fhir.proxy._notify_fhir_write") as notify:
+        r = client.post("/fhir/R4/Condition", json={"resourceType": "Condition"})
+
+    assert r.status_code == 201
+    notify.assert_called_once()
+    method, path, response = notify.call_args.args
+    assert (method, path) == ("POST", "Condition")
+    assert response.json()["id"] == "c1"
+
+
+def test_connect_error_maps_to_operation_outcome(client, hapi):
+    def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+    hapi.handler = refuse
+
+    r = client.get("/fhir/R4/Patient/p1")
+
+    assert r.status_code == 503
+    assert r.json()["resourceType"] == "OperationOutcome"
+    assert r.json()["issue"][0]["code"] == "transient"
+
+
+def test_buffered_mode_when_streaming_disabled(client, hapi, monkeypatch):
+    monkeypatch.setattr(proxy, "FHIR_PROXY_STREAMING", False)
+    hapi.handler = lambda r: httpx.Response(200, json={"resourceType": "Bundle"})
+
+    with patch("api.fhir.proxy.StreamingResponse", side_effect=AssertionError("streamed")):
+        r = client.get("/fhir/R4/Patient")
+
+    assert r.status_code == 200
+    assert r.json() == {"resourceType": "Bundle"}
+
+
+def test_writes_invalidate_shared_cache(client, hapi, monkeypatch):
+    from services import fhir_resource_cache as frc
+    from services.fhir_resource_cache import FHIRResourceCache, patient_tag, type_tag
+
+    cache = FHIRResourceCache()
+    monkeypatch.setattr(frc, "_resource_cache", cache)
+    cache.set("conditions", [], tags=[type_tag("Condition")])
+    cache.set("p1-graph", {}, tags=[patient_tag("p1")])
+    cache.set("meds", [], tags=[type_tag("MedicationRequest")])
+
+    hapi.handler = lambda r: httpx.Response(
+        201, json={"resourceType": "Condition", "id": "c1",
+                   "subject": {"reference": "Patient/p1"}})
+    with patch("api.fhir.proxy._notify_fhir_write"):
+        client.post("/fhir/R4/Condition", json={"resourceType": "Condition"})
+
+    assert cache.get("conditions") is None
+    assert cache.get("p1-graph") is None
+    assert cache.get("meds") == []
+
+    # A transaction Bundle can touch anything: the whole cache goes
+    hapi.handler = lambda r: httpx.Response(200, json={"resourceType": "Bundle"})
+    client.post("/fhir/R4", json={"resourceType": "Bundle", "type": "transaction"})
+    assert len(cache) == 0
@@ -0,0 +1,168 @@
+"""
+Persisted, incrementally synced dynamic catalogs.
+
+Catalogs must survive the per-request DynamicCatalogService and the
+process (they live in a SQLite file), a refresh must only ask HAPI for
+resources updated since the watermark, and re-reading or editing a
+resource must never double count it.
+"""
+
+from __future__ import annotations
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from api.services.clinical import dynamic_catalog_store
+from api.services.clinical.dynamic_catalog_service import (
+    CATALOG_SPECS,
+    CONDITION_CATALOG,
+    DynamicCatalogService,
+)
+from api.services.clinical.dynamic_catalog_store import DynamicCatalogStore
+
+
+def condition(resource_id, code, display, updated):
+    return {
+        "resourceType": "Condition",
+        "id": resource_id,
+        "meta": {"lastUpdated": updated},
+        "code": {"coding": [{"system": "http://snomed.info/sct", "code": code, "display": display}]},
+    }
+
+
+class _FakeHAPI:
+    """Serves resources by type, honoring _lastUpdated=ge<instant>."""
+
+    def __init__(self, resources=(), fail=False):
+        self.resources = list(resources)
+        self.fail = fail
+        self.calls = []
+
+    async def search_iter(self, resource_type, params):
+        self.calls.append((resource_type, dict(params)))
+        if self.fail:
+            raise RuntimeError("HAPI down")
+        since = params.get("_lastUpdated", "ge")[2:]
+        matching = [
+            r for r in self.resources
+            if r["resourceType"] == resource_type and r["meta"]["lastUpdated"] >= since
+        ]
+        for resource in sorted(matching, key=lambda r: r["meta"]["lastUpdated"]):
+            yield resource
+
+
+@pytest.fixture
+def hapi():
+    fake = _FakeHAPI([
+        condition("c1", "38341003", "Hypertension", "2026-05-01T10:00:00+00:00"),
+        condition("c2", "38341003", "Hypertension", "2026-05-01T11:00:00+00:00"),
+        condition("c3", "44054006", "Diabetes", "2026-05-02T09:00:00+00:00"),
+    ])
+    with patch.object(dynamic_catalog_store, "HAPIFHIRClient", return_value=fake):
+        yield fake
+
+
+def counts(catalog):
+    return {c["code"]: c["frequency_count"] for c in catalog}
+
+
+@pytest.mark.asyncio
+async def test_catalog_is_shared_by_per_request_service_instances(hapi):
+    first = await DynamicCatalogService().extract_condition_catalog()
+    second = await DynamicCatalogService().extract_condition_catalog(limit=1)
+
+    assert counts(first) == {"38341003": 2, "44054006": 1}
+    assert first[0]["display"] == "Hypertension"
+    assert second == first[:1]
+    assert len(hapi.calls) == 1
+    assert "_lastUpdated" not in hapi.calls[0][1]
+
+
+@pytest.mark.asyncio
+async def test_refresh_pulls_only_changes_and_never_double_counts(hapi, tmp_path):
+    store = DynamicCatalogStore(str(tmp_path / "catalogs.db"), refresh_seconds=0)
+    await store.get_entries(CONDITION_CATALOG)
+
+    hapi.resources += [
+        condition("c4", "44054006", "Diabetes", "2026-05-03T08:00:00+00:00"),
+        # c1 edited to a different code
+        condition("c1", "44054006", "Diabetes", "2026-05-03T09:00:00+00:00"),
+    ]
+    hapi.resources = [r for r in hapi.resources if not (r["id"] == "c1" and r["code"]["coding"][0]["code"] == "38341003")]
+    entries = await store.get_entries(CONDITION_CATALOG)
+
+    assert hapi.calls[-1][1]["_lastUpdated"] == "ge2026-05-02T09:00:00+00:00"
+    assert {e.key: e.count for e in entries} == {"44054006": 3, "38341003": 1}
+
+    # Nothing new: the watermark resource is re-read but not re-counted
+    entries = await store.get_entries(CONDITION_CATALOG)
+    assert hapi.calls[-1][1]["_lastUpdated"] == "ge2026-05-03T09:00:00+00:00"
+    assert {e.key: e.count for e in entries} == {"44054006": 3, "38341003": 1}
+
+
+@pytest.mark.asyncio
+async def test_catalog_survives_restart_without_hapi(hapi, tmp_path):
+    path = str(tmp_path / "catalogs.db")
+    await DynamicCatalogStore(path).get_entries(CONDITION_CATALOG)
+    calls = len(hapi.calls)
+
+    restarted = DynamicCatalogStore(path)
+    entries = await restarted.get_entries(CONDITION_CATALOG)
+
+    assert len(hapi.calls) == calls
+    assert {e.key: e.count for e in entries} == {"38341003": 2, "44054006": 1}
+
+
+@pytest.mark.asyncio
+async def test_only_one_worker_syncs_a_stale_catalog(hapi, tmp_path):
+    path = str(tmp_path / "catalogs.db")
+    worker_a = DynamicCatalogStore(path, refresh_seconds=0)
+    worker_b = DynamicCatalogStore(path, refresh_seconds=0)
+    await worker_a.get_entries(CONDITION_CATALOG)
+
+    # Worker A holds the lease (mid-sync); B serves the persisted rows
+    assert worker_a._take_lease(CONDITION_CATALOG.name, time.time())
+    calls = len(hapi.calls)
+    entries = await worker_b.get_entries(CONDITION_CATALOG)
+
+    assert len(hapi.calls) == calls
+    assert {e.key: e.count for e in entries} == {"38341003": 2, "44054006": 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_sync_keeps_watermark_and_serves_persisted(hapi, tmp_path):
+    store = DynamicCatalogStore(str(tmp_path / "catalogs.db"), refresh_seconds=0)
+    await store.get_entries(CONDITION_CATALOG)
+    before = store._read_state(CONDITION_CATALOG.name)
+
+    hapi.fail = True
+    entries = await store.get_entries(CONDITION_CATALOG)
+    after = store._read_state(CONDITION_CATALOG.name)
+
+    assert {e.key: e.count for e in entries} == {"38341003": 2, "44054006": 1}
+    assert after.watermark == before.watermark
+    assert after.lease_until is None
+
+
+@pytest.mark.asyncio
+async def test_full_sync_drops_deleted_resources(hapi, tmp_path):
+    store = DynamicCatalogStore(str(tmp_path / "catalogs.db"))
+    await store.get_entries(CONDITION_CATALOG)
+
+    hapi.resources = [r for r in hapi.resources if r["id"] != "c3"]
+    assert await store.sync(CONDITION_CATALOG, full=True)
+    entries = await store.get_entries(CONDITION_CATALOG)
+
+    assert "_lastUpdated" not in hapi.calls[-1][1]
+    assert {e.key: e.count for e in entries} == {"38341003": 2}
+
+
+@pytest.mark.asyncio
+async def test_refresh_all_syncs_every_catalog_once(hapi):
+    service = DynamicCatalogService()
+    with patch.object(DynamicCatalogService, "get_catalog_statistics", return_value=None):
+        await service.refresh_all_catalogs()
+
+    assert sorted(rt for rt, _ in hapi.calls) == sorted(spec.resource_type for spec in CATALOG_SPECS)
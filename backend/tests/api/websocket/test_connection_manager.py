@@ -0,0 +1,152 @@
+"""
+Legacy subscription matching in ConnectionManager.
+
+broadcast_resource_update used to walk every client's subscriptions for
+every write. Subscriptions are now kept in an inverted index by resource
+type and patient id, and the room broadcast and the matching legacy
+subscribers are sent as one deduplicated recipient set.
+"""
+
+import json
+import random
+
+import pytest
+
+from api.websocket.connection_manager import ConnectionManager, Subscription
+from api.websocket.connection_pool import ConnectionPool
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    def updates(self):
+        return [m for m in self.sent if m["type"] == "update"]
+
+
+@pytest.fixture
+def manager():
+    manager = ConnectionManager()
+    manager.pool = ConnectionPool(max_connections=10_000)
+    return manager
+
+
+async def _connect(manager, client_id):
+    websocket = FakeWebSocket()
+    await manager.pool.add_connection(client_id, websocket)
+    return websocket
+
+
+async def _flush(manager):
+    broadcasts = []
+    while not manager.pool.broadcast_queue.empty():
+        broadcasts.append(manager.pool.broadcast_queue.get_nowait())
+    await manager.pool._send_broadcasts(broadcasts)
+    await manager.pool.drain_send_queues()
+
+
+def _brute_force(manager, resource_type, patient_id):
+    return {
+        client_id
+        for client_id, subs in manager.subscriptions.items()
+        if any(s.matches(resource_type, patient_id) for s in subs)
+    }
+
+
+async def test_index_agrees_with_subscription_matches(manager):
+    rng = random.Random(7)
+    types = ["Observation", "Condition", "MedicationRequest", "Encounter"]
+    patients = [f"p{i}" for i in range(6)]
+    for i in range(200):
+        await _connect(manager, f"c{i}")
+        await manager.subscribe(
+            f"c{i}", f"s{i % 3}",
+            resource_types=rng.sample(types, rng.randint(0, 2)),
+            patient_ids=rng.sample(patients, rng.randint(0, 2)),
+        )
+
+    for resource_type in types + ["Patient"]:
+        for patient_id in patients + [None, "nobody"]:
+            assert manager.match_subscribers(resource_type, patient_id) == \
+                _brute_force(manager, resource_type, patient_id)
+
+
+async def test_resubscribe_and_unsubscribe_update_index(manager):
+    await _connect(manager, "c1")
+    await manager.subscribe("c1", "s1", resource_types=["Observation"], patient_ids=["p1"])
+    assert manager.match_subscribers("Observation", "p1") == {"c1"}
+
+    # Same id replaces the old criteria
+    await manager.subscribe("c1", "s1", resource_types=["Condition"], patient_ids=["p1"])
+    assert manager.match_subscribers("Observation", "p1") == set()
+    assert manager.match_subscribers("Condition", "p1") == {"c1"}
+
+    await manager.unsubscribe("c1", "s1")
+    assert manager.match_subscribers("Condition", "p1") == set()
+    assert manager._subs_by_type == {}
+    assert manager._subs_by_patient == {}
+
+
+async def test_room_member_and_subscriber_gets_update_once(manager):
+    both = await _connect(manager, "both")
+    other_patient = await _connect(manager, "other")
+    await manager.subscribe("both", "s1", resource_types=["Observation"], patient_ids=["p1"])
+    await manager.subscribe("other", "s2", resource_types=["Condition"], patient_ids=["p2"])
+
+    await manager.broadcast_resource_update("Observation", "o1", "created", patient_id="p1")
+    await _flush(manager)
+
+    # "both" is in three of the rooms and has a matching subscription
+    assert len(both.updates()) == 1
+    assert both.updates()[0]["data"]["resource_id"] == "o1"
+    assert other_patient.updates() == []
+
+
+async def test_wildcard_subscription_receives_everything(manager):
+    watcher = await _connect(manager, "watcher")
+    await manager.subscribe("watcher", "all")
+
+    await manager.broadcast_resource_update("Encounter", "e1", "updated", patient_id="p9")
+    await _flush(manager)
+
+    assert len(watcher.updates()) == 1
+
+
+@pytest.mark.slow
+async def test_load_5k_subscribers(manager):
+    """5k clients spread over 500 patients: each write reaches ~10 of them."""
+    n_clients, n_patients, n_writes = 5000, 500, 200
+    types = ["Observation", "Condition", "MedicationRequest", "AllergyIntolerance"]
+    rng = random.Random(11)
+
+    sockets = {}
+    for i in range(n_clients):
+        client_id = f"c{i}"
+        sockets[client_id] = await _connect(manager, client_id)
+        manager.subscriptions[client_id] = []
+        subscription = Subscription(
+            id="chart",
+            client_id=client_id,
+            resource_types=[rng.choice(types)],
+            patient_ids=[f"p{i % n_patients}"],
+        )
+        manager.subscriptions[client_id].append(subscription)
+        manager._index_subscription(subscription)
+
+    writes = [(rng.choice(types), f"p{rng.randrange(n_patients)}") for _ in range(n_writes)]
+
+    indexed = [manager.match_subscribers(rt, pid) for rt, pid in writes]
+    scanned = [_brute_force(manager, rt, pid) for rt, pid in writes]
+
+    assert indexed == scanned
+
+    # End to end: every matching subscriber gets exactly one copy
+    rt, pid = writes[0]
+    await manager.broadcast_resource_update(rt, "r1", "updated", patient_id=pid)
+    await _flush(manager)
+    received = {cid for cid, ws in sockets.items() if ws.updates()}
+    assert received == indexed[0]
+    assert all(len(sockets[cid].updates()) == 1 for cid in received)
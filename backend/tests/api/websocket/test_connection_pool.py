@@ -0,0 +1,280 @@
+"""
+WebSocket ConnectionPool broadcast fan-out.
+
+A broadcast is serialized once into an EncodedMessage and the same text is
+sent to every recipient; the rate limiter is charged from its cached size.
+The load test at the bottom checks that a 500-client room still shares
+one encoding per broadcast; the opt-in benchmark reports its CPU cost
+against the old per-recipient json.dumps path.
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from api.websocket import connection_pool as cp
+from api.websocket.connection_pool import ConnectionPool, encode_message
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+async def _pool_with_room(n_clients, room="patient:p1"):
+    pool = ConnectionPool(max_connections=n_clients + 1)
+    sockets = {}
+    for i in range(n_clients):
+        client_id = f"c{i}"
+        sockets[client_id] = FakeWebSocket()
+        await pool.add_connection(client_id, sockets[client_id])
+        await pool.join_room(client_id, room)
+    return pool, sockets
+
+
+async def _drain(pool):
+    """Run one pass of the broadcast worker over whatever is queued."""
+    broadcasts = []
+    while not pool.broadcast_queue.empty():
+        broadcasts.append(pool.broadcast_queue.get_nowait())
+    await pool._send_broadcasts(broadcasts)
+    await pool.drain_send_queues()
+
+
+def _resource_update(n_entries=40):
+    return {
+        "type": "update",
+        "data": {
+            "action": "updated",
+            "resource_type": "Observation",
+            "resource_id": "obs-1",
+            "patient_id": "p1",
+            "resource": {
+                "resourceType": "Observation",
+                "id": "obs-1",
+                "component": [
+                    {"code": {"coding": [{"system": "http://loinc.org", "code": f"{i}-1"}]},
+                     "valueQuantity": {"value": i * 1.5, "unit": "mmHg"}}
+                    for i in range(n_entries)
+                ],
+            },
+        },
+        "timestamp": "2026-01-01T00:00:00",
+    }
+
+
+def test_encode_message_round_trips_and_counts_utf8_bytes():
+    message = {"type": "update", "data": {"name": "Zoë"}}
+    encoded = encode_message(message)
+    assert json.loads(encoded.text) == message
+    assert encoded.size == len(encoded.text.encode())
+
+
+def test_encode_message_without_orjson(monkeypatch):
+    monkeypatch.setattr(cp, "orjson", None)
+    encoded = encode_message({"a": [1, 2]})
+    assert encoded.text == '{"a":[1,2]}'
+    assert encoded.size == 11
+
+
+async def test_broadcast_serializes_once_for_all_recipients():
+    pool, sockets = await _pool_with_room(50)
+    message = _resource_update()
+
+    with patch.object(cp, "encode_message", wraps=cp.encode_message) as encoder:
+        await pool.broadcast_to_room("patient:p1", message, exclude_clients={"c0"})
+        await _drain(pool)
+
+    assert encoder.call_count == 1
+    texts = {ws.sent[0] for cid, ws in sockets.items() if cid != "c0"}
+    assert len(texts) == 1
+    assert json.loads(texts.pop()) == message
+    assert sockets["c0"].sent == []
+
+
+async def test_rate_limit_charged_from_encoded_size():
+    pool, _ = await _pool_with_room(1)
+    encoded = encode_message(_resource_update())
+
+    with patch.object(pool.rate_limiter, "check_rate_limit", return_value=True) as check:
+        assert await pool.send_to_client("c0", encoded)
+
+    check.assert_called_once_with("c0", encoded.size)
+    assert pool.connection_metrics["c0"].bytes_sent == encoded.size
+
+
+async def test_send_failure_removes_client():
+    class Broken(FakeWebSocket):
+        async def send_text(self, text):
+            raise RuntimeError("socket closed")
+
+    pool = ConnectionPool()
+    await pool.add_connection("c0", Broken())
+
+    assert await pool.send_to_client("c0", {"type": "ping"}) is False
+    assert "c0" not in pool.connections
+
+
+# ---- Per-client send queues ----
+
+class BlockedWebSocket(FakeWebSocket):
+    """A tab that stops reading: send_text hangs until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+        self.closed_with = None
+
+    async def send_text(self, text):
+        await self.release.wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+
+
+def _update(resource_id, version):
+    return encode_message(
+        {"type": "update", "data": {"resource_id": resource_id, "v": version}},
+        coalesce_key=f"Observation/{resource_id}",
+    )
+
+
+async def test_slow_client_does_not_hold_up_room():
+    pool, sockets = await _pool_with_room(3)
+    slow = BlockedWebSocket()
+    await pool.add_connection("slow", slow)
+    await pool.join_room("slow", "patient:p1")
+
+    await pool.broadcast_to_room("patient:p1", {"type": "update"})
+    broadcasts = [pool.broadcast_queue.get_nowait()]
+    await asyncio.wait_for(pool._send_broadcasts(broadcasts), timeout=1)
+    await asyncio.wait_for(
+        asyncio.gather(*(pool.send_queues[c].join() for c in sockets)), timeout=1
+    )
+
+    assert all(len(ws.sent) == 1 for ws in sockets.values())
+    assert pool.send_queues["slow"].depth + len(slow.sent) <= 1
+    slow.release.set()
+    await pool.drain_send_queues()
+    assert len(slow.sent) == 1
+
+
+async def test_drop_oldest_policy_keeps_newest():
+    pool = ConnectionPool(send_queue_size=2, send_queue_policy="drop_oldest")
+    slow = BlockedWebSocket()
+    await pool.add_connection("c0", slow)
+    await asyncio.sleep(0)  # writer parks on the first message
+
+    for i in range(5):
+        pool.enqueue("c0", {"n": i})
+    await asyncio.sleep(0)
+
+    slow.release.set()
+    await pool.drain_send_queues()
+    received = [json.loads(t)["n"] for t in slow.sent]
+    assert received[-2:] == [3, 4]
+    assert pool.get_send_queue_stats()["dropped"] >= 2
+
+
+async def test_coalesce_policy_replaces_queued_update_in_place():
+    pool = ConnectionPool(send_queue_size=10, send_queue_policy="coalesce")
+    slow = BlockedWebSocket()
+    await pool.add_connection("c0", slow)
+
+    pool.enqueue("c0", {"type": "ping"})
+    await asyncio.sleep(0)  # writer takes the ping and blocks on it
+    pool.enqueue("c0", _update("o1", 1))
+    pool.enqueue("c0", _update("o2", 1))
+    pool.enqueue("c0", _update("o1", 2))
+
+    queue = pool.send_queues["c0"]
+    assert queue.depth == 2
+    assert queue.coalesced == 1
+
+    slow.release.set()
+    await pool.drain_send_queues()
+    data = [json.loads(t).get("data") for t in slow.sent[1:]]
+    assert data == [{"resource_id": "o1", "v": 2}, {"resource_id": "o2", "v": 1}]
+
+
+async def test_disconnect_policy_evicts_slow_consumer():
+    pool = ConnectionPool(send_queue_size=2, send_queue_policy="disconnect")
+    slow = BlockedWebSocket()
+    await pool.add_connection("c0", slow)
+    await pool.join_room("c0", "patient:p1")
+    await asyncio.sleep(0)
+
+    results = [pool.enqueue("c0", {"n": i}) for i in range(4)]
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert results[-1] is False
+    assert slow.closed_with == 1013
+    assert "c0" not in pool.connections
+    assert "patient:p1" not in pool.rooms
+    assert pool.get_send_queue_stats()["slow_consumers_evicted"] == 1
+
+
+@pytest.mark.slow
+async def test_500_client_room_shares_one_encoding_per_broadcast():
+    """500-client room: one encode per broadcast, the same text to every client."""
+    n_clients, rounds = 500, 5
+    pool, sockets = await _pool_with_room(n_clients)
+    charged = []
+    pool.rate_limiter.check_rate_limit = lambda client_id, size: charged.append(size) or True
+
+    with patch.object(cp, "encode_message", wraps=cp.encode_message) as encoder, \
+            patch.object(cp.json, "dumps", wraps=cp.json.dumps) as dumps:
+        for i in range(rounds):
+            await pool.broadcast_to_room("patient:p1", {**_resource_update(), "timestamp": str(i)})
+            await _drain(pool)
+
+    assert encoder.call_count == rounds
+    assert dumps.call_count <= rounds  # the stdlib fallback, once per broadcast at most
+    for i in range(rounds):
+        texts = [ws.sent[i] for ws in sockets.values()]
+        assert len({id(text) for text in texts}) == 1
+        assert json.loads(texts[0])["timestamp"] == str(i)
+    assert len(charged) == n_clients * rounds
+
+
+@pytest.mark.benchmark
+async def test_benchmark_serialize_once_vs_per_recipient(record_property):
+    """500-client room: one encode per broadcast vs json.dumps per client."""
+    n_clients, rounds = 500, 20
+    message = _resource_update()
+
+    pool, _ = await _pool_with_room(n_clients)
+    clients = list(pool.rooms["patient:p1"])
+    pool.rate_limiter.check_rate_limit = lambda client_id, size: True
+
+    async def per_recipient(message):
+        # The previous send path: dumps + encode for every recipient
+        for client_id in clients:
+            text = json.dumps(message)
+            await pool.connections[client_id].send_text(text)
+            len(text.encode())
+
+    async def shared(message):
+        encoded = encode_message(message)
+        for client_id in clients:
+            await pool.send_to_client(client_id, encoded)
+
+    async def cpu_per_broadcast(fn):
+        start = time.process_time()
+        for _ in range(rounds):
+            await fn(message)
+        return (time.process_time() - start) / rounds
+
+    before = await cpu_per_broadcast(per_recipient)
+    after = await cpu_per_broadcast(shared)
+
+    record_property("benchmark", f"broadcast to {n_clients} clients: per-recipient {before * 1000:.2f}ms, "
+                    f"serialize-once {after * 1000:.2f}ms CPU")
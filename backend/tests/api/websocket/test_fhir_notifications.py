@@ -0,0 +1,55 @@
+"""
+In-process listeners on FHIRNotificationService.
+
+Listeners hear every created/updated/deleted notification, even with no
+WebSocket client connected, and a failing listener never reaches the
+write path that notified.
+"""
+
+import pytest
+
+from api.websocket import fhir_notifications
+from api.websocket.fhir_notifications import FHIRNotificationService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    sent = []
+
+    async def broadcast(**kwargs):
+        sent.append(kwargs["action"])
+
+    monkeypatch.setattr(fhir_notifications.manager, "broadcast_resource_update", broadcast)
+    service = FHIRNotificationService()
+    service.sent = sent
+    return service
+
+
+@pytest.mark.asyncio
+async def test_listeners_hear_every_write_and_failures_are_contained(service):
+    heard = []
+
+    async def broken(*args):
+        raise RuntimeError("listener bug")
+
+    async def listener(action, resource_type, resource_id, resource_data):
+        heard.append((action, resource_type, resource_id, resource_data))
+
+    service.add_listener(broken)
+    service.add_listener(listener)
+    service.add_listener(listener)  # subscribing twice is a no-op
+
+    await service.notify_resource_created("Task", "t1", {"resourceType": "Task", "id": "t1"})
+    await service.notify_resource_updated("Task", "t1", {})
+    await service.notify_resource_deleted("Task", "t1")
+
+    assert heard == [
+        ("created", "Task", "t1", {"resourceType": "Task", "id": "t1"}),
+        ("updated", "Task", "t1", {}),
+        ("deleted", "Task", "t1", None),
+    ]
+    assert service.sent == ["created", "updated", "deleted"]
+
+    service.remove_listener(listener)
+    await service.notify_resource_deleted("Task", "t2")
+    assert len(heard) == 3
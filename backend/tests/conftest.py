@@ -5,6 +5,8 @@
 mocked services, and test data.
 """
 
+import os
+
 import pytest
 from typing import AsyncGenerator, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
@@ -16,6 +18,30 @@
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 
+def pytest_collection_modifyitems(config, items):
+    """Benchmarks are opt-in: timings on a shared CI box are noise, not results."""
+    if os.getenv("RUN_BENCHMARKS"):
+        return
+    skip = pytest.mark.skip(reason="benchmark; set RUN_BENCHMARKS=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Report what benchmarks recorded with record_property("benchmark", ...)."""
+    results = [
+        (report.nodeid, value)
+        for report in terminalreporter.stats.get("passed", [])
+        for name, value in report.user_properties
+        if name == "benchmark"
+    ]
+    if results:
+        terminalreporter.write_sep("=", "benchmarks")
+        for nodeid, value in results:
+            terminalreporter.write_line(f"{nodeid}: {value}")
+
+
 # (No custom event_loop fixture: pytest-asyncio 1.x removed support for
 # overriding it — loop management is configured via asyncio_default_*_loop_scope
 # in pytest.ini instead.)
@@ -218,3 +244,48 @@ async def async_client() -> AsyncGenerator[AsyncClient, None]:
     """Async HTTP client for testing API endpoints"""
     async with AsyncClient(base_url="http://test") as client:
         yield client
+
+
+@pytest.fixture(autouse=True)
+def fresh_circuit_breaker(monkeypatch):
+    """Give every test its own external-service circuit breaker.
+
+    The breaker is a process-wide singleton; without this, failures
+    recorded by one test would open circuits for the next.
+    """
+    from api.cds_hooks.providers import circuit_breaker
+    monkeypatch.setattr(circuit_breaker, "_circuit_breaker", None)
+
+
+@pytest.fixture(autouse=True)
+def fresh_inbox_write_log(monkeypatch, tmp_path):
+    """Give every test its own inbox write log file.
+
+    Counters sharing one would re-read each other's writes as if they came
+    from another worker. Process-wide counters a test created are
+    unsubscribed afterwards.
+    """
+    from api.clinical.inbox import counters
+    from api.websocket.fhir_notifications import notification_service
+    from services.hapi_fhir_client import remove_write_listener
+    monkeypatch.setattr(counters, "INBOX_COUNTERS_DB_PATH", str(tmp_path / "inbox_writes.db"))
+    monkeypatch.setattr(counters, "_inbox_counters", None)
+    yield
+    if counters._inbox_counters is not None:
+        remove_write_listener(counters._inbox_counters.on_fhir_write)
+        notification_service.remove_listener(counters._inbox_counters.on_fhir_write)
+
+
+@pytest.fixture(autouse=True)
+def fresh_dynamic_catalog_store(monkeypatch, tmp_path):
+    """Give every test its own persisted dynamic catalog file.
+
+    The store is a process-wide singleton backed by SQLite; sharing it
+    would carry one test's synced catalogs into the next.
+    """
+    from api.services.clinical import dynamic_catalog_store
+    monkeypatch.setattr(
+        dynamic_catalog_store,
+        "_dynamic_catalog_store",
+        dynamic_catalog_store.DynamicCatalogStore(str(tmp_path / "dynamic_catalogs.db")),
+    )
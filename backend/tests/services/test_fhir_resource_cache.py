@@ -0,0 +1,175 @@
+"""Tests for the shared, write-invalidated FHIRResourceCache.
+
+Covers the cache itself (LRU + TTL + byte budget, tag invalidation) and
+its two write hooks: HAPIFHIRClient create/update/delete and read-through
+caching when HAPI_FHIR_CACHE_READS is on.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import fhir_resource_cache as frc  # noqa: E402
+from services import hapi_fhir_client as hfc  # noqa: E402
+from services.fhir_resource_cache import (  # noqa: E402
+    FHIRResourceCache,
+    patient_tag,
+    resource_tag,
+    type_tag,
+)
+from services.hapi_fhir_client import HAPIFHIRClient, PooledTransport  # noqa: E402
+
+
+class TestFHIRResourceCache:
+    def test_hit_and_miss_are_counted(self):
+        cache = FHIRResourceCache()
+        assert cache.get("k") is None
+        cache.set("k", {"a": 1})
+        assert cache.get("k") == {"a": 1}
+
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_eviction_by_entry_count(self):
+        cache = FHIRResourceCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # a is now most recently used
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_byte_budget_evicts_oldest(self):
+        cache = FHIRResourceCache(max_bytes=100)
+        cache.set("a", "x", size=60)
+        cache.set("b", "y", size=60)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == "y"
+        assert cache.get_stats()["bytes"] == 60
+
+    def test_oversized_value_is_not_cached(self):
+        cache = FHIRResourceCache(max_bytes=10)
+        cache.set("a", "x", size=11)
+        assert len(cache) == 0
+
+    def test_ttl_expiry(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(frc.time, "monotonic", lambda: now[0])
+        cache = FHIRResourceCache()
+        cache.set("a", 1, ttl=5)
+        now[0] += 6
+
+        assert cache.get("a") is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_write_invalidates_type_resource_and_compartment(self):
+        cache = FHIRResourceCache()
+        cache.set("obs-search", [], tags=[type_tag("Observation")])
+        cache.set("patient-read", {}, tags=[resource_tag("Patient", "p1"), patient_tag("p1")])
+        cache.set("p1-graph", {}, tags=["relationships", patient_tag("p1")])
+        cache.set("cond-search", [], tags=[type_tag("Condition")])
+
+        dropped = cache.invalidate_write(
+            "Observation", "o1",
+            resource={"resourceType": "Observation", "subject": {"reference": "Patient/p1"}},
+        )
+
+        assert dropped == 3
+        assert cache.get("cond-search") == []
+
+    def test_stale_generation_is_not_stored(self):
+        cache = FHIRResourceCache()
+        generation = cache.write_generation
+        cache.invalidate_write("Patient", "p1")  # a write lands mid-fetch
+        cache.set("read", {}, generation=generation)
+        assert len(cache) == 0
+
+
+@pytest.fixture
+def hapi(monkeypatch):
+    """Read-through caching on, against a MockTransport upstream."""
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path))
+        if request.method == "PUT":
+            return httpx.Response(200, json={"resourceType": "Patient", "id": "p1", "active": False})
+        return httpx.Response(200, json={"resourceType": "Patient", "id": "p1", "active": True})
+
+    monkeypatch.setattr(frc, "_resource_cache", FHIRResourceCache())
+    monkeypatch.setattr(hfc, "_single_flight", hfc.SingleFlight())
+    monkeypatch.setattr(hfc, "HAPI_FHIR_CACHE_READS", True)
+    monkeypatch.setattr(hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler)))
+    return calls
+
+
+@pytest.fixture(autouse=True)
+async def _reset_shared_pool():
+    await hfc.close_shared_http_client()
+    yield
+    await hfc.close_shared_http_client()
+
+
+class TestClientReadThrough:
+    async def test_repeat_read_is_served_from_cache(self, hapi):
+        client = HAPIFHIRClient()
+        first = await client.read("Patient", "p1")
+        first["active"] = "mutated"
+        second = await client.read("Patient", "p1")
+
+        assert hapi == [("GET", "/fhir/Patient/p1")]
+        assert second["active"] is True
+
+    async def test_update_invalidates_read_and_searches(self, hapi):
+        client = HAPIFHIRClient()
+        await client.read("Patient", "p1")
+        await client.search("Patient", {"name": "Smith"})
+        await client.update("Patient", "p1", {"resourceType": "Patient", "active": False})
+        await client.read("Patient", "p1")
+        await client.search("Patient", {"name": "Smith"})
+
+        assert [m for m, _ in hapi] == ["GET", "GET", "PUT", "GET", "GET"]
+
+    async def test_body_fetched_before_a_write_is_not_cached(self, hapi, monkeypatch):
+        current = {"resourceType": "Patient", "id": "p1", "active": True}
+        gets = []
+
+        async def handler(request):
+            if request.method == "PUT":
+                current["active"] = False
+                return httpx.Response(200, json=current)
+            gets.append(request.url.path)
+            body = dict(current)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=body)
+
+        monkeypatch.setattr(hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler)))
+        client = HAPIFHIRClient()
+        before = asyncio.ensure_future(client.read("Patient", "p1"))
+        await asyncio.sleep(0.01)
+        await client.update("Patient", "p1", {"resourceType": "Patient", "active": False})
+        after = asyncio.ensure_future(client.read("Patient", "p1"))
+
+        assert (await before)["active"] is True
+        assert (await after)["active"] is False
+        assert (await client.read("Patient", "p1"))["active"] is False
+        assert len(gets) == 2
+
+    async def test_disabled_by_default_setting(self, hapi, monkeypatch):
+        monkeypatch.setattr(hfc, "HAPI_FHIR_CACHE_READS", False)
+        client = HAPIFHIRClient()
+        await client.read("Patient", "p1")
+        await client.read("Patient", "p1")
+        assert len(hapi) == 2
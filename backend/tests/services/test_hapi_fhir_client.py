@@ -0,0 +1,374 @@
+"""Tests for the shared pooled transport behind HAPIFHIRClient.
+
+Every HAPIFHIRClient instance must go through one process-wide httpx
+client instead of opening a new AsyncClient (and TCP connection) per call.
+The upstream is an ``httpx.MockTransport`` wrapped in ``PooledTransport``,
+so these tests never touch a real HAPI server.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import hapi_fhir_client as hfc  # noqa: E402
+from services.hapi_fhir_client import (  # noqa: E402
+    FHIRClientError,
+    HAPIFHIRClient,
+    PooledTransport,
+)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Route the shared pool at a MockTransport; yields the request log."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        if request.url.path.endswith("/Patient/missing"):
+            return httpx.Response(404, json={"resourceType": "OperationOutcome"})
+        return httpx.Response(200, json={"resourceType": "Bundle", "entry": []})
+
+    monkeypatch.setattr(
+        hfc,
+        "PooledTransport",
+        lambda: PooledTransport(max_per_host=2, inner=httpx.MockTransport(handler)),
+    )
+    return seen
+
+
+@pytest.fixture(autouse=True)
+async def _reset_shared_pool(monkeypatch):
+    monkeypatch.setattr(hfc, "_single_flight", hfc.SingleFlight())
+    await hfc.close_shared_http_client()
+    yield
+    await hfc.close_shared_http_client()
+
+
+class TestSharedPool:
+    async def test_instances_share_one_http_client(self, upstream):
+        await HAPIFHIRClient().search("Patient", {"name": "Smith"})
+        first = hfc.get_shared_http_client()
+        await HAPIFHIRClient().read("Patient", "123")
+
+        assert hfc.get_shared_http_client() is first
+        assert len(upstream) == 2
+        assert upstream[0].url.params["name"] == "Smith"
+
+    async def test_stats_count_requests_and_release_slots(self, upstream):
+        client = HAPIFHIRClient()
+        await asyncio.gather(*(client.search("Observation", {"patient": str(i)}) for i in range(6)))
+
+        stats = hfc.get_pool_stats()
+        assert stats["initialized"] is True
+        assert stats["requests"]["total"] == 6
+        assert stats["requests"]["in_use"] == 0
+        assert stats["requests"]["waiting"] == 0
+        assert stats["config"]["max_per_host"] == 2
+
+    async def test_per_host_limit_caps_concurrency(self, monkeypatch):
+        active = 0
+        peak = 0
+
+        async def slow_handler(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return httpx.Response(200, json={})
+
+        monkeypatch.setattr(
+            hfc,
+            "PooledTransport",
+            lambda: PooledTransport(max_per_host=2, inner=httpx.MockTransport(slow_handler)),
+        )
+        client = HAPIFHIRClient()
+        await asyncio.gather(*(client.read("Patient", str(i)) for i in range(8)))
+
+        assert peak == 2
+        assert hfc.get_pool_stats()["wait_time_ms"]["max"] > 0
+
+    async def test_error_mapping_is_unchanged(self, upstream):
+        with pytest.raises(FHIRClientError) as exc:
+            await HAPIFHIRClient().read("Patient", "missing")
+        assert exc.value.status_code == 404
+        assert hfc.get_pool_stats()["requests"]["in_use"] == 0
+
+    async def test_close_resets_pool(self, upstream):
+        await HAPIFHIRClient().search("Patient")
+        await hfc.close_shared_http_client()
+        assert hfc.get_pool_stats()["initialized"] is False
+
+    def test_new_event_loop_closes_the_old_pool(self):
+        closed = threading.Event()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so the connection stays pooled
+
+            def do_GET(self):
+                body = b'{"resourceType": "Bundle"}'
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def finish(self):
+                super().finish()
+                closed.set()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/fhir/Patient"
+
+        async def get():
+            await hfc.get_shared_http_client().get(url)
+
+        try:
+            asyncio.run(get())
+            assert not closed.wait(0.1)
+            # A new loop (reloaded worker) must not strand the old loop's sockets
+            asyncio.run(get())
+            assert closed.wait(2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_http2_falls_back_without_h2(self, monkeypatch):
+        monkeypatch.setattr(hfc, "_http2_available", lambda: False)
+        transport = PooledTransport(http2=True, inner=httpx.MockTransport(lambda r: httpx.Response(200)))
+        assert transport.http2 is False
+
+
+def _paged_upstream(monkeypatch, pages, seen, base="http://hapi-fhir:8080/fhir"):
+    """Serve `pages` (lists of ids) as a chain of Bundles linked by next."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        index = int(request.url.params.get("_getpagesoffset", "0"))
+        bundle = {
+            "resourceType": "Bundle",
+            "entry": [{"resource": {"resourceType": "Patient", "id": i}} for i in pages[index]],
+        }
+        if index + 1 < len(pages):
+            bundle["link"] = [{"relation": "next", "url": f"{base}?_getpages=abc&_getpagesoffset={index + 1}"}]
+        return httpx.Response(200, json=bundle)
+
+    monkeypatch.setattr(
+        hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler))
+    )
+
+
+class TestSearchIter:
+    async def test_follows_next_links_across_pages(self, monkeypatch):
+        seen = []
+        _paged_upstream(monkeypatch, [["a", "b"], ["c"], ["d", "e"]], seen)
+
+        client = HAPIFHIRClient(base_url="http://hapi-fhir:8080/fhir")
+        ids = [r["id"] async for r in client.search_iter("Patient", {"_count": 2})]
+
+        assert ids == ["a", "b", "c", "d", "e"]
+        assert len(seen) == 3
+        assert seen[0].url.params["_count"] == "2"
+
+    async def test_next_link_is_repointed_at_our_base(self, monkeypatch):
+        seen = []
+        _paged_upstream(monkeypatch, [["a"], ["b"]], seen, base="http://localhost:8888/fhir")
+
+        client = HAPIFHIRClient(base_url="http://hapi-fhir:8080/fhir")
+        assert len(await client.search_all("Patient")) == 2
+        assert seen[1].url.host == "hapi-fhir"
+        assert seen[1].url.port == 8080
+
+    async def test_max_pages_truncates(self, monkeypatch):
+        seen = []
+        _paged_upstream(monkeypatch, [["a"], ["b"], ["c"], ["d"]], seen)
+
+        resources = await HAPIFHIRClient().search_all("Patient", max_pages=2)
+
+        assert [r["id"] for r in resources] == ["a", "b"]
+        assert len(seen) == 2
+
+    async def test_byte_budget_truncates(self, monkeypatch):
+        seen = []
+        _paged_upstream(monkeypatch, [["a"], ["b"], ["c"]], seen)
+
+        resources = await HAPIFHIRClient().search_all("Patient", max_bytes=1)
+
+        assert [r["id"] for r in resources] == ["a"]
+
+    async def test_next_page_is_prefetched_while_consuming(self, monkeypatch):
+        seen = []
+        _paged_upstream(monkeypatch, [["a", "b"], ["c"]], seen)
+
+        iterator = HAPIFHIRClient().search_iter("Patient")
+        assert (await iterator.__anext__())["id"] == "a"
+        await asyncio.sleep(0)  # let the prefetch task run
+        await asyncio.sleep(0)
+        assert len(seen) == 2
+        await iterator.aclose()
+
+    async def test_page_error_raises_fhir_client_error(self, monkeypatch):
+        monkeypatch.setattr(
+            hfc, "PooledTransport",
+            lambda: PooledTransport(inner=httpx.MockTransport(lambda r: httpx.Response(500))),
+        )
+        with pytest.raises(FHIRClientError) as exc:
+            await HAPIFHIRClient().search_all("Patient")
+        assert exc.value.status_code == 500
+
+
+class TestSingleFlight:
+    async def test_identical_concurrent_reads_share_one_call(self, monkeypatch):
+        calls = 0
+
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"resourceType": "Patient", "id": "p1"})
+
+        monkeypatch.setattr(
+            hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler))
+        )
+        results = await asyncio.gather(*(HAPIFHIRClient().read("Patient", "p1") for _ in range(5)))
+
+        assert calls == 1
+        assert all(r == {"resourceType": "Patient", "id": "p1"} for r in results)
+        # Each caller parses its own copy
+        results[0]["id"] = "mutated"
+        assert results[1]["id"] == "p1"
+
+        stats = hfc.get_pool_stats()["coalescing"]
+        assert stats["upstream_calls"] == 1
+        assert stats["coalesced_calls"] == 4
+        assert stats["in_flight"] == 0
+
+    async def test_param_order_does_not_matter(self, monkeypatch):
+        calls = 0
+
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"resourceType": "Bundle"})
+
+        monkeypatch.setattr(
+            hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler))
+        )
+        client = HAPIFHIRClient()
+        await asyncio.gather(
+            client.search("MedicationRequest", {"patient": "p1", "status": "active"}),
+            client.search("MedicationRequest", {"status": "active", "patient": "p1"}),
+            client.search("MedicationRequest", {"status": "stopped", "patient": "p1"}),
+        )
+
+        assert calls == 2
+
+    async def test_sequential_calls_are_not_cached(self, upstream):
+        client = HAPIFHIRClient()
+        await client.read("Patient", "p1")
+        await client.read("Patient", "p1")
+        assert len(upstream) == 2
+
+    async def test_errors_reach_every_waiter(self, monkeypatch):
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            return httpx.Response(404)
+
+        monkeypatch.setattr(
+            hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler))
+        )
+        results = await asyncio.gather(
+            *(HAPIFHIRClient().read("Patient", "gone") for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, FHIRClientError) and r.status_code == 404 for r in results)
+
+    async def test_disabled_by_setting(self, monkeypatch):
+        calls = 0
+
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={})
+
+        monkeypatch.setattr(hfc, "HAPI_FHIR_COALESCE_READS", False)
+        monkeypatch.setattr(
+            hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler))
+        )
+        await asyncio.gather(*(HAPIFHIRClient().read("Patient", "p1") for _ in range(3)))
+        assert calls == 3
+
+    async def test_read_after_write_does_not_join_an_older_read(self, monkeypatch):
+        current = {"resourceType": "Patient", "id": "p", "v": 1}
+
+        async def handler(request):
+            if request.method == "PUT":
+                current.update(json.loads(request.content))
+                return httpx.Response(200, json=current)
+            body = dict(current)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=body)
+
+        monkeypatch.setattr(
+            hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler))
+        )
+        client = HAPIFHIRClient()
+        before = asyncio.ensure_future(client.read("Patient", "p"))
+        await asyncio.sleep(0.01)
+        await client.update("Patient", "p", {"resourceType": "Patient", "id": "p", "v": 2})
+
+        assert (await client.read("Patient", "p"))["v"] == 2
+        assert (await before)["v"] == 1
+
+
+class TestWriteListeners:
+    async def test_listeners_hear_writes_and_failures_are_contained(self, monkeypatch):
+        def handler(request):
+            if request.method == "POST":
+                return httpx.Response(201, json={"resourceType": "Task", "id": "t1"})
+            return httpx.Response(200, json={"resourceType": "Task", "id": "t1", "status": "completed"})
+
+        monkeypatch.setattr(
+            hfc, "PooledTransport", lambda: PooledTransport(inner=httpx.MockTransport(handler))
+        )
+        monkeypatch.setattr(hfc, "_write_listeners", [])
+        heard = []
+
+        async def broken(*args):
+            raise RuntimeError("listener bug")
+
+        async def listener(action, resource_type, resource_id, resource):
+            heard.append((action, resource_type, resource_id, resource and resource.get("status")))
+
+        hfc.add_write_listener(broken)
+        hfc.add_write_listener(listener)
+        client = HAPIFHIRClient()
+        await client.create("Task", {"status": "requested"})
+        await client.update("Task", "t1", {"status": "completed"})
+        assert await client.delete("Task", "t1")
+
+        assert heard == [
+            ("created", "Task", "t1", None),
+            ("updated", "Task", "t1", "completed"),
+            ("deleted", "Task", "t1", None),
+        ]
+        hfc.remove_write_listener(listener)
+        await client.delete("Task", "t1")
+        assert len(heard) == 3
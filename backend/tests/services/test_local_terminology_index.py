@@ -211,3 +211,269 @@ async def test_search_multi_runs_concurrently(built_db: Path):
     # in conditions.
     assert {r["code"] for r in results["medications"]} == {"1551291", "29046"}
     assert results["conditions_icd10"] == []
+
+
+# -- ranking, domain partitioning, result cache ------------------------------
+
+@pytest.mark.asyncio
+async def test_search_results_ranked_best_first(built_db: Path):
+    """The bare ingredient outranks the longer product display."""
+    idx = LocalTerminologyIndex(str(built_db))
+    try:
+        results = await idx.search_catalog("medications", "metformin", count=10)
+    finally:
+        idx.close()
+    assert [r["code"] for r in results] == ["6809", "860975"]
+
+
+def test_build_index_records_domain_rowid_ranges(built_db: Path):
+    conn = sqlite3.connect(str(built_db))
+    ranges = dict(((d, (lo, hi)) for d, lo, hi in conn.execute("SELECT * FROM domain_ranges")))
+    for domain, (lo, hi) in ranges.items():
+        inside = conn.execute(
+            "SELECT COUNT(*), SUM(domain = ?) FROM concepts WHERE rowid BETWEEN ? AND ?",
+            (domain, lo, hi),
+        ).fetchone()
+        assert inside[0] == inside[1]
+    conn.close()
+    assert set(ranges) == {"medications", "medication_ingredients", "conditions_icd10"}
+
+
+@pytest.mark.asyncio
+async def test_domain_partition_excludes_other_domains(built_db: Path):
+    """'metformin' is in both rxnorm domains; each search only sees its own."""
+    idx = LocalTerminologyIndex(str(built_db))
+    try:
+        ingredients = await idx.search_catalog("medication_ingredients", "metf", count=10)
+        conditions = await idx.search_catalog("conditions_icd10", "metf", count=10)
+    finally:
+        idx.close()
+    assert [r["code"] for r in ingredients] == ["6809"]
+    assert conditions == []
+
+
+@pytest.mark.asyncio
+async def test_index_without_domain_ranges_uses_join_query(built_db: Path):
+    """Indexes built before domain_ranges existed still search correctly."""
+    conn = sqlite3.connect(str(built_db))
+    conn.execute("DROP TABLE domain_ranges")
+    conn.commit()
+    conn.close()
+    idx = LocalTerminologyIndex(str(built_db))
+    try:
+        results = await idx.search_catalog("medications", "metformin", count=10)
+    finally:
+        idx.close()
+    assert [r["code"] for r in results] == ["6809", "860975"]
+
+
+@pytest.mark.asyncio
+async def test_search_cache_serves_repeats_and_normalizes_query(built_db: Path):
+    idx = LocalTerminologyIndex(str(built_db))
+    try:
+        first = await idx.search_catalog("medications", "metf", count=10)
+        first[0]["display"] = "mutated by caller"
+        again = await idx.search_catalog("medications", "METF ", count=10)
+    finally:
+        idx.close()
+    assert idx.cache_hits == 1 and idx.cache_misses == 1
+    assert again[0]["display"] != "mutated by caller"
+
+
+@pytest.mark.asyncio
+async def test_search_cache_is_bounded_lru(built_db: Path):
+    idx = LocalTerminologyIndex(str(built_db), cache_size=2)
+    try:
+        await idx.search_catalog("medications", "metf")
+        await idx.search_catalog("medications", "lis")
+        await idx.search_catalog("medications", "metf")      # refresh
+        await idx.search_catalog("conditions_icd10", "type")  # evicts 'lis'
+        await idx.search_catalog("medications", "metf")
+        assert idx.cache_hits == 2
+        await idx.search_catalog("medications", "lis")
+        assert idx.cache_misses == 4
+        assert idx.get_cache_stats()["size"] == 2
+    finally:
+        idx.close()
+
+
+@pytest.mark.asyncio
+async def test_missing_index_results_are_not_cached(tmp_path: Path):
+    idx = LocalTerminologyIndex(str(tmp_path / "later.db"))
+    assert await idx.search_catalog("medications", "metf") == []
+    assert idx.get_cache_stats()["size"] == 0
+
+
+@pytest.mark.benchmark
+def test_benchmark_autocomplete_p95_full_load(tmp_path: Path, record_property):
+    """300K synthetic concepts across domains; p95 of cold prefix searches.
+
+    Compares bm25 ranking over the join-and-filter query the index used
+    before against the ranked, rowid-range query on the same file. The old
+    unranked query is timed too for reference: it can stop after the first
+    50 hits, which ranking by definition cannot.
+    """
+    import random
+    import time
+
+    rng = random.Random(42)
+    stems = ["dia", "diab", "hyper", "hypo", "metf", "lisin", "card", "neph", "pneu", "arth",
+             "ost", "gastr", "hep", "derm", "neur", "psych", "onc", "hem", "endo", "pulm"]
+    words = [stem + "".join(rng.choice("aeioulnrst") for _ in range(rng.randint(2, 7)))
+             for stem in stems for _ in range(60)]
+    words += ["tablet", "oral", "mg", "injection", "solution", "chronic", "acute", "disorder"]
+
+    def code_system(n, url):
+        return {"url": url, "concept": [
+            {"code": str(i), "display": " ".join(rng.choice(words) for _ in range(rng.randint(2, 8))),
+             "property": {"TTY": rng.choice(["IN", "SCD", "SBD"])}}
+            for i in range(n)
+        ]}
+
+    json_dir = tmp_path / "vocab"
+    json_dir.mkdir()
+    (json_dir / "rxnorm.json").write_text(json.dumps(code_system(120_000, "rxnorm")))
+    (json_dir / "snomed.json").write_text(json.dumps(code_system(60_000, "snomed")))
+    (json_dir / "icd10cm.json").write_text(json.dumps(code_system(40_000, "icd10")))
+    output = tmp_path / "terminology.db"
+    total = build_terminology_index.build_index(json_dir, None, output)
+    assert total >= 300_000
+
+    queries = [w[:n] for w in rng.sample(words, 12) for n in (2, 3, 4)] + ["type 2", "oral tab"]
+    domains = ["procedures_snomed", "medication_ingredients"]
+
+    def p95(run):
+        samples = []
+        for q in queries:
+            for domain in domains:
+                started = time.perf_counter()
+                run(domain, q)
+                samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        return samples[int(len(samples) * 0.95) - 1]
+
+    conn = sqlite3.connect(f"file:{output}?mode=ro", uri=True)
+
+    def join_and_filter(order_by):
+        sql = (
+            "SELECT c.system, c.code, c.display FROM concepts_fts f "
+            "JOIN concepts c ON c.rowid = f.rowid "
+            f"WHERE c.domain = ? AND concepts_fts MATCH ? {order_by} LIMIT 50"
+        )
+        return lambda domain, q: conn.execute(sql, (domain, _build_fts_query(q))).fetchall()
+
+    idx = LocalTerminologyIndex(str(output))
+    try:
+        unranked_p95 = p95(join_and_filter(""))
+        join_ranked_p95 = p95(join_and_filter("ORDER BY f.rank"))
+        partitioned_p95 = p95(lambda domain, q: idx._search_sync(domain, q, 50))
+    finally:
+        idx.close()
+        conn.close()
+
+    record_property("benchmark", f"{total} concepts, {len(queries) * len(domains)} searches, p95: "
+                    f"unranked join+filter {unranked_p95:.1f}ms, ranked join+filter {join_ranked_p95:.1f}ms, "
+                    f"ranked+partitioned {partitioned_p95:.1f}ms")
+
+
+# -- Read pool, executor, hot swap ----------------------------------------
+
+@pytest.mark.asyncio
+async def test_readers_are_read_only_with_mmap_and_page_cache(built_db: Path):
+    idx = LocalTerminologyIndex(str(built_db))
+    try:
+        await idx.search_catalog("medications", "metf")
+        with idx._reader() as reader:
+            conn = reader.conn
+            assert conn.execute("PRAGMA mmap_size").fetchone()[0] > 0
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] < 0  # KiB
+            with pytest.raises(sqlite3.Error):
+                conn.execute("DELETE FROM concepts")
+    finally:
+        idx.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_searches_use_pool_on_dedicated_executor(built_db: Path, monkeypatch):
+    import asyncio
+    import threading
+
+    idx = LocalTerminologyIndex(str(built_db), cache_size=0, pool_size=3)
+    seen = []
+    query = idx._query
+
+    def slow_query(reader, *args):
+        seen.append((threading.current_thread().name, id(reader.conn)))
+        import time
+        time.sleep(0.05)
+        return query(reader, *args)
+
+    monkeypatch.setattr(idx, "_query", slow_query)
+    try:
+        results = await asyncio.gather(*[
+            idx.search_catalog("medications", text) for text in ("metf", "lis", "tab", "oral", "mg", "met")
+        ])
+    finally:
+        idx.close()
+
+    assert [r["code"] for r in results[1]] == ["29046", "1551291"]
+    assert all(name.startswith("terminology-search") for name, _ in seen)
+    # Three workers, each holding its own connection
+    assert len({conn for _, conn in seen}) == 3
+
+
+@pytest.mark.asyncio
+async def test_rebuilt_index_is_picked_up_without_restart(built_db: Path, fixture_json_dir: Path):
+    idx = LocalTerminologyIndex(str(built_db), reload_check_seconds=0)
+    try:
+        assert await idx.search_catalog("conditions_icd10", "hypertension")
+        with idx._reader() as held:
+            # Rebuild without hypertension while a reader holds the old file
+            icd = json.loads((fixture_json_dir / "icd10cm.json").read_text())
+            icd["concept"] = [c for c in icd["concept"] if c["code"] != "I10"]
+            (fixture_json_dir / "icd10cm.json").write_text(json.dumps(icd))
+            build_terminology_index.build_index(fixture_json_dir, None, built_db)
+
+            assert await idx.search_catalog("conditions_icd10", "hypertension") == []
+            # The retired reader still reads the file it opened
+            old_rows = held.conn.execute("SELECT COUNT(*) FROM concepts WHERE code = 'I10'").fetchone()
+        assert old_rows == (1,)
+        # Retired reader is closed on return, not pooled
+        assert held not in idx._idle
+        with pytest.raises(sqlite3.ProgrammingError):
+            held.conn.execute("SELECT 1")
+    finally:
+        idx.close()
+
+
+@pytest.mark.asyncio
+async def test_reload_switches_to_another_file_and_clears_cache(built_db: Path, tmp_path: Path):
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    (empty / "rxnorm.json").write_text(json.dumps({"url": "rx", "concept": [
+        {"code": "1", "display": "metoprolol", "property": {"TTY": "IN"}},
+    ]}))
+    other = tmp_path / "other.db"
+    build_terminology_index.build_index(empty, None, other)
+
+    idx = LocalTerminologyIndex(str(built_db))
+    try:
+        assert [r["code"] for r in await idx.search_catalog("medication_ingredients", "met")] == ["6809"]
+        idx.reload(str(other))
+        assert idx.get_cache_stats()["size"] == 0
+        assert [r["code"] for r in await idx.search_catalog("medication_ingredients", "met")] == ["1"]
+    finally:
+        idx.close()
+
+
+def test_failed_build_leaves_existing_index_in_place(built_db: Path, tmp_path: Path, monkeypatch):
+    before = built_db.read_bytes()
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(build_terminology_index, "_ingest_domain", boom)
+    with pytest.raises(RuntimeError):
+        build_terminology_index.build_index(tmp_path, None, built_db)
+    assert built_db.read_bytes() == before
+    assert not list(tmp_path.glob("*.building*"))
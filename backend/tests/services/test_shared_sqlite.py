@@ -0,0 +1,41 @@
+"""Tests for SharedSQLiteFile, the host-wide SQLite setup behind the
+dynamic catalog store and the inbox write log."""
+
+from __future__ import annotations
+
+import sys
+from contextlib import closing
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import shared_sqlite  # noqa: E402
+from services.shared_sqlite import SharedSQLiteFile  # noqa: E402
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY);"
+
+
+def test_creates_directory_schema_and_wal(tmp_path):
+    db = SharedSQLiteFile(str(tmp_path / "nested" / "items.db"), SCHEMA, "items.db", "items")
+
+    with closing(db.connect()) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.execute("INSERT INTO items DEFAULT VALUES")
+        conn.commit()
+    with closing(db.connect()) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+
+
+def test_unwritable_path_falls_back_to_temp_dir(tmp_path, monkeypatch):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    temp_dir = tmp_path / "tmp"
+    temp_dir.mkdir()
+    monkeypatch.setattr(shared_sqlite.tempfile, "gettempdir", lambda: str(temp_dir))
+    db = SharedSQLiteFile(str(blocker / "items.db"), SCHEMA, "fallback_items.db", "items")
+
+    with closing(db.connect()) as conn:
+        conn.execute("SELECT COUNT(*) FROM items")
+
+    assert db.db_path == str(temp_dir / "fallback_items.db")
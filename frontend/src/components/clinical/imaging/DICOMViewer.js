@@ -66,6 +66,9 @@ const DICOMViewer = ({ study, onClose }) => {
   const animationRef = useRef(null);
   const lastPanRef = useRef({ x: 0, y: 0 });
   const isDragging = useRef(false);
+  // Identifies this viewer to the backend's series read-ahead, which
+  // prefetches the slices around the one being viewed while we scroll.
+  const prefetchSessionRef = useRef(`viewer-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`);
 
   // Frames in the current instance (≥1). >1 means a cine clip (e.g. echo).
   const frameCount = instances[currentInstanceIndex]?.numberOfFrames || 1;
@@ -84,6 +87,14 @@ const DICOMViewer = ({ study, onClose }) => {
     }
   }, [study]); // Remove loadStudyData from dependencies to prevent infinite loops
 
+  // Stop the backend's read-ahead for this viewer when it closes
+  useEffect(() => {
+    const sessionId = prefetchSessionRef.current;
+    return () => {
+      apiClient.delete(`/api/dicom/prefetch/${sessionId}`).catch(() => {});
+    };
+  }, []);
+
   // Auto-play animation. For a multi-frame instance (cine clip, e.g. echo) we
   // loop its frames; otherwise we advance through instances (e.g. CT slices).
   useEffect(() => {
@@ -225,7 +236,7 @@ const DICOMViewer = ({ study, onClose }) => {
       }
 
       const frameParam = (instance?.numberOfFrames > 1) ? currentFrame : 1;
-      const url = `/api/dicom/studies/${studyDir}/series/${seriesUid}/instances/${sopUid}/image?window_center=${windowCenter}&window_width=${windowWidth}&frame=${frameParam}`;
+      const url = `/api/dicom/studies/${studyDir}/series/${seriesUid}/instances/${sopUid}/image?window_center=${windowCenter}&window_width=${windowWidth}&frame=${frameParam}&session=${prefetchSessionRef.current}`;
       const dicomEndpoints = resolveDicomEndpoints();
 
       const response = await apiClient.get(url, {